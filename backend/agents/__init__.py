@@ -9,16 +9,40 @@ from .agent_manager import (
     get_agent_manager
 )
 
+from .registry import (
+    AgentRegistry,
+    AgentProfile,
+    get_agent_registry
+)
+
 from .workflow import (
     ProjectWorkflow,
     WorkflowStep,
-    WorkflowStatus
+    WorkflowStatus,
+    get_running_workflow,
+    confirm_step,
+    refine_step
+)
+
+from .revisions import (
+    RevisionScheduler,
+    get_revision_scheduler,
+    get_revision_job
 )
 
 __all__ = [
     'AgentManager',
     'get_agent_manager',
+    'AgentRegistry',
+    'AgentProfile',
+    'get_agent_registry',
     'ProjectWorkflow',
     'WorkflowStep',
-    'WorkflowStatus'
+    'WorkflowStatus',
+    'get_running_workflow',
+    'confirm_step',
+    'refine_step',
+    'RevisionScheduler',
+    'get_revision_scheduler',
+    'get_revision_job'
 ]
\ No newline at end of file
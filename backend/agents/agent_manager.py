@@ -9,9 +9,13 @@ via Ollama, gérer leur état et traiter leurs réponses.
 import os
 import json
 import time
+import socket
+import hashlib
 import subprocess
 import requests
+import contextvars
 from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from flask import g, current_app
 import logging
 from datetime import datetime
@@ -19,17 +23,170 @@ from datetime import datetime
 # Import des configurations
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from config import OLLAMA_BASE_MODEL, AGENTS, AGENT_TITLES
+from config import (
+    OLLAMA_API_URL, OLLAMA_BASE_MODEL, AGENTS, AGENT_TITLES,
+    OLLAMA_MAX_PARALLEL, BATCH_DEFAULT_TIMEOUT, GENERATION_TIERS, DEFAULT_STEP_TIER,
+    DEFAULT_STEP_BUDGET, WORKFLOW_STEPS, AGENT_MODEL_MODE, OLLAMA_SHARED_MODEL, OLLAMA_KEEP_ALIVE,
+    SECTION_CONTEXT_CHARS, SECTION_TOKEN_FACTOR, SECTION_MIN_TOKENS
+)
 from database.db import get_db, insert_db, query_db, update_db
+from database.analytics import insert_generation_stats
+from database.dedup import store_knowledge
 from utils.file_manager import save_deliverable, get_brief, get_deliverable, get_feedback
+from agents.registry import get_agent_registry
+from agents.tuning import tuned_modelfile_pending, mark_applied
+from utils.admission import PrioritySlots, AdmissionError, QueueFullError, DeadlineExceededError
+from utils.cancellation import CancellationToken, GenerationCancelled
+from utils.checkpoint import StepCheckpoint, CheckpointBusyError
+from utils.sections import parse_sections, render_sections, section_spans, splice_sections, fit_section
+from utils.metrics import (
+    OLLAMA_REQUEST_DURATION, OLLAMA_REQUESTS, INFERENCE_QUEUE_WAIT,
+    INFERENCE_IN_FLIGHT, ADMISSION_REJECTIONS, CHECKPOINT_RESUMED_TOKENS, record_generation_stats
+)
+from utils.tracing import span, record_span
+from utils.cache import invalidate_bootstrap_cache
 
-# Configuration du logger
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logger (handlers configurés une seule fois par utils.logs.configure_logging)
 logger = logging.getLogger('agent_manager')
 
-# URL de l'API Ollama
-OLLAMA_API_URL = "http://localhost:11434/api"
+
+def get_step_tier(step_id):
+    """
+    Retourne le palier de génération configuré pour une étape du workflow.
+    
+    Args:
+        step_id (str): ID de l'étape
+        
+    Returns:
+        str: Palier ('draft' ou 'full', voir GENERATION_TIERS)
+    """
+    for step in WORKFLOW_STEPS:
+        if step['id'] == step_id:
+            return step.get('tier', DEFAULT_STEP_TIER)
+    return DEFAULT_STEP_TIER
+
+
+def get_step_budget(step_id):
+    """
+    Retourne le budget de génération d'une étape du workflow.
+    
+    Args:
+        step_id (str): ID de l'étape
+        
+    Returns:
+        dict: Budget (max_seconds, max_tokens), DEFAULT_STEP_BUDGET complété
+            par la clé 'budget' de l'étape dans WORKFLOW_STEPS
+    """
+    budget = dict(DEFAULT_STEP_BUDGET)
+    for step in WORKFLOW_STEPS:
+        if step['id'] == step_id:
+            budget.update(step.get('budget') or {})
+    return budget
+
+
+# Caractères de chaque livrable précédent repris dans le prompt d'une étape
+UPSTREAM_EXCERPT_CHARS = 500
+
+
+def hash_step_input(content):
+    """
+    Empreinte d'une entrée d'étape, telle qu'elle est reprise dans le prompt.
+    
+    Args:
+        content (str): Brief ou extrait d'un livrable précédent
+        
+    Returns:
+        str: Empreinte SHA-256 hexadécimale
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+class StreamAccumulator:
+    """
+    Assemble une génération Ollama reçue en flux (une ligne JSON par fragment).
+    
+    Utilisé par la lecture bloquante (AgentManager._read_stream) comme par la
+    lecture asynchrone (agents.async_client).
+    """
+    
+    def __init__(self, budget=None, on_token=None):
+        """
+        Args:
+            budget (dict, optional): Budget (max_seconds, max_tokens)
+            on_token (callable, optional): Appelée avec chaque fragment de texte
+        """
+        budget = budget or {}
+        self.started = time.perf_counter()
+        self.budget_deadline = self.started + budget['max_seconds'] if budget.get('max_seconds') else None
+        self.max_tokens = budget.get('max_tokens')
+        self.on_token = on_token
+        self.parts = []
+        self.tokens = 0
+        self.final = None
+    
+    @property
+    def text(self):
+        """Texte reçu jusqu'ici"""
+        return ''.join(self.parts)
+    
+    def feed(self, line):
+        """
+        Traite une ligne du flux.
+        
+        Args:
+            line (bytes|str): Ligne JSON reçue d'Ollama
+            
+        Returns:
+            bool: True si la génération est terminée ou a dépassé son budget
+            
+        Raises:
+            RuntimeError: Si Ollama signale une erreur dans le flux
+        """
+        if not line:
+            return False
+        
+        chunk = json.loads(line)
+        if chunk.get('error'):
+            raise RuntimeError(f"Erreur de communication avec l'agent: {chunk['error']}")
+        text = chunk.get('response', '')
+        self.parts.append(text)
+        if text and self.on_token is not None:
+            self.on_token(text)
+        if chunk.get('done'):
+            self.final = chunk
+            return True
+        
+        self.tokens += 1
+        if (self.max_tokens and self.tokens > self.max_tokens) or \
+                (self.budget_deadline is not None and time.perf_counter() >= self.budget_deadline):
+            self.final = {
+                'model': chunk.get('model'),
+                'done': True,
+                'done_reason': 'budget',
+                'eval_count': self.tokens,
+                'total_duration': int((time.perf_counter() - self.started) * 1e9)
+            }
+            return True
+        return False
+    
+    def result(self, cancel_token=None):
+        """
+        Returns:
+            dict: Dernier fragment d'Ollama (statistiques), avec le texte complet
+                dans 'response'; en cas de dépassement du budget, statistiques
+                mesurées côté client et done_reason 'budget'
+            
+        Raises:
+            GenerationCancelled: Si le flux s'est interrompu sur une annulation
+            RuntimeError: Si le flux s'est interrompu avant le dernier fragment
+        """
+        if self.final is None:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled(self.text)
+            raise RuntimeError("Erreur de communication avec l'agent: flux interrompu")
+        
+        self.final['response'] = self.text
+        return self.final
+
 
 class AgentManager:
     """
@@ -40,33 +197,105 @@ class AgentManager:
     def __init__(self):
         """Initialise le gestionnaire d'agents"""
         self.lock = Lock()  # Pour éviter les conflits d'accès concurrents
-        self.ensure_agents_exist()
+        # Nombre de générations simultanées autorisées vers Ollama
+        self.inference_slots = PrioritySlots(OLLAMA_MAX_PARALLEL)
+        self.registry = get_agent_registry()
+        # La vérification des agents dans Ollama est faite à la première génération
+        # (ou une seule fois dans le processus maître gunicorn, cf. gunicorn.conf.py)
         logger.info("AgentManager initialisé avec succès")
     
+    def ensure_agents_ready(self):
+        """
+        Vérifie, une seule fois, que les agents existent dans Ollama.
+        
+        Le résultat est conservé au niveau du module: une vérification faite
+        avant le fork (gunicorn --preload) vaut pour tous les workers. En cas
+        d'échec (Ollama injoignable), la vérification est retentée à l'appel suivant.
+        
+        Returns:
+            bool: True si les agents sont prêts
+        """
+        global _agents_ready
+        if _agents_ready:
+            return True
+        with _agents_ready_lock:
+            if not _agents_ready:
+                _agents_ready = self.ensure_agents_exist()
+            return _agents_ready
+    
     def ensure_agents_exist(self):
-        """Vérifie que tous les agents existent dans Ollama, sinon les crée"""
+        """
+        Vérifie que tous les agents existent dans Ollama, sinon les crée.
+        Les agents dont le modelfile réglé (manage.py autotune) n'a pas encore
+        été appliqué sont recréés.
+        """
         try:
             # Liste des modèles disponibles
             response = requests.get(f"{OLLAMA_API_URL}/tags")
             if response.status_code != 200:
-                logger.error(f"Erreur lors de la récupération des modèles: {response.text}")
+                logger.error("Erreur lors de la récupération des modèles: %s", response.text)
                 return False
             
-            available_models = [model['name'] for model in response.json().get('models', [])]
+            # Ollama suffixe les noms de modèles par leur tag (ex: "arch:latest")
+            available_models = set()
+            for model in response.json().get('models', []):
+                available_models.add(model['name'])
+                if model['name'].endswith(':latest'):
+                    available_models.add(model['name'][:-len(':latest')])
+            
+            if AGENT_MODEL_MODE == 'shared':
+                return self.ensure_shared_model(available_models)
             
             # Vérifier chaque agent
             for agent in AGENTS:
                 if agent not in available_models:
-                    logger.warning(f"L'agent {agent} n'existe pas, création en cours...")
+                    logger.warning("L'agent %s n'existe pas, création en cours...", agent)
+                    self.create_agent(agent)
+                elif tuned_modelfile_pending(self.registry.get(agent)):
+                    # Modelfile réglé par manage.py autotune, pas encore appliqué
+                    logger.info("Application du modelfile réglé de l'agent %s", agent)
                     self.create_agent(agent)
                 else:
-                    logger.info(f"L'agent {agent} existe déjà")
+                    logger.info("L'agent %s existe déjà", agent)
             
             return True
         
         except Exception as e:
-            logger.error(f"Erreur lors de la vérification des agents: {e}")
+            logger.error("Erreur lors de la vérification des agents: %s", e)
+            return False
+    
+    def ensure_shared_model(self, available_models):
+        """
+        Mode modèle partagé: vérifie que le modèle de base est présent et le
+        charge en mémoire avec les options d'exécution communes aux agents.
+        
+        Args:
+            available_models (set): Modèles présents dans Ollama
+        
+        Returns:
+            bool: True si le modèle partagé est disponible
+        """
+        if OLLAMA_SHARED_MODEL not in available_models:
+            logger.error("Modèle partagé %s absent d'Ollama (ollama pull %s)",
+                         OLLAMA_SHARED_MODEL, OLLAMA_SHARED_MODEL)
+            return False
+        
+        # Une requête sans prompt ne fait que charger le modèle
+        response = requests.post(
+            f"{OLLAMA_API_URL}/generate",
+            json={
+                "model": OLLAMA_SHARED_MODEL,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+                "options": self.registry.shared_runner_options(),
+                "stream": False
+            }
+        )
+        if response.status_code != 200:
+            logger.error("Erreur lors du chargement du modèle partagé %s: %s", OLLAMA_SHARED_MODEL, response.text)
             return False
+        
+        logger.info("Modèle partagé %s chargé pour les %s agents", OLLAMA_SHARED_MODEL, len(AGENTS))
+        return True
     
     def create_agent(self, agent_name):
         """
@@ -79,15 +308,13 @@ class AgentManager:
             bool: True si l'agent a été créé avec succès, False sinon
         """
         try:
-            modelfile_path = f"agents/modelfiles/{agent_name}.modelfile"
+            profile = self.registry.get(agent_name)
             
-            if not os.path.exists(modelfile_path):
-                logger.error(f"Modelfile introuvable pour {agent_name}")
+            if profile is None:
+                logger.error("Modelfile introuvable pour %s", agent_name)
                 return False
             
-            # Lire le contenu du modelfile
-            with open(modelfile_path, 'r') as f:
-                modelfile_content = f.read()
+            modelfile_content = profile.modelfile
             
             # Créer le modèle via l'API
             response = requests.post(
@@ -99,14 +326,15 @@ class AgentManager:
             )
             
             if response.status_code != 200:
-                logger.error(f"Erreur lors de la création de l'agent {agent_name}: {response.text}")
+                logger.error("Erreur lors de la création de l'agent %s: %s", agent_name, response.text)
                 return False
             
-            logger.info(f"Agent {agent_name} créé avec succès")
+            mark_applied(profile)
+            logger.info("Agent %s créé avec succès", agent_name)
             return True
         
         except Exception as e:
-            logger.error(f"Erreur lors de la création de l'agent {agent_name}: {e}")
+            logger.error("Erreur lors de la création de l'agent %s: %s", agent_name, e)
             return False
     
     def list_agents(self):
@@ -116,16 +344,7 @@ class AgentManager:
         Returns:
             list: Liste des agents avec leurs métadonnées
         """
-        agents_info = []
-        
-        for agent in AGENTS:
-            agents_info.append({
-                'name': agent,
-                'title': AGENT_TITLES.get(agent, agent.capitalize()),
-                'description': self.get_agent_description(agent)
-            })
-        
-        return agents_info
+        return self.registry.list_agents()
     
     def get_agent_description(self, agent_name):
         """
@@ -137,74 +356,521 @@ class AgentManager:
         Returns:
             str: Description de l'agent ou description par défaut
         """
-        modelfile_path = f"backend/agents/modelfiles/{agent_name}.modelfile"
+        profile = self.registry.get(agent_name)
         
-        if not os.path.exists(modelfile_path):
+        if profile is None:
             return "Agent spécialisé"
         
-        try:
-            with open(modelfile_path, 'r') as f:
-                content = f.read()
-                
-                # Extraire la description à partir du système prompt
-                if 'Ton rôle est de ' in content:
-                    description = content.split('Ton rôle est de ')[1].split('\n')[0]
-                    return description
+        return profile.description
+    
+    def build_payload(self, agent_name, prompt, temperature=None, max_tokens=None, tier=None, budget=None):
+        """
+        Construit la requête /api/generate d'une génération en flux.
+        
+        Args:
+            agent_name (str): Nom de l'agent
+            prompt (str): Prompt à envoyer
+            temperature (float, optional): Température, par défaut celle du modelfile
+            max_tokens (int, optional): Nombre maximum de tokens, par défaut le
+                num_predict du palier ou du modelfile de l'agent
+            tier (str, optional): Palier de génération (voir GENERATION_TIERS)
+            budget (dict, optional): Budget de la génération (max_tokens plafonne num_predict)
             
-            return "Agent spécialisé"
+        Returns:
+            dict: Corps de la requête à Ollama
+        """
+        limits = self.registry.get_limits(agent_name)
+        tier_config = GENERATION_TIERS.get(tier) or {}
+        budget = budget or {}
+        if max_tokens is None:
+            max_tokens = limits['num_predict']
+            if tier_config.get('num_predict'):
+                max_tokens = min(tier_config['num_predict'], max_tokens or tier_config['num_predict'])
+        if budget.get('max_tokens'):
+            max_tokens = min(budget['max_tokens'], max_tokens or budget['max_tokens'])
+        options = {
+            "temperature": limits['temperature'] if temperature is None else temperature,
+            "num_predict": max_tokens
+        }
         
-        except Exception as e:
-            logger.error(f"Erreur lors de la récupération de la description de l'agent {agent_name}: {e}")
-            return "Agent spécialisé"
+        payload = {
+            "model": agent_name,
+            "prompt": prompt,
+            "options": options,
+            "stream": True
+        }
+        if tier_config.get('model'):
+            # Modèle de base du palier: le prompt système du modelfile est transmis explicitement
+            profile = self.registry.get(agent_name)
+            payload['model'] = tier_config['model']
+            if profile and profile.system:
+                payload['system'] = profile.system
+        elif AGENT_MODEL_MODE == 'shared':
+            # Modèle partagé: l'agent n'est qu'un persona (prompt système et paramètres)
+            profile = self.registry.get(agent_name)
+            payload['model'] = OLLAMA_SHARED_MODEL
+            payload['keep_alive'] = OLLAMA_KEEP_ALIVE
+            payload['options'] = {
+                **self.registry.shared_runner_options(),
+                **(profile.sampling_options() if profile else {}),
+                **options
+            }
+            if profile and profile.system:
+                payload['system'] = profile.system
+        
+        return payload
     
-    def ask_agent(self, agent_name, message, temperature=0.7, max_tokens=2000):
+    def generate(self, agent_name, prompt, temperature=None, max_tokens=None, timeout=None,
+                 priority='interactive', tier=None, cancel_token=None, budget=None, on_token=None):
         """
-        Pose une question à un agent et retourne sa réponse.
+        Envoie un prompt à un agent via l'API Ollama, sans stockage.
+        
+        La réponse est reçue en flux: le jeton d'annulation et le budget sont
+        vérifiés à chaque fragment, et la connexion est fermée dès l'annulation,
+        ce qui arrête la génération côté Ollama et libère le créneau d'inférence.
         
         Args:
             agent_name (str): Nom de l'agent
-            message (str): Question ou instruction pour l'agent
-            temperature (float): Température de génération (0.0 - 1.0)
-            max_tokens (int): Nombre maximum de tokens à générer
+            prompt (str): Prompt à envoyer
+            temperature (float, optional): Température de génération,
+                par défaut celle du modelfile de l'agent
+            max_tokens (int, optional): Nombre maximum de tokens à générer,
+                par défaut le num_predict du modelfile de l'agent
+            timeout (float, optional): Délai maximal en secondes, attente
+                d'un créneau d'inférence comprise
+            priority (str): Classe de priorité pour l'attente d'un créneau
+                (voir INFERENCE_PRIORITIES)
+            tier (str, optional): Palier de génération (voir GENERATION_TIERS);
+                un palier avec son propre modèle reçoit le prompt système de l'agent
+            cancel_token (CancellationToken, optional): Jeton d'annulation de l'appelant
+            budget (dict, optional): Budget de la génération (max_seconds, max_tokens);
+                au-delà, la génération est arrêtée et la sortie partielle est
+                retournée avec done_reason 'budget'
+            on_token (callable, optional): Appelée avec chaque fragment de texte reçu
             
         Returns:
-            str: Réponse de l'agent ou message d'erreur
+            dict: Réponse d'Ollama (texte complet et statistiques)
+            
+        Raises:
+            QueueFullError: Si la file d'attente de cette priorité est pleine
+            DeadlineExceededError: Si le délai expire avant l'appel à Ollama
+            GenerationCancelled: Si le jeton est annulé (sortie partielle dans l'exception)
+            RuntimeError: Si Ollama retourne une erreur
         """
-        if agent_name not in AGENTS:
-            return f"Agent {agent_name} non reconnu"
+        self.ensure_agents_ready()
+        payload = self.build_payload(agent_name, prompt, temperature, max_tokens, tier, budget)
         
+        deadline = time.monotonic() + timeout if timeout else None
+        
+        wait_started = time.perf_counter()
         try:
-            # Appel à l'API Ollama
-            with self.lock:  # Assurer un accès séquentiel pour éviter les conflits
+            with span('inference.queue_wait', agent=agent_name, priority=priority):
+                acquired = self.inference_slots.acquire(priority, timeout=timeout or None,
+                                                        cancel_token=cancel_token)
+        except QueueFullError:
+            ADMISSION_REJECTIONS.labels('queue_full', priority).inc()
+            raise
+        except GenerationCancelled:
+            OLLAMA_REQUESTS.labels(agent_name, 'cancelled').inc()
+            raise
+        INFERENCE_QUEUE_WAIT.labels(agent_name).observe(time.perf_counter() - wait_started)
+        
+        if not acquired:
+            OLLAMA_REQUESTS.labels(agent_name, 'queue_timeout').inc()
+            ADMISSION_REJECTIONS.labels('deadline', priority).inc()
+            raise DeadlineExceededError(f"Aucun créneau d'inférence disponible pour l'agent {agent_name}")
+        
+        INFERENCE_IN_FLIGHT.inc()
+        request_started = time.perf_counter()
+        cancelled = False
+        try:
+            with span('ollama.generate', agent=agent_name, prompt_chars=len(prompt),
+                      tier=tier or 'full') as generate_span:
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    ADMISSION_REJECTIONS.labels('deadline', priority).inc()
+                    raise DeadlineExceededError(f"Délai dépassé avant l'appel à l'agent {agent_name}")
+                
                 response = requests.post(
                     f"{OLLAMA_API_URL}/generate",
-                    json={
-                        "model": agent_name,
-                        "prompt": message,
-                        "temperature": temperature,
-                        "num_predict": max_tokens,
-                        "stream": False
-                    }
+                    json=payload,
+                    timeout=remaining,
+                    stream=True
                 )
+                
+                try:
+                    if response.status_code != 200:
+                        generate_span.set_attribute('status_code', response.status_code)
+                        logger.error("Erreur lors de l'appel à l'agent %s: %s", agent_name, response.text)
+                        raise RuntimeError(f"Erreur de communication avec l'agent: {response.text}")
+                    
+                    response_data = self._read_stream(response, cancel_token, budget, on_token, deadline)
+                finally:
+                    response.close()
+                
+                generate_span.set_attribute('done_reason', response_data.get('done_reason'))
+                self.record_generation_spans(generate_span, response_data)
+        except GenerationCancelled:
+            cancelled = True
+            OLLAMA_REQUESTS.labels(agent_name, 'cancelled').inc()
+            logger.info("Génération de l'agent %s annulée", agent_name)
+            raise
+        except DeadlineExceededError:
+            OLLAMA_REQUESTS.labels(agent_name, 'timeout').inc()
+            raise
+        except requests.exceptions.Timeout as e:
+            OLLAMA_REQUESTS.labels(agent_name, 'timeout').inc()
+            raise DeadlineExceededError(f"Délai dépassé pendant la génération de l'agent {agent_name}") from e
+        except Exception:
+            OLLAMA_REQUESTS.labels(agent_name, 'error').inc()
+            raise
+        finally:
+            self.release_slot(agent_name, request_started, cancelled)
+        
+        self.record_result(agent_name, response_data)
+        return response_data
+    
+    def release_slot(self, agent_name, request_started, cancelled=False):
+        """
+        Libère le créneau d'inférence d'une génération terminée et mesure sa durée.
+        
+        Args:
+            agent_name (str): Nom de l'agent
+            request_started (float): Début de l'appel à Ollama (time.perf_counter)
+            cancelled (bool): Génération annulée (sa durée n'est pas représentative)
+        """
+        INFERENCE_IN_FLIGHT.dec()
+        self.inference_slots.release()
+        request_duration = time.perf_counter() - request_started
+        # Une génération annulée ne renseigne pas sur la durée d'occupation d'un créneau
+        if not cancelled:
+            self.inference_slots.observe_service_time(request_duration)
+        OLLAMA_REQUEST_DURATION.labels(agent_name).observe(request_duration)
+    
+    def record_result(self, agent_name, response_data):
+        """
+        Comptabilise une génération réussie (ou arrêtée par son budget).
+        
+        Args:
+            agent_name (str): Nom de l'agent
+            response_data (dict): Réponse d'Ollama
+        """
+        if response_data.get('done_reason') == 'budget':
+            OLLAMA_REQUESTS.labels(agent_name, 'budget').inc()
+            logger.warning("Génération de l'agent %s arrêtée par son budget (%s tokens)",
+                           agent_name, response_data.get('eval_count'))
+        else:
+            OLLAMA_REQUESTS.labels(agent_name, 'success').inc()
+        record_generation_stats(agent_name, response_data)
+    
+    def _read_stream(self, response, cancel_token=None, budget=None, on_token=None, deadline=None):
+        """
+        Lit une génération Ollama reçue en flux (une ligne JSON par fragment).
+        
+        Args:
+            response (requests.Response): Réponse en flux d'Ollama
+            cancel_token (CancellationToken, optional): Jeton d'annulation
+            budget (dict, optional): Budget (max_seconds, max_tokens)
+            on_token (callable, optional): Appelée avec chaque fragment de texte
+            deadline (float, optional): Échéance de la génération (time.monotonic)
             
-            if response.status_code != 200:
-                logger.error(f"Erreur lors de l'appel à l'agent {agent_name}: {response.text}")
-                return f"Erreur de communication avec l'agent: {response.text}"
+        Returns:
+            dict: Dernier fragment d'Ollama (statistiques), avec le texte complet
+                dans 'response'; en cas de dépassement du budget, statistiques
+                mesurées côté client et done_reason 'budget'
             
-            # Extraction de la réponse
-            response_data = response.json()
-            agent_response = response_data.get('response', "Pas de réponse de l'agent")
+        Raises:
+            GenerationCancelled: Si le jeton est annulé pendant la lecture
+            DeadlineExceededError: Si l'échéance est atteinte avant la fin du flux
+            RuntimeError: Si Ollama signale une erreur dans le flux
+        """
+        stream = StreamAccumulator(budget, on_token)
+        
+        def stream_socket():
+            connection = getattr(response.raw, 'connection', None)
+            return getattr(connection, 'sock', None)
+        
+        # L'annulation ferme la socket: une lecture bloquée entre deux fragments se termine aussitôt
+        def abort():
+            sock = stream_socket()
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        
+        def check_deadline():
+            # Le timeout de requests ne borne que chaque lecture: l'échéance est
+            # vérifiée entre les fragments, et la lecture suivante ne peut la dépasser
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError("Délai dépassé pendant la génération")
+            sock = stream_socket()
+            if sock is not None:
+                sock.settimeout(remaining)
+        
+        if cancel_token is not None:
+            cancel_token.add_callback(abort)
+        try:
+            for line in response.iter_lines():
+                if cancel_token is not None and cancel_token.cancelled:
+                    cancel_token.raise_if_cancelled(stream.text)
+                if stream.feed(line):
+                    break
+                if deadline is not None:
+                    check_deadline()
+        except requests.exceptions.RequestException:
+            # Flux interrompu par abort(): l'annulation prime sur l'erreur de lecture
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled(stream.text)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceededError("Délai dépassé pendant la génération")
+            raise
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(abort)
+        
+        return stream.result(cancel_token)
+    
+    def record_generation_spans(self, generate_span, response_data):
+        """
+        Décompose une génération en phases (chargement, prefill, décodage)
+        à partir des durées rapportées par Ollama.
+        
+        Args:
+            generate_span (Span): Span courant de l'appel à Ollama
+            response_data (dict): Réponse d'Ollama
+        """
+        if generate_span.trace_id is None:
+            return
+        
+        generate_span.set_attributes(
+            prompt_eval_count=response_data.get('prompt_eval_count'),
+            eval_count=response_data.get('eval_count'),
+            response_bytes=len(response_data.get('response', '').encode('utf-8'))
+        )
+        
+        offset = generate_span.started_at
+        for name, key, count_key in (
+            ('ollama.load', 'load_duration', None),
+            ('ollama.prefill', 'prompt_eval_duration', 'prompt_eval_count'),
+            ('ollama.decode', 'eval_duration', 'eval_count')
+        ):
+            duration_ns = response_data.get(key) or 0
+            if not duration_ns:
+                continue
+            attributes = {'tokens': response_data.get(count_key)} if count_key else {}
+            record_span(name, offset, duration_ns / 1e6, **attributes)
+            offset += duration_ns / 1e9
+    
+    def ask_agent(self, agent_name, message, temperature=None, max_tokens=None,
+                  project_id=None, step_id=None, interaction_id=None, priority='interactive',
+                  timeout=None, tier=None, cancel_token=None, budget=None, on_token=None):
+        """
+        Pose une question à un agent et retourne sa réponse.
+        
+        Args:
+            agent_name (str): Nom de l'agent
+            message (str): Question ou instruction pour l'agent
+            temperature (float, optional): Température de génération (0.0 - 1.0),
+                par défaut celle du modelfile de l'agent
+            max_tokens (int, optional): Nombre maximum de tokens à générer,
+                par défaut le num_predict du modelfile de l'agent
+            project_id (int, optional): Projet associé à la génération
+            step_id (str, optional): Étape du workflow associée
+            interaction_id (int, optional): Interaction associée
+            priority (str): Classe de priorité de la génération
+            timeout (float, optional): Délai restant du client en secondes
+            tier (str, optional): Palier de génération (voir GENERATION_TIERS)
+            cancel_token (CancellationToken, optional): Jeton d'annulation de l'appelant
+            budget (dict, optional): Budget de la génération (max_seconds, max_tokens);
+                une réponse interrompue par son budget est stockée telle quelle
+            on_token (callable, optional): Appelée avec chaque fragment de texte reçu
             
-            # Stocker la réponse dans la base de connaissances
-            self.store_agent_response(agent_name, message, agent_response)
+        Returns:
+            str: Réponse de l'agent ou message d'erreur
             
-            return agent_response
+        Raises:
+            AdmissionError: Si la demande est refusée avant l'appel à Ollama
+            GenerationCancelled: Si la génération est annulée (rien n'est stocké)
+        """
+        if agent_name not in AGENTS:
+            return f"Agent {agent_name} non reconnu"
         
+        try:
+            response_data = self.generate(agent_name, message, temperature, max_tokens,
+                                          timeout=timeout, priority=priority, tier=tier,
+                                          cancel_token=cancel_token, budget=budget,
+                                          on_token=on_token)
+        except (AdmissionError, GenerationCancelled):
+            raise
+        except RuntimeError as e:
+            return str(e)
         except Exception as e:
-            logger.error(f"Erreur lors de l'interaction avec l'agent {agent_name}: {e}")
+            logger.error("Erreur lors de l'interaction avec l'agent %s: %s", agent_name, e)
             return f"Erreur: {str(e)}"
+        
+        # Extraction de la réponse
+        agent_response = response_data.get('response', "Pas de réponse de l'agent")
+        
+        # Stocker la réponse et les statistiques de génération
+        self.store_agent_response(
+            agent_name, message, agent_response,
+            project_id=project_id,
+            response_data=response_data,
+            step_id=step_id,
+            interaction_id=interaction_id,
+            tier=tier
+        )
+        
+        return agent_response
+    
+    def ask_agents_batch(self, items, timeout=None, partial=True):
+        """
+        Envoie plusieurs prompts à des agents en parallèle.
+        
+        Les résultats sont produits dans l'ordre où les générations se terminent.
+        Les réponses obtenues sont stockées dans la base de connaissances en une
+        seule transaction à la fin du lot. Un élément expiré ou abandonné (lot
+        interrompu, client déconnecté) est annulé: sa génération s'arrête et
+        libère son créneau d'inférence.
+        
+        Args:
+            items (list): Liste de dicts {agent, prompt, options}; options peut
+                contenir temperature, max_tokens et timeout (en secondes)
+            timeout (float, optional): Délai global du lot en secondes
+            partial (bool): Si False, le lot est interrompu à la première erreur
+                et aucune réponse n'est stockée
+            
+        Yields:
+            dict: Résultat de chaque élément, puis un résumé final
+        """
+        started = time.monotonic()
+        batch_deadline = started + (timeout or BATCH_DEFAULT_TIMEOUT)
+        
+        deadlines = {}
+        tokens = {}
+        futures = {}
+        executor = ThreadPoolExecutor(
+            max_workers=len(items),
+            thread_name_prefix='agent-batch'
+        )
+        
+        for index, item in enumerate(items):
+            options = item.get('options') or {}
+            item_deadline = batch_deadline
+            if options.get('timeout'):
+                item_deadline = min(batch_deadline, started + float(options['timeout']))
+            deadlines[index] = item_deadline
+            tokens[index] = CancellationToken()
+            
+            # Chaque élément s'exécute dans une copie du contexte pour rester dans la trace
+            future = executor.submit(
+                contextvars.copy_context().run,
+                self.generate,
+                item['agent'],
+                item['prompt'],
+                options.get('temperature'),
+                options.get('max_tokens'),
+                item_deadline - started,
+                'batch',
+                cancel_token=tokens[index]
+            )
+            futures[future] = index
+        
+        rows = []
+        completed = 0
+        failed = 0
+        aborted = False
+        pending = set(futures)
+        
+        try:
+            while pending:
+                next_deadline = min(deadlines[futures[f]] for f in pending)
+                done, pending = wait(
+                    pending,
+                    timeout=max(0, next_deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED
+                )
+                
+                # Les éléments dont le délai est dépassé sont abandonnés
+                now = time.monotonic()
+                expired = {f for f in pending if deadlines[futures[f]] <= now}
+                pending -= expired
+                
+                for future in done:
+                    index = futures[future]
+                    item = items[index]
+                    result = {
+                        'index': index,
+                        'agent': item['agent'],
+                        'duration_ms': int((now - started) * 1000)
+                    }
+                    
+                    try:
+                        response_data = future.result()
+                        agent_response = response_data.get('response', "Pas de réponse de l'agent")
+                        result.update({'status': 'ok', 'response': agent_response})
+                        rows.append((item['agent'], item['prompt'], agent_response, response_data))
+                        completed += 1
+                    except QueueFullError as e:
+                        result.update({'status': 'rejected', 'error': str(e), 'retry_after': e.retry_after})
+                        failed += 1
+                    except TimeoutError as e:
+                        result.update({'status': 'timeout', 'error': str(e)})
+                        failed += 1
+                    except Exception as e:
+                        result.update({'status': 'error', 'error': str(e)})
+                        failed += 1
+                    
+                    yield result
+                
+                for future in expired:
+                    future.cancel()
+                    index = futures[future]
+                    tokens[index].cancel('timeout')
+                    failed += 1
+                    yield {
+                        'index': index,
+                        'agent': items[index]['agent'],
+                        'status': 'timeout',
+                        'error': "Délai dépassé",
+                        'duration_ms': int((now - started) * 1000)
+                    }
+                
+                if failed and not partial:
+                    aborted = True
+                    for future in pending:
+                        future.cancel()
+                        index = futures[future]
+                        tokens[index].cancel('aborted')
+                        yield {
+                            'index': index,
+                            'agent': items[index]['agent'],
+                            'status': 'cancelled'
+                        }
+                    pending = set()
+        finally:
+            # Lot abandonné (client déconnecté): les générations encore en cours s'arrêtent
+            for token in tokens.values():
+                token.cancel('batch_closed')
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        knowledge_ids = []
+        if rows and not aborted:
+            knowledge_ids = self.store_agent_responses(rows)
+        
+        yield {
+            'done': True,
+            'completed': completed,
+            'failed': failed,
+            'aborted': aborted,
+            'knowledge_ids': knowledge_ids,
+            'duration_ms': int((time.monotonic() - started) * 1000)
+        }
     
-    def store_agent_response(self, agent_name, query, response, category="Général", project_id=None):
+    def store_agent_response(self, agent_name, query, response, category="Général", project_id=None,
+                             response_data=None, step_id=None, interaction_id=None, tier=None):
         """
         Stocke une réponse d'agent dans la base de connaissances.
         
@@ -214,34 +880,84 @@ class AgentManager:
             response (str): Réponse de l'agent
             category (str): Catégorie de la connaissance
             project_id (int, optional): ID du projet associé
+            response_data (dict, optional): Réponse brute d'Ollama, dont les
+                statistiques de génération sont stockées dans la même transaction
+            step_id (str, optional): Étape du workflow associée
+            interaction_id (int, optional): Interaction associée
+            tier (str, optional): Palier de génération, enregistré avec les statistiques
         
         Returns:
-            int: ID de l'entrée de connaissance créée
+            int: ID de l'entrée de connaissance créée, ou de l'entrée existante
+                si la réponse en est un quasi-doublon
         """
         try:
             db = get_db()
             
-            # Insertion dans la base de données
-            cursor = db.execute(
-                """
-                INSERT INTO knowledge 
-                (agent, category, query, content, project_id) 
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (agent_name, category, query, response, project_id)
-            )
-            
-            knowledge_id = cursor.lastrowid
-            db.commit()
+            # Insertion dans la base de données (un quasi-doublon est rattaché à l'entrée existante)
+            with span('knowledge.store', agent=agent_name, bytes=len(response.encode('utf-8'))):
+                knowledge_id, duplicate = store_knowledge(db, agent_name, category, query, response, project_id)
+                
+                if response_data:
+                    insert_generation_stats(
+                        db, agent_name, response_data,
+                        project_id=project_id,
+                        step_id=step_id,
+                        interaction_id=interaction_id,
+                        knowledge_id=knowledge_id,
+                        tier=tier
+                    )
+                
+                db.commit()
+            invalidate_bootstrap_cache()
             
-            logger.info(f"Réponse de l'agent {agent_name} stockée avec l'ID {knowledge_id}")
+            if duplicate:
+                logger.info("Réponse de l'agent %s rattachée à l'entrée existante %s", agent_name, knowledge_id)
+            else:
+                logger.info("Réponse de l'agent %s stockée avec l'ID %s", agent_name, knowledge_id)
             return knowledge_id
         
         except Exception as e:
-            logger.error(f"Erreur lors du stockage de la réponse de l'agent {agent_name}: {e}")
+            logger.error("Erreur lors du stockage de la réponse de l'agent %s: %s", agent_name, e)
             return None
     
-    def process_project_step(self, project_name, step_id, agent_name, context=None):
+    def store_agent_responses(self, rows, category="Général", project_id=None):
+        """
+        Stocke plusieurs réponses d'agents en une seule transaction.
+        
+        Args:
+            rows (list): Liste de tuples (agent, query, response, response_data)
+            category (str): Catégorie de la connaissance
+            project_id (int, optional): ID du projet associé
+        
+        Returns:
+            list: IDs des entrées de connaissance créées (ou existantes pour les quasi-doublons)
+        """
+        db = get_db()
+        knowledge_ids = []
+        
+        try:
+            with db:
+                for agent_name, query, response, response_data in rows:
+                    knowledge_id, _ = store_knowledge(db, agent_name, category, query, response, project_id)
+                    knowledge_ids.append(knowledge_id)
+                    
+                    if response_data:
+                        insert_generation_stats(
+                            db, agent_name, response_data,
+                            project_id=project_id,
+                            knowledge_id=knowledge_id
+                        )
+            
+            invalidate_bootstrap_cache()
+            logger.info("%s réponses d'agents stockées en une transaction", len(knowledge_ids))
+            return knowledge_ids
+        
+        except Exception as e:
+            logger.error("Erreur lors du stockage groupé des réponses d'agents: %s", e)
+            return []
+    
+    def process_project_step(self, project_name, step_id, agent_name, context=None, priority='workflow',
+                             tier=None, cancel_token=None):
         """
         Traite une étape du workflow d'un projet.
         
@@ -250,22 +966,34 @@ class AgentManager:
             step_id (str): ID de l'étape (ex: "01_brief_strategique")
             agent_name (str): Nom de l'agent à utiliser
             context (dict, optional): Contexte supplémentaire pour l'agent
+            priority (str): Classe de priorité de la génération
+            tier (str, optional): Palier de génération, par défaut celui de
+                l'étape dans WORKFLOW_STEPS
+            cancel_token (CancellationToken, optional): Jeton d'annulation; une
+                étape annulée n'enregistre pas de livrable
+            
+        Une étape annulée ou en échec garde sa sortie partielle dans son point de
+        reprise (dossier temp/ du projet): la tentative suivante la poursuit au lieu
+        de la régénérer.
             
         Returns:
-            dict: Résultat du traitement de l'étape
+            dict: Résultat du traitement de l'étape ('cancelled' à True si annulée,
+                'busy' à True si l'étape est déjà en cours de génération dans un
+                autre processus, 'inputs': empreintes des entrées consommées si réussie)
         """
         # Récupérer les informations du projet
         db = get_db()
         project = query_db("SELECT * FROM projects WHERE name = ?", (project_name,), one=True)
         
         if not project:
-            logger.error(f"Projet {project_name} non trouvé")
+            logger.error("Projet %s non trouvé", project_name)
             return {
                 "success": False,
                 "message": f"Projet {project_name} non trouvé"
             }
         
         project_id = project['id']
+        tier = tier or get_step_tier(step_id)
         
         # Enregistrer le début de l'étape
         interaction_id = insert_db(
@@ -279,36 +1007,118 @@ class AgentManager:
         
         try:
             # Préparer le prompt pour l'agent
-            prompt = self.prepare_step_prompt(project_name, step_id, agent_name, context)
+            # Empreintes des entrées consommées: une étape dont les entrées changent devient périmée
+            inputs = {}
+            with span('step.prepare_prompt', step_id=step_id) as prompt_span:
+                prompt = self.prepare_step_prompt(project_name, step_id, agent_name, context, inputs=inputs)
+                prompt_span.set_attribute('prompt_bytes', len(prompt.encode('utf-8')))
             
-            # Obtenir la réponse de l'agent
-            agent_response = self.ask_agent(agent_name, prompt)
+            # La sortie est sauvegardée au fil du flux; une étape interrompue reprend là où elle s'était arrêtée
+            with StepCheckpoint(project_name, step_id, agent_name, tier, prompt) as checkpoint:
+                partial = checkpoint.resumed_text
+                if partial:
+                    logger.info("Reprise de l'étape %s du projet %s après %s tokens sauvegardés",
+                                step_id, project_name, checkpoint.resumed_tokens)
+                
+                # Obtenir la réponse de l'agent
+                response_data = self.generate(
+                    agent_name,
+                    self.continuation_prompt(prompt, partial) if partial else prompt,
+                    priority=priority,
+                    tier=tier,
+                    cancel_token=cancel_token,
+                    budget=get_step_budget(step_id),
+                    on_token=checkpoint.append
+                )
+                agent_response = partial + response_data.get('response', '')
+                response_data['resumed_tokens'] = checkpoint.resumed_tokens
+                if checkpoint.resumed_tokens:
+                    CHECKPOINT_RESUMED_TOKENS.labels(agent_name).inc(checkpoint.resumed_tokens)
+                
+                self.store_agent_response(
+                    agent_name, prompt, agent_response,
+                    project_id=project_id,
+                    response_data=response_data,
+                    step_id=step_id,
+                    interaction_id=interaction_id,
+                    tier=tier
+                )
+                
+                # Sauvegarder le livrable
+                with span('step.save_deliverable', bytes=len(agent_response.encode('utf-8'))):
+                    deliverable_path = save_deliverable(
+                        project_name, 
+                        step_id, 
+                        agent_response, 
+                        agent=agent_name
+                    )
+                
+                # Mettre à jour l'état de l'interaction
+                with span('step.update_interaction'):
+                    update_db(
+                        """
+                        UPDATE interactions 
+                        SET status = ?, content = ?, completed_at = CURRENT_TIMESTAMP 
+                        WHERE id = ?
+                        """,
+                        ('completed', agent_response, interaction_id)
+                    )
+                
+                # Étape enregistrée: le point de reprise n'est plus utile
+                checkpoint.commit()
+            
+            logger.info("Étape %s du projet %s complétée par l'agent %s", step_id, project_name, agent_name)
             
-            # Sauvegarder le livrable
-            deliverable_path = save_deliverable(
-                project_name, 
-                step_id, 
-                agent_response, 
-                agent=agent_name
+            return {
+                "success": True,
+                "deliverable_path": deliverable_path,
+                "step_id": step_id,
+                "agent": agent_name,
+                "tier": tier,
+                "inputs": inputs
+            }
+            
+        except GenerationCancelled as e:
+            update_db(
+                """
+                UPDATE interactions 
+                SET status = ?, content = ?, completed_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+                """,
+                ('cancelled', e.reason, interaction_id)
             )
             
-            # Mettre à jour l'état de l'interaction
+            logger.info("Étape %s du projet %s annulée (%s)", step_id, project_name, e.reason)
+            
+            return {
+                "success": False,
+                "cancelled": True,
+                "message": str(e),
+                "step_id": step_id,
+                "agent": agent_name,
+                "tier": tier
+            }
+            
+        except CheckpointBusyError as e:
+            # Génération de la même étape en cours ailleurs: ce n'est pas un échec de l'étape
             update_db(
                 """
                 UPDATE interactions 
                 SET status = ?, content = ?, completed_at = CURRENT_TIMESTAMP 
                 WHERE id = ?
                 """,
-                ('completed', agent_response, interaction_id)
+                ('cancelled', 'busy', interaction_id)
             )
             
-            logger.info(f"Étape {step_id} du projet {project_name} complétée par l'agent {agent_name}")
+            logger.warning("Étape %s du projet %s déjà en cours dans un autre processus", step_id, project_name)
             
             return {
-                "success": True,
-                "deliverable_path": deliverable_path,
+                "success": False,
+                "busy": True,
+                "message": str(e),
                 "step_id": step_id,
-                "agent": agent_name
+                "agent": agent_name,
+                "tier": tier
             }
             
         except Exception as e:
@@ -322,39 +1132,216 @@ class AgentManager:
                 ('failed', str(e), interaction_id)
             )
             
-            logger.error(f"Erreur lors du traitement de l'étape {step_id} du projet {project_name}: {e}")
+            logger.error("Erreur lors du traitement de l'étape %s du projet %s: %s", step_id, project_name, e)
             
             return {
                 "success": False,
                 "message": f"Erreur: {str(e)}",
                 "step_id": step_id,
-                "agent": agent_name
+                "agent": agent_name,
+                "tier": tier
             }
-    
-    def prepare_step_prompt(self, project_name, step_id, agent_name, context=None):
+
+    def revise_sections(self, project_name, step_id, agent_name, feedback, section_ids, priority='feedback'):
         """
-        Prépare le prompt pour une étape spécifique.
-        
+        Régénère uniquement certaines sections d'un livrable, puis les remet en place.
+
+        Chaque plage de sections visées (sous-sections comprises) fait l'objet
+        d'une génération dont le prompt ne contient que la section, ses voisines
+        et le feedback; la génération est bornée par la taille de la section.
+
         Args:
             project_name (str): Nom du projet
             step_id (str): ID de l'étape
             agent_name (str): Nom de l'agent
-            context (dict, optional): Contexte supplémentaire
-            
+            feedback (str): Feedback (éventuellement fusionné) à appliquer
+            section_ids (list): Identifiants des sections à régénérer (voir utils.sections)
+            priority (str): Classe de priorité des générations
+
+        Returns:
+            dict: Résultat de la révision (sections régénérées et tokens générés)
+        """
+        project = query_db("SELECT * FROM projects WHERE name = ?", (project_name,), one=True)
+        content = get_deliverable(project_name, step_id)
+
+        if not project or not content:
+            message = f"Projet {project_name} non trouvé" if not project else f"Livrable {step_id} non trouvé"
+            logger.error(message)
+            return {"success": False, "message": message, "step_id": step_id}
+
+        project_id = project['id']
+        sections = parse_sections(content)
+        spans = section_spans(sections, section_ids)
+
+        interaction_id = insert_db(
+            """
+            INSERT INTO interactions
+            (project_id, agent, step_id, status)
+            VALUES (?, ?, ?, ?)
+            """,
+            (project_id, agent_name, step_id, 'processing')
+        )
+
+        try:
+            brief = get_brief(project_name) or f"Projet: {project_name}"
+            replacements = {}
+            generated_tokens = 0
+
+            for start, end in spans:
+                original = render_sections(sections[start:end])
+                with span('step.prepare_prompt', step_id=step_id, section=sections[start].id) as prompt_span:
+                    prompt = self.prepare_section_prompt(project_name, step_id, agent_name, brief,
+                                                         sections, start, end, feedback)
+                    prompt_span.set_attribute('prompt_bytes', len(prompt.encode('utf-8')))
+
+                # Environ 4 caractères par token, avec une marge pour une section qui s'étoffe
+                max_tokens = max(SECTION_MIN_TOKENS, int(len(original) / 4 * SECTION_TOKEN_FACTOR))
+                response_data = self.generate(
+                    agent_name,
+                    prompt,
+                    max_tokens=max_tokens,
+                    priority=priority,
+                    tier='full',
+                    budget=get_step_budget(step_id)
+                )
+                revised = fit_section(sections[start], original, response_data.get('response', ''))
+                replacements[(start, end)] = revised
+                generated_tokens += response_data.get('eval_count') or 0
+
+                self.store_agent_response(
+                    agent_name, prompt, revised,
+                    project_id=project_id,
+                    response_data=response_data,
+                    step_id=step_id,
+                    interaction_id=interaction_id,
+                    tier='full'
+                )
+
+            revised_content = splice_sections(sections, replacements)
+            with span('step.save_deliverable', bytes=len(revised_content.encode('utf-8'))):
+                deliverable_path = save_deliverable(project_name, step_id, revised_content, agent=agent_name)
+
+            update_db(
+                """
+                UPDATE interactions
+                SET status = ?, content = ?, completed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                ('completed', revised_content, interaction_id)
+            )
+
+            revised_ids = [sections[start].id for start, _ in spans]
+            logger.info("Sections %s du livrable %s du projet %s révisées par l'agent %s",
+                        ', '.join(revised_ids), step_id, project_name, agent_name)
+
+            return {
+                "success": True,
+                "deliverable_path": deliverable_path,
+                "step_id": step_id,
+                "agent": agent_name,
+                "tier": 'full',
+                "sections": revised_ids,
+                "generated_tokens": generated_tokens
+            }
+
+        except Exception as e:
+            update_db(
+                """
+                UPDATE interactions
+                SET status = ?, content = ?, completed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                ('failed', str(e), interaction_id)
+            )
+
+            logger.error("Erreur lors de la révision des sections de %s du projet %s: %s", step_id, project_name, e)
+
+            return {
+                "success": False,
+                "message": f"Erreur: {str(e)}",
+                "step_id": step_id,
+                "agent": agent_name,
+                "tier": 'full'
+            }
+
+    def prepare_section_prompt(self, project_name, step_id, agent_name, brief, sections, start, end, feedback):
+        """
+        Prépare le prompt de révision d'une plage de sections.
+
+        Args:
+            project_name (str): Nom du projet
+            step_id (str): ID de l'étape
+            agent_name (str): Nom de l'agent
+            brief (str): Brief du projet
+            sections (list): Sections du livrable
+            start (int): Indice de la première section à réviser
+            end (int): Indice suivant la dernière section à réviser
+            feedback (str): Feedback à appliquer
+
         Returns:
             str: Prompt formaté pour l'agent
         """
-        # Récupérer le brief du projet
+        before = sections[start - 1].text if start > 0 else ''
+        after = sections[end].text if end < len(sections) else ''
+        heading = sections[start].heading
+
+        prompt = f"""
+# Projet: {project_name}
+
+## Brief du projet (extrait)
+{brief[:500]}
+
+"""
+        if before:
+            prompt += f"""
+## Section précédente (contexte, à ne pas modifier)
+{before[-SECTION_CONTEXT_CHARS:]}
+
+"""
+        prompt += f"""
+## Section à réviser
+{render_sections(sections[start:end])}
+
+"""
+        if after:
+            prompt += f"""
+## Section suivante (contexte, à ne pas modifier)
+{after[:SECTION_CONTEXT_CHARS]}
+
+"""
+        prompt += f"""
+## Feedback à prendre en compte
+{feedback}
+
+## Ta mission
+Tu es {AGENT_TITLES.get(agent_name, agent_name)} sur ce projet.
+Réécris uniquement la section à réviser du livrable '{step_id}' en appliquant le feedback.
+"""
+        if heading:
+            prompt += f"Commence par son titre inchangé ({heading}) et conserve ses sous-titres.\n"
+        prompt += "Ne reproduis ni les sections voisines ni ces consignes.\n"
+
+        return prompt
+
+    def collect_step_inputs(self, project_name, step_id):
+        """
+        Lit les entrées d'une étape: le brief et les livrables des étapes précédentes.
+        
+        Args:
+            project_name (str): Nom du projet
+            step_id (str): ID de l'étape
+            
+        Returns:
+            tuple: (brief, livrables précédents: liste de dict step_id, agent, content)
+        """
         brief = get_brief(project_name)
         
         if not brief:
-            logger.error(f"Brief du projet {project_name} non trouvé")
+            logger.error("Brief du projet %s non trouvé", project_name)
             brief = f"Projet: {project_name}"
         
-        # Récupérer les livrables précédents si nécessaire
-        previous_deliverables = []
-        
         # Charger les livrables précédents en fonction de l'étape actuelle
+        previous_deliverables = []
         step_number = int(step_id.split('_')[0])
         for i in range(1, step_number):
             prev_step_id = f"{i:02d}_" + self.get_step_name_by_number(i)
@@ -368,8 +1355,65 @@ class AgentManager:
                     "content": prev_content
                 })
         
-        # Récupérer les feedbacks précédents si disponibles
-        feedback = get_feedback(project_name, step_id)
+        return brief, previous_deliverables
+    
+    def hash_inputs(self, brief, previous_deliverables):
+        """
+        Empreintes des entrées d'une étape, limitées à ce que le prompt en reprend.
+        
+        Args:
+            brief (str): Brief du projet
+            previous_deliverables (list): Livrables précédents (voir collect_step_inputs)
+            
+        Returns:
+            dict: 'brief' et ID de chaque livrable précédent -> empreinte
+        """
+        inputs = {'brief': hash_step_input(brief)}
+        for deliverable in previous_deliverables:
+            inputs[deliverable['step_id']] = hash_step_input(deliverable['content'][:UPSTREAM_EXCERPT_CHARS])
+        return inputs
+    
+    def step_input_hashes(self, project_name, step_id):
+        """
+        Empreintes actuelles des entrées d'une étape.
+        
+        Comparées à celles enregistrées lors de la génération de son livrable
+        (voir prepare_step_prompt), elles indiquent si l'étape est périmée.
+        
+        Args:
+            project_name (str): Nom du projet
+            step_id (str): ID de l'étape
+            
+        Returns:
+            dict: Empreintes des entrées (voir hash_inputs)
+        """
+        return self.hash_inputs(*self.collect_step_inputs(project_name, step_id))
+    
+    def prepare_step_prompt(self, project_name, step_id, agent_name, context=None, inputs=None):
+        """
+        Prépare le prompt pour une étape spécifique.
+        
+        Args:
+            project_name (str): Nom du projet
+            step_id (str): ID de l'étape
+            agent_name (str): Nom de l'agent
+            context (dict, optional): Contexte supplémentaire
+            inputs (dict, optional): Complété avec les empreintes du brief et des
+                livrables précédents repris dans le prompt
+            
+        Returns:
+            str: Prompt formaté pour l'agent
+        """
+        # Récupérer le brief du projet et les livrables précédents
+        brief, previous_deliverables = self.collect_step_inputs(project_name, step_id)
+        if inputs is not None:
+            inputs.update(self.hash_inputs(brief, previous_deliverables))
+        
+        # Récupérer les feedbacks précédents (ou les feedbacks regroupés d'une révision)
+        if context and context.get('feedback'):
+            feedback = context['feedback']
+        else:
+            feedback = get_feedback(project_name, step_id)
         
         # Construction du prompt
         prompt = f"""
@@ -386,7 +1430,7 @@ class AgentManager:
             
             for deliverable in previous_deliverables:
                 prompt += f"### {deliverable['step_id']} (par {AGENT_TITLES.get(deliverable['agent'], deliverable['agent'])})\n"
-                prompt += f"{deliverable['content'][:500]}...\n\n"
+                prompt += f"{deliverable['content'][:UPSTREAM_EXCERPT_CHARS]}...\n\n"
         
         # Ajouter le feedback s'il existe
         if feedback:
@@ -394,6 +1438,14 @@ class AgentManager:
 ## Feedback précédent sur ce livrable
 {feedback}
 
+"""
+        
+        # Brouillon à affiner (passe complète après un premier jet rapide)
+        if context and context.get('draft'):
+            prompt += f"""
+## Brouillon à affiner
+{context['draft']}
+
 """
         
         # Ajouter des instructions pour l'étape
@@ -406,7 +1458,7 @@ Fournis un livrable de qualité professionnelle, avec une structure claire et d
 """
         
         # Ajouter du contexte spécifique si fourni
-        if context:
+        if context and context.get('instructions'):
             prompt += f"""
 ## Contexte supplémentaire
 {context.get('instructions', '')}
@@ -414,6 +1466,27 @@ Fournis un livrable de qualité professionnelle, avec une structure claire et d
         
         return prompt
     
+    def continuation_prompt(self, prompt, partial):
+        """
+        Construit le prompt de reprise d'une génération interrompue.
+        
+        Args:
+            prompt (str): Prompt initial de l'étape
+            partial (str): Début de réponse déjà généré
+            
+        Returns:
+            str: Prompt demandant à l'agent de poursuivre le texte sans le répéter
+        """
+        return prompt + f"""
+## Réponse interrompue à poursuivre
+La génération de ce livrable a été interrompue. En voici le début, déjà enregistré:
+
+{partial}
+
+Poursuis le livrable exactement là où ce texte s'arrête, sans répéter ce qui précède
+ni ajouter d'introduction.
+"""
+    
     def get_step_name_by_number(self, step_number):
         """
         Obtient le nom d'une étape par son numéro.
@@ -486,7 +1559,7 @@ Fournis un livrable de qualité professionnelle, avec une structure claire et d
         project = query_db("SELECT * FROM projects WHERE name = ?", (project_name,), one=True)
         
         if not project:
-            logger.error(f"Projet {project_name} non trouvé")
+            logger.error("Projet %s non trouvé", project_name)
             return {
                 "success": False,
                 "message": f"Projet {project_name} non trouvé"
@@ -508,15 +1581,17 @@ Fournis un livrable de qualité professionnelle, avec une structure claire et d
             (project_id, step_id, feedback_content, 'pending')
         )
         
-        # Dans une vraie application, on pourrait ici lancer une tâche asynchrone
-        # pour faire traiter le feedback par l'agent et générer une nouvelle version
+        # La régénération du livrable est confiée au planificateur de révisions
+        # (agents/revisions.py), qui regroupe les feedbacks en attente
         
-        logger.info(f"Feedback pour {deliverable_id} du projet {project_name} enregistré")
+        logger.info("Feedback pour %s du projet %s enregistré", deliverable_id, project_name)
         
         return {
             "success": True,
             "feedback_id": feedback_id,
-            "feedback_path": feedback_path
+            "feedback_path": feedback_path,
+            "project_id": project_id,
+            "step_id": step_id
         }
 
 
@@ -524,6 +1599,22 @@ Fournis un livrable de qualité professionnelle, avec une structure claire et d
 _agent_manager_instance = None
 _agent_manager_lock = Lock()
 
+# Agents vérifiés dans Ollama (conservé à travers le fork)
+_agents_ready = False
+_agents_ready_lock = Lock()
+
+
+def _reset_process_state():
+    # Chaque worker crée son propre gestionnaire (créneaux d'inférence, verrous)
+    global _agent_manager_instance, _agent_manager_lock, _agents_ready_lock
+    _agent_manager_instance = None
+    _agent_manager_lock = Lock()
+    _agents_ready_lock = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_process_state)
+
 def get_agent_manager():
     """
     Retourne l'instance unique du gestionnaire d'agents.
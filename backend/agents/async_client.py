@@ -0,0 +1,357 @@
+# backend/agents/async_client.py
+"""
+Client Ollama asynchrone pour le point d'entrée ASGI (asgi.py).
+
+Une génération en cours n'occupe ni thread ni worker: l'attente d'un
+créneau d'inférence et la lecture du flux d'Ollama se font dans la boucle
+asyncio, si bien qu'un seul processus peut garder ouvertes des centaines
+de connexions de chat. Les créneaux, le format des requêtes, les budgets,
+l'annulation, les métriques et les spans sont ceux de AgentManager; seul
+le stockage des réponses (SQLite) est délégué à un thread.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import httpx
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import OLLAMA_API_URL, AGENTS, BATCH_DEFAULT_TIMEOUT
+from agents.agent_manager import StreamAccumulator
+from utils.admission import AdmissionError, QueueFullError, DeadlineExceededError
+from utils.cancellation import GenerationCancelled
+from utils.metrics import OLLAMA_REQUESTS, INFERENCE_QUEUE_WAIT, INFERENCE_IN_FLIGHT, ADMISSION_REJECTIONS
+from utils.tracing import span
+
+logger = logging.getLogger('async_client')
+
+
+class AsyncAgentClient:
+    """Générations non bloquantes, partageant les créneaux d'inférence de AgentManager"""
+
+    def __init__(self, agent_manager, flask_app):
+        """
+        Args:
+            agent_manager (AgentManager): Gestionnaire d'agents du processus
+            flask_app (Flask): Application, dont le contexte est requis pour le stockage
+        """
+        self.agent_manager = agent_manager
+        self.flask_app = flask_app
+        self._http = None
+        self._agents_ready = False
+
+    @property
+    def http(self):
+        # Créé dans la boucle qui l'utilise; pas de limite de connexions,
+        # le nombre de générations vers Ollama étant borné par les créneaux
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=httpx.Limits(max_connections=None,
+                                                               max_keepalive_connections=64))
+        return self._http
+
+    async def aclose(self):
+        """Ferme les connexions vers Ollama"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def generate(self, agent_name, prompt, temperature=None, max_tokens=None, timeout=None,
+                       priority='interactive', tier=None, cancel_token=None, budget=None, on_token=None):
+        """
+        Envoie un prompt à un agent via l'API Ollama, sans stockage.
+
+        Équivalent asynchrone de AgentManager.generate (mêmes arguments).
+
+        Returns:
+            dict: Réponse d'Ollama (texte complet et statistiques)
+
+        Raises:
+            QueueFullError: Si la file d'attente de cette priorité est pleine
+            DeadlineExceededError: Si le délai expire avant ou pendant la génération
+            GenerationCancelled: Si le jeton est annulé (sortie partielle dans l'exception)
+            RuntimeError: Si Ollama retourne une erreur
+        """
+        manager = self.agent_manager
+        if not self._agents_ready:
+            # Vérification (appels HTTP bloquants) hors de la boucle, retentée tant qu'elle échoue
+            self._agents_ready = await asyncio.to_thread(manager.ensure_agents_ready)
+        payload = manager.build_payload(agent_name, prompt, temperature, max_tokens, tier, budget)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+
+        wait_started = time.perf_counter()
+        try:
+            with span('inference.queue_wait', agent=agent_name, priority=priority):
+                acquired = await manager.inference_slots.acquire_async(priority, timeout=timeout or None,
+                                                                       cancel_token=cancel_token)
+        except QueueFullError:
+            ADMISSION_REJECTIONS.labels('queue_full', priority).inc()
+            raise
+        except GenerationCancelled:
+            OLLAMA_REQUESTS.labels(agent_name, 'cancelled').inc()
+            raise
+        INFERENCE_QUEUE_WAIT.labels(agent_name).observe(time.perf_counter() - wait_started)
+
+        if not acquired:
+            OLLAMA_REQUESTS.labels(agent_name, 'queue_timeout').inc()
+            ADMISSION_REJECTIONS.labels('deadline', priority).inc()
+            raise DeadlineExceededError(f"Aucun créneau d'inférence disponible pour l'agent {agent_name}")
+
+        INFERENCE_IN_FLIGHT.inc()
+        request_started = time.perf_counter()
+        cancelled = False
+        try:
+            with span('ollama.generate', agent=agent_name, prompt_chars=len(prompt),
+                      tier=tier or 'full') as generate_span:
+                remaining = deadline - loop.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    ADMISSION_REJECTIONS.labels('deadline', priority).inc()
+                    raise DeadlineExceededError(f"Délai dépassé avant l'appel à l'agent {agent_name}")
+
+                stream = StreamAccumulator(budget, on_token)
+                reader = asyncio.ensure_future(
+                    self._read_stream(payload, remaining, stream, cancel_token, generate_span)
+                )
+                response_data = await self._await_reader(reader, stream, cancel_token)
+
+                generate_span.set_attribute('done_reason', response_data.get('done_reason'))
+                manager.record_generation_spans(generate_span, response_data)
+        except GenerationCancelled:
+            cancelled = True
+            OLLAMA_REQUESTS.labels(agent_name, 'cancelled').inc()
+            logger.info("Génération de l'agent %s annulée", agent_name)
+            raise
+        except asyncio.CancelledError:
+            # Tâche de l'appelant annulée (client parti, élément de lot expiré)
+            cancelled = True
+            OLLAMA_REQUESTS.labels(agent_name, 'cancelled').inc()
+            raise
+        except httpx.TimeoutException as e:
+            OLLAMA_REQUESTS.labels(agent_name, 'timeout').inc()
+            raise DeadlineExceededError(f"Délai dépassé pendant la génération de l'agent {agent_name}") from e
+        except Exception:
+            OLLAMA_REQUESTS.labels(agent_name, 'error').inc()
+            raise
+        finally:
+            manager.release_slot(agent_name, request_started, cancelled)
+
+        manager.record_result(agent_name, response_data)
+        return response_data
+
+    async def _read_stream(self, payload, timeout, stream, cancel_token, generate_span):
+        """
+        Envoie la requête à Ollama et lit la génération reçue en flux.
+
+        Returns:
+            dict: Réponse d'Ollama (voir StreamAccumulator.result)
+        """
+        request_timeout = httpx.Timeout(timeout) if timeout is not None else httpx.Timeout(None)
+        async with self.http.stream('POST', f"{OLLAMA_API_URL}/generate", json=payload,
+                                    timeout=request_timeout) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode('utf-8', 'replace')
+                generate_span.set_attribute('status_code', response.status_code)
+                logger.error("Erreur lors de l'appel à l'agent %s: %s", payload.get('model'), body)
+                raise RuntimeError(f"Erreur de communication avec l'agent: {body}")
+
+            async for line in response.aiter_lines():
+                if cancel_token is not None and cancel_token.cancelled:
+                    cancel_token.raise_if_cancelled(stream.text)
+                if stream.feed(line):
+                    break
+        return stream.result(cancel_token)
+
+    async def _await_reader(self, reader, stream, cancel_token):
+        """
+        Attend la lecture du flux; l'annulation du jeton (depuis n'importe quel
+        thread) interrompt la lecture, ce qui ferme la connexion vers Ollama.
+
+        Raises:
+            GenerationCancelled: Si le jeton est annulé pendant la lecture
+        """
+        if cancel_token is None:
+            return await reader
+
+        loop = asyncio.get_running_loop()
+
+        def abort():
+            try:
+                loop.call_soon_threadsafe(reader.cancel)
+            except RuntimeError:
+                pass
+
+        cancel_token.add_callback(abort)
+        try:
+            return await reader
+        except asyncio.CancelledError:
+            # Lecture interrompue par le jeton, et non annulation de l'appelant
+            if reader.cancelled() and cancel_token.cancelled and not asyncio.current_task().cancelling():
+                raise GenerationCancelled(cancel_token.reason, stream.text) from None
+            raise
+        finally:
+            cancel_token.remove_callback(abort)
+
+    async def ask_agent(self, agent_name, message, temperature=None, max_tokens=None, priority='interactive',
+                        timeout=None, tier=None, cancel_token=None, budget=None, on_token=None):
+        """
+        Pose une question à un agent et retourne sa réponse, stockée dans la base de connaissances.
+
+        Équivalent asynchrone de AgentManager.ask_agent.
+
+        Returns:
+            str: Réponse de l'agent ou message d'erreur
+
+        Raises:
+            AdmissionError: Si la demande est refusée avant l'appel à Ollama
+            GenerationCancelled: Si la génération est annulée (rien n'est stocké)
+        """
+        if agent_name not in AGENTS:
+            return f"Agent {agent_name} non reconnu"
+
+        try:
+            response_data = await self.generate(agent_name, message, temperature, max_tokens,
+                                                timeout=timeout, priority=priority, tier=tier,
+                                                cancel_token=cancel_token, budget=budget,
+                                                on_token=on_token)
+        except (AdmissionError, GenerationCancelled):
+            raise
+        except RuntimeError as e:
+            return str(e)
+        except Exception as e:
+            logger.error("Erreur lors de l'interaction avec l'agent %s: %s", agent_name, e)
+            return f"Erreur: {str(e)}"
+
+        agent_response = response_data.get('response', "Pas de réponse de l'agent")
+        await self.run_in_app_context(
+            self.agent_manager.store_agent_response,
+            agent_name, message, agent_response,
+            response_data=response_data,
+            tier=tier
+        )
+        return agent_response
+
+    async def ask_agents_batch(self, items, timeout=None, partial=True):
+        """
+        Envoie plusieurs prompts à des agents en parallèle.
+
+        Équivalent asynchrone de AgentManager.ask_agents_batch: un élément dont
+        le délai expire est réellement interrompu et libère son créneau.
+
+        Yields:
+            dict: Résultat de chaque élément, dans l'ordre où ils se terminent, puis un résumé final
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        batch_deadline = started + (timeout or BATCH_DEFAULT_TIMEOUT)
+
+        deadlines = {}
+        tasks = {}
+        for index, item in enumerate(items):
+            options = item.get('options') or {}
+            item_deadline = batch_deadline
+            if options.get('timeout'):
+                item_deadline = min(batch_deadline, started + float(options['timeout']))
+            task = asyncio.ensure_future(self.generate(
+                item['agent'], item['prompt'],
+                options.get('temperature'), options.get('max_tokens'),
+                timeout=item_deadline - started, priority='batch'
+            ))
+            tasks[task] = index
+            deadlines[task] = item_deadline
+
+        rows = []
+        completed = 0
+        failed = 0
+        aborted = False
+        pending = set(tasks)
+
+        try:
+            while pending:
+                next_deadline = min(deadlines[task] for task in pending)
+                done, pending = await asyncio.wait(pending, timeout=max(0, next_deadline - loop.time()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+
+                now = loop.time()
+                expired = {task for task in pending if deadlines[task] <= now}
+                pending -= expired
+
+                for task in done:
+                    index = tasks[task]
+                    item = items[index]
+                    result = {
+                        'index': index,
+                        'agent': item['agent'],
+                        'duration_ms': int((now - started) * 1000)
+                    }
+                    try:
+                        response_data = task.result()
+                        agent_response = response_data.get('response', "Pas de réponse de l'agent")
+                        result.update({'status': 'ok', 'response': agent_response})
+                        rows.append((item['agent'], item['prompt'], agent_response, response_data))
+                        completed += 1
+                    except QueueFullError as e:
+                        result.update({'status': 'rejected', 'error': str(e), 'retry_after': e.retry_after})
+                        failed += 1
+                    except TimeoutError as e:
+                        result.update({'status': 'timeout', 'error': str(e)})
+                        failed += 1
+                    except Exception as e:
+                        result.update({'status': 'error', 'error': str(e)})
+                        failed += 1
+                    yield result
+
+                for task in expired:
+                    task.cancel()
+                    failed += 1
+                    yield {
+                        'index': tasks[task],
+                        'agent': items[tasks[task]]['agent'],
+                        'status': 'timeout',
+                        'error': "Délai dépassé",
+                        'duration_ms': int((now - started) * 1000)
+                    }
+
+                if failed and not partial:
+                    aborted = True
+                    for task in pending:
+                        task.cancel()
+                        yield {
+                            'index': tasks[task],
+                            'agent': items[tasks[task]]['agent'],
+                            'status': 'cancelled'
+                        }
+                    pending = set()
+        finally:
+            # Client parti: les générations restantes sont interrompues
+            for task in tasks:
+                task.cancel()
+
+        knowledge_ids = []
+        if rows and not aborted:
+            knowledge_ids = await self.run_in_app_context(self.agent_manager.store_agent_responses, rows)
+
+        yield {
+            'done': True,
+            'completed': completed,
+            'failed': failed,
+            'aborted': aborted,
+            'knowledge_ids': knowledge_ids,
+            'duration_ms': int((loop.time() - started) * 1000)
+        }
+
+    async def run_in_app_context(self, function, *args, **kwargs):
+        """
+        Exécute une fonction bloquante (accès SQLite) dans un thread, avec le contexte de l'application.
+
+        Returns:
+            Valeur retournée par la fonction
+        """
+        def run():
+            with self.flask_app.app_context():
+                return function(*args, **kwargs)
+
+        return await asyncio.to_thread(run)
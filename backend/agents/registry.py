@@ -0,0 +1,428 @@
+# backend/agents/registry.py
+"""
+Registre des agents IA pour l'application IA-WebAgency.
+
+Ce module analyse une seule fois les modelfiles des agents et conserve
+en mémoire leurs métadonnées (modèle de base, paramètres, prompt système,
+description). Les fichiers sont rechargés à chaud lorsqu'on détecte un
+changement de date de modification. Le modelfile réglé pour la machine
+(TUNED_MODELFILES_DIR, cf. agents.tuning) remplace celui du dépôt s'il existe.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from threading import Lock
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    OLLAMA_BASE_MODEL, AGENTS, AGENT_TITLES,
+    MODELFILES_DIR, TUNED_MODELFILES_DIR, AGENT_REGISTRY_POLL_INTERVAL
+)
+
+logger = logging.getLogger('agent_registry')
+
+DEFAULT_DESCRIPTION = "Agent spécialisé"
+
+# Valeurs par défaut d'Ollama lorsque le modelfile ne les précise pas
+DEFAULT_PARAMETERS = {
+    'temperature': 0.8,
+    'num_predict': 2000,
+    'num_ctx': 2048
+}
+
+# Options d'exécution: Ollama recharge le modèle lorsqu'elles changent
+RUNNER_PARAMETERS = ('num_ctx', 'num_thread', 'num_batch', 'num_gpu', 'main_gpu', 'use_mmap', 'use_mlock')
+
+
+def _coerce_value(value):
+    """Convertit une valeur de PARAMETER en int ou float lorsque c'est possible"""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            continue
+    return value.strip('"')
+
+
+def parse_modelfile(content):
+    """
+    Analyse le contenu d'un modelfile Ollama.
+
+    Args:
+        content (str): Contenu brut du modelfile
+
+    Returns:
+        dict: Modèle de base, paramètres et prompt système
+    """
+    base_model = None
+    parameters = {}
+    system = None
+
+    lines = content.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+
+        if not line or line.startswith('#'):
+            continue
+
+        instruction, _, rest = line.partition(' ')
+        instruction = instruction.upper()
+        rest = rest.strip()
+
+        if instruction == 'FROM':
+            base_model = rest
+        elif instruction == 'PARAMETER':
+            key, _, value = rest.partition(' ')
+            if key:
+                parameters[key] = _coerce_value(value.strip())
+        elif instruction == 'SYSTEM':
+            if rest.startswith('"""'):
+                # Bloc multiligne délimité par des triples guillemets
+                block = rest[3:]
+                if block.endswith('"""'):
+                    system = block[:-3]
+                else:
+                    block_lines = [block] if block else []
+                    while i < len(lines):
+                        current = lines[i]
+                        i += 1
+                        if current.rstrip().endswith('"""'):
+                            block_lines.append(current.rstrip()[:-3])
+                            break
+                        block_lines.append(current)
+                    system = '\n'.join(block_lines)
+            else:
+                system = rest.strip('"')
+
+    return {
+        'base_model': base_model or OLLAMA_BASE_MODEL,
+        'parameters': parameters,
+        'system': system.strip() if system else ''
+    }
+
+
+def extract_description(system_prompt):
+    """
+    Extrait la description d'un agent à partir de son prompt système.
+
+    Args:
+        system_prompt (str): Prompt système de l'agent
+
+    Returns:
+        str: Description de l'agent ou description par défaut
+    """
+    for marker in ("Ton rôle est de ", "Ton rôle est d'"):
+        if marker in system_prompt:
+            return system_prompt.split(marker, 1)[1].split('\n')[0].strip()
+
+    return DEFAULT_DESCRIPTION
+
+
+class AgentProfile:
+    """Représentation d'un agent issue de son modelfile"""
+
+    def __init__(self, name, path, content, mtime, tuned=False):
+        """
+        Initialise le profil d'un agent.
+
+        Args:
+            name (str): Nom de l'agent
+            path (str): Chemin du modelfile
+            content (str): Contenu brut du modelfile
+            mtime (float): Date de modification du modelfile
+            tuned (bool): Modelfile généré par l'auto-réglage
+        """
+        parsed = parse_modelfile(content)
+
+        self.name = name
+        self.path = path
+        self.modelfile = content
+        self.mtime = mtime
+        self.tuned = tuned
+        self.title = AGENT_TITLES.get(name, name.capitalize())
+        self.base_model = parsed['base_model']
+        self.parameters = parsed['parameters']
+        self.system = parsed['system']
+        self.description = extract_description(self.system)
+
+    @property
+    def temperature(self):
+        return self.parameters.get('temperature', DEFAULT_PARAMETERS['temperature'])
+
+    @property
+    def num_predict(self):
+        return self.parameters.get('num_predict', DEFAULT_PARAMETERS['num_predict'])
+
+    @property
+    def num_ctx(self):
+        return self.parameters.get('num_ctx', DEFAULT_PARAMETERS['num_ctx'])
+
+    def sampling_options(self):
+        """
+        Paramètres du modelfile qui peuvent varier d'une requête à l'autre
+        sans recharger le modèle (température, top_p, pénalités...).
+
+        Returns:
+            dict: Options à envoyer avec la requête
+        """
+        return {key: value for key, value in self.parameters.items() if key not in RUNNER_PARAMETERS}
+
+    def get_limits(self):
+        """
+        Retourne les limites de génération de l'agent.
+
+        Returns:
+            dict: temperature, num_predict et num_ctx effectifs
+        """
+        return {
+            'temperature': self.temperature,
+            'num_predict': self.num_predict,
+            'num_ctx': self.num_ctx
+        }
+
+    def to_dict(self):
+        """
+        Convertit le profil en dictionnaire pour l'API.
+
+        Returns:
+            dict: Représentation publique de l'agent
+        """
+        return {
+            'name': self.name,
+            'title': self.title,
+            'description': self.description,
+            'base_model': self.base_model,
+            'parameters': self.get_limits()
+        }
+
+
+class AgentRegistry:
+    """
+    Registre en mémoire des agents.
+    Les modelfiles sont analysés une seule fois, puis rechargés uniquement
+    si leur date de modification change (vérification par polling).
+    """
+
+    def __init__(self, modelfiles_dir=MODELFILES_DIR, agents=AGENTS,
+                 poll_interval=AGENT_REGISTRY_POLL_INTERVAL, tuned_dir=TUNED_MODELFILES_DIR):
+        """
+        Initialise le registre.
+
+        Args:
+            modelfiles_dir (str): Dossier contenant les modelfiles
+            agents (list): Noms des agents à charger
+            poll_interval (float): Intervalle minimal entre deux vérifications
+            tuned_dir (str): Dossier des modelfiles réglés pour la machine
+        """
+        self.modelfiles_dir = modelfiles_dir
+        self.tuned_dir = tuned_dir
+        self.agents = list(agents)
+        self.poll_interval = poll_interval
+        self.lock = Lock()
+        self._profiles = {}
+        self._mtimes = {}
+        self._listing = []
+        self._runner_options = {}
+        self._etag = None
+        self._last_check = 0.0
+        self.reload()
+
+    def modelfile_path(self, agent_name):
+        """Retourne le chemin absolu du modelfile d'un agent (le modelfile réglé s'il existe)"""
+        if self.tuned_dir:
+            tuned_path = os.path.join(self.tuned_dir, f"{agent_name}.modelfile")
+            if os.path.exists(tuned_path):
+                return tuned_path
+        return os.path.join(self.modelfiles_dir, f"{agent_name}.modelfile")
+
+    def _stat(self, agent_name):
+        # Le chemin fait partie de la signature: l'apparition ou la suppression
+        # d'un modelfile réglé provoque un rechargement
+        path = self.modelfile_path(agent_name)
+        try:
+            return (path, os.stat(path).st_mtime)
+        except OSError:
+            return None
+
+    def _load_profile(self, agent_name, signature):
+        if signature is None:
+            return None
+
+        path, mtime = signature
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            tuned = os.path.dirname(path) != os.path.abspath(self.modelfiles_dir)
+            return AgentProfile(agent_name, path, content, mtime, tuned=tuned)
+        except Exception as e:
+            logger.error("Erreur lors de l'analyse du modelfile de l'agent %s: %s", agent_name, e)
+            return None
+
+    def _rebuild_listing(self):
+        listing = []
+        for agent in self.agents:
+            profile = self._profiles.get(agent)
+            if profile:
+                listing.append(profile.to_dict())
+            else:
+                listing.append({
+                    'name': agent,
+                    'title': AGENT_TITLES.get(agent, agent.capitalize()),
+                    'description': DEFAULT_DESCRIPTION
+                })
+
+        payload = json.dumps(listing, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        self._runner_options = self._merge_runner_options()
+        self._listing = listing
+        self._etag = hashlib.sha1(payload).hexdigest()
+
+    def _merge_runner_options(self):
+        # Une seule valeur par option pour tous les agents: le plus grand contexte,
+        # et pour les autres options la valeur la plus fréquente
+        values = {}
+        for profile in self._profiles.values():
+            if profile:
+                for key in RUNNER_PARAMETERS:
+                    if key in profile.parameters:
+                        values.setdefault(key, []).append(profile.parameters[key])
+        merged = {}
+        for key, found in values.items():
+            merged[key] = max(found) if key == 'num_ctx' else max(set(found), key=found.count)
+        return merged
+
+    def shared_runner_options(self):
+        """
+        Options d'exécution communes à tous les agents, pour le mode modèle partagé
+        (des options différentes d'un agent à l'autre feraient recharger le modèle).
+
+        Returns:
+            dict: Options d'exécution (num_ctx, num_thread...)
+        """
+        self.refresh_if_changed()
+        return self._runner_options
+
+    def reload(self):
+        """Analyse à nouveau tous les modelfiles"""
+        with self.lock:
+            for agent in self.agents:
+                signature = self._stat(agent)
+                self._mtimes[agent] = signature
+                self._profiles[agent] = self._load_profile(agent, signature)
+            self._rebuild_listing()
+            self._last_check = time.monotonic()
+
+        logger.info("Registre des agents chargé (%s agents)", len(self.agents))
+
+    def refresh_if_changed(self, force=False):
+        """
+        Recharge les modelfiles modifiés depuis la dernière vérification.
+
+        Args:
+            force (bool): Ignorer l'intervalle de polling
+
+        Returns:
+            bool: True si au moins un agent a été rechargé
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.poll_interval:
+            return False
+
+        with self.lock:
+            self._last_check = now
+            changed = []
+            for agent in self.agents:
+                signature = self._stat(agent)
+                if signature != self._mtimes.get(agent):
+                    self._mtimes[agent] = signature
+                    self._profiles[agent] = self._load_profile(agent, signature)
+                    changed.append(agent)
+
+            if changed:
+                self._rebuild_listing()
+                logger.info("Modelfiles rechargés: %s", ', '.join(changed))
+
+        return bool(changed)
+
+    def get(self, agent_name):
+        """
+        Retourne le profil d'un agent.
+
+        Args:
+            agent_name (str): Nom de l'agent
+
+        Returns:
+            AgentProfile: Profil de l'agent ou None si inconnu
+        """
+        self.refresh_if_changed()
+        return self._profiles.get(agent_name)
+
+    def get_limits(self, agent_name):
+        """
+        Retourne les limites de génération d'un agent.
+
+        Args:
+            agent_name (str): Nom de l'agent
+
+        Returns:
+            dict: temperature, num_predict et num_ctx
+        """
+        profile = self.get(agent_name)
+        if profile is None:
+            return dict(DEFAULT_PARAMETERS)
+        return profile.get_limits()
+
+    def list_agents(self):
+        """
+        Liste les agents avec leurs métadonnées.
+
+        Returns:
+            list: Liste des agents
+        """
+        self.refresh_if_changed()
+        return self._listing
+
+    @property
+    def etag(self):
+        """Empreinte de la liste des agents, utilisée comme ETag HTTP"""
+        self.refresh_if_changed()
+        return self._etag
+
+
+# Singleton pour le registre des agents
+_agent_registry_instance = None
+_agent_registry_lock = Lock()
+
+def get_agent_registry():
+    """
+    Retourne l'instance unique du registre des agents.
+
+    Returns:
+        AgentRegistry: Instance du registre
+    """
+    global _agent_registry_instance
+
+    with _agent_registry_lock:
+        if _agent_registry_instance is None:
+            _agent_registry_instance = AgentRegistry()
+
+        return _agent_registry_instance
+
+
+def _reset_process_state():
+    # Les profils déjà lus avant le fork (gunicorn --preload) restent partagés
+    # avec le processus parent; seuls les verrous sont recréés
+    global _agent_registry_lock
+    _agent_registry_lock = Lock()
+    if _agent_registry_instance is not None:
+        _agent_registry_instance.lock = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_process_state)
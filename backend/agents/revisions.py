@@ -0,0 +1,607 @@
+# backend/agents/revisions.py
+"""
+Révisions asynchrones des livrables à partir des feedbacks.
+
+Les feedbacks postés sur un même livrable (projet, étape) pendant une
+fenêtre de regroupement sont fusionnés en une seule régénération, exécutée
+en arrière-plan avec la priorité "feedback". Chaque révision correspond à
+une ligne de la table revision_jobs dont l'ID est retourné au client.
+
+Lorsque les feedbacks ne visent que certaines sections du livrable (voir
+utils.sections), seules ces sections sont régénérées; sinon le livrable
+est régénéré en entier.
+
+Chaque planificateur (un par processus) détient un verrou de présence
+(flock) et enregistre son identifiant dans les révisions qu'il programme:
+au démarrage, un planificateur reprend les révisions des processus
+arrêtés. Les révisions d'un même livrable sont sérialisées entre processus
+par un verrou par (projet, étape).
+"""
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    FEEDBACK_DEBOUNCE_SECONDS, FEEDBACK_MAX_DELAY_SECONDS, REVISION_MAX_WORKERS,
+    SECTION_REVISIONS, SECTION_REVISION_MAX_SHARE, REVISIONS_DIR, WORKFLOW_STEPS
+)
+from database.db import query_db, insert_db, update_db
+from agents.agent_manager import get_agent_manager
+from agents.workflow import ProjectWorkflow, record_step_tier
+from utils.file_manager import get_deliverable
+from utils.sections import parse_sections, match_sections, section_spans, render_sections
+from utils.tracing import start_trace
+from utils.logs import log_context
+
+logger = logging.getLogger('revisions')
+
+
+def merge_feedback(feedback_rows):
+    """
+    Fusionne plusieurs feedbacks en un seul texte pour l'agent.
+
+    Args:
+        feedback_rows (list): Lignes de la table feedback, par ordre d'arrivée
+
+    Returns:
+        str: Feedback fusionné
+    """
+    if len(feedback_rows) == 1:
+        return feedback_rows[0]['feedback']
+
+    parts = []
+    for index, row in enumerate(feedback_rows, start=1):
+        parts.append(f"### Commentaire {index} ({row['created_at']})\n{row['feedback']}")
+    return "\n\n".join(parts)
+
+
+def revision_scope(agent_manager, project_name, step_id, feedback):
+    """
+    Détermine la portée d'une révision: quelques sections ou le livrable entier.
+
+    La révision est complète si les révisions ciblées sont désactivées, si le
+    livrable n'est qu'un brouillon (il doit être affiné en entier), si le
+    feedback ne désigne aucune section ou si les sections désignées couvrent
+    plus de SECTION_REVISION_MAX_SHARE du livrable.
+
+    Args:
+        agent_manager (AgentManager): Gestionnaire d'agents
+        project_name (str): Nom du projet
+        step_id (str): ID de l'étape
+        feedback (str): Feedback fusionné
+
+    Returns:
+        tuple: ('sections', identifiants des sections) ou ('full', [])
+    """
+    if not SECTION_REVISIONS:
+        return 'full', []
+
+    content = get_deliverable(project_name, step_id)
+    if not content:
+        return 'full', []
+
+    workflow = ProjectWorkflow.load(agent_manager, project_name)
+    step = next((step for step in workflow.steps if step.id == step_id), None) if workflow else None
+    if step is not None and step.tier == 'draft':
+        return 'full', []
+
+    sections = parse_sections(content)
+    section_ids = match_sections(sections, feedback)
+    if not section_ids:
+        return 'full', []
+
+    covered = sum(len(render_sections(sections[start:end])) for start, end in section_spans(sections, section_ids))
+    if covered > SECTION_REVISION_MAX_SHARE * len(content):
+        return 'full', []
+    return 'sections', section_ids
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """
+    Verrouille un fichier (flock) le temps du bloc; le verrou d'un processus
+    mort est libéré par le système.
+
+    Args:
+        path (str): Chemin du fichier de verrou (créé s'il n'existe pas)
+        blocking (bool): Attendre le verrou s'il est détenu ailleurs
+
+    Yields:
+        bool: True si le verrou est acquis (toujours en mode bloquant)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            acquired = True
+        except BlockingIOError:
+            acquired = False
+        yield acquired
+
+
+def owner_lock_path(owner):
+    """
+    Args:
+        owner (str): Identifiant d'un planificateur de révisions
+
+    Returns:
+        str: Chemin de son verrou de présence
+    """
+    return os.path.join(REVISIONS_DIR, 'owners', f"{owner}.lock")
+
+
+def owner_alive(owner):
+    """
+    Args:
+        owner (str): Identifiant d'un planificateur de révisions (None pour
+            les révisions antérieures à leur suivi)
+
+    Returns:
+        bool: True si le processus de ce planificateur est en cours d'exécution
+    """
+    if not owner or not os.path.exists(owner_lock_path(owner)):
+        return False
+    with file_lock(owner_lock_path(owner), blocking=False) as acquired:
+        return not acquired
+
+
+def revision_lock_path(project_id, step_id):
+    """
+    Args:
+        project_id (int): ID du projet
+        step_id (str): ID de l'étape
+
+    Returns:
+        str: Chemin du verrou sérialisant les révisions de ce livrable
+    """
+    return os.path.join(REVISIONS_DIR, f"{project_id}-{step_id}.lock")
+
+
+class RevisionScheduler:
+    """Regroupe les feedbacks par livrable et lance les révisions en arrière-plan"""
+
+    def __init__(self, debounce=FEEDBACK_DEBOUNCE_SECONDS, max_delay=FEEDBACK_MAX_DELAY_SECONDS,
+                 max_workers=REVISION_MAX_WORKERS):
+        """
+        Args:
+            debounce (float): Délai sans nouveau feedback avant de lancer la révision
+            max_delay (float): Délai maximal entre le premier feedback et la révision
+            max_workers (int): Nombre de révisions exécutées simultanément
+        """
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_workers = max_workers
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._condition = threading.Condition()
+        self._queued = {}     # (project_id, step_id) -> révision en attente
+        self._running = set()
+        self._thread = None
+        self._app = None
+        # Identifiant et verrou de présence de ce processus (recréés après un fork)
+        self._owner = None
+        self._owner_file = None
+
+    def _ensure_owner(self):
+        """
+        Returns:
+            str: Identifiant de ce planificateur, dont le verrou de présence est détenu
+        """
+        with self._condition:
+            if self._owner is None:
+                owner = uuid.uuid4().hex
+                lock_path = owner_lock_path(owner)
+                os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+                self._owner_file = open(lock_path, 'a')
+                fcntl.flock(self._owner_file, fcntl.LOCK_EX)
+                self._owner = owner
+            return self._owner
+
+    def _start_thread(self):
+        # Appelée sous self._condition
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='revision-scheduler', daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, key, job_id, agent_name, now, merged=()):
+        """
+        Met une révision en file (appelée sous self._condition). Si une révision
+        est déjà en attente pour ce livrable, la nouvelle lui est rattachée: elle
+        est exécutée avec elle et en partage le résultat.
+        """
+        pending = self._queued.get(key)
+        if pending is None:
+            self._queued[key] = {
+                'job_id': job_id,
+                'agent': agent_name,
+                'first_seen': now,
+                'due': now + self.debounce,
+                'merged': list(merged)
+            }
+        elif job_id != pending['job_id'] and job_id not in pending['merged']:
+            pending['merged'].extend([job_id, *merged])
+
+    def start(self, app):
+        """
+        Démarre la planification dans ce processus; le thread de planification
+        reprend d'abord les révisions interrompues (voir recover).
+
+        Args:
+            app (Flask): Application, pour le contexte des threads de révision
+        """
+        with self._condition:
+            self._app = app
+            self._start_thread()
+
+    def submit(self, app, project_id, step_id, agent_name):
+        """
+        Programme la révision d'un livrable suite à un nouveau feedback.
+
+        Si une révision est déjà en attente pour ce livrable, le feedback
+        lui est rattaché et son déclenchement est repoussé.
+
+        Args:
+            app (Flask): Application, pour le contexte des threads de révision
+            project_id (int): ID du projet
+            step_id (str): ID de l'étape (ex: "02_design_ux")
+            agent_name (str): Agent chargé de la révision
+
+        Returns:
+            int: ID de la révision
+        """
+        key = (project_id, step_id)
+        now = time.monotonic()
+        owner = self._ensure_owner()
+
+        with self._condition:
+            self._app = app
+            pending = self._queued.get(key)
+            if pending:
+                pending['due'] = min(now + self.debounce, pending['first_seen'] + self.max_delay)
+                job_id = pending['job_id']
+
+        # Écritures en base hors du verrou: le planificateur n'attend pas la base
+        if pending:
+            update_db(
+                "UPDATE revision_jobs SET feedback_count = feedback_count + 1 WHERE id = ?",
+                (job_id,)
+            )
+            logger.info("Feedback rattaché à la révision %s (%s, %s)", job_id, project_id, step_id)
+        else:
+            job_id = insert_db(
+                """
+                INSERT INTO revision_jobs
+                (project_id, step_id, agent, status, feedback_count, owner)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (project_id, step_id, agent_name, 'queued', 1, owner)
+            )
+            with self._condition:
+                self._enqueue(key, job_id, agent_name, now)
+            logger.info("Révision %s programmée pour (%s, %s)", job_id, project_id, step_id)
+
+        with self._condition:
+            self._start_thread()
+            self._condition.notify_all()
+
+        return job_id
+
+    def recover(self):
+        """
+        Reprend les révisions programmées par des processus arrêtés.
+
+        Les révisions en attente ou en cours dont le planificateur ne détient
+        plus son verrou de présence sont rattachées à ce processus et remises
+        en file; les feedbacks en attente sans révision programmée en reçoivent
+        une. Un verrou global évite que deux processus démarrant ensemble ne
+        programment chacun la même révision.
+
+        Returns:
+            int: Nombre de révisions mises en file
+        """
+        owner = self._ensure_owner()
+
+        with file_lock(os.path.join(REVISIONS_DIR, 'recover.lock')):
+            owners = query_db(
+                "SELECT DISTINCT owner FROM revision_jobs WHERE status IN ('queued', 'running')"
+            )
+            for row in owners:
+                if row['owner'] == owner or owner_alive(row['owner']):
+                    continue
+                # Le processus est mort: ses révisions en cours n'ont pas abouti
+                adopted = update_db(
+                    """
+                    UPDATE revision_jobs SET owner = ?, status = 'queued', started_at = NULL
+                    WHERE owner IS ? AND status IN ('queued', 'running')
+                    """,
+                    (owner, row['owner'])
+                )
+                if row['owner']:
+                    try:
+                        os.remove(owner_lock_path(row['owner']))
+                    except OSError:
+                        pass
+                logger.info("%s révisions reprises d'un processus arrêté", adopted)
+
+            orphans = query_db(
+                """
+                SELECT DISTINCT f.project_id, f.step_id FROM feedback f
+                JOIN projects p ON p.id = f.project_id
+                WHERE f.status = 'pending' AND NOT EXISTS (
+                    SELECT 1 FROM revision_jobs j
+                    WHERE j.project_id = f.project_id AND j.step_id = f.step_id
+                    AND j.status IN ('queued', 'running')
+                )
+                """
+            )
+            step_agents = {step['id']: step['agent'] for step in WORKFLOW_STEPS}
+            for row in orphans:
+                agent_name = step_agents.get(row['step_id'])
+                if agent_name is None:
+                    continue
+                insert_db(
+                    """
+                    INSERT INTO revision_jobs
+                    (project_id, step_id, agent, status, feedback_count, owner)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (row['project_id'], row['step_id'], agent_name, 'queued', 0, owner)
+                )
+
+            jobs = query_db(
+                "SELECT id, project_id, step_id, agent FROM revision_jobs WHERE owner = ? AND status = 'queued' ORDER BY id",
+                (owner,)
+            )
+
+        now = time.monotonic()
+        with self._condition:
+            for job in jobs:
+                self._enqueue((job['project_id'], job['step_id']), job['id'], job['agent'], now)
+            self._condition.notify_all()
+        if jobs:
+            logger.info("%s révisions en attente reprogrammées", len(jobs))
+        return len(jobs)
+
+    def _take_due(self):
+        """Retire de la file les révisions échues dont le livrable n'est pas en cours de révision"""
+        now = time.monotonic()
+        ready = []
+        for key, job in sorted(self._queued.items(), key=lambda item: item[1]['due']):
+            if len(self._running) >= self.max_workers or job['due'] > now:
+                break
+            if key in self._running:
+                continue
+            ready.append((key, job))
+            self._running.add(key)
+        for key, _ in ready:
+            del self._queued[key]
+        return ready
+
+    def _next_wakeup(self):
+        waiting = [job['due'] for key, job in self._queued.items() if key not in self._running]
+        if not waiting or len(self._running) >= self.max_workers:
+            return None
+        return max(0, min(waiting) - time.monotonic())
+
+    def _run(self):
+        with self._condition:
+            app = self._app
+        try:
+            with app.app_context():
+                self.recover()
+        except Exception as e:
+            logger.error("Erreur lors de la reprise des révisions: %s", e)
+
+        while True:
+            with self._condition:
+                ready = self._take_due()
+                while not ready:
+                    self._condition.wait(self._next_wakeup())
+                    ready = self._take_due()
+                app = self._app
+
+            for key, job in ready:
+                threading.Thread(
+                    target=self._execute,
+                    args=(app, key, job),
+                    name=f"revision-{job['job_id']}",
+                    daemon=True
+                ).start()
+
+    def _execute(self, app, key, job):
+        try:
+            with app.app_context():
+                result = self.run_job(job['job_id'], key[0], key[1], job['agent'], job['merged'])
+            if result.get('busy'):
+                # Étape en cours de génération ailleurs (workflow): révision reprogrammée
+                with self._condition:
+                    self._enqueue(key, job['job_id'], job['agent'], time.monotonic(), job['merged'])
+        except Exception as e:
+            logger.error("Erreur lors de la révision %s: %s", job['job_id'], e)
+        finally:
+            with self._condition:
+                self._running.discard(key)
+                self._condition.notify_all()
+
+    def run_job(self, job_id, project_id, step_id, agent_name, merged_ids=()):
+        """
+        Exécute une révision: fusionne les feedbacks en attente et régénère le livrable.
+
+        Les révisions d'un même livrable sont exécutées l'une après l'autre, y
+        compris entre processus; une révision déjà prise en charge ailleurs
+        n'est pas exécutée une seconde fois.
+
+        Args:
+            job_id (int): ID de la révision
+            project_id (int): ID du projet
+            step_id (str): ID de l'étape
+            agent_name (str): Agent chargé de la révision
+            merged_ids (iterable): Révisions rattachées, qui en partagent le résultat
+
+        Returns:
+            dict: Résultat de la régénération ('busy' à True si l'étape est en
+                cours de génération dans un autre processus: la révision reste en attente)
+        """
+        with file_lock(revision_lock_path(project_id, step_id)):
+            return self._run_locked([job_id, *merged_ids], project_id, step_id, agent_name)
+
+    def _run_locked(self, job_ids, project_id, step_id, agent_name):
+        job_id = job_ids[0]
+        placeholders = ','.join('?' * len(job_ids))
+        project = query_db("SELECT * FROM projects WHERE id = ?", (project_id,), one=True)
+        feedback_rows = query_db(
+            """
+            SELECT id, feedback, created_at FROM feedback
+            WHERE project_id = ? AND step_id = ? AND status = 'pending'
+            ORDER BY id
+            """,
+            (project_id, step_id)
+        )
+        feedback_ids = [row['id'] for row in feedback_rows]
+
+        # Prise en charge conditionnelle: une révision n'est exécutée qu'une fois
+        claimed = update_db(
+            f"""
+            UPDATE revision_jobs
+            SET status = ?, started_at = CURRENT_TIMESTAMP, feedback_count = ?, feedback_ids = ?
+            WHERE id IN ({placeholders}) AND status = 'queued'
+            """,
+            ('running', len(feedback_ids), json.dumps(feedback_ids), *job_ids)
+        )
+        if not claimed:
+            return {"success": False, "message": "Révision déjà prise en charge"}
+
+        if not project or not feedback_rows:
+            message = "Projet non trouvé" if not project else "Aucun feedback en attente"
+            self._finish(job_ids, 'completed' if project else 'failed', None if project else message)
+            return {"success": bool(project), "message": message}
+
+        agent_manager = get_agent_manager()
+        feedback = merge_feedback(feedback_rows)
+        scope, section_ids = revision_scope(agent_manager, project['name'], step_id, feedback)
+        update_db(
+            f"UPDATE revision_jobs SET scope = ?, sections = ? WHERE id IN ({placeholders})",
+            (scope, json.dumps(section_ids) if section_ids else None, *job_ids)
+        )
+
+        with start_trace('feedback.revision', project_id=project_id, step_id=step_id,
+                         job_id=job_id, feedback_count=len(feedback_ids), scope=scope), \
+                log_context(step_id=step_id, agent=agent_name):
+            if scope == 'sections':
+                result = agent_manager.revise_sections(
+                    project['name'],
+                    step_id,
+                    agent_name,
+                    feedback,
+                    section_ids,
+                    priority='feedback'
+                )
+            else:
+                result = agent_manager.process_project_step(
+                    project['name'],
+                    step_id,
+                    agent_name,
+                    context={'feedback': feedback},
+                    priority='feedback',
+                    tier='full'
+                )
+
+        if result.get('success', False):
+            feedback_placeholders = ','.join('?' * len(feedback_ids))
+            update_db(
+                f"UPDATE feedback SET status = 'completed' WHERE id IN ({feedback_placeholders})",
+                feedback_ids
+            )
+            # Une révision produit toujours un livrable complet, même sur une étape en brouillon
+            record_step_tier(agent_manager, project['name'], step_id, 'full', inputs=result.get('inputs'))
+            self._finish(job_ids, 'completed')
+            logger.info("Révision %s terminée (%s): %s feedbacks appliqués à %s", job_id, scope, len(feedback_ids), step_id)
+        elif result.get('busy'):
+            # L'étape est générée par un autre processus: la révision reste en attente
+            update_db(
+                f"UPDATE revision_jobs SET status = 'queued', started_at = NULL WHERE id IN ({placeholders})",
+                job_ids
+            )
+            logger.info("Révision %s reportée: étape %s en cours de génération", job_id, step_id)
+        else:
+            # Les feedbacks restent en attente et seront repris par la prochaine révision
+            self._finish(job_ids, 'failed', result.get('message'))
+            logger.error("Échec de la révision %s: %s", job_id, result.get('message'))
+
+        return result
+
+    def _finish(self, job_ids, status, error=None):
+        placeholders = ','.join('?' * len(job_ids))
+        update_db(
+            f"UPDATE revision_jobs SET status = ?, error = ?, completed_at = CURRENT_TIMESTAMP WHERE id IN ({placeholders})",
+            (status, error, *job_ids)
+        )
+
+
+def get_revision_job(project_id, job_id):
+    """
+    Retourne l'état d'une révision.
+
+    Args:
+        project_id (int): ID du projet
+        job_id (int): ID de la révision
+
+    Returns:
+        dict: État de la révision ou None si non trouvée
+    """
+    job = query_db(
+        "SELECT * FROM revision_jobs WHERE id = ? AND project_id = ?",
+        (job_id, project_id),
+        one=True
+    )
+    if not job:
+        return None
+
+    return {
+        'id': job['id'],
+        'project_id': job['project_id'],
+        'step_id': job['step_id'],
+        'agent': job['agent'],
+        'status': job['status'],
+        'feedback_count': job['feedback_count'],
+        'feedback_ids': json.loads(job['feedback_ids']) if job['feedback_ids'] else [],
+        'scope': job['scope'],
+        'sections': json.loads(job['sections']) if job['sections'] else [],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'completed_at': job['completed_at']
+    }
+
+
+# Singleton pour le planificateur de révisions
+_revision_scheduler_instance = None
+_revision_scheduler_lock = threading.Lock()
+
+
+def get_revision_scheduler():
+    """
+    Retourne l'instance unique du planificateur de révisions.
+
+    Returns:
+        RevisionScheduler: Instance du planificateur
+    """
+    global _revision_scheduler_instance
+
+    with _revision_scheduler_lock:
+        if _revision_scheduler_instance is None:
+            _revision_scheduler_instance = RevisionScheduler()
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=_revision_scheduler_instance._reset_process_state)
+
+    return _revision_scheduler_instance
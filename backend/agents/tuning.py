@@ -0,0 +1,497 @@
+# backend/agents/tuning.py
+"""
+Auto-réglage des paramètres d'exécution Ollama de chaque agent.
+
+Les modelfiles du dépôt ne fixent que temperature et num_predict: num_ctx,
+num_thread et num_batch gardent les valeurs par défaut d'Ollama, qui ne
+tiennent compte ni des prompts réels des agents ni des machines sans GPU.
+
+Pour chaque agent, des jeux de paramètres candidats sont mesurés sur la
+machine courante avec des prompts représentatifs tirés de l'historique
+(base de connaissances et statistiques de génération): débit de prefill,
+débit de décodage et mémoire du modèle chargé (/api/ps). La recherche se
+fait paramètre par paramètre (num_thread, puis num_batch, puis num_ctx),
+en gardant à chaque fois la meilleure valeur. Le score est la durée
+estimée d'une génération typique de l'agent.
+
+Le meilleur jeu est écrit dans un modelfile généré (TUNED_MODELFILES_DIR),
+que le registre des agents préfère au modelfile du dépôt; l'agent est
+recréé dans Ollama au démarrage suivant (ensure_agents_exist).
+
+La quantification dépend du modèle de base (FROM): des variantes déjà
+téléchargées (ex: llama3:8b-instruct-q4_K_M) peuvent être comparées.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import statistics
+from datetime import datetime
+
+import requests
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    OLLAMA_API_URL, TUNED_MODELFILES_DIR, TUNING_DECODE_TOKENS, TUNING_REPEATS,
+    TUNING_BATCH_SIZES, TUNING_PROMPTS
+)
+from agents.registry import DEFAULT_PARAMETERS
+
+logger = logging.getLogger('agent_tuning')
+
+# Valeur par défaut de num_batch dans Ollama
+DEFAULT_BATCH = 512
+
+# Contexte minimal et marge sur le plus long prompt observé
+MIN_CONTEXT = 2048
+CONTEXT_HEADROOM = 1.25
+
+# Prompt utilisé pour un agent sans historique
+FALLBACK_PROMPT = (
+    "Présente ta démarche pour un nouveau projet de site web: étapes, livrables, "
+    "points de vigilance et recommandations."
+)
+
+
+def detect_cpu():
+    """
+    Détecte les cœurs disponibles pour le processus.
+
+    Returns:
+        dict: logical (threads utilisables), physical (cœurs physiques)
+    """
+    try:
+        logical = len(os.sched_getaffinity(0))
+    except AttributeError:
+        logical = os.cpu_count() or 1
+
+    cores = set()
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            physical_id = core_id = None
+            for line in f:
+                key, _, value = line.partition(':')
+                key = key.strip()
+                if key == 'physical id':
+                    physical_id = value.strip()
+                elif key == 'core id':
+                    core_id = value.strip()
+                elif not line.strip():
+                    if core_id is not None:
+                        cores.add((physical_id, core_id))
+                    physical_id = core_id = None
+            if core_id is not None:
+                cores.add((physical_id, core_id))
+    except OSError:
+        pass
+
+    physical = min(len(cores), logical) if cores else logical
+    return {'logical': logical, 'physical': max(1, physical)}
+
+
+def _quantiles(values, count):
+    """Valeurs aux rangs régulièrement espacés (médiane ... maximum)"""
+    ordered = sorted(values)
+    if len(ordered) <= count:
+        return ordered
+    ranks = [int(round((len(ordered) - 1) * (0.5 + 0.5 * i / max(1, count - 1)))) for i in range(count)]
+    return [ordered[rank] for rank in sorted(set(ranks))]
+
+
+def representative_workload(db, agent, prompts=TUNING_PROMPTS, default_predict=None):
+    """
+    Construit la charge représentative d'un agent à partir de l'historique.
+
+    Les prompts sont choisis parmi les questions enregistrées dans la base de
+    connaissances, de la longueur médiane à la plus longue; les statistiques de
+    génération donnent la taille des prompts et des réponses observées.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        agent (str): Nom de l'agent
+        prompts (int): Nombre de prompts à retenir
+        default_predict (int, optional): Tokens générés si aucun historique
+
+    Returns:
+        dict: prompts (liste), prompt_tokens_max et eval_tokens (médiane)
+    """
+    queries = [
+        row[0] for row in db.execute(
+            "SELECT query FROM knowledge WHERE agent = ? AND query IS NOT NULL AND query != '' "
+            "ORDER BY id DESC LIMIT 1000",
+            (agent,)
+        )
+    ]
+    chosen = []
+    if queries:
+        lengths = _quantiles([len(query) for query in queries], prompts)
+        by_length = sorted(queries, key=len)
+        for length in lengths:
+            chosen.append(next(query for query in by_length if len(query) >= length))
+
+    stats = db.execute(
+        "SELECT prompt_eval_count, eval_count FROM generation_stats "
+        "WHERE agent = ? AND prompt_eval_count IS NOT NULL ORDER BY id DESC LIMIT 1000",
+        (agent,)
+    ).fetchall()
+    prompt_counts = [row[0] for row in stats if row[0]]
+    eval_counts = [row[1] for row in stats if row[1]]
+
+    return {
+        'prompts': chosen or [FALLBACK_PROMPT],
+        'history': len(queries),
+        'prompt_tokens_max': max(prompt_counts) if prompt_counts else None,
+        'eval_tokens': int(statistics.median(eval_counts)) if eval_counts
+        else (default_predict or DEFAULT_PARAMETERS['num_predict'])
+    }
+
+
+def context_candidates(workload, current=None):
+    """
+    Tailles de contexte à essayer: la plus petite puissance de deux qui contient
+    le plus long prompt observé et la réponse, et la valeur actuelle si elle est plus grande.
+
+    Args:
+        workload (dict): Charge représentative (representative_workload)
+        current (int, optional): num_ctx actuel de l'agent
+
+    Returns:
+        list: Valeurs de num_ctx croissantes
+    """
+    prompt_tokens = workload['prompt_tokens_max'] or max(len(p) for p in workload['prompts']) // 3
+    required = int((prompt_tokens + workload['eval_tokens']) * CONTEXT_HEADROOM)
+    fit = MIN_CONTEXT
+    while fit < required:
+        fit *= 2
+    return sorted({fit, max(fit, current or DEFAULT_PARAMETERS['num_ctx'])})
+
+
+def thread_candidates(cpu):
+    """
+    Args:
+        cpu (dict): Cœurs détectés (detect_cpu)
+
+    Returns:
+        list: Valeurs de num_thread croissantes
+    """
+    return sorted({max(1, cpu['physical'] // 2), cpu['physical'], cpu['logical']})
+
+
+class Measurement:
+    """Résultat de la mesure d'un jeu de paramètres"""
+
+    def __init__(self, model, options, prefill_tps, decode_tps, memory_bytes, load_seconds):
+        self.model = model
+        self.options = dict(options)
+        self.prefill_tps = prefill_tps
+        self.decode_tps = decode_tps
+        self.memory_bytes = memory_bytes
+        self.load_seconds = load_seconds
+
+    def estimated_seconds(self, workload, prompt_tokens):
+        """
+        Durée estimée d'une génération typique de l'agent.
+
+        Args:
+            workload (dict): Charge représentative
+            prompt_tokens (list): Tokens de chaque prompt mesuré
+
+        Returns:
+            float: Secondes (moyenne sur les prompts)
+        """
+        if not self.prefill_tps or not self.decode_tps:
+            return float('inf')
+        decode = workload['eval_tokens'] / self.decode_tps
+        return statistics.mean(tokens / self.prefill_tps + decode for tokens in prompt_tokens)
+
+    def to_dict(self):
+        return {
+            'model': self.model,
+            'options': self.options,
+            'prefill_tps': round(self.prefill_tps, 2),
+            'decode_tps': round(self.decode_tps, 2),
+            'memory_mb': round(self.memory_bytes / 2**20, 1) if self.memory_bytes else None,
+            'load_s': round(self.load_seconds, 3)
+        }
+
+
+def _loaded_size(model, timeout):
+    """Mémoire occupée par le modèle chargé, d'après /api/ps"""
+    try:
+        response = requests.get(f"{OLLAMA_API_URL}/ps", timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+    for loaded in response.json().get('models', []):
+        if loaded.get('name') in (model, f"{model}:latest") or loaded.get('model') == model:
+            return loaded.get('size')
+    return None
+
+
+def measure(model, system, prompts, options, repeats=TUNING_REPEATS,
+            decode_tokens=TUNING_DECODE_TOKENS, timeout=600):
+    """
+    Mesure un jeu de paramètres: une génération de chauffe (chargement du
+    modèle avec ces options) puis `repeats` générations par prompt.
+
+    Args:
+        model (str): Modèle de base
+        system (str): Prompt système de l'agent
+        prompts (list): Prompts représentatifs
+        options (dict): Options d'exécution (num_ctx, num_thread, num_batch)
+        repeats (int): Générations mesurées par prompt
+        decode_tokens (int): Tokens générés par mesure
+        timeout (float): Délai maximal d'une génération (secondes)
+
+    Returns:
+        tuple: (Measurement, tokens de chaque prompt)
+
+    Raises:
+        RuntimeError: Si Ollama retourne une erreur
+    """
+    request_options = dict(options, num_predict=decode_tokens, temperature=0)
+
+    def generate(prompt):
+        response = requests.post(
+            f"{OLLAMA_API_URL}/generate",
+            json={'model': model, 'prompt': prompt, 'system': system,
+                  'options': request_options, 'stream': False},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Erreur Ollama ({response.status_code}): {response.text}")
+        return response.json()
+
+    warmup = generate(prompts[0])
+    load_seconds = (warmup.get('load_duration') or 0) / 1e9
+
+    prefill_rates, decode_rates = [], []
+    prompt_tokens = []
+    for prompt in prompts:
+        tokens = None
+        for _ in range(max(1, repeats)):
+            data = generate(prompt)
+            tokens = data.get('prompt_eval_count') or tokens
+            if data.get('prompt_eval_count') and data.get('prompt_eval_duration'):
+                prefill_rates.append(data['prompt_eval_count'] / data['prompt_eval_duration'] * 1e9)
+            if data.get('eval_count') and data.get('eval_duration'):
+                decode_rates.append(data['eval_count'] / data['eval_duration'] * 1e9)
+        prompt_tokens.append(tokens or 0)
+
+    measurement = Measurement(
+        model, options,
+        statistics.median(prefill_rates) if prefill_rates else 0.0,
+        statistics.median(decode_rates) if decode_rates else 0.0,
+        _loaded_size(model, timeout),
+        load_seconds
+    )
+    return measurement, prompt_tokens
+
+
+def tune_agent(profile, workload, cpu=None, models=None, batch_sizes=TUNING_BATCH_SIZES,
+               repeats=TUNING_REPEATS, decode_tokens=TUNING_DECODE_TOKENS, max_memory_mb=None,
+               on_trial=None):
+    """
+    Cherche les meilleurs paramètres d'exécution d'un agent.
+
+    Args:
+        profile (AgentProfile): Profil de l'agent
+        workload (dict): Charge représentative (representative_workload)
+        cpu (dict, optional): Cœurs disponibles (detect_cpu par défaut)
+        models (list, optional): Modèles de base à comparer (FROM de l'agent par défaut)
+        batch_sizes (list): Valeurs de num_batch à essayer
+        repeats (int): Générations mesurées par prompt
+        decode_tokens (int): Tokens générés par mesure
+        max_memory_mb (float, optional): Mémoire maximale du modèle chargé
+        on_trial (callable, optional): Appelée avec chaque essai (dict)
+
+    Returns:
+        dict: model, parameters, estimated_s, baseline_estimated_s et trials
+    """
+    cpu = cpu or detect_cpu()
+    models = models or [profile.base_model]
+    candidates = {
+        'num_thread': thread_candidates(cpu),
+        'num_batch': sorted(set(batch_sizes)),
+        'num_ctx': context_candidates(workload, profile.parameters.get('num_ctx'))
+    }
+    measured = {}
+    trials = []
+
+    def evaluate(model, options):
+        key = (model, tuple(sorted(options.items())))
+        if key not in measured:
+            measurement, prompt_tokens = measure(
+                model, profile.system, workload['prompts'], options, repeats, decode_tokens
+            )
+            estimated = measurement.estimated_seconds(workload, prompt_tokens)
+            fits = not (max_memory_mb and measurement.memory_bytes
+                        and measurement.memory_bytes > max_memory_mb * 2**20)
+            trial = dict(measurement.to_dict(), estimated_s=round(estimated, 3), fits=fits)
+            trials.append(trial)
+            if on_trial:
+                on_trial(trial)
+            measured[key] = (estimated if fits else float('inf'), measurement.memory_bytes or 0)
+        return measured[key]
+
+    # Référence: valeurs par défaut d'Ollama, avec le plus petit contexte qui contient les prompts
+    baseline_options = {'num_ctx': candidates['num_ctx'][0]}
+    baseline = evaluate(profile.base_model, baseline_options)
+
+    best = None
+    for model in models:
+        current = {
+            'num_ctx': candidates['num_ctx'][-1],
+            'num_thread': cpu['physical'],
+            'num_batch': DEFAULT_BATCH
+        }
+        for parameter in ('num_thread', 'num_batch', 'num_ctx'):
+            scored = []
+            for value in candidates[parameter]:
+                options = dict(current, **{parameter: value})
+                # À durée égale, la plus petite empreinte mémoire l'emporte
+                estimated, memory = evaluate(model, options)
+                scored.append((round(estimated, 2), memory, value))
+            current[parameter] = min(scored)[2]
+        estimated, memory = evaluate(model, current)
+        if best is None or (round(estimated, 2), memory) < best[:2]:
+            best = (round(estimated, 2), memory, model, dict(current))
+
+    estimated, _, model, parameters = best
+    if baseline[0] <= estimated:
+        # Aucun jeu candidat ne fait mieux que les valeurs par défaut d'Ollama
+        estimated, model, parameters = baseline[0], profile.base_model, baseline_options
+    return {
+        'agent': profile.name,
+        'model': model,
+        'parameters': parameters,
+        'estimated_s': round(estimated, 3),
+        'baseline_estimated_s': round(baseline[0], 3),
+        'cpu': cpu,
+        'workload': {key: value for key, value in workload.items() if key != 'prompts'},
+        'trials': trials
+    }
+
+
+def render_tuned_modelfile(content, model, parameters, comment=None):
+    """
+    Réécrit un modelfile avec le modèle de base et les paramètres réglés.
+
+    Les lignes PARAMETER des paramètres réglés sont remplacées; les autres
+    instructions (SYSTEM, temperature, num_predict...) sont conservées.
+
+    Args:
+        content (str): Modelfile d'origine
+        model (str): Modèle de base (FROM)
+        parameters (dict): Paramètres réglés
+        comment (str, optional): Commentaire d'en-tête
+
+    Returns:
+        str: Modelfile généré
+    """
+    lines = []
+    insert_at = None
+    in_block = False
+    for line in content.splitlines():
+        stripped = line.strip()
+        if in_block:
+            lines.append(line)
+            in_block = not stripped.endswith('"""')
+            continue
+        instruction, _, rest = stripped.partition(' ')
+        instruction = instruction.upper()
+        if instruction == 'FROM':
+            lines.append(f"FROM {model}")
+            insert_at = len(lines)
+        elif instruction == 'PARAMETER':
+            if rest.split(' ', 1)[0] in parameters:
+                continue
+            lines.append(line)
+            insert_at = len(lines)
+        else:
+            lines.append(line)
+            if instruction == 'SYSTEM' and rest.startswith('"""') and \
+                    not (len(rest) > 3 and rest.endswith('"""')):
+                in_block = True
+
+    if insert_at is None:
+        lines.insert(0, f"FROM {model}")
+        insert_at = 1
+    lines[insert_at:insert_at] = [f"PARAMETER {key} {value}" for key, value in parameters.items()]
+
+    header = [f"# {part}" for part in (comment or '').splitlines()]
+    return '\n'.join(header + lines) + '\n'
+
+
+def write_tuned_modelfile(profile, result, directory=TUNED_MODELFILES_DIR):
+    """
+    Écrit le modelfile réglé d'un agent et le rapport des mesures.
+
+    Args:
+        profile (AgentProfile): Profil de l'agent (modelfile d'origine)
+        result (dict): Résultat de tune_agent
+        directory (str): Dossier des modelfiles réglés
+
+    Returns:
+        str: Chemin du modelfile écrit
+    """
+    os.makedirs(directory, exist_ok=True)
+    source = profile.modelfile
+    if profile.tuned:
+        # Repartir du modelfile du dépôt, pas d'un réglage précédent
+        source_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelfiles',
+                                   f"{profile.name}.modelfile")
+        with open(source_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+
+    comment = (
+        f"Généré par manage.py autotune le {datetime.now().isoformat(timespec='seconds')} "
+        f"({result['cpu']['physical']} cœurs, {result['cpu']['logical']} threads).\n"
+        "Ne pas modifier: relancer l'auto-réglage ou supprimer ce fichier."
+    )
+    content = render_tuned_modelfile(source, result['model'], result['parameters'], comment)
+
+    path = os.path.join(directory, f"{profile.name}.modelfile")
+    for target, data in ((f"{path}.tuning.json", json.dumps(result, indent=2, ensure_ascii=False)),
+                         (path, content)):
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+    logger.info("Modelfile réglé de l'agent %s écrit: %s", profile.name, path)
+    return path
+
+
+def _applied_marker(profile):
+    return f"{profile.path}.applied"
+
+
+def modelfile_digest(profile):
+    return hashlib.sha256(profile.modelfile.encode('utf-8')).hexdigest()
+
+
+def tuned_modelfile_pending(profile):
+    """
+    Args:
+        profile (AgentProfile): Profil de l'agent
+
+    Returns:
+        bool: True si le modelfile réglé n'a pas encore été appliqué dans Ollama
+    """
+    if profile is None or not profile.tuned:
+        return False
+    try:
+        with open(_applied_marker(profile), 'r', encoding='utf-8') as f:
+            return f.read().strip() != modelfile_digest(profile)
+    except OSError:
+        return True
+
+
+def mark_applied(profile):
+    """Enregistre que le modelfile réglé a été appliqué dans Ollama"""
+    if profile is not None and profile.tuned:
+        with open(_applied_marker(profile), 'w', encoding='utf-8') as f:
+            f.write(modelfile_digest(profile))
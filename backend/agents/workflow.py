@@ -4,28 +4,68 @@ Gestionnaire de workflow pour les projets de l'application IA-WebAgency.
 
 Ce module gère le flux de travail séquentiel des projets, coordonnant
 les différentes étapes et les interactions entre les agents.
+
+Un workflow en cours d'exécution verrouille (flock) un fichier de présence
+dans le dossier workflow/ du projet: un autre processus ne peut pas le
+relancer, et le verrou d'un processus mort est libéré par le système.
+
+Chaque étape terminée conserve les empreintes des entrées qu'elle a
+consommées (brief et extraits des livrables précédents). Une étape dont
+une entrée a changé depuis est périmée; la reconstruction (rebuild) ne
+régénère que les étapes périmées, dans l'ordre du workflow.
 """
 
 import os
 import json
 import time
+import fcntl
 from enum import Enum
 import threading
 import logging
 from datetime import datetime
+from flask import current_app
 
 # Import des configurations
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from config import WORKFLOW_STEPS
+from config import WORKFLOW_STEPS, DEFAULT_STEP_TIER, CHECKPOINT_BUSY_RETRY
 from database.db import get_db, query_db, update_db
-from utils.file_manager import save_deliverable, get_brief
+from utils.file_manager import save_deliverable, get_brief, get_deliverable
+from utils.metrics import WORKFLOWS_ACTIVE, WORKFLOW_STEP_DURATION
+from utils.tracing import start_trace, span
+from utils.cache import invalidate_bootstrap_cache
+from utils.cancellation import CancellationToken
+from utils.logs import log_context
 
-# Configuration du logger
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logger (handlers configurés une seule fois par utils.logs.configure_logging)
 logger = logging.getLogger('workflow')
 
+# Workflows en cours d'exécution dans ce processus, par nom de projet
+_running_workflows = {}
+_running_lock = threading.Lock()
+# Verrous par projet, sérialisant les mises à jour de l'état sauvegardé hors du workflow
+_project_locks = {}
+# Étapes en cours d'affinage en passe complète dans ce processus, par (projet, étape)
+_refining_steps = set()
+
+
+def _reset_process_state():
+    global _running_lock
+    # Les threads de workflow ne survivent pas au fork
+    _running_workflows.clear()
+    _project_locks.clear()
+    _refining_steps.clear()
+    _running_lock = threading.Lock()
+
+
+def _project_lock(project_name):
+    with _running_lock:
+        return _project_locks.setdefault(project_name, threading.Lock())
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_process_state)
+
 
 class WorkflowStatus(Enum):
     """États possibles pour un workflow"""
@@ -50,6 +90,12 @@ class WorkflowStep:
         self.agent = step_config['agent']
         self.title = step_config['title']
         self.description = step_config['description']
+        # Palier configuré pour la première génération, et palier du livrable actuel
+        self.configured_tier = step_config.get('tier', DEFAULT_STEP_TIER)
+        self.tier = None
+        # Empreintes des entrées du livrable actuel, et entrées modifiées depuis
+        self.inputs = None
+        self.stale = False
         self.status = WorkflowStatus.PENDING
         self.started_at = None
         self.completed_at = None
@@ -68,6 +114,10 @@ class WorkflowStep:
             'title': self.title,
             'description': self.description,
             'status': self.status.value,
+            'tier': self.tier,
+            'configured_tier': self.configured_tier,
+            'inputs': self.inputs,
+            'stale': self.stale,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'result': self.result
@@ -77,13 +127,15 @@ class WorkflowStep:
 class ProjectWorkflow:
     """Gestionnaire de workflow pour un projet"""
     
-    def __init__(self, agent_manager, project_name):
+    def __init__(self, agent_manager, project_name, save_state=True):
         """
         Initialise un workflow de projet.
         
         Args:
             agent_manager (AgentManager): Gestionnaire d'agents
             project_name (str): Nom du projet
+            save_state (bool): Écrire l'état initial (False lors d'un chargement,
+                pour ne pas écraser l'état sauvegardé)
         """
         self.agent_manager = agent_manager
         self.project_name = project_name
@@ -92,9 +144,15 @@ class ProjectWorkflow:
         self.current_step_index = 0
         self.lock = threading.Lock()
         self.thread = None
+        self.trace_id = None
+        # Jeton d'annulation de l'exécution en cours, déclenché par pause()
+        self.cancel_token = None
+        # Fichier de présence verrouillé pendant l'exécution
+        self._run_lock = None
         
         # Sauvegarde de l'état initial du workflow
-        self._save_state()
+        if save_state:
+            self._save_state()
         
     def start(self):
         """
@@ -103,12 +161,24 @@ class ProjectWorkflow:
         Returns:
             bool: True si le workflow a démarré, False sinon
         """
+        # Après une pause, l'exécution précédente se termine dès l'annulation de sa génération
+        previous = self.thread
+        if previous is not None and previous is not threading.current_thread():
+            previous.join(timeout=10)
+        
         with self.lock:
             if self.status != WorkflowStatus.PENDING and self.status != WorkflowStatus.PAUSED:
-                logger.warning(f"Workflow du projet {self.project_name} déjà démarré ou terminé")
+                logger.warning("Workflow du projet %s déjà démarré ou terminé", self.project_name)
+                return False
+            if self.thread is not None and self.thread.is_alive():
+                logger.warning("Workflow du projet %s encore en cours d'arrêt", self.project_name)
+                return False
+            if not self._acquire_run_lock():
+                logger.warning("Workflow du projet %s en cours dans un autre processus", self.project_name)
                 return False
             
             self.status = WorkflowStatus.PROCESSING
+            self.cancel_token = CancellationToken()
             
             # Mise à jour du statut du projet
             db = get_db()
@@ -117,21 +187,75 @@ class ProjectWorkflow:
                 ("in_progress", self.project_name)
             )
             db.commit()
+            invalidate_bootstrap_cache()
             
-            # Démarrage du thread de workflow
-            self.thread = threading.Thread(target=self._run_workflow)
+            # Démarrage du thread de workflow, dans le contexte de l'application
+            # pour que les accès à la base de données restent possibles
+            app = current_app._get_current_object()
+            self.thread = threading.Thread(target=self._run_in_app_context,
+                                           args=(app, self._run_workflow, 'workflow.run'))
             self.thread.daemon = True
+            with _running_lock:
+                _running_workflows[self.project_name] = self
             self.thread.start()
             
-            logger.info(f"Workflow du projet {self.project_name} démarré")
+            logger.info("Workflow du projet %s démarré", self.project_name)
             return True
     
+    def _run_in_app_context(self, app, run, trace_name):
+        """Exécute le workflow (ou sa reconstruction) dans le contexte de l'application Flask"""
+        WORKFLOWS_ACTIVE.inc()
+        try:
+            with app.app_context():
+                project = query_db("SELECT id FROM projects WHERE name = ?", (self.project_name,), one=True)
+                project_id = project['id'] if project else None
+                
+                with start_trace(trace_name, project_id=project_id,
+                                 project=self.project_name, start_step=self.current_step_index) as trace:
+                    self.trace_id = trace.trace_id
+                    run()
+        finally:
+            with _running_lock:
+                if _running_workflows.get(self.project_name) is self:
+                    del _running_workflows[self.project_name]
+            with self.lock:
+                self._release_run_lock()
+            WORKFLOWS_ACTIVE.dec()
+    
+    def _acquire_run_lock(self):
+        """
+        Verrouille le fichier de présence du workflow (à appeler sous self.lock).
+        
+        Returns:
+            bool: True si le verrou est détenu par cette instance, False si le
+                workflow s'exécute dans un autre processus
+        """
+        if self._run_lock is not None:
+            return True
+        
+        lock_path = workflow_lock_path(self.project_name)
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        lock_file = open(lock_path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._run_lock = lock_file
+        return True
+    
+    def _release_run_lock(self):
+        """Libère le fichier de présence du workflow (à appeler sous self.lock)"""
+        if self._run_lock is not None:
+            self._run_lock.close()
+            self._run_lock = None
+    
     def _run_workflow(self):
         """Exécute le workflow étape par étape"""
         try:
             # Vérifier si on reprend un workflow existant
             if self.current_step_index > 0:
-                logger.info(f"Reprise du workflow du projet {self.project_name} à l'étape {self.current_step_index}")
+                logger.info("Reprise du workflow du projet %s à l'étape %s", self.project_name, self.current_step_index)
             
             # Exécution des étapes
             while self.current_step_index < len(self.steps):
@@ -145,26 +269,49 @@ class ProjectWorkflow:
                     current_step.status = WorkflowStatus.PROCESSING
                     current_step.started_at = datetime.now()
                 
-                logger.info(f"Exécution de l'étape {current_step.id} pour le projet {self.project_name}")
+                logger.info("Exécution de l'étape %s pour le projet %s", current_step.id, self.project_name)
                 
                 # Traitement de l'étape par l'agent approprié
-                result = self.agent_manager.process_project_step(
-                    self.project_name,
-                    current_step.id,
-                    current_step.agent
-                )
+                with WORKFLOW_STEP_DURATION.labels(current_step.id).time(), \
+                        span('workflow.step', step_id=current_step.id, agent=current_step.agent), \
+                        log_context(step_id=current_step.id, agent=current_step.agent):
+                    result = self.agent_manager.process_project_step(
+                        self.project_name,
+                        current_step.id,
+                        current_step.agent,
+                        cancel_token=self.cancel_token
+                    )
+                
+                if result.get('busy'):
+                    # Étape en cours de génération dans un autre processus (affinage, révision):
+                    # elle est retentée plus tard, sans être marquée en échec
+                    with self.lock:
+                        current_step.status = WorkflowStatus.PENDING
+                        current_step.started_at = None
+                    self.cancel_token.wait(CHECKPOINT_BUSY_RETRY)
+                    continue
                 
                 with self.lock:
+                    if result.get('cancelled'):
+                        # Génération interrompue par une pause: l'étape reprendra depuis son point de reprise
+                        current_step.status = WorkflowStatus.PENDING
+                        current_step.started_at = None
+                        self._save_state()
+                        continue
+                    
                     # Mise à jour de l'état de l'étape
                     current_step.completed_at = datetime.now()
                     current_step.result = result
+                    current_step.tier = result.get('tier')
+                    current_step.inputs = result.get('inputs')
+                    current_step.stale = False
                     
                     if result.get('success', False):
                         current_step.status = WorkflowStatus.COMPLETED
-                        logger.info(f"Étape {current_step.id} du projet {self.project_name} terminée avec succès")
+                        logger.info("Étape %s du projet %s terminée avec succès", current_step.id, self.project_name)
                     else:
                         current_step.status = WorkflowStatus.FAILED
-                        logger.error(f"Étape {current_step.id} du projet {self.project_name} échouée: {result.get('message')}")
+                        logger.error("Étape %s du projet %s échouée: %s", current_step.id, self.project_name, result.get('message'))
                         # On continue quand même les étapes suivantes
                     
                     # Passage à l'étape suivante
@@ -172,7 +319,8 @@ class ProjectWorkflow:
                     self._save_state()
                 
                 # Pause entre les étapes pour éviter de surcharger les ressources
-                time.sleep(1)
+                with span('workflow.sleep'):
+                    time.sleep(1)
             
             # Toutes les étapes sont terminées
             with self.lock:
@@ -185,8 +333,9 @@ class ProjectWorkflow:
                     ("completed", self.project_name)
                 )
                 db.commit()
+                invalidate_bootstrap_cache()
                 
-                logger.info(f"Workflow du projet {self.project_name} terminé avec succès")
+                logger.info("Workflow du projet %s terminé avec succès", self.project_name)
                 self._save_state()
         
         except Exception as e:
@@ -201,23 +350,30 @@ class ProjectWorkflow:
                     ("failed", self.project_name)
                 )
                 db.commit()
+                invalidate_bootstrap_cache()
                 
-                logger.error(f"Erreur dans le workflow du projet {self.project_name}: {e}")
+                logger.error("Erreur dans le workflow du projet %s: %s", self.project_name, e)
                 self._save_state()
     
     def pause(self):
         """
         Met le workflow en pause.
         
+        La génération de l'étape en cours est annulée immédiatement; à la
+        reprise, l'étape repart de la réponse partielle enregistrée dans son
+        point de reprise (utils.checkpoint) au lieu de tout régénérer.
+        
         Returns:
             bool: True si le workflow a été mis en pause, False sinon
         """
         with self.lock:
             if self.status != WorkflowStatus.PROCESSING:
-                logger.warning(f"Impossible de mettre en pause le workflow du projet {self.project_name} (statut: {self.status.value})")
+                logger.warning("Impossible de mettre en pause le workflow du projet %s (statut: %s)", self.project_name, self.status.value)
                 return False
             
             self.status = WorkflowStatus.PAUSED
+            if self.cancel_token is not None:
+                self.cancel_token.cancel('paused')
             
             # Mise à jour du statut du projet
             db = get_db()
@@ -226,34 +382,241 @@ class ProjectWorkflow:
                 ("paused", self.project_name)
             )
             db.commit()
+            invalidate_bootstrap_cache()
             
-            logger.info(f"Workflow du projet {self.project_name} mis en pause")
+            logger.info("Workflow du projet %s mis en pause", self.project_name)
             self._save_state()
             return True
     
     def resume(self):
         """
-        Reprend un workflow mis en pause.
+        Reprend un workflow mis en pause, ou interrompu par l'arrêt du processus
+        qui l'exécutait (état sauvegardé 'processing' sans verrou de présence).
+        L'étape interrompue repart de son point de reprise.
         
         Returns:
-            bool: True si le workflow a repris, False sinon
+            bool: True si le workflow a repris, False sinon (notamment s'il
+                s'exécute dans un autre processus)
         """
+        with self.lock:
+            if self.status == WorkflowStatus.PROCESSING and self.thread is None:
+                if not self._acquire_run_lock():
+                    logger.warning("Workflow du projet %s en cours dans un autre processus", self.project_name)
+                    return False
+                logger.info("Reprise du workflow interrompu du projet %s", self.project_name)
+                self.status = WorkflowStatus.PAUSED
+                for step in self.steps:
+                    if step.status == WorkflowStatus.PROCESSING:
+                        step.status = WorkflowStatus.PENDING
+                        step.started_at = None
         return self.start()
     
+    def refresh_stale(self):
+        """
+        Compare les entrées de chaque étape terminée à celles de son livrable.
+        
+        Une étape terminée est périmée si le brief ou l'extrait d'un livrable
+        précédent repris dans son prompt a changé, ou si ses entrées n'ont pas
+        été enregistrées (livrable antérieur à leur suivi).
+        
+        Returns:
+            list: IDs des étapes périmées
+        """
+        with self.lock:
+            completed = [step for step in self.steps if step.status == WorkflowStatus.COMPLETED]
+        
+        current = {step.id: self.agent_manager.step_input_hashes(self.project_name, step.id) for step in completed}
+        
+        with self.lock:
+            for step in self.steps:
+                step.stale = step.id in current and step.inputs != current[step.id]
+            return [step.id for step in self.steps if step.stale]
+    
+    def rebuild(self):
+        """
+        Lance en arrière-plan la régénération des étapes périmées.
+        
+        Les étapes sont parcourues dans l'ordre: une étape régénérée modifie
+        les entrées des suivantes, qui sont alors régénérées à leur tour; une
+        étape dont les entrées sont inchangées est conservée telle quelle.
+        
+        Returns:
+            list: IDs des étapes périmées au lancement (vide si tout est à jour),
+                ou None si le workflow est en cours d'exécution
+        """
+        previous = self.thread
+        if previous is not None and previous is not threading.current_thread():
+            previous.join(timeout=10)
+        
+        with self.lock:
+            if self.status == WorkflowStatus.PROCESSING or (self.thread is not None and self.thread.is_alive()):
+                logger.warning("Workflow du projet %s en cours: reconstruction impossible", self.project_name)
+                return None
+            if not self._acquire_run_lock():
+                logger.warning("Workflow du projet %s en cours dans un autre processus", self.project_name)
+                return None
+        
+        stale = self.refresh_stale()
+        
+        with self.lock:
+            if not stale:
+                self._release_run_lock()
+                self._save_state()
+                return []
+            
+            previous_status = self.status
+            self.status = WorkflowStatus.PROCESSING
+            self.cancel_token = CancellationToken()
+            
+            db = get_db()
+            project = db.execute("SELECT status FROM projects WHERE name = ?", (self.project_name,)).fetchone()
+            previous_project_status = project['status'] if project else None
+            db.execute(
+                "UPDATE projects SET status = ? WHERE name = ?",
+                ("in_progress", self.project_name)
+            )
+            db.commit()
+            invalidate_bootstrap_cache()
+            self._save_state()
+            
+            app = current_app._get_current_object()
+            self.thread = threading.Thread(
+                target=self._run_in_app_context,
+                args=(app, lambda: self._run_rebuild(previous_status, previous_project_status), 'workflow.rebuild')
+            )
+            self.thread.daemon = True
+            with _running_lock:
+                _running_workflows[self.project_name] = self
+            self.thread.start()
+            
+            logger.info("Reconstruction du workflow du projet %s: étapes périmées %s",
+                        self.project_name, ', '.join(stale))
+            return stale
+    
+    def _run_rebuild(self, previous_status, previous_project_status):
+        """
+        Régénère les étapes terminées dont les entrées ont changé.
+        
+        Args:
+            previous_status (WorkflowStatus): Statut du workflow à rétablir à la fin
+            previous_project_status (str): Statut du projet à rétablir à la fin
+        """
+        rebuilt = []
+        skipped = []
+        try:
+            for step in self.steps:
+                with self.lock:
+                    if self.status == WorkflowStatus.PAUSED:
+                        self._save_state()
+                        return
+                    if step.status != WorkflowStatus.COMPLETED:
+                        continue
+                
+                # Entrées relues à chaque étape: elles tiennent compte des étapes déjà régénérées
+                inputs = self.agent_manager.step_input_hashes(self.project_name, step.id)
+                if inputs == step.inputs:
+                    with self.lock:
+                        step.stale = False
+                    skipped.append(step.id)
+                    continue
+                
+                with self.lock:
+                    step.status = WorkflowStatus.PROCESSING
+                    step.started_at = datetime.now()
+                
+                with WORKFLOW_STEP_DURATION.labels(step.id).time(), \
+                        span('workflow.step', step_id=step.id, agent=step.agent, rebuild=True), \
+                        log_context(step_id=step.id, agent=step.agent):
+                    result = self.agent_manager.process_project_step(
+                        self.project_name,
+                        step.id,
+                        step.agent,
+                        tier=step.tier,
+                        cancel_token=self.cancel_token
+                    )
+                
+                with self.lock:
+                    if result.get('cancelled'):
+                        # Reconstruction interrompue par une pause: le livrable précédent est conservé
+                        step.status = WorkflowStatus.COMPLETED
+                        step.stale = True
+                        self._save_state()
+                        return
+                    if result.get('busy'):
+                        # Étape en cours de génération dans un autre processus: le livrable
+                        # précédent est conservé et l'étape reste périmée
+                        step.status = WorkflowStatus.COMPLETED
+                        step.stale = True
+                        skipped.append(step.id)
+                        self._save_state()
+                        continue
+                    
+                    step.completed_at = datetime.now()
+                    step.result = result
+                    if result.get('success', False):
+                        step.status = WorkflowStatus.COMPLETED
+                        step.tier = result.get('tier')
+                        step.inputs = result.get('inputs')
+                        step.stale = False
+                        rebuilt.append(step.id)
+                    else:
+                        step.status = WorkflowStatus.FAILED
+                        logger.error("Reconstruction de l'étape %s du projet %s échouée: %s",
+                                     step.id, self.project_name, result.get('message'))
+                    self._save_state()
+            
+            with self.lock:
+                self.status = previous_status
+                if previous_project_status is not None:
+                    db = get_db()
+                    db.execute(
+                        "UPDATE projects SET status = ? WHERE name = ?",
+                        (previous_project_status, self.project_name)
+                    )
+                    db.commit()
+                    invalidate_bootstrap_cache()
+                self._save_state()
+            
+            logger.info("Reconstruction du workflow du projet %s terminée: %s étapes régénérées, %s inchangées",
+                        self.project_name, len(rebuilt), len(skipped))
+        
+        except Exception as e:
+            with self.lock:
+                self.status = WorkflowStatus.FAILED
+                
+                db = get_db()
+                db.execute(
+                    "UPDATE projects SET status = ? WHERE name = ?",
+                    ("failed", self.project_name)
+                )
+                db.commit()
+                invalidate_bootstrap_cache()
+                
+                logger.error("Erreur lors de la reconstruction du workflow du projet %s: %s", self.project_name, e)
+                self._save_state()
+    
     def get_status(self):
         """
         Récupère l'état actuel du workflow.
         
         Returns:
-            dict: État du workflow
+            dict: État du workflow (avec les étapes périmées)
         """
+        with self.lock:
+            running = self.status == WorkflowStatus.PROCESSING
+        if not running:
+            self.refresh_stale()
+        
         with self.lock:
             return {
                 'project_name': self.project_name,
                 'status': self.status.value,
                 'current_step': self.current_step_index,
                 'total_steps': len(self.steps),
-                'steps': [step.to_dict() for step in self.steps]
+                'steps': [step.to_dict() for step in self.steps],
+                'stale_steps': [step.id for step in self.steps if step.stale],
+                'refining_steps': [step.id for step in self.steps
+                                   if (self.project_name, step.id) in _refining_steps]
             }
     
     def _save_state(self):
@@ -267,11 +630,10 @@ class ProjectWorkflow:
         }
         
         # Créer le dossier de workflow s'il n'existe pas
-        workflow_dir = os.path.join('data', 'projects', self.project_name, 'workflow')
-        os.makedirs(workflow_dir, exist_ok=True)
+        state_path = workflow_state_path(self.project_name)
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
         
         # Sauvegarder l'état
-        state_path = os.path.join(workflow_dir, 'workflow_state.json')
         with open(state_path, 'w', encoding='utf-8') as f:
             json.dump(workflow_state, f, ensure_ascii=False, indent=2)
     
@@ -287,10 +649,10 @@ class ProjectWorkflow:
         Returns:
             ProjectWorkflow: Instance du workflow ou None si non trouvé
         """
-        state_path = os.path.join('data', 'projects', project_name, 'workflow', 'workflow_state.json')
+        state_path = workflow_state_path(project_name)
         
         if not os.path.exists(state_path):
-            logger.warning(f"Aucun état de workflow trouvé pour le projet {project_name}")
+            logger.warning("Aucun état de workflow trouvé pour le projet %s", project_name)
             return None
         
         try:
@@ -298,7 +660,7 @@ class ProjectWorkflow:
                 workflow_state = json.load(f)
             
             # Création d'une nouvelle instance
-            workflow = cls(agent_manager, project_name)
+            workflow = cls(agent_manager, project_name, save_state=False)
             
             # Restauration de l'état
             workflow.status = WorkflowStatus(workflow_state['status'])
@@ -312,15 +674,40 @@ class ProjectWorkflow:
                     step.started_at = datetime.fromisoformat(step_data['started_at']) if step_data['started_at'] else None
                     step.completed_at = datetime.fromisoformat(step_data['completed_at']) if step_data['completed_at'] else None
                     step.result = step_data['result']
+                    step.tier = step_data.get('tier')
+                    step.inputs = step_data.get('inputs')
+                    step.stale = step_data.get('stale', False)
             
-            logger.info(f"Workflow du projet {project_name} chargé avec succès (statut: {workflow.status.value})")
+            logger.info("Workflow du projet %s chargé avec succès (statut: %s)", project_name, workflow.status.value)
             return workflow
         
         except Exception as e:
-            logger.error(f"Erreur lors du chargement du workflow du projet {project_name}: {e}")
+            logger.error("Erreur lors du chargement du workflow du projet %s: %s", project_name, e)
             return None
 
 
+def workflow_state_path(project_name):
+    """
+    Args:
+        project_name (str): Nom du projet
+        
+    Returns:
+        str: Chemin du fichier d'état du workflow du projet
+    """
+    return os.path.join('data', 'projects', project_name, 'workflow', 'workflow_state.json')
+
+
+def workflow_lock_path(project_name):
+    """
+    Args:
+        project_name (str): Nom du projet
+        
+    Returns:
+        str: Chemin du fichier de présence, verrouillé pendant l'exécution du workflow
+    """
+    return os.path.join('data', 'projects', project_name, 'workflow', 'workflow.lock')
+
+
 def get_project_workflow(agent_manager, project_name):
     """
     Récupère ou crée un workflow pour un projet.
@@ -332,6 +719,11 @@ def get_project_workflow(agent_manager, project_name):
     Returns:
         ProjectWorkflow: Instance du workflow
     """
+    # Un workflow en cours d'exécution est retourné tel quel, pour pouvoir l'interrompre
+    workflow = get_running_workflow(project_name)
+    if workflow is not None:
+        return workflow
+    
     # Essayer de charger un workflow existant
     workflow = ProjectWorkflow.load(agent_manager, project_name)
     
@@ -339,4 +731,132 @@ def get_project_workflow(agent_manager, project_name):
     if workflow is None:
         workflow = ProjectWorkflow(agent_manager, project_name)
     
-    return workflow
\ No newline at end of file
+    return workflow
+
+def get_running_workflow(project_name):
+    """
+    Args:
+        project_name (str): Nom du projet
+        
+    Returns:
+        ProjectWorkflow: Workflow en cours d'exécution dans ce processus, ou None
+    """
+    with _running_lock:
+        return _running_workflows.get(project_name)
+
+
+def record_step_tier(agent_manager, project_name, step_id, tier, inputs=None):
+    """
+    Enregistre le palier du livrable actuel d'une étape dans l'état du workflow.
+    
+    Le livrable ayant changé, les étapes suivantes qui en reprennent un
+    extrait deviennent périmées. Un workflow en cours d'exécution est modifié
+    directement: il sauvegarde lui-même son état et écraserait sinon la mise à jour.
+    
+    Args:
+        agent_manager (AgentManager): Gestionnaire d'agents
+        project_name (str): Nom du projet
+        step_id (str): ID de l'étape
+        tier (str): Palier du livrable ('draft' ou 'full')
+        inputs (dict, optional): Empreintes des entrées du livrable régénéré
+            en entier (conservées sinon)
+        
+    Returns:
+        bool: True si l'étape a été trouvée
+    """
+    with _project_lock(project_name):
+        workflow = get_running_workflow(project_name) or ProjectWorkflow.load(agent_manager, project_name)
+        if workflow is None:
+            return False
+        
+        step = next((step for step in workflow.steps if step.id == step_id), None)
+        if step is None:
+            return False
+        
+        with workflow.lock:
+            step.tier = tier
+            if inputs is not None:
+                step.inputs = inputs
+        
+        workflow.refresh_stale()
+        with workflow.lock:
+            workflow._save_state()
+        return True
+
+
+def refine_step(agent_manager, project_name, step_id, priority='feedback'):
+    """
+    Régénère le livrable d'une étape en passe complète, à partir de son brouillon.
+    
+    Args:
+        agent_manager (AgentManager): Gestionnaire d'agents
+        project_name (str): Nom du projet
+        step_id (str): ID de l'étape
+        priority (str): Classe de priorité de la génération
+        
+    Returns:
+        dict: Résultat du traitement de l'étape
+    """
+    step_config = next((step for step in WORKFLOW_STEPS if step['id'] == step_id), None)
+    if step_config is None:
+        return {"success": False, "message": f"Étape {step_id} inconnue", "step_id": step_id}
+    
+    draft = get_deliverable(project_name, step_id)
+    with span('workflow.refine', step_id=step_id, agent=step_config['agent']), \
+            log_context(step_id=step_id, agent=step_config['agent']):
+        result = agent_manager.process_project_step(
+            project_name,
+            step_id,
+            step_config['agent'],
+            context={'draft': draft} if draft else None,
+            priority=priority,
+            tier='full'
+        )
+    
+    if result.get('success', False):
+        record_step_tier(agent_manager, project_name, step_id, 'full', inputs=result.get('inputs'))
+        logger.info("Étape %s du projet %s affinée en passe complète", step_id, project_name)
+    return result
+
+
+def confirm_step(agent_manager, project_name, step_id):
+    """
+    Valide une étape: si son livrable n'est qu'un brouillon, lance la passe
+    complète en arrière-plan. Une seule passe complète par étape peut être
+    en cours à la fois.
+    
+    Args:
+        agent_manager (AgentManager): Gestionnaire d'agents
+        project_name (str): Nom du projet
+        step_id (str): ID de l'étape
+        
+    Returns:
+        str: 'refining' si l'affinage a été lancé, 'already_refining' si un
+            affinage de l'étape est déjà en cours, 'already_full' si le livrable
+            est déjà complet, None si l'étape n'a pas encore de livrable
+    """
+    key = (project_name, step_id)
+    with _project_lock(project_name):
+        if key in _refining_steps:
+            return 'already_refining'
+        
+        workflow = get_running_workflow(project_name) or ProjectWorkflow.load(agent_manager, project_name)
+        step = next((step for step in workflow.steps if step.id == step_id), None) if workflow else None
+        if step is None or step.tier is None:
+            return None
+        if step.tier != 'draft':
+            return 'already_full'
+        _refining_steps.add(key)
+    
+    app = current_app._get_current_object()
+    
+    def run():
+        try:
+            with app.app_context(), start_trace('workflow.refine', step_id=step_id, project=project_name):
+                refine_step(agent_manager, project_name, step_id)
+        finally:
+            with _project_lock(project_name):
+                _refining_steps.discard(key)
+    
+    threading.Thread(target=run, name=f"refine-{step_id}", daemon=True).start()
+    return 'refining'
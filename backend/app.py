@@ -1,43 +1,296 @@
 # backend/app.py
-from flask import Flask, jsonify, request
+"""
+Application Flask de l'agence web IA.
+
+L'application est construite par create_app(). Sous gunicorn --preload,
+le travail fait avant le fork (configuration, schéma de la base, lecture
+des modelfiles, vérification des agents dans Ollama) est partagé par tous
+les workers; ce qui appartient au processus (connexions SQLite, créneaux
+d'inférence, threads d'arrière-plan) est créé dans chaque worker, à la
+demande.
+
+Les routes de génération existent aussi en version asynchrone dans
+asgi.py, qui sert le reste de l'application par cette même instance.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+    uvicorn asgi:app
+    python app.py
+"""
+from flask import Flask, Blueprint, jsonify, request, Response, stream_with_context, current_app
 from flask_cors import CORS
 import os
 import json
+import math
 import sys
+import queue
+import threading
+import contextvars
+import zipfile
+import hashlib
+from datetime import datetime
 
 # Ajouter le répertoire courant au chemin de recherche Python
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 # Import des modules de l'application
-from database.db import init_db, get_db
+from utils.logs import configure_logging
+from database.db import init_db, get_db, close_db
 import config
 import sqlite3
 
-# Initialisation de l'application
-app = Flask(__name__)
-# Configuration CORS plus permissive
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+from agents.agent_manager import AgentManager, get_agent_manager
+from agents.registry import get_agent_registry
+from agents.workflow import ProjectWorkflow, get_project_workflow, get_running_workflow, confirm_step
+from agents.revisions import get_revision_scheduler, get_revision_job
+from utils.file_manager import save_brief, get_deliverable, save_feedback, get_brief
+from utils.metrics import REGISTRY as metrics_registry
+from utils.tracing import start_trace, get_project_traces, flame_summary
+from database.analytics import generation_analytics, tier_savings
+from database.summary import get_knowledge_categories as knowledge_category_stats, get_summary_stats
+from database.retention import get_retention_scheduler, list_archives, iter_archive
+from database.knowledge_io import iter_knowledge_ndjson, gzip_stream, iter_import_knowledge, iter_ndjson_lines
+from utils.archive import stream_project_archive, read_archive_manifest
+from utils.cache import BOOTSTRAP_CACHE, invalidate_bootstrap_cache
+from utils.admission import ClientRateLimiter, AdmissionError, QueueFullError, DeadlineExceededError
+from utils.cancellation import CancellationToken, GenerationCancelled, ACTIVE_REQUESTS
+from utils.sections import parse_sections
 
-# S'assurer que les dossiers nécessaires existent
-os.makedirs('data/db', exist_ok=True)
-os.makedirs('data/projects', exist_ok=True)
-os.makedirs('data/knowledge', exist_ok=True)
+api = Blueprint('api', __name__)
 
-# Initialiser la base de données dans le contexte de l'application
-with app.app_context():
-    init_db()
 
-# Import des modules qui utilisent la base de données (après initialisation)
-from agents.agent_manager import AgentManager, get_agent_manager
-from agents.workflow import ProjectWorkflow, get_project_workflow
-from utils.file_manager import save_brief, get_deliverable, save_feedback, get_brief
+def create_app(test_config=None):
+    """
+    Construit l'application, sans appel réseau.
+    
+    Args:
+        test_config (dict, optional): Configuration Flask à appliquer
+    
+    Returns:
+        Flask: Application
+    """
+    # Journalisation non bloquante, configurée une seule fois pour tout le processus
+    configure_logging()
+    
+    app = Flask(__name__)
+    if test_config:
+        app.config.update(test_config)
+    # Configuration CORS plus permissive
+    CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+    
+    # S'assurer que les dossiers nécessaires existent
+    os.makedirs('data/db', exist_ok=True)
+    os.makedirs('data/projects', exist_ok=True)
+    os.makedirs('data/knowledge', exist_ok=True)
+    
+    # Initialiser la base de données (la connexion est fermée avec le contexte)
+    app.teardown_appcontext(close_db)
+    with app.app_context():
+        init_db()
+    
+    # Modelfiles lus une seule fois: sous --preload, partagés par les workers
+    get_agent_registry()
+    
+    app.before_request(init_worker)
+    app.register_blueprint(api)
+    return app
+
+
+_worker_pid = None
+
+
+def init_worker():
+    """
+    Démarre les tâches de fond du processus courant (une seule fois par worker).
+    
+    Appelée par le hook post_worker_init de gunicorn, et à défaut avant
+    la première requête traitée par le processus.
+    """
+    global _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    _worker_pid = os.getpid()
+    
+    # Écriture périodique des métriques de ce worker pour l'agrégation multi-workers
+    metrics_registry.start_flusher()
+    # Rétention et archivage des données anciennes
+    get_retention_scheduler().start()
+    # Reprise des révisions sur feedback interrompues par l'arrêt d'un processus
+    get_revision_scheduler().start(get_app())
+
+
+_app_instance = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """
+    Retourne l'application du module, créée au premier appel.
+    
+    Returns:
+        Flask: Application
+    """
+    global _app_instance
+    
+    with _app_lock:
+        if _app_instance is None:
+            _app_instance = create_app()
+        
+        return _app_instance
+
+
+def __getattr__(name):
+    # "app" (gunicorn app:app) et "agent_manager" sont créés au premier accès
+    if name == 'app':
+        return get_app()
+    if name == 'agent_manager':
+        return get_agent_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Limitation du débit par client pour les routes qui sollicitent les agents
+client_limiter = ClientRateLimiter()
+
+
+def get_client_id():
+    """Identifie le client: en-tête X-Client-Id, sinon adresse IP"""
+    return request.headers.get('X-Client-Id') or request.remote_addr or 'anonymous'
+
+
+def get_request_timeout(default):
+    """
+    Délai accordé par le client, transmis dans l'en-tête X-Request-Timeout (secondes).
+    
+    Le délai est propagé jusqu'à l'appel à Ollama afin de ne pas lancer une
+    génération dont le client n'attend plus le résultat.
+    """
+    try:
+        timeout = float(request.headers.get('X-Request-Timeout', default))
+    except ValueError:
+        return default
+    return min(timeout, default) if timeout > 0 else default
+
+
+def parse_timeout(value):
+    """
+    Valide un délai transmis dans le corps d'une requête.
+    
+    Args:
+        value: Valeur reçue (nombre de secondes attendu)
+    
+    Returns:
+        float: Délai en secondes, None s'il est absent
+    
+    Raises:
+        ValueError: Si le délai n'est pas un nombre strictement positif
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError("timeout doit être un nombre de secondes strictement positif")
+    return float(value)
+
+
+def validate_batch(data):
+    """
+    Valide le corps d'une requête groupée (/api/agents/batch).
+    
+    Les délais sont convertis en float: la validation a lieu avant l'envoi
+    de la réponse en flux, qui ne peut plus signaler une erreur de requête.
+    
+    Args:
+        data: Corps JSON de la requête
+    
+    Returns:
+        tuple: (éléments, délai global ou None)
+    
+    Raises:
+        ValueError: Si la requête est invalide (message destiné au client)
+    """
+    items = data.get('items') if isinstance(data, dict) else None
+    
+    if not isinstance(items, list) or not items:
+        raise ValueError('Une liste non vide "items" est requise')
+    
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise ValueError(f'Maximum {config.BATCH_MAX_ITEMS} éléments par lot')
+    
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get('prompt'):
+            raise ValueError(f'Élément {index}: prompt requis')
+        if item.get('agent') not in config.AGENTS:
+            raise ValueError(f"Élément {index}: agent {item.get('agent')} non reconnu")
+        options = item.get('options') or {}
+        if not isinstance(options, dict):
+            raise ValueError(f'Élément {index}: options doit être un objet')
+        try:
+            item_timeout = parse_timeout(options.get('timeout'))
+        except ValueError as e:
+            raise ValueError(f'Élément {index}: {e}')
+        if item_timeout is not None:
+            item['options'] = dict(options, timeout=item_timeout)
+    
+    return items, parse_timeout(data.get('timeout'))
+
+
+def admission_error_response(error):
+    """Convertit un refus d'admission en réponse HTTP (429 ou 504)"""
+    if isinstance(error, DeadlineExceededError):
+        return jsonify({'error': str(error)}), 504
+    
+    body = {'error': str(error), 'retry_after': error.retry_after}
+    if isinstance(error, QueueFullError):
+        body['queue_position'] = error.position
+    return jsonify(body), 429, {'Retry-After': str(error.retry_after)}
+
+def load_bootstrap():
+    """
+    Rassemble les données affichées au chargement de l'interface.
+    
+    Returns:
+        tuple: (contenu JSON encodé, ETag)
+    """
+    db = get_db()
+    projects = []
+    for project in db.execute('SELECT * FROM projects ORDER BY created_at DESC').fetchall():
+        deliverables_dir = f"data/projects/{project['name']}/deliverables"
+        deliverable_count = 0
+        if os.path.isdir(deliverables_dir):
+            with os.scandir(deliverables_dir) as entries:
+                deliverable_count = sum(1 for entry in entries if entry.name.endswith('.md'))
+        
+        projects.append({
+            'id': project['id'],
+            'name': project['name'],
+            'description': project['description'],
+            'status': project['status'],
+            'created_at': project['created_at'],
+            'deliverable_count': deliverable_count
+        })
+    
+    payload = json.dumps({
+        'projects': projects,
+        'agents': get_agent_manager().list_agents(),
+        'knowledge': [
+            {'category': item['category'], 'count': item['count']} for item in knowledge_category_stats(db)
+        ]
+    }, ensure_ascii=False, default=str)
+    etag = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    return payload, etag
 
-# Initialiser le gestionnaire d'agents
-with app.app_context():
-    agent_manager = get_agent_manager()
+# Données d'amorçage de l'interface en une seule requête
+@api.route('/api/bootstrap', methods=['GET'])
+def get_bootstrap():
+    payload, etag = BOOTSTRAP_CACHE.get(('bootstrap', get_agent_manager().registry.etag), load_bootstrap)
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+    
+    response = Response(payload, mimetype='application/json')
+    response.set_etag(etag)
+    return response
 
 # Routes pour les projets
-@app.route('/api/projects', methods=['GET'])
+@api.route('/api/projects', methods=['GET'])
 def get_projects():
     db = get_db()
     projects = db.execute('SELECT * FROM projects ORDER BY created_at DESC').fetchall()
@@ -49,7 +302,7 @@ def get_projects():
         'created_at': project['created_at']
     } for project in projects])
 
-@app.route('/api/projects', methods=['POST'])
+@api.route('/api/projects', methods=['POST'])
 def create_project():
     data = request.json
     name = data.get('name')
@@ -93,6 +346,7 @@ def create_project():
     )
     project_id = cursor.lastrowid
     db.commit()
+    invalidate_bootstrap_cache()
     
     return jsonify({
         'id': project_id,
@@ -101,7 +355,7 @@ def create_project():
         'status': 'created'
     }), 201
 
-@app.route('/api/projects/<int:project_id>', methods=['GET'])
+@api.route('/api/projects/<int:project_id>', methods=['GET'])
 def get_project(project_id):
     db = get_db()
     project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
@@ -130,7 +384,7 @@ def get_project(project_id):
         'deliverables': deliverables
     })
 
-@app.route('/api/projects/<int:project_id>/start', methods=['POST'])
+@api.route('/api/projects/<int:project_id>/start', methods=['POST'])
 def start_project_workflow(project_id):
     db = get_db()
     project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
@@ -141,15 +395,100 @@ def start_project_workflow(project_id):
     # Mettre à jour le statut du projet
     db.execute('UPDATE projects SET status = ? WHERE id = ?', ('in_progress', project_id))
     db.commit()
+    invalidate_bootstrap_cache()
     
     # Démarrer le workflow du projet en arrière-plan
     # Note: Dans une vraie application, cela serait fait avec une tâche asynchrone (Celery, etc.)
-    workflow = get_project_workflow(agent_manager, project['name'])
+    workflow = get_project_workflow(get_agent_manager(), project['name'])
     workflow.start()
     
     return jsonify({'status': 'workflow_started'})
 
-@app.route('/api/projects/<int:project_id>/deliverables/<path:deliverable_name>', methods=['GET'])
+@api.route('/api/projects/<int:project_id>/workflow', methods=['GET'])
+def get_workflow_status(project_id):
+    db = get_db()
+    project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    workflow = get_running_workflow(project['name']) or ProjectWorkflow.load(get_agent_manager(), project['name'])
+    if workflow is None:
+        return jsonify({'error': 'Workflow not started'}), 404
+    
+    return jsonify(workflow.get_status())
+
+@api.route('/api/projects/<int:project_id>/pause', methods=['POST'])
+def pause_project_workflow(project_id):
+    db = get_db()
+    project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    # La génération de l'étape en cours est annulée, l'étape sera relancée à la reprise
+    workflow = get_running_workflow(project['name'])
+    if workflow is None or not workflow.pause():
+        return jsonify({'error': 'Workflow not running'}), 409
+    
+    return jsonify({'status': 'workflow_paused'})
+
+@api.route('/api/projects/<int:project_id>/resume', methods=['POST'])
+def resume_project_workflow(project_id):
+    db = get_db()
+    project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    workflow = get_project_workflow(get_agent_manager(), project['name'])
+    if not workflow.resume():
+        return jsonify({'error': 'Workflow not paused'}), 409
+    
+    return jsonify({'status': 'workflow_resumed'})
+
+@api.route('/api/projects/<int:project_id>/rebuild', methods=['POST'])
+def rebuild_project_workflow(project_id):
+    db = get_db()
+    project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+
+    if get_running_workflow(project['name']) is not None:
+        return jsonify({'error': 'Workflow is running'}), 409
+
+    workflow = ProjectWorkflow.load(get_agent_manager(), project['name'])
+    if workflow is None:
+        return jsonify({'error': 'Workflow not started'}), 404
+
+    # Seules les étapes dont le brief ou les livrables précédents ont changé sont régénérées
+    stale = workflow.rebuild()
+    if stale is None:
+        return jsonify({'error': 'Workflow is running'}), 409
+    if not stale:
+        return jsonify({'status': 'up_to_date', 'stale_steps': []})
+
+    return jsonify({'status': 'rebuild_started', 'stale_steps': stale}), 202
+
+@api.route('/api/projects/<int:project_id>/steps/<step_id>/confirm', methods=['POST'])
+def confirm_project_step(project_id, step_id):
+    db = get_db()
+    project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    # Un livrable en brouillon est affiné en passe complète, en arrière-plan
+    status = confirm_step(get_agent_manager(), project['name'], step_id)
+    if status is None:
+        return jsonify({'error': 'Step has no deliverable yet'}), 404
+    if status == 'already_refining':
+        return jsonify({'error': 'Step is already being refined'}), 409
+    
+    return jsonify({'status': status, 'step_id': step_id}), 202 if status == 'refining' else 200
+
+@api.route('/api/projects/<int:project_id>/deliverables/<path:deliverable_name>', methods=['GET'])
 def get_project_deliverable(project_id, deliverable_name):
     db = get_db()
     project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
@@ -161,12 +500,14 @@ def get_project_deliverable(project_id, deliverable_name):
     if not content:
         return jsonify({'error': 'Deliverable not found'}), 404
     
+    # Sections du livrable: leurs identifiants peuvent être cités dans un feedback ("#securite")
     return jsonify({
         'name': deliverable_name,
-        'content': content
+        'content': content,
+        'sections': [section.to_dict() for section in parse_sections(content)]
     })
 
-@app.route('/api/projects/<int:project_id>/feedback', methods=['POST'])
+@api.route('/api/projects/<int:project_id>/feedback', methods=['POST'])
 def add_feedback(project_id):
     data = request.json
     deliverable = data.get('deliverable')
@@ -181,9 +522,6 @@ def add_feedback(project_id):
     if not project:
         return jsonify({'error': 'Project not found'}), 404
     
-    # Sauvegarder le feedback
-    save_feedback(project['name'], deliverable, feedback)
-    
     # Envoyer le feedback à l'agent approprié pour révision
     deliverable_type = deliverable.split('_')[0] if '_' in deliverable else 'other'
     agent_mapping = {
@@ -200,19 +538,192 @@ def add_feedback(project_id):
     }
     
     agent_name = agent_mapping.get(deliverable_type)
-    if agent_name:
-        # Dans une vraie application, cela serait fait avec une tâche asynchrone
-        agent_manager.process_feedback(project['name'], deliverable, feedback, agent_name)
+    if not agent_name:
+        save_feedback(project['name'], deliverable, feedback)
+        return jsonify({'status': 'feedback_received'})
+    
+    # Enregistrer le feedback puis programmer la révision en arrière-plan
+    result = get_agent_manager().process_feedback(project['name'], deliverable, feedback, agent_name)
+    job_id = get_revision_scheduler().submit(current_app._get_current_object(), project_id, result['step_id'], agent_name)
+    
+    return jsonify({
+        'status': 'feedback_received',
+        'feedback_id': result['feedback_id'],
+        'job_id': job_id
+    }), 202
+
+@api.route('/api/projects/<int:project_id>/archive', methods=['GET', 'POST'])
+def download_project_archive(project_id):
+    db = get_db()
+    project = db.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    # Archive incrémentale: manifeste JSON ou archive précédente (champ "since")
+    since_manifest = None
+    if request.method == 'POST':
+        try:
+            if 'since' in request.files:
+                since_manifest = read_archive_manifest(request.files['since'].stream)
+            else:
+                since_manifest = request.get_json(silent=True)
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'Invalid archive'}), 400
+        
+        if not isinstance(since_manifest, dict) or not isinstance(since_manifest.get('files'), dict):
+            return jsonify({'error': 'A previous archive or manifest is required'}), 400
+    
+    include_temp = request.args.get('include_temp', '').lower() in ('1', 'true')
+    kind = 'incremental' if since_manifest else 'archive'
+    filename = f"{project['name']}_{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    
+    return Response(
+        stream_with_context(stream_project_archive(project['name'], since_manifest, include_temp)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api.route('/api/projects/<int:project_id>/revisions/<int:job_id>', methods=['GET'])
+def get_revision(project_id, job_id):
+    job = get_revision_job(project_id, job_id)
+    
+    if not job:
+        return jsonify({'error': 'Revision job not found'}), 404
+    
+    return jsonify(job)
+
+# Sonde de disponibilité (sans accès à la base ni à Ollama)
+@api.route('/api/health', methods=['GET'])
+def get_health():
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+# Métriques au format texte Prometheus
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+# Routes de profilage (traces)
+@api.route('/api/projects/<int:project_id>/traces', methods=['GET'])
+def get_project_trace_tree(project_id):
+    db = get_db()
+    project = db.execute('SELECT id FROM projects WHERE id = ?', (project_id,)).fetchone()
+    
+    if not project:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify(get_project_traces(db, project_id, limit))
+
+@api.route('/api/traces/summary', methods=['GET'])
+def get_trace_summary():
+    project_id = request.args.get('project_id', type=int)
+    limit = request.args.get('limit', 500, type=int)
+    return jsonify(flame_summary(get_db(), project_id, limit))
+
+# Routes d'analyse des générations
+@api.route('/api/analytics/generation', methods=['GET'])
+def get_generation_analytics():
+    try:
+        results = generation_analytics(
+            get_db(),
+            group_by=request.args.get('group_by', 'agent'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            agent=request.args.get('agent'),
+            project_id=request.args.get('project_id', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({'status': 'feedback_received'})
+    return jsonify(results)
+
+@api.route('/api/analytics/tiers', methods=['GET'])
+def get_tier_analytics():
+    return jsonify(tier_savings(get_db(), project_id=request.args.get('project_id', type=int)))
+
+@api.route('/api/stats', methods=['GET'])
+def get_stats():
+    return jsonify(get_summary_stats(get_db()))
+
+@api.route('/api/projects/<int:project_id>/stats', methods=['GET'])
+def get_project_stats(project_id):
+    stats = get_summary_stats(get_db(), project_id=project_id)
+    if not stats['projects']:
+        return jsonify({'error': 'Project not found'}), 404
+    return jsonify(stats['projects'][0])
+
+# Archives froides produites par la tâche de rétention
+@api.route('/api/archives', methods=['GET'])
+def get_archives():
+    return jsonify(list_archives())
+
+@api.route('/api/archives/<table>', methods=['GET'])
+def read_archive(table):
+    filters = {
+        'project_id': request.args.get('project_id'),
+        'agent': request.args.get('agent'),
+        'category': request.args.get('category')
+    }
+    lines = iter_archive(table, month=request.args.get('month'), filters=filters)
+    try:
+        # Valide la table et le mois avant de commencer la réponse
+        first = next(lines, None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        if first is not None:
+            yield first
+            yield from lines
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 # Routes pour les agents
-@app.route('/api/agents', methods=['GET'])
+@api.route('/api/agents', methods=['GET'])
 def get_agents():
-    agents = agent_manager.list_agents()
-    return jsonify(agents)
+    # Servi depuis le registre en mémoire, avec ETag pour les requêtes conditionnelles
+    etag = get_agent_manager().registry.etag
+    if request.if_none_match.contains(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+    
+    response = jsonify(get_agent_manager().list_agents())
+    response.set_etag(etag)
+    return response
+
+@api.route('/api/agents/batch', methods=['POST'])
+def batch_interact_with_agents():
+    data = request.get_json(silent=True) or {}
+    try:
+        items, timeout = validate_batch(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        client_limiter.take(get_client_id(), cost=len(items), priority='batch')
+    except AdmissionError as e:
+        return admission_error_response(e)
+    
+    if 'X-Request-Timeout' in request.headers:
+        timeout = get_request_timeout(timeout or config.BATCH_DEFAULT_TIMEOUT)
+    
+    trace = start_trace('chat.batch', items=len(items))
+    
+    # Chaque résultat est envoyé dès qu'il est disponible (une ligne JSON par résultat)
+    def generate():
+        with trace:
+            results = get_agent_manager().ask_agents_batch(
+                items,
+                timeout=timeout,
+                partial=data.get('partial', True)
+            )
+            for result in results:
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Trace-Id': trace.trace_id})
 
-@app.route('/api/agents/<agent_name>', methods=['GET', 'POST'])
+@api.route('/api/agents/<agent_name>', methods=['GET', 'POST'])
 def interact_with_agent(agent_name):
     # Handle message extraction differently for GET and POST
     if request.method == 'GET':
@@ -224,19 +735,156 @@ def interact_with_agent(agent_name):
     if not message:
         return jsonify({'error': 'Message est requis'}), 400
     
+    # La requête peut être annulée via DELETE /api/requests/<X-Request-Id>
+    token = CancellationToken()
+    request_id = ACTIVE_REQUESTS.register(token, request.headers.get('X-Request-Id'))
     try:
-        response = agent_manager.ask_agent(agent_name, message)
-        return jsonify({'response': response})
+        client_limiter.take(get_client_id())
+        with start_trace('chat', agent=agent_name, message_bytes=len(message.encode('utf-8'))) as trace:
+            response = get_agent_manager().ask_agent(
+                agent_name, message,
+                timeout=get_request_timeout(config.CHAT_DEFAULT_TIMEOUT),
+                cancel_token=token
+            )
+        return jsonify({'response': response}), 200, {'X-Trace-Id': trace.trace_id, 'X-Request-Id': request_id}
+    except GenerationCancelled as e:
+        return jsonify({'error': str(e), 'cancelled': True}), 499, {'X-Request-Id': request_id}
+    except AdmissionError as e:
+        return admission_error_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        ACTIVE_REQUESTS.discard(request_id)
+
+@api.route('/api/agents/<agent_name>/stream', methods=['POST'])
+def stream_agent_response(agent_name):
+    data = request.json or {}
+    message = data.get('message')
+    
+    if not message:
+        return jsonify({'error': 'Message est requis'}), 400
+    if agent_name not in config.AGENTS:
+        return jsonify({'error': f'Agent {agent_name} non reconnu'}), 404
+    
+    try:
+        client_limiter.take(get_client_id())
+    except AdmissionError as e:
+        return admission_error_response(e)
+    
+    token = CancellationToken()
+    request_id = ACTIVE_REQUESTS.register(token, request.headers.get('X-Request-Id'))
+    timeout = get_request_timeout(config.CHAT_DEFAULT_TIMEOUT)
+    events = queue.Queue()
+    trace = start_trace('chat.stream', agent=agent_name, message_bytes=len(message.encode('utf-8')))
+    app = current_app._get_current_object()
+    
+    def run():
+        try:
+            with app.app_context():
+                response = get_agent_manager().ask_agent(
+                    agent_name, message,
+                    timeout=timeout,
+                    cancel_token=token,
+                    on_token=lambda text: events.put(('token', text))
+                )
+            events.put(('done', response))
+        except Exception as e:
+            events.put(('error', e))
+    
+    # Une ligne JSON par fragment, puis une ligne finale; des lignes vides sont envoyées
+    # pendant l'attente pour détecter un client parti, dont la génération est annulée
+    def generate():
+        try:
+            with trace:
+                worker = threading.Thread(target=contextvars.copy_context().run, args=(run,),
+                                          name=f"chat-{request_id[:8]}", daemon=True)
+                worker.start()
+                while True:
+                    try:
+                        kind, value = events.get(timeout=config.CHAT_STREAM_HEARTBEAT)
+                    except queue.Empty:
+                        yield '\n'
+                        continue
+                    
+                    if kind == 'token':
+                        yield json.dumps({'token': value}, ensure_ascii=False) + '\n'
+                        continue
+                    
+                    if kind == 'done':
+                        final = {'done': True, 'response': value}
+                    elif isinstance(value, GenerationCancelled):
+                        final = {'done': True, 'cancelled': True, 'reason': value.reason}
+                    else:
+                        final = {'done': True, 'error': str(value)}
+                        if isinstance(value, AdmissionError):
+                            final['retry_after'] = value.retry_after
+                    yield json.dumps(final, ensure_ascii=False) + '\n'
+                    break
+        finally:
+            # Sans effet si la génération est terminée; sinon le client est parti
+            token.cancel('client_disconnected')
+            ACTIVE_REQUESTS.discard(request_id)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Trace-Id': trace.trace_id, 'X-Request-Id': request_id})
+
+@api.route('/api/requests/<request_id>', methods=['DELETE'])
+def cancel_request(request_id):
+    # Annule une requête de chat en cours de ce worker; son créneau d'inférence est libéré
+    if not ACTIVE_REQUESTS.cancel(request_id, 'cancelled_by_client'):
+        return jsonify({'error': 'Request not found'}), 404
+    return jsonify({'status': 'cancelled', 'request_id': request_id})
+
 # Routes pour la base de connaissances
-@app.route('/api/knowledge', methods=['GET'])
+@api.route('/api/knowledge', methods=['GET'])
 def get_knowledge_categories():
-    db = get_db()
-    categories = db.execute('SELECT DISTINCT category FROM knowledge').fetchall()
-    return jsonify([category['category'] for category in categories])
+    # Lu depuis la table de synthèse maintenue par triggers
+    return jsonify([item['category'] for item in knowledge_category_stats(get_db())])
+
+@api.route('/api/knowledge/export', methods=['GET'])
+def export_knowledge():
+    compress = request.args.get('gzip', '').lower() in ('1', 'true')
+    lines = iter_knowledge_ndjson(
+        get_db(),
+        agent=request.args.get('agent'),
+        category=request.args.get('category')
+    )
+    
+    filename = f"knowledge_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+    if compress:
+        return Response(
+            stream_with_context(gzip_stream(lines)),
+            mimetype='application/gzip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}.gz"'}
+        )
+    
+    return Response(
+        stream_with_context(lines),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api.route('/api/knowledge/import', methods=['POST'])
+def import_knowledge():
+    compressed = (
+        request.headers.get('Content-Encoding') == 'gzip'
+        or request.mimetype in ('application/gzip', 'application/x-gzip')
+    )
+    batch_size = request.args.get('batch_size', 10000, type=int)
+    
+    # Une ligne JSON d'avancement par lot, la dernière contient le bilan
+    def generate():
+        progress = iter_import_knowledge(
+            get_db(),
+            iter_ndjson_lines(request.stream, compressed),
+            batch_size=batch_size
+        )
+        for stats in progress:
+            yield json.dumps(stats) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
-@app.route('/api/knowledge/<category>', methods=['GET'])
+@api.route('/api/knowledge/<category>', methods=['GET'])
 def get_knowledge_by_category(category):
     db = get_db()
     items = db.execute('SELECT * FROM knowledge WHERE category = ?', (category,)).fetchall()
@@ -247,7 +895,7 @@ def get_knowledge_by_category(category):
         'created_at': item['created_at']
     } for item in items])
 
-@app.route('/api/knowledge/search', methods=['GET'])
+@api.route('/api/knowledge/search', methods=['GET'])
 def search_knowledge():
     search_term = request.args.get('q', '')
     if not search_term:
@@ -269,4 +917,6 @@ def search_knowledge():
     } for item in items])
 
 if __name__ == '__main__':
+    app = create_app()
+    init_worker()
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
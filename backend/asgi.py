@@ -0,0 +1,415 @@
+# backend/asgi.py
+"""
+Point d'entrée ASGI de l'application.
+
+Les routes de génération sont servies nativement dans une boucle asyncio,
+avec un client Ollama non bloquant (agents.async_client): une génération
+en cours ne monopolise ni worker ni thread, et un seul processus garde
+ouvertes des centaines de connexions de chat.
+
+- POST /api/agents/batch: lot de prompts, résultats en flux NDJSON
+- GET|POST /api/agents/<agent>: chat
+- POST /api/agents/<agent>/stream: chat en flux NDJSON
+- GET /api/projects/<id>/workflow/events: état du workflow en flux NDJSON,
+  une ligne à chaque changement, jusqu'à la fin du workflow
+
+Les réponses, codes d'erreur et en-têtes sont ceux des routes Flask
+équivalentes. Toutes les autres routes sont servies par l'application
+Flask, chacune dans un thread dédié: au plus ASGI_THREADS à la fois, les
+suivantes attendent dans la boucle.
+
+Usage (depuis backend/):
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+import config
+from app import get_app, init_worker, client_limiter, validate_batch
+from agents.agent_manager import get_agent_manager
+from agents.async_client import AsyncAgentClient
+from agents.workflow import ProjectWorkflow, get_running_workflow, workflow_state_path
+from database.db import get_db
+from utils.admission import AdmissionError, QueueFullError, DeadlineExceededError
+from utils.cancellation import CancellationToken, GenerationCancelled, ACTIVE_REQUESTS
+from utils.tracing import start_trace
+
+logger = logging.getLogger('asgi')
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """Adaptateur WSGI vers ASGI servant au plus max_threads requêtes en parallèle"""
+
+    def __init__(self, wsgi_application, max_threads=config.ASGI_THREADS):
+        super().__init__(wsgi_application)
+        self.slots = asyncio.Semaphore(max_threads)
+
+    async def __call__(self, scope, receive, send):
+        # asgiref exécute par défaut toutes les requêtes WSGI dans un même thread:
+        # un contexte par requête lui fait attribuer un thread dédié, le sémaphore
+        # borne le nombre de ces threads
+        async with self.slots, ThreadSensitiveContext():
+            await super().__call__(scope, receive, send)
+
+
+class Request:
+    """Requête HTTP reçue par une route asynchrone"""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope['method']
+        self.headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        self.args = {key: values[0] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+
+    @property
+    def client_id(self):
+        """Identifie le client: en-tête X-Client-Id, sinon adresse IP"""
+        client = self.scope.get('client')
+        return self.headers.get('x-client-id') or (client[0] if client else None) or 'anonymous'
+
+    def timeout(self, default):
+        """Délai accordé par le client (en-tête X-Request-Timeout), comme get_request_timeout"""
+        try:
+            timeout = float(self.headers.get('x-request-timeout', default))
+        except ValueError:
+            return default
+        return min(timeout, default) if timeout > 0 else default
+
+    async def json(self):
+        """
+        Returns:
+            dict: Corps JSON de la requête, None s'il est vide ou invalide
+        """
+        chunks = []
+        while True:
+            message = await self.receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        try:
+            return json.loads(b''.join(chunks) or b'null')
+        except ValueError:
+            return None
+
+    def watch_disconnect(self, token):
+        """
+        Annule le jeton si le client ferme la connexion (corps de la requête déjà lu).
+
+        Returns:
+            asyncio.Task: Tâche de surveillance, à annuler en fin de réponse
+        """
+        async def watch():
+            while True:
+                message = await self.receive()
+                if message['type'] == 'http.disconnect':
+                    token.cancel('client_disconnected')
+                    return
+
+        return asyncio.ensure_future(watch())
+
+
+def response_headers(request, headers=None, content_type='application/json'):
+    headers = dict(headers or {})
+    headers['Content-Type'] = content_type
+    # Même politique CORS que l'application Flask
+    if request.headers.get('origin') == config.FRONTEND_URL:
+        headers['Access-Control-Allow-Origin'] = config.FRONTEND_URL
+        headers['Vary'] = 'Origin'
+    return [(key.lower().encode('latin-1'), str(value).encode('latin-1')) for key, value in headers.items()]
+
+
+async def send_json(request, send, body, status=200, headers=None):
+    payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': response_headers(request, headers)})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def send_ndjson(request, send, lines, headers=None):
+    # Une ligne JSON par élément produit; les envois vers un client parti sont ignorés par le serveur
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': response_headers(request, headers, 'application/x-ndjson')})
+    async for line in lines:
+        await send({'type': 'http.response.body', 'body': line.encode('utf-8'), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def send_admission_error(request, send, error):
+    """Convertit un refus d'admission en réponse HTTP (429 ou 504)"""
+    if isinstance(error, DeadlineExceededError):
+        return await send_json(request, send, {'error': str(error)}, 504)
+
+    body = {'error': str(error), 'retry_after': error.retry_after}
+    if isinstance(error, QueueFullError):
+        body['queue_position'] = error.position
+    await send_json(request, send, body, 429, {'Retry-After': error.retry_after})
+
+
+def ndjson(value):
+    return json.dumps(value, ensure_ascii=False, default=str) + '\n'
+
+
+async def batch_interact_with_agents(client, request, send):
+    data = await request.json() or {}
+    try:
+        items, timeout = validate_batch(data)
+    except ValueError as e:
+        return await send_json(request, send, {'error': str(e)}, 400)
+
+    try:
+        client_limiter.take(request.client_id, cost=len(items), priority='batch')
+    except AdmissionError as e:
+        return await send_admission_error(request, send, e)
+
+    if 'x-request-timeout' in request.headers:
+        timeout = request.timeout(timeout or config.BATCH_DEFAULT_TIMEOUT)
+
+    trace = start_trace('chat.batch', items=len(items))
+
+    async def lines():
+        with trace:
+            async for result in client.ask_agents_batch(items, timeout=timeout, partial=data.get('partial', True)):
+                yield ndjson(result)
+
+    await send_ndjson(request, send, lines(), {'X-Trace-Id': trace.trace_id})
+
+
+async def interact_with_agent(client, request, send, agent_name):
+    if request.method == 'GET':
+        message = request.args.get('message')
+    else:
+        data = await request.json()
+        message = data.get('message') if isinstance(data, dict) else None
+
+    if not message:
+        return await send_json(request, send, {'error': 'Message est requis'}, 400)
+
+    # La requête peut être annulée via DELETE /api/requests/<X-Request-Id>, ou en fermant la connexion
+    token = CancellationToken()
+    request_id = ACTIVE_REQUESTS.register(token, request.headers.get('x-request-id'))
+    watcher = request.watch_disconnect(token)
+    try:
+        client_limiter.take(request.client_id)
+        with start_trace('chat', agent=agent_name, message_bytes=len(message.encode('utf-8'))) as trace:
+            response = await client.ask_agent(
+                agent_name, message,
+                timeout=request.timeout(config.CHAT_DEFAULT_TIMEOUT),
+                cancel_token=token
+            )
+        await send_json(request, send, {'response': response}, 200,
+                        {'X-Trace-Id': trace.trace_id, 'X-Request-Id': request_id})
+    except GenerationCancelled as e:
+        await send_json(request, send, {'error': str(e), 'cancelled': True}, 499, {'X-Request-Id': request_id})
+    except AdmissionError as e:
+        await send_admission_error(request, send, e)
+    except Exception as e:
+        await send_json(request, send, {'error': str(e)}, 500)
+    finally:
+        watcher.cancel()
+        ACTIVE_REQUESTS.discard(request_id)
+
+
+async def stream_agent_response(client, request, send, agent_name):
+    data = await request.json() or {}
+    message = data.get('message') if isinstance(data, dict) else None
+
+    if not message:
+        return await send_json(request, send, {'error': 'Message est requis'}, 400)
+    if agent_name not in config.AGENTS:
+        return await send_json(request, send, {'error': f'Agent {agent_name} non reconnu'}, 404)
+
+    try:
+        client_limiter.take(request.client_id)
+    except AdmissionError as e:
+        return await send_admission_error(request, send, e)
+
+    token = CancellationToken()
+    request_id = ACTIVE_REQUESTS.register(token, request.headers.get('x-request-id'))
+    timeout = request.timeout(config.CHAT_DEFAULT_TIMEOUT)
+    events = asyncio.Queue()
+    trace = start_trace('chat.stream', agent=agent_name, message_bytes=len(message.encode('utf-8')))
+
+    async def run():
+        try:
+            response = await client.ask_agent(
+                agent_name, message,
+                timeout=timeout,
+                cancel_token=token,
+                on_token=lambda text: events.put_nowait(('token', text))
+            )
+            events.put_nowait(('done', response))
+        except Exception as e:
+            events.put_nowait(('error', e))
+
+    # Une ligne JSON par fragment, puis une ligne finale; des lignes vides sont envoyées
+    # pendant l'attente, comme la route Flask (maintien des proxys et des clients)
+    async def lines():
+        with trace:
+            generation = asyncio.ensure_future(run())
+            try:
+                while True:
+                    try:
+                        kind, value = await asyncio.wait_for(events.get(), config.CHAT_STREAM_HEARTBEAT)
+                    except asyncio.TimeoutError:
+                        yield '\n'
+                        continue
+
+                    if kind == 'token':
+                        yield ndjson({'token': value})
+                        continue
+
+                    if kind == 'done':
+                        final = {'done': True, 'response': value}
+                    elif isinstance(value, GenerationCancelled):
+                        final = {'done': True, 'cancelled': True, 'reason': value.reason}
+                    else:
+                        final = {'done': True, 'error': str(value)}
+                        if isinstance(value, AdmissionError):
+                            final['retry_after'] = value.retry_after
+                    yield ndjson(final)
+                    break
+            finally:
+                await generation
+
+    watcher = request.watch_disconnect(token)
+    try:
+        await send_ndjson(request, send, lines(), {'X-Trace-Id': trace.trace_id, 'X-Request-Id': request_id})
+    finally:
+        # Sans effet si la génération est terminée; sinon le client est parti
+        token.cancel('client_disconnected')
+        watcher.cancel()
+        ACTIVE_REQUESTS.discard(request_id)
+
+
+def load_workflow_status(project_id):
+    """
+    Returns:
+        tuple: (nom du projet ou None, état du workflow ou None)
+    """
+    project = get_db().execute('SELECT name FROM projects WHERE id = ?', (project_id,)).fetchone()
+    if not project:
+        return None, None
+    workflow = get_running_workflow(project['name']) or ProjectWorkflow.load(get_agent_manager(), project['name'])
+    return project['name'], workflow.get_status() if workflow is not None else None
+
+
+async def workflow_events(client, request, send, project_id):
+    project_name, status = await client.run_in_app_context(load_workflow_status, int(project_id))
+    if project_name is None:
+        return await send_json(request, send, {'error': 'Project not found'}, 404)
+    if status is None:
+        return await send_json(request, send, {'error': 'Workflow not started'}, 404)
+
+    token = CancellationToken()
+    watcher = request.watch_disconnect(token)
+    state_path = workflow_state_path(project_name)
+    loop = asyncio.get_running_loop()
+
+    # L'état est relu lorsque son fichier change, et envoyé s'il diffère du précédent
+    async def lines():
+        nonlocal status
+        last_status = status
+        last_mtime = None
+        last_sent = loop.time()
+        yield ndjson(status)
+
+        while not token.cancelled and last_status['status'] not in ('completed', 'failed'):
+            await asyncio.sleep(config.WORKFLOW_EVENTS_INTERVAL)
+            try:
+                mtime = os.stat(state_path).st_mtime_ns
+            except OSError:
+                mtime = None
+
+            if mtime != last_mtime:
+                last_mtime = mtime
+                _, status = await client.run_in_app_context(load_workflow_status, int(project_id))
+                if status is not None and status != last_status:
+                    last_status = status
+                    last_sent = loop.time()
+                    yield ndjson(status)
+                    continue
+
+            if loop.time() - last_sent >= config.CHAT_STREAM_HEARTBEAT:
+                last_sent = loop.time()
+                yield '\n'
+
+    try:
+        await send_ndjson(request, send, lines())
+    finally:
+        watcher.cancel()
+
+
+# Routes servies nativement: (méthodes, motif du chemin, gestionnaire); l'ordre compte
+ROUTES = [
+    (('POST',), re.compile(r'^/api/agents/batch$'), batch_interact_with_agents),
+    (('GET', 'POST'), re.compile(r'^/api/agents/(?P<agent_name>[^/]+)$'), interact_with_agent),
+    (('POST',), re.compile(r'^/api/agents/(?P<agent_name>[^/]+)/stream$'), stream_agent_response),
+    (('GET',), re.compile(r'^/api/projects/(?P<project_id>\d+)/workflow/events$'), workflow_events),
+]
+
+
+class AsgiApplication:
+    """Application ASGI: routes de génération asynchrones, le reste par Flask"""
+
+    def __init__(self):
+        self.flask_app = None
+        self.wsgi = None
+        self.client = None
+
+    def setup(self):
+        """Construit l'application Flask et démarre les tâches de fond du processus"""
+        self.flask_app = get_app()
+        init_worker()
+        self.wsgi = ThreadedWsgiToAsgi(self.flask_app)
+        self.client = AsyncAgentClient(get_agent_manager(), self.flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if self.flask_app is None:
+            # Serveur sans gestion du cycle de vie
+            self.setup()
+        if scope['type'] != 'http':
+            return
+
+        for methods, pattern, handler in ROUTES:
+            match = pattern.match(scope['path'])
+            if match and scope['method'] in methods:
+                return await handler(self.client, Request(scope, receive), send, **match.groupdict())
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    # Pool des accès SQLite des routes asynchrones
+                    asyncio.get_running_loop().set_default_executor(
+                        ThreadPoolExecutor(max_workers=config.ASGI_THREADS, thread_name_prefix='asgi')
+                    )
+                    await asyncio.to_thread(self.setup)
+                except Exception as e:
+                    logger.error("Échec du démarrage de l'application ASGI: %s", e)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.client is not None:
+                    await self.client.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsgiApplication()
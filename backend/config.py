@@ -3,14 +3,39 @@ import os
 
 # Chemins des dossiers
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.environ.get('AGENCY_DATA_DIR', os.path.join(BASE_DIR, 'data'))
 DB_DIR = os.path.join(DATA_DIR, 'db')
 PROJECTS_DIR = os.path.join(DATA_DIR, 'projects')
 KNOWLEDGE_DIR = os.path.join(DATA_DIR, 'knowledge')
 
+METRICS_DIR = os.path.join(DATA_DIR, 'metrics')
+# Verrous des révisions sur feedback (présence des processus, livrables en cours de révision)
+REVISIONS_DIR = os.path.join(DATA_DIR, 'revisions')
+
 # Chemin de la base de données
 DATABASE = os.path.join(DB_DIR, 'agency.db')
 
+# Intervalle d'écriture des instantanés de métriques de chaque worker (secondes)
+METRICS_FLUSH_INTERVAL = 5.0
+
+# Traçage: taille des lots de spans et intervalle d'écriture en base (secondes)
+TRACE_BATCH_SIZE = 200
+TRACE_FLUSH_INTERVAL = 2.0
+
+# Journalisation: niveau, format ('json' ou 'text') et destination (stderr si LOG_FILE vide).
+# Les enregistrements passent par une file bornée vidée par un thread d'écriture unique;
+# au-delà de LOG_QUEUE_SIZE en attente, ils sont abandonnés (et comptés).
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_FILE = os.environ.get('LOG_FILE') or None
+LOG_QUEUE_SIZE = 10000
+# Échantillonnage des messages fréquents (INFO et DEBUG): au plus LOG_SAMPLE_BURST messages
+# d'un même modèle par fenêtre de LOG_SAMPLE_WINDOW secondes (0 = pas d'échantillonnage)
+LOG_SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 20))
+LOG_SAMPLE_WINDOW = 10.0
+# Nombre maximal de modèles suivis par l'échantillonnage (au-delà, les compteurs sont remis à zéro)
+LOG_SAMPLE_MAX_KEYS = 10000
+
 # Configuration de l'API
 API_PREFIX = '/api'
 DEBUG = True
@@ -18,7 +43,100 @@ HOST = '0.0.0.0'
 PORT = 5001
 
 # Configuration des agents
+OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', "http://localhost:11434/api")
 OLLAMA_BASE_MODEL = "llama3:8b"
+MODELFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agents', 'modelfiles')
+# Intervalle minimal (en secondes) entre deux vérifications des mtime des modelfiles
+AGENT_REGISTRY_POLL_INTERVAL = 2.0
+# Modelfiles réglés pour la machine par "manage.py autotune": prioritaires sur ceux de
+# MODELFILES_DIR, et recréés dans Ollama au démarrage suivant s'ils ont changé
+TUNED_MODELFILES_DIR = os.path.join(DATA_DIR, 'modelfiles')
+# Auto-réglage: tokens générés par mesure, mesures par jeu de paramètres (après une
+# génération de chauffe), tailles de lot essayées et prompts représentatifs par agent
+TUNING_DECODE_TOKENS = 64
+TUNING_REPEATS = 2
+TUNING_BATCH_SIZES = [128, 256, 512]
+TUNING_PROMPTS = 3
+# Mode des modèles Ollama: 'agents' = un modèle par agent, créé depuis son modelfile;
+# 'shared' = un seul modèle de base résident (OLLAMA_SHARED_MODEL), le prompt système et
+# les paramètres de l'agent étant envoyés avec chaque requête (pas de rechargement d'un
+# agent à l'autre sur les machines qui ne peuvent garder qu'un modèle en mémoire)
+AGENT_MODEL_MODE = os.environ.get('AGENT_MODEL_MODE', 'agents')
+OLLAMA_SHARED_MODEL = os.environ.get('OLLAMA_SHARED_MODEL', OLLAMA_BASE_MODEL)
+# Durée de maintien en mémoire du modèle partagé après une requête (keep_alive d'Ollama)
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+
+# Nombre de générations envoyées en parallèle à Ollama (cf. OLLAMA_NUM_PARALLEL)
+OLLAMA_MAX_PARALLEL = int(os.environ.get('OLLAMA_MAX_PARALLEL', 2))
+# Limites des requêtes groupées (/api/agents/batch)
+BATCH_MAX_ITEMS = 20
+BATCH_DEFAULT_TIMEOUT = 300
+# Classes de priorité pour l'accès aux créneaux d'inférence (plus petit = plus prioritaire)
+INFERENCE_PRIORITIES = {
+    'interactive': 0,
+    'feedback': 1,
+    'workflow': 2,
+    'batch': 3
+}
+# Nombre maximal d'appelants en attente par classe de priorité (None = illimité)
+INFERENCE_QUEUE_LIMITS = {
+    'interactive': 8,
+    'feedback': None,
+    'workflow': None,
+    'batch': 20
+}
+# Délai par défaut d'une requête de chat, si le client n'en indique pas (secondes)
+CHAT_DEFAULT_TIMEOUT = 300
+# Intervalle des lignes vides envoyées pendant un chat en flux (secondes): une écriture
+# qui échoue révèle un client parti, dont la génération est alors annulée
+CHAT_STREAM_HEARTBEAT = 2.0
+# Point d'entrée ASGI (asgi.py): nombre maximal de routes Flask servies en parallèle (un
+# thread chacune), taille du pool des accès SQLite des routes asynchrones, et intervalle
+# de scrutation de l'état d'un workflow suivi en flux (secondes)
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+WORKFLOW_EVENTS_INTERVAL = 1.0
+# Limitation par client (seau à jetons): débit soutenu et rafale autorisée
+CLIENT_RATE_PER_MINUTE = float(os.environ.get('CLIENT_RATE_PER_MINUTE', 30))
+CLIENT_RATE_BURST = 10
+# Archives de projets: taille des blocs lus et seuil au-delà duquel un fichier est stocké sans compression
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+ARCHIVE_STORE_THRESHOLD = 8 * 1024 * 1024
+# Durée de vie du cache de /api/bootstrap (secondes), invalidé par les écritures
+BOOTSTRAP_CACHE_TTL = 10.0
+# Révisions sur feedback: fenêtre de regroupement et délai maximal (secondes)
+FEEDBACK_DEBOUNCE_SECONDS = float(os.environ.get('FEEDBACK_DEBOUNCE_SECONDS', 60))
+FEEDBACK_MAX_DELAY_SECONDS = float(os.environ.get('FEEDBACK_MAX_DELAY_SECONDS', 600))
+REVISION_MAX_WORKERS = 2
+# Révisions ciblées: un feedback qui désigne des sections du livrable (titres markdown) ne
+# fait régénérer que ces sections, les sections voisines étant jointes au prompt (tronquées
+# à SECTION_CONTEXT_CHARS). Au-delà de SECTION_REVISION_MAX_SHARE du livrable, la révision
+# est complète. La génération d'une section est bornée à SECTION_TOKEN_FACTOR fois sa
+# taille estimée en tokens, et au moins SECTION_MIN_TOKENS.
+SECTION_REVISIONS = os.environ.get('SECTION_REVISIONS', '1') == '1'
+SECTION_REVISION_MAX_SHARE = 0.6
+SECTION_CONTEXT_CHARS = 1200
+SECTION_TOKEN_FACTOR = 1.5
+SECTION_MIN_TOKENS = 256
+# Détection des quasi-doublons de connaissances (SimHash 64 bits): distance de Hamming
+# maximale pour considérer deux réponses d'un même agent comme identiques (-1 = désactivé),
+# et nombre de bandes de l'index (toute paire à distance < bandes partage une bande)
+KNOWLEDGE_DUPLICATE_DISTANCE = int(os.environ.get('KNOWLEDGE_DUPLICATE_DISTANCE', 3))
+KNOWLEDGE_SIMHASH_BANDS = 4
+# Rétention: politiques par table (âge en jours, statut du projet, nombre d'entrées par agent).
+# Les lignes expirées sont déplacées dans des archives froides (NDJSON gzip, ajout seul).
+RETENTION_POLICIES = {
+    'interactions': {'max_age_days': 90, 'project_statuses': ['completed', 'failed']},
+    'knowledge': {'max_age_days': 365, 'max_per_agent': 5000, 'categories': ['Général']},
+    'spans': {'max_age_days': 30}
+}
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+# Intervalle entre deux passes de la tâche de rétention (secondes, 0 = désactivée)
+RETENTION_INTERVAL = float(os.environ.get('RETENTION_INTERVAL', 6 * 3600))
+RETENTION_BATCH_SIZE = 500
+# Budget d'E/S de la tâche de rétention (octets lus, écrits et libérés par seconde)
+RETENTION_IO_BUDGET = 2 * 1024 * 1024
+# Pages libérées par appel à PRAGMA incremental_vacuum
+RETENTION_VACUUM_PAGES = 256
 AGENTS = [
     'vision', 'pixel', 'arch', 'script', 'node', 
     'data', 'secure', 'test', 'deploy', 'pm'
@@ -37,6 +155,34 @@ AGENT_TITLES = {
     'pm': 'Chef de Projet'
 }
 
+# Génération par paliers: 'draft' produit un brouillon rapide avec un modèle plus petit et
+# moins de tokens; 'full' utilise le modèle et le num_predict de l'agent (None = ceux du
+# modelfile). Une étape en brouillon est affinée en 'full' lorsqu'elle est validée ou
+# reçoit un feedback.
+GENERATION_TIERS = {
+    'draft': {'model': os.environ.get('OLLAMA_DRAFT_MODEL', 'llama3.2:3b'), 'num_predict': 700},
+    'full': {'model': None, 'num_predict': None}
+}
+# Palier des étapes sans clé 'tier' dans WORKFLOW_STEPS
+DEFAULT_STEP_TIER = os.environ.get('DEFAULT_STEP_TIER', 'full')
+# Budget d'une génération d'étape: durée maximale (secondes, à partir de l'appel à Ollama)
+# et nombre maximal de tokens générés (None = num_predict du palier/de l'agent). Une
+# génération qui dépasse son budget est arrêtée et sa sortie partielle est conservée.
+# Une clé 'budget' dans WORKFLOW_STEPS remplace tout ou partie de ces valeurs.
+DEFAULT_STEP_BUDGET = {
+    'max_seconds': float(os.environ.get('STEP_MAX_SECONDS', 600)),
+    'max_tokens': None
+}
+
+# Points de reprise des étapes (dossier temp/ du projet): la sortie reçue est écrite sur
+# disque au plus tous les N tokens ou toutes les N secondes, et une étape interrompue
+# reprend à partir du texte sauvegardé
+CHECKPOINT_FLUSH_TOKENS = 32
+CHECKPOINT_FLUSH_SECONDS = 2.0
+# Délai avant de retenter une étape dont le point de reprise est verrouillé par une
+# génération en cours dans un autre processus (affinage, révision) (secondes)
+CHECKPOINT_BUSY_RETRY = 5.0
+
 # Mapping des étapes du workflow
 WORKFLOW_STEPS = [
     {
@@ -61,25 +207,31 @@ WORKFLOW_STEPS = [
         'id': '04_planning',
         'agent': 'pm',
         'title': 'Planning de projet',
-        'description': 'Planification détaillée du projet'
+        'description': 'Planification détaillée du projet',
+        'tier': 'draft'
     },
     {
         'id': '05_frontend',
         'agent': 'script',
         'title': 'Développement Frontend',
-        'description': 'Implémentation de l\'interface utilisateur'
+        'description': 'Implémentation de l\'interface utilisateur',
+        'tier': 'draft',
+        'budget': {'max_seconds': 900}
     },
     {
         'id': '06_backend',
         'agent': 'node',
         'title': 'Développement Backend',
-        'description': 'Développement des API et services'
+        'description': 'Développement des API et services',
+        'tier': 'draft',
+        'budget': {'max_seconds': 900}
     },
     {
         'id': '07_database',
         'agent': 'data',
         'title': 'Base de données',
-        'description': 'Conception de la base de données'
+        'description': 'Conception de la base de données',
+        'tier': 'draft'
     },
     {
         'id': '08_securite',
@@ -91,13 +243,15 @@ WORKFLOW_STEPS = [
         'id': '09_tests',
         'agent': 'test',
         'title': 'Plan de tests',
-        'description': 'Stratégie et scénarios de test'
+        'description': 'Stratégie et scénarios de test',
+        'tier': 'draft'
     },
     {
         'id': '10_deploiement',
         'agent': 'deploy',
         'title': 'Plan de déploiement',
-        'description': 'Stratégie de déploiement et configuration'
+        'description': 'Stratégie de déploiement et configuration',
+        'tier': 'draft'
     }
 ]
 
@@ -107,5 +261,5 @@ FRONTEND_URL = 'http://localhost:3000'
 # Fonction pour créer les dossiers nécessaires
 def ensure_directories():
     """Crée les dossiers nécessaires s'ils n'existent pas"""
-    for directory in [DATA_DIR, DB_DIR, PROJECTS_DIR, KNOWLEDGE_DIR]:
+    for directory in [DATA_DIR, DB_DIR, PROJECTS_DIR, KNOWLEDGE_DIR, ARCHIVE_DIR]:
         os.makedirs(directory, exist_ok=True)
\ No newline at end of file
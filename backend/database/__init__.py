@@ -12,10 +12,55 @@ from .db import (
     insert_db
 )
 
+from .analytics import (
+    insert_generation_stats,
+    generation_analytics
+)
+
+from .knowledge_io import (
+    content_hash,
+    import_knowledge,
+    iter_knowledge_ndjson
+)
+
+from .dedup import (
+    simhash,
+    store_knowledge,
+    dedupe_knowledge
+)
+
+from .retention import (
+    run_retention,
+    iter_archive,
+    list_archives,
+    get_retention_scheduler
+)
+
+from .summary import (
+    rebuild_summaries,
+    get_knowledge_categories,
+    get_summary_stats
+)
+
 __all__ = [
     'init_db',
     'get_db',
     'close_db',
     'query_db',
-    'insert_db'
+    'insert_db',
+    'insert_generation_stats',
+    'generation_analytics',
+    'content_hash',
+    'import_knowledge',
+    'iter_knowledge_ndjson',
+    'simhash',
+    'store_knowledge',
+    'dedupe_knowledge',
+    'run_retention',
+    'iter_archive',
+    'list_archives',
+    'get_retention_scheduler',
+    'rebuild_summaries',
+    'get_knowledge_categories',
+    'get_summary_stats'
 ]
\ No newline at end of file
@@ -0,0 +1,197 @@
+# backend/database/analytics.py
+"""
+Statistiques de génération pour l'application IA-WebAgency.
+
+Ce module conserve, pour chaque appel à Ollama, les compteurs de tokens et
+les durées renvoyés par l'API (prompt_eval_count, eval_count, durées en
+nanosecondes), puis les agrège par agent, par étape ou par jour.
+"""
+
+# Colonnes de regroupement autorisées pour les analyses
+GROUP_BY_COLUMNS = {
+    'agent': 'agent',
+    'step': "COALESCE(step_id, 'chat')",
+    'day': 'date(created_at)',
+    'model': "COALESCE(model, agent)",
+    'tier': "COALESCE(tier, 'full')"
+}
+
+
+def insert_generation_stats(db, agent_name, response_data, project_id=None, step_id=None,
+                            interaction_id=None, knowledge_id=None, tier=None):
+    """
+    Insère les statistiques d'une génération (sans commit).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        agent_name (str): Nom de l'agent
+        response_data (dict): Réponse brute d'Ollama (resumed_tokens: tokens repris
+            d'un point de reprise)
+        project_id (int, optional): Projet associé
+        step_id (str, optional): Étape du workflow associée
+        interaction_id (int, optional): Interaction associée
+        knowledge_id (int, optional): Entrée de connaissance associée
+        tier (str, optional): Palier de génération ('draft' ou 'full')
+
+    Returns:
+        int: ID de la ligne de statistiques
+    """
+    cursor = db.execute(
+        """
+        INSERT INTO generation_stats
+        (agent, model, tier, project_id, step_id, interaction_id, knowledge_id,
+         prompt_eval_count, eval_count, total_duration, load_duration,
+         prompt_eval_duration, eval_duration, resumed_tokens)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            agent_name, response_data.get('model'), tier, project_id, step_id, interaction_id, knowledge_id,
+            response_data.get('prompt_eval_count'), response_data.get('eval_count'),
+            response_data.get('total_duration'), response_data.get('load_duration'),
+            response_data.get('prompt_eval_duration'), response_data.get('eval_duration'),
+            response_data.get('resumed_tokens') or 0
+        )
+    )
+    return cursor.lastrowid
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    if not numerator or not denominator:
+        return None
+    return round(numerator / denominator * scale, 3)
+
+
+def generation_analytics(db, group_by='agent', since=None, until=None, agent=None, project_id=None):
+    """
+    Agrège les statistiques de génération.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        group_by (str): 'agent', 'step', 'day', 'model' ou 'tier'
+        since (str, optional): Date de début incluse (YYYY-MM-DD)
+        until (str, optional): Date de fin incluse (YYYY-MM-DD)
+        agent (str, optional): Restreindre à un agent
+        project_id (int, optional): Restreindre à un projet
+
+    Returns:
+        list: Une entrée par groupe avec débits, part du prefill et du chargement,
+            et tokens économisés par les reprises sur point de reprise
+
+    Raises:
+        ValueError: Si le regroupement demandé n'existe pas
+    """
+    if group_by not in GROUP_BY_COLUMNS:
+        raise ValueError(f"Regroupement inconnu: {group_by}")
+
+    conditions = []
+    args = []
+    if since:
+        conditions.append('date(created_at) >= ?')
+        args.append(since)
+    if until:
+        conditions.append('date(created_at) <= ?')
+        args.append(until)
+    if agent:
+        conditions.append('agent = ?')
+        args.append(agent)
+    if project_id is not None:
+        conditions.append('project_id = ?')
+        args.append(project_id)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    group = GROUP_BY_COLUMNS[group_by]
+
+    rows = db.execute(
+        f"""
+        SELECT {group} AS key,
+               COUNT(*) AS calls,
+               SUM(prompt_eval_count) AS prompt_tokens,
+               SUM(eval_count) AS generated_tokens,
+               SUM(resumed_tokens) AS resumed_tokens,
+               SUM(prompt_eval_duration) AS prompt_eval_ns,
+               SUM(eval_duration) AS eval_ns,
+               SUM(load_duration) AS load_ns,
+               SUM(total_duration) AS total_ns
+        FROM generation_stats
+        {where}
+        GROUP BY key
+        ORDER BY key
+        """,
+        args
+    ).fetchall()
+
+    results = []
+    for row in rows:
+        prompt_eval_ns = row['prompt_eval_ns'] or 0
+        eval_ns = row['eval_ns'] or 0
+        compute_ns = prompt_eval_ns + eval_ns
+        results.append({
+            group_by: row['key'],
+            'calls': row['calls'],
+            'prompt_tokens': row['prompt_tokens'] or 0,
+            'generated_tokens': row['generated_tokens'] or 0,
+            'resumed_tokens': row['resumed_tokens'] or 0,
+            'decode_tokens_per_sec': _ratio(row['generated_tokens'], eval_ns, 1e9),
+            'prefill_tokens_per_sec': _ratio(row['prompt_tokens'], prompt_eval_ns, 1e9),
+            'prefill_share': _ratio(prompt_eval_ns, compute_ns),
+            'decode_share': _ratio(eval_ns, compute_ns),
+            'load_overhead_share': _ratio(row['load_ns'], row['total_ns']),
+            'avg_load_ms': _ratio(row['load_ns'], row['calls'], 1e-6),
+            'avg_total_ms': _ratio(row['total_ns'], row['calls'], 1e-6)
+        })
+
+    return results
+
+
+def tier_savings(db, project_id=None):
+    """
+    Compare, par étape, la durée des générations en brouillon et en passe complète.
+
+    Le gain d'un brouillon est estimé par la différence entre la durée
+    moyenne d'une passe complète de l'étape et celle d'un brouillon.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        project_id (int, optional): Restreindre à un projet
+
+    Returns:
+        dict: Détail par étape et gain total estimé (en millisecondes)
+    """
+    where = 'WHERE step_id IS NOT NULL'
+    args = []
+    if project_id is not None:
+        where += ' AND project_id = ?'
+        args.append(project_id)
+
+    rows = db.execute(
+        f"""
+        SELECT step_id,
+               SUM(COALESCE(tier, 'full') = 'draft') AS draft_calls,
+               AVG(CASE WHEN tier = 'draft' THEN total_duration END) AS draft_ns,
+               SUM(COALESCE(tier, 'full') = 'full') AS full_calls,
+               AVG(CASE WHEN COALESCE(tier, 'full') = 'full' THEN total_duration END) AS full_ns
+        FROM generation_stats
+        {where}
+        GROUP BY step_id
+        ORDER BY step_id
+        """,
+        args
+    ).fetchall()
+
+    steps = []
+    total_saved_ms = 0.0
+    for row in rows:
+        saved_ms = None
+        if row['draft_ns'] is not None and row['full_ns'] is not None:
+            saved_ms = round((row['full_ns'] - row['draft_ns']) / 1e6, 3)
+            total_saved_ms += saved_ms * row['draft_calls']
+        steps.append({
+            'step': row['step_id'],
+            'draft_calls': row['draft_calls'],
+            'full_calls': row['full_calls'],
+            'avg_draft_ms': _ratio(row['draft_ns'], 1, 1e-6),
+            'avg_full_ms': _ratio(row['full_ns'], 1, 1e-6),
+            'saved_ms_per_draft': saved_ms
+        })
+
+    return {'steps': steps, 'total_saved_ms': round(total_saved_ms, 3)}
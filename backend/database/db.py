@@ -21,6 +21,16 @@ import os
 # Ajout du répertoire parent au chemin de recherche Python
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config import DATABASE, DB_DIR
+from utils.metrics import SQLITE_QUERY_DURATION
+from utils.cache import invalidate_bootstrap_cache
+from database.knowledge_io import content_hash, backfill_content_hashes
+from database.summary import ensure_summary_tables
+from database.dedup import simhash, rebuild_simhash_index, backfill_simhashes
+
+_query_timer = SQLITE_QUERY_DURATION.labels('query_db')
+_insert_timer = SQLITE_QUERY_DURATION.labels('insert_db')
+_update_timer = SQLITE_QUERY_DURATION.labels('update_db')
+_delete_timer = SQLITE_QUERY_DURATION.labels('delete_db')
 
 
 def get_db():
@@ -68,6 +78,11 @@ def init_db():
     db = get_db()
     
     try:
+        # Base neuve: auto_vacuum incrémental (le mode ne peut changer qu'avant la
+        # création des tables, ou par un VACUUM complet: cf. scripts/manage.py vacuum)
+        if db.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()[0] == 0:
+            db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
         # Création des tables
         db.execute('''
         CREATE TABLE IF NOT EXISTS projects (
@@ -118,6 +133,116 @@ def init_db():
         )
         ''')
         
+        db.execute('''
+        CREATE TABLE IF NOT EXISTS spans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trace_id TEXT NOT NULL,
+            span_id TEXT NOT NULL,
+            parent_id TEXT,
+            name TEXT NOT NULL,
+            project_id INTEGER,
+            started_at REAL NOT NULL,
+            duration_ms REAL,
+            attributes TEXT
+        )
+        ''')
+        
+        db.execute('CREATE INDEX IF NOT EXISTS idx_spans_trace ON spans (trace_id)')
+        db.execute('CREATE INDEX IF NOT EXISTS idx_spans_project_root ON spans (project_id, parent_id, started_at)')
+        
+        db.execute('''
+        CREATE TABLE IF NOT EXISTS generation_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent TEXT NOT NULL,
+            model TEXT,
+            project_id INTEGER,
+            step_id TEXT,
+            interaction_id INTEGER,
+            knowledge_id INTEGER,
+            prompt_eval_count INTEGER,
+            eval_count INTEGER,
+            total_duration INTEGER,
+            load_duration INTEGER,
+            prompt_eval_duration INTEGER,
+            eval_duration INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+        ''')
+        
+        db.execute('CREATE INDEX IF NOT EXISTS idx_generation_stats_created ON generation_stats (created_at)')
+        
+        # Palier de génération (brouillon ou passe complète)
+        stats_columns = {row['name'] for row in db.execute('PRAGMA table_info(generation_stats)')}
+        if 'tier' not in stats_columns:
+            db.execute('ALTER TABLE generation_stats ADD COLUMN tier TEXT')
+        # Tokens repris d'un point de reprise (non régénérés)
+        if 'resumed_tokens' not in stats_columns:
+            db.execute('ALTER TABLE generation_stats ADD COLUMN resumed_tokens INTEGER DEFAULT 0')
+        
+        db.execute('''
+        CREATE TABLE IF NOT EXISTS revision_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            step_id TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            status TEXT DEFAULT 'queued',
+            feedback_count INTEGER DEFAULT 0,
+            feedback_ids TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+        ''')
+        
+        db.execute('CREATE INDEX IF NOT EXISTS idx_feedback_pending ON feedback (project_id, step_id, status)')
+
+        # Portée des révisions ('full' ou 'sections') et sections régénérées
+        revision_columns = {row['name'] for row in db.execute('PRAGMA table_info(revision_jobs)')}
+        if 'scope' not in revision_columns:
+            db.execute('ALTER TABLE revision_jobs ADD COLUMN scope TEXT')
+        if 'sections' not in revision_columns:
+            db.execute('ALTER TABLE revision_jobs ADD COLUMN sections TEXT')
+        # Processus (planificateur) responsable de la révision, repris s'il s'arrête
+        if 'owner' not in revision_columns:
+            db.execute('ALTER TABLE revision_jobs ADD COLUMN owner TEXT')
+        
+        # Empreinte du contenu des connaissances (dédoublonnage à l'import)
+        knowledge_columns = {row['name'] for row in db.execute('PRAGMA table_info(knowledge)')}
+        if 'content_hash' not in knowledge_columns:
+            db.execute('ALTER TABLE knowledge ADD COLUMN content_hash TEXT')
+        db.execute('CREATE INDEX IF NOT EXISTS idx_knowledge_content_hash ON knowledge (content_hash)')
+        backfill_content_hashes(db)
+        
+        # Empreintes SimHash et index par bandes (détection des quasi-doublons)
+        if 'simhash' not in knowledge_columns:
+            db.execute('ALTER TABLE knowledge ADD COLUMN simhash INTEGER')
+        if 'duplicate_count' not in knowledge_columns:
+            db.execute('ALTER TABLE knowledge ADD COLUMN duplicate_count INTEGER DEFAULT 0')
+        db.execute('''
+        CREATE TABLE IF NOT EXISTS knowledge_simhash_bands (
+            band INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            knowledge_id INTEGER NOT NULL,
+            PRIMARY KEY (band, value, knowledge_id)
+        ) WITHOUT ROWID
+        ''')
+        db.execute('CREATE INDEX IF NOT EXISTS idx_simhash_bands_knowledge ON knowledge_simhash_bands (knowledge_id)')
+        db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_knowledge_simhash_delete
+        AFTER DELETE ON knowledge
+        BEGIN
+            DELETE FROM knowledge_simhash_bands WHERE knowledge_id = OLD.id;
+        END
+        ''')
+        # Entrées antérieures aux empreintes: indexées pour être vues par store_knowledge
+        backfill_simhashes(db)
+        
+        # Compteurs de synthèse maintenus par triggers
+        ensure_summary_tables(db)
+        
         # Commit des changements
         db.commit()
         
@@ -193,11 +318,15 @@ def seed_knowledge(db):
     ]
     
     try:
-        for item in basic_knowledge:
-            db.execute(
-                "INSERT INTO knowledge (agent, category, content) VALUES (?, ?, ?)",
-                (item["agent"], item["category"], item["content"])
-            )
+        db.executemany(
+            "INSERT INTO knowledge (agent, category, content, content_hash, simhash) VALUES (?, ?, ?, ?, ?)",
+            [
+                (item["agent"], item["category"], item["content"],
+                 content_hash(item["content"]), simhash(item["content"]))
+                for item in basic_knowledge
+            ]
+        )
+        rebuild_simhash_index(db)
         
         db.commit()
     except sqlite3.Error as e:
@@ -218,10 +347,11 @@ def query_db(query, args=(), one=False):
         list or dict: Résultats de la requête
     """
     db = get_db()
-    cursor = db.execute(query, args)
-    
-    rv = cursor.fetchall()
-    cursor.close()
+    with _query_timer.time():
+        cursor = db.execute(query, args)
+        
+        rv = cursor.fetchall()
+        cursor.close()
     
     return (rv[0] if rv else None) if one else rv
 
@@ -238,8 +368,10 @@ def insert_db(query, args=()):
         int: ID de la ligne insérée
     """
     db = get_db()
-    cursor = db.execute(query, args)
-    db.commit()
+    with _insert_timer.time():
+        cursor = db.execute(query, args)
+        db.commit()
+    invalidate_bootstrap_cache()
     
     return cursor.lastrowid
 
@@ -256,8 +388,10 @@ def update_db(query, args=()):
         int: Nombre de lignes affectées
     """
     db = get_db()
-    cursor = db.execute(query, args)
-    db.commit()
+    with _update_timer.time():
+        cursor = db.execute(query, args)
+        db.commit()
+    invalidate_bootstrap_cache()
     
     return cursor.rowcount
 
@@ -274,8 +408,10 @@ def delete_db(query, args=()):
         int: Nombre de lignes supprimées
     """
     db = get_db()
-    cursor = db.execute(query, args)
-    db.commit()
+    with _delete_timer.time():
+        cursor = db.execute(query, args)
+        db.commit()
+    invalidate_bootstrap_cache()
     
     return cursor.rowcount
 
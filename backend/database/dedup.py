@@ -0,0 +1,357 @@
+# backend/database/dedup.py
+"""
+Détection des quasi-doublons dans la base de connaissances.
+
+Chaque entrée reçoit une empreinte SimHash de 64 bits calculée sur les
+mots distincts de son contenu: deux textes presque identiques ont des
+empreintes à faible distance de Hamming. L'empreinte est découpée en
+bandes indexées (table knowledge_simhash_bands); d'après le principe des
+tiroirs, deux empreintes à distance strictement inférieure au nombre de
+bandes ont au moins une bande identique, ce qui permet de trouver les
+candidats par recherche exacte dans l'index au lieu de parcourir la table.
+"""
+
+import os
+import re
+import sys
+import hashlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import KNOWLEDGE_DUPLICATE_DISTANCE, KNOWLEDGE_SIMHASH_BANDS
+from utils.cache import invalidate_bootstrap_cache
+from database.knowledge_io import content_hash
+
+SIMHASH_BITS = 64
+
+_MASK64 = (1 << SIMHASH_BITS) - 1
+_WORD_RE = re.compile(r'\w+')
+
+# Compteurs de bits empaquetés: un entier avec un compteur de 32 bits par bit de
+# l'empreinte. _SPREAD[k][b] place les bits de l'octet b (octet k du hash) chacun
+# dans son compteur, ce qui remplace 64 opérations par bit par 8 additions.
+_LANE = 32
+_SPREAD = [
+    [
+        sum(((byte >> bit) & 1) << (_LANE * (8 * k + bit)) for bit in range(8))
+        for byte in range(256)
+    ]
+    for k in range(8)
+]
+
+
+def _features(text):
+    # Mots distincts: les mots fréquents ne dominent pas l'empreinte
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def simhash(text):
+    """
+    Calcule l'empreinte SimHash d'un texte.
+
+    Args:
+        text (str): Texte
+
+    Returns:
+        int: Empreinte de 64 bits, signée pour être stockée telle quelle par SQLite
+    """
+    features = _features(text)
+    counters = 0
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        for k, byte in enumerate(digest):
+            counters += _SPREAD[k][byte]
+
+    fingerprint = 0
+    lane_mask = (1 << _LANE) - 1
+    for bit in range(SIMHASH_BITS):
+        # Bit à 1 si la majorité des caractéristiques ont ce bit à 1
+        if 2 * ((counters >> (_LANE * bit)) & lane_mask) > len(features):
+            fingerprint |= 1 << bit
+
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >> (SIMHASH_BITS - 1) else fingerprint
+
+
+def hamming_distance(a, b):
+    """
+    Args:
+        a (int): Empreinte
+        b (int): Empreinte
+
+    Returns:
+        int: Nombre de bits différents entre les deux empreintes
+    """
+    return bin((a ^ b) & _MASK64).count('1')
+
+
+def band_values(fingerprint, bands=KNOWLEDGE_SIMHASH_BANDS):
+    """
+    Découpe une empreinte en bandes.
+
+    Args:
+        fingerprint (int): Empreinte
+        bands (int): Nombre de bandes (diviseur de 64)
+
+    Returns:
+        list: Couples (numéro de bande, valeur)
+    """
+    width = SIMHASH_BITS // bands
+    mask = (1 << width) - 1
+    return [(band, (fingerprint >> (band * width)) & mask) for band in range(bands)]
+
+
+def index_fingerprint(db, knowledge_id, fingerprint):
+    """
+    Enregistre l'empreinte d'une entrée et ses bandes dans l'index (sans commit).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        knowledge_id (int): ID de l'entrée de connaissance
+        fingerprint (int): Empreinte du contenu
+    """
+    db.execute("UPDATE knowledge SET simhash = ? WHERE id = ?", (fingerprint, knowledge_id))
+    db.executemany(
+        "INSERT OR IGNORE INTO knowledge_simhash_bands (band, value, knowledge_id) VALUES (?, ?, ?)",
+        [(band, value, knowledge_id) for band, value in band_values(fingerprint)]
+    )
+
+
+def backfill_simhashes(db, batch_size=5000):
+    """
+    Calcule l'empreinte et les bandes des entrées qui n'en ont pas encore (sans commit).
+
+    Concerne les entrées antérieures à la détection des quasi-doublons et
+    celles insérées en masse (import NDJSON).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        batch_size (int): Nombre de lignes traitées par lot
+
+    Returns:
+        int: Nombre de lignes mises à jour
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            """
+            SELECT id, content FROM knowledge
+            WHERE simhash IS NULL AND id > ?
+            ORDER BY id LIMIT ?
+            """,
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            return updated
+
+        fingerprints = [(simhash(row[1] or ''), row[0]) for row in rows]
+        db.executemany("UPDATE knowledge SET simhash = ? WHERE id = ?", fingerprints)
+        db.executemany(
+            "INSERT OR IGNORE INTO knowledge_simhash_bands (band, value, knowledge_id) VALUES (?, ?, ?)",
+            [(band, value, knowledge_id)
+             for fingerprint, knowledge_id in fingerprints
+             for band, value in band_values(fingerprint)]
+        )
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def find_near_duplicate(db, agent, fingerprint, max_distance=KNOWLEDGE_DUPLICATE_DISTANCE,
+                        before_id=None, exclude=()):
+    """
+    Cherche une entrée du même agent dont le contenu est presque identique.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        agent (str): Agent auteur de l'entrée
+        fingerprint (int): Empreinte du contenu
+        max_distance (int): Distance de Hamming maximale (-1 = aucune recherche)
+        before_id (int, optional): Ne considérer que les entrées d'ID inférieur
+        exclude (collection): IDs à ignorer
+
+    Returns:
+        int: ID de l'entrée la plus proche (la plus ancienne à distance égale), ou None
+    """
+    if max_distance < 0:
+        return None
+
+    bands = band_values(fingerprint)
+    lookups = ' UNION '.join(
+        ['SELECT knowledge_id FROM knowledge_simhash_bands WHERE band = ? AND value = ?'] * len(bands)
+    )
+    args = [item for pair in bands for item in pair] + [agent]
+    condition = ''
+    if before_id is not None:
+        condition = 'AND k.id < ?'
+        args.append(before_id)
+
+    candidates = db.execute(
+        f"""
+        SELECT k.id, k.simhash FROM ({lookups}) c
+        JOIN knowledge k ON k.id = c.knowledge_id
+        WHERE k.agent = ? {condition}
+        """,
+        args
+    ).fetchall()
+
+    best = None
+    for knowledge_id, candidate in candidates:
+        if knowledge_id in exclude or candidate is None:
+            continue
+        distance = hamming_distance(fingerprint, candidate)
+        if distance <= max_distance and (best is None or (distance, knowledge_id) < best):
+            best = (distance, knowledge_id)
+
+    return best[1] if best else None
+
+
+def store_knowledge(db, agent, category, query, content, project_id=None,
+                    max_distance=KNOWLEDGE_DUPLICATE_DISTANCE):
+    """
+    Insère une entrée de connaissance, sauf si elle double une entrée existante (sans commit).
+
+    Un quasi-doublon n'est pas stocké: le compteur duplicate_count de
+    l'entrée existante est incrémenté et son ID est retourné, de sorte que
+    les statistiques de génération y sont rattachées.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        agent (str): Agent auteur de l'entrée
+        category (str): Catégorie de la connaissance
+        query (str): Question posée
+        content (str): Contenu
+        project_id (int, optional): ID du projet associé
+        max_distance (int): Distance de Hamming maximale d'un doublon (-1 = désactivé)
+
+    Returns:
+        tuple: (ID de l'entrée, True si l'entrée existait déjà)
+    """
+    fingerprint = simhash(content)
+    existing_id = find_near_duplicate(db, agent, fingerprint, max_distance)
+    if existing_id is not None:
+        db.execute("UPDATE knowledge SET duplicate_count = duplicate_count + 1 WHERE id = ?", (existing_id,))
+        return existing_id, True
+
+    cursor = db.execute(
+        """
+        INSERT INTO knowledge
+        (agent, category, query, content, project_id, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (agent, category, query, content, project_id, content_hash(content))
+    )
+    index_fingerprint(db, cursor.lastrowid, fingerprint)
+    return cursor.lastrowid, False
+
+
+def rebuild_simhash_index(db):
+    """
+    Recrée l'index des bandes à partir des empreintes stockées (sans commit).
+
+    À lancer après un changement de KNOWLEDGE_SIMHASH_BANDS.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+    """
+    width = SIMHASH_BITS // KNOWLEDGE_SIMHASH_BANDS
+    db.execute("DELETE FROM knowledge_simhash_bands")
+    for band in range(KNOWLEDGE_SIMHASH_BANDS):
+        db.execute(
+            """
+            INSERT INTO knowledge_simhash_bands (band, value, knowledge_id)
+            SELECT ?, (simhash >> ?) & ?, id FROM knowledge WHERE simhash IS NOT NULL
+            """,
+            (band, band * width, (1 << width) - 1)
+        )
+
+
+def dedupe_knowledge(db, max_distance=KNOWLEDGE_DUPLICATE_DISTANCE, batch_size=1000,
+                     dry_run=False, reindex=False, on_progress=None):
+    """
+    Supprime les quasi-doublons déjà présents dans la base de connaissances.
+
+    Les entrées sans empreinte (antérieures à la détection, ou importées en
+    masse) sont d'abord indexées. Les entrées sont ensuite parcourues par ID
+    croissant: une entrée proche d'une entrée plus ancienne du même agent est
+    fusionnée dans celle-ci (compteur de doublons, statistiques de
+    génération rattachées) puis supprimée. Un commit est fait par lot.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        max_distance (int): Distance de Hamming maximale d'un doublon
+        batch_size (int): Nombre d'entrées traitées par lot
+        dry_run (bool): Compter les doublons sans les fusionner (les empreintes
+            manquantes sont tout de même calculées)
+        reindex (bool): Recréer l'index des bandes avant le parcours
+        on_progress (callable, optional): Appelée avec les statistiques après chaque lot
+
+    Returns:
+        dict: Statistiques (fingerprinted, scanned, duplicates)
+    """
+    stats = {'fingerprinted': 0, 'scanned': 0, 'duplicates': 0}
+
+    if reindex and not dry_run:
+        with db:
+            rebuild_simhash_index(db)
+
+    # Indexation des entrées sans empreinte
+    last_id = 0
+    while True:
+        rows = db.execute(
+            "SELECT id, content FROM knowledge WHERE simhash IS NULL AND id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        with db:
+            for knowledge_id, content in rows:
+                index_fingerprint(db, knowledge_id, simhash(content))
+        stats['fingerprinted'] += len(rows)
+        last_id = rows[-1][0]
+        if on_progress:
+            on_progress(dict(stats, stage='fingerprinting'))
+
+    # Fusion des doublons dans l'entrée la plus ancienne
+    merged = set()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            "SELECT id, agent, simhash, duplicate_count FROM knowledge WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+
+        with db:
+            for knowledge_id, agent, fingerprint, duplicate_count in rows:
+                stats['scanned'] += 1
+                if fingerprint is None:
+                    continue
+                keeper = find_near_duplicate(
+                    db, agent, fingerprint, max_distance, before_id=knowledge_id, exclude=merged
+                )
+                if keeper is None:
+                    continue
+
+                stats['duplicates'] += 1
+                if dry_run:
+                    merged.add(knowledge_id)
+                    continue
+
+                db.execute(
+                    "UPDATE knowledge SET duplicate_count = duplicate_count + ? WHERE id = ?",
+                    ((duplicate_count or 0) + 1, keeper)
+                )
+                db.execute(
+                    "UPDATE generation_stats SET knowledge_id = ? WHERE knowledge_id = ?",
+                    (keeper, knowledge_id)
+                )
+                # Les bandes de l'entrée sont supprimées par trigger
+                db.execute("DELETE FROM knowledge WHERE id = ?", (knowledge_id,))
+
+        last_id = rows[-1][0]
+        if on_progress:
+            on_progress(dict(stats, stage='merging'))
+
+    if stats['duplicates'] and not dry_run:
+        invalidate_bootstrap_cache()
+    return stats
@@ -0,0 +1,304 @@
+# backend/database/knowledge_io.py
+"""
+Import et export en masse de la base de connaissances.
+
+L'export produit une ligne JSON par entrée (NDJSON), éventuellement
+compressée en gzip, en parcourant la table par blocs: la mémoire utilisée
+ne dépend pas du nombre de lignes. L'import charge les lignes par lots
+dans une table temporaire, puis les fusionne en une seule instruction
+pendant laquelle les index et triggers de la table knowledge sont
+suspendus. Les doublons sont écartés grâce à l'empreinte du contenu.
+"""
+
+import os
+import sys
+import gzip
+import json
+import zlib
+import hashlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.cache import invalidate_bootstrap_cache
+from database.summary import rebuild_knowledge_summaries
+
+# Colonnes exportées, dans l'ordre
+EXPORT_COLUMNS = ('agent', 'category', 'query', 'content', 'created_at', 'content_hash')
+
+# Index conservé pendant l'import: il sert à écarter les doublons
+HASH_INDEX = 'idx_knowledge_content_hash'
+
+
+def content_hash(content):
+    """
+    Calcule l'empreinte d'un contenu de connaissance.
+
+    Args:
+        content (str): Contenu
+
+    Returns:
+        str: Empreinte SHA-256 hexadécimale du contenu normalisé
+    """
+    normalized = ' '.join(content.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def backfill_content_hashes(db, batch_size=5000):
+    """
+    Calcule l'empreinte des entrées qui n'en ont pas encore (sans commit).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        batch_size (int): Nombre de lignes traitées par lot
+
+    Returns:
+        int: Nombre de lignes mises à jour
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            """
+            SELECT id, content FROM knowledge
+            WHERE content_hash IS NULL AND id > ?
+            ORDER BY id LIMIT ?
+            """,
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            return updated
+
+        db.executemany(
+            "UPDATE knowledge SET content_hash = ? WHERE id = ?",
+            [(content_hash(row[1]), row[0]) for row in rows]
+        )
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def iter_knowledge_ndjson(db, agent=None, category=None, fetch_size=1000):
+    """
+    Parcourt la base de connaissances sous forme de lignes NDJSON.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        agent (str, optional): Restreindre à un agent
+        category (str, optional): Restreindre à une catégorie
+        fetch_size (int): Nombre de lignes lues à la fois
+
+    Yields:
+        str: Une ligne JSON terminée par un saut de ligne
+    """
+    conditions = []
+    args = []
+    if agent:
+        conditions.append('agent = ?')
+        args.append(agent)
+    if category:
+        conditions.append('category = ?')
+        args.append(category)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    cursor = db.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM knowledge {where} ORDER BY id", args)
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=str) + '\n'
+    finally:
+        cursor.close()
+
+
+def gzip_stream(lines, level=6, flush_size=64 * 1024):
+    """
+    Compresse un flux de lignes au format gzip, bloc par bloc.
+
+    Args:
+        lines (iterable): Lignes de texte
+        level (int): Niveau de compression
+        flush_size (int): Taille minimale des blocs produits
+
+    Yields:
+        bytes: Données gzip
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = []
+    pending_size = 0
+    for line in lines:
+        data = compressor.compress(line.encode('utf-8'))
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= flush_size:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+
+def iter_ndjson_lines(stream, compressed=None):
+    """
+    Parcourt les lignes d'un flux NDJSON binaire, compressé en gzip ou non.
+
+    Args:
+        stream: Flux binaire en lecture
+        compressed (bool, optional): Flux gzip; si None, détecté par l'en-tête
+            du flux lorsque celui-ci le permet (peek)
+
+    Yields:
+        bytes: Lignes du flux
+    """
+    if compressed is None:
+        peek = getattr(stream, 'peek', None)
+        compressed = bool(peek) and peek(2)[:2] == b'\x1f\x8b'
+    if compressed:
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    for line in stream:
+        yield line
+
+
+def _parse_line(line):
+    item = json.loads(line)
+    content = item.get('content')
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("contenu manquant")
+    return (
+        item.get('agent') or 'pm',
+        item.get('category') or 'Général',
+        item.get('query'),
+        content,
+        item.get('created_at'),
+        content_hash(content)
+    )
+
+
+def import_knowledge(db, lines, batch_size=10000, on_progress=None):
+    """
+    Importe des entrées de connaissance depuis des lignes NDJSON.
+
+    Les lignes sont chargées par lots (executemany) dans une table
+    temporaire sans index. La fusion dans la table knowledge se fait en
+    une transaction, index secondaires et triggers suspendus puis recréés;
+    les compteurs de synthèse sont ensuite recalculés.
+    Les entrées dont l'empreinte existe déjà (en base ou plus tôt dans le
+    fichier) sont ignorées. L'ID de projet n'est pas importé. Les
+    empreintes SimHash des entrées importées et leurs bandes d'index sont
+    calculées dans la transaction de fusion (backfill_simhashes); les
+    quasi-doublons restent fusionnés par dedupe_knowledge (commande
+    knowledge-dedupe).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        lines (iterable): Lignes NDJSON (str ou bytes)
+        batch_size (int): Nombre de lignes par lot
+        on_progress (callable, optional): Appelée avec les statistiques
+            courantes après chaque lot
+
+    Returns:
+        dict: Statistiques (read, invalid, inserted, duplicates)
+    """
+    stats = None
+    for stats in iter_import_knowledge(db, lines, batch_size):
+        if on_progress:
+            on_progress(stats)
+    return stats
+
+
+def iter_import_knowledge(db, lines, batch_size=10000):
+    """
+    Variante de import_knowledge qui produit l'avancement au fil de l'import.
+
+    Yields:
+        dict: Statistiques courantes, avec l'étape ('staging', 'merging', 'done')
+    """
+    stats = {'read': 0, 'invalid': 0, 'inserted': 0, 'duplicates': 0}
+
+    db.execute("DROP TABLE IF EXISTS temp.knowledge_import")
+    db.execute(
+        """
+        CREATE TEMP TABLE knowledge_import (
+            agent TEXT, category TEXT, query TEXT, content TEXT,
+            created_at TIMESTAMP, content_hash TEXT
+        )
+        """
+    )
+
+    try:
+        batch = []
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            stats['read'] += 1
+            try:
+                batch.append(_parse_line(line))
+            except (ValueError, AttributeError):
+                stats['invalid'] += 1
+                continue
+
+            if len(batch) >= batch_size:
+                with db:
+                    db.executemany("INSERT INTO temp.knowledge_import VALUES (?, ?, ?, ?, ?, ?)", batch)
+                batch = []
+                yield dict(stats, stage='staging')
+
+        if batch:
+            with db:
+                db.executemany("INSERT INTO temp.knowledge_import VALUES (?, ?, ?, ?, ?, ?)", batch)
+
+        staged = stats['read'] - stats['invalid']
+        yield dict(stats, stage='merging')
+
+        # BEGIN explicite: sans lui, sqlite3 validerait chaque DROP/CREATE immédiatement
+        if db.in_transaction:
+            db.commit()
+        db.execute("BEGIN")
+        try:
+            deferred = db.execute(
+                """
+                SELECT type, name, sql FROM sqlite_master
+                WHERE tbl_name = 'knowledge' AND type IN ('index', 'trigger')
+                AND sql IS NOT NULL AND name != ?
+                """,
+                (HASH_INDEX,)
+            ).fetchall()
+            for object_type, name, _ in deferred:
+                db.execute(f"DROP {object_type.upper()} {name}")
+
+            cursor = db.execute(
+                """
+                INSERT INTO knowledge (agent, category, query, content, created_at, content_hash)
+                SELECT agent, category, query, content, COALESCE(created_at, CURRENT_TIMESTAMP), content_hash
+                FROM temp.knowledge_import
+                WHERE rowid IN (SELECT MIN(rowid) FROM temp.knowledge_import GROUP BY content_hash)
+                AND content_hash NOT IN (
+                    SELECT content_hash FROM knowledge WHERE content_hash IS NOT NULL
+                )
+                ORDER BY rowid
+                """
+            )
+            stats['inserted'] = cursor.rowcount
+
+            # Index avant triggers: un trigger peut dépendre d'un index
+            for object_type, _, sql in sorted(deferred, key=lambda item: item[0] != 'index'):
+                db.execute(sql)
+
+            # Les triggers de synthèse étaient suspendus: recalcul des compteurs
+            rebuild_knowledge_summaries(db)
+            # Empreintes des entrées importées (import local: dedup dépend de ce module)
+            from database.dedup import backfill_simhashes
+            backfill_simhashes(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        invalidate_bootstrap_cache()
+
+        stats['duplicates'] = staged - stats['inserted']
+        yield dict(stats, stage='done')
+
+    finally:
+        db.execute("DROP TABLE IF EXISTS temp.knowledge_import")
@@ -0,0 +1,406 @@
+# backend/database/retention.py
+"""
+Rétention des données et archives froides.
+
+Chaque table concernée a une politique (RETENTION_POLICIES): âge maximal,
+statut des projets dont les lignes peuvent partir, nombre maximal
+d'entrées conservées par agent. Les lignes expirées sont écrites dans des
+archives froides avant d'être supprimées: un fichier NDJSON compressé par
+table et par mois (data/archive/<table>/<AAAA-MM>.ndjson.gz), auquel
+chaque passe ajoute un membre gzip. Les archives restent lisibles par
+l'API. L'espace libéré est rendu au système par PRAGMA incremental_vacuum.
+
+La tâche de fond limite son débit d'E/S pour ne pas concurrencer les
+requêtes, et un verrou de fichier évite que plusieurs workers la lancent
+en même temps.
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import fcntl
+import sqlite3
+import logging
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    DATABASE, ARCHIVE_DIR, RETENTION_POLICIES, RETENTION_INTERVAL,
+    RETENTION_BATCH_SIZE, RETENTION_IO_BUDGET, RETENTION_VACUUM_PAGES
+)
+from database.knowledge_io import gzip_stream
+from utils.cache import invalidate_bootstrap_cache
+from utils.metrics import RETENTION_ARCHIVED_ROWS
+
+logger = logging.getLogger('retention')
+
+MONTH_RE = re.compile(r'^\d{4}-\d{2}$')
+
+
+class IOBudget:
+    """Limite le débit d'E/S d'une tâche de fond en la faisant patienter"""
+
+    def __init__(self, bytes_per_second):
+        """
+        Args:
+            bytes_per_second (float): Débit autorisé (None ou 0 = illimité)
+        """
+        self.bytes_per_second = bytes_per_second
+        self._next_free = time.monotonic()
+
+    def consume(self, nbytes):
+        """
+        Décompte des octets et patiente si le débit autorisé est dépassé.
+
+        Args:
+            nbytes (int): Octets lus, écrits ou libérés
+        """
+        if not self.bytes_per_second or nbytes <= 0:
+            return
+        now = time.monotonic()
+        self._next_free = max(self._next_free, now) + nbytes / self.bytes_per_second
+        if self._next_free > now:
+            time.sleep(self._next_free - now)
+
+
+def _expired_interactions(db, policy):
+    conditions = ["i.created_at < datetime('now', ?)"]
+    args = [f"-{policy.get('max_age_days', 0)} days"]
+    statuses = policy.get('project_statuses')
+    if statuses:
+        conditions.append(f"p.status IN ({','.join('?' * len(statuses))})")
+        args.extend(statuses)
+    return db.execute(
+        f"""
+        SELECT i.id FROM interactions i
+        JOIN projects p ON p.id = i.project_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY i.id
+        """,
+        args
+    ).fetchall()
+
+
+def _expired_knowledge(db, policy):
+    conditions = []
+    args = []
+    categories = policy.get('categories')
+    where = ''
+    if categories:
+        where = f"WHERE category IN ({','.join('?' * len(categories))})"
+        args.extend(categories)
+
+    if policy.get('max_age_days') is not None:
+        conditions.append("created_at < datetime('now', ?)")
+        args.append(f"-{policy['max_age_days']} days")
+    if policy.get('max_per_agent') is not None:
+        conditions.append("rank > ?")
+        args.append(policy['max_per_agent'])
+    if not conditions:
+        return []
+
+    return db.execute(
+        f"""
+        SELECT id FROM (
+            SELECT id, created_at, ROW_NUMBER() OVER (PARTITION BY agent ORDER BY id DESC) AS rank
+            FROM knowledge {where}
+        )
+        WHERE {' OR '.join(conditions)}
+        ORDER BY id
+        """,
+        args
+    ).fetchall()
+
+
+def _expired_spans(db, policy):
+    return db.execute(
+        "SELECT id FROM spans WHERE started_at < strftime('%s', 'now') - ? ORDER BY id",
+        (policy.get('max_age_days', 0) * 86400,)
+    ).fetchall()
+
+
+# Sélection des lignes expirées et date utilisée pour ranger chaque ligne archivée
+RETENTION_TABLES = {
+    'interactions': (_expired_interactions, lambda row: str(row['created_at'])[:7]),
+    'knowledge': (_expired_knowledge, lambda row: str(row['created_at'])[:7]),
+    'spans': (_expired_spans, lambda row: time.strftime('%Y-%m', time.gmtime(row['started_at'])))
+}
+
+
+def archive_path(table, month):
+    """
+    Args:
+        table (str): Table archivée
+        month (str): Mois au format AAAA-MM
+
+    Returns:
+        str: Chemin du fichier d'archive
+    """
+    return os.path.join(ARCHIVE_DIR, table, f"{month}.ndjson.gz")
+
+
+def append_archive(table, rows, month_of):
+    """
+    Ajoute des lignes aux archives froides d'une table.
+
+    Chaque appel ajoute un membre gzip complet aux fichiers concernés et
+    les synchronise sur disque avant de rendre la main: les lignes peuvent
+    ensuite être supprimées de la base sans risque de perte.
+
+    Args:
+        table (str): Table archivée
+        rows (list): Lignes (sqlite3.Row)
+        month_of (callable): Retourne le mois (AAAA-MM) d'une ligne
+
+    Returns:
+        tuple: (octets JSON archivés, octets compressés écrits)
+    """
+    by_month = {}
+    for row in rows:
+        month = month_of(row)
+        if not MONTH_RE.match(month):
+            month = 'unknown'
+        line = json.dumps(dict(row), ensure_ascii=False, default=str) + '\n'
+        by_month.setdefault(month, []).append(line)
+
+    raw_bytes = 0
+    written = 0
+    os.makedirs(os.path.join(ARCHIVE_DIR, table), exist_ok=True)
+    for month, lines in sorted(by_month.items()):
+        raw_bytes += sum(len(line.encode('utf-8')) for line in lines)
+        with open(archive_path(table, month), 'ab') as f:
+            for chunk in gzip_stream(lines):
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+    return raw_bytes, written
+
+
+def list_archives():
+    """
+    Liste les archives froides disponibles.
+
+    Returns:
+        dict: Table -> liste de {'month', 'size'}
+    """
+    archives = {}
+    for table in RETENTION_TABLES:
+        table_dir = os.path.join(ARCHIVE_DIR, table)
+        if not os.path.isdir(table_dir):
+            continue
+        archives[table] = [
+            {'month': name[:-len('.ndjson.gz')], 'size': os.path.getsize(os.path.join(table_dir, name))}
+            for name in sorted(os.listdir(table_dir))
+            if name.endswith('.ndjson.gz')
+        ]
+    return archives
+
+
+def iter_archive(table, month=None, filters=None):
+    """
+    Parcourt les lignes archivées d'une table.
+
+    Args:
+        table (str): Table archivée
+        month (str, optional): Mois (AAAA-MM); tous les mois si None
+        filters (dict, optional): Valeurs attendues par colonne (comparées en texte)
+
+    Yields:
+        str: Lignes NDJSON
+
+    Raises:
+        ValueError: Si la table ou le mois est invalide
+    """
+    if table not in RETENTION_TABLES:
+        raise ValueError(f"Table non archivée: {table}")
+    if month is not None and month != 'unknown' and not MONTH_RE.match(month):
+        raise ValueError(f"Mois invalide: {month}")
+
+    months = [month] if month else [item['month'] for item in list_archives().get(table, [])]
+    filters = {key: str(value) for key, value in (filters or {}).items() if value is not None}
+
+    for current in months:
+        path = archive_path(table, current)
+        if not os.path.exists(path):
+            continue
+        # gzip lit les membres successifs ajoutés par chaque passe
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if filters:
+                    item = json.loads(line)
+                    if any(str(item.get(key)) != value for key, value in filters.items()):
+                        continue
+                yield line
+
+
+def incremental_vacuum(db, budget=None, pages=RETENTION_VACUUM_PAGES):
+    """
+    Rend au système les pages libres de la base, par petites tranches.
+
+    Sans effet si la base n'est pas en mode auto_vacuum=INCREMENTAL
+    (voir la commande vacuum de scripts/manage.py).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        budget (IOBudget, optional): Budget d'E/S à respecter
+        pages (int): Pages libérées par appel
+
+    Returns:
+        int: Nombre de pages libérées
+    """
+    if db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    freed = 0
+    while True:
+        free_pages = db.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_pages:
+            return freed
+        step = min(pages, free_pages)
+        # executescript exécute l'instruction jusqu'au bout: via execute, le module
+        # sqlite3 ne ferait qu'un pas (une seule page libérée)
+        db.executescript(f"PRAGMA incremental_vacuum({int(step)})")
+        freed += step
+        if budget:
+            budget.consume(step * page_size)
+
+
+def run_retention(db, policies=None, batch_size=RETENTION_BATCH_SIZE, budget=None,
+                  dry_run=False, on_progress=None):
+    """
+    Applique les politiques de rétention: archive puis supprime les lignes expirées.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données (row_factory sqlite3.Row)
+        policies (dict, optional): Politiques par table (défaut: RETENTION_POLICIES)
+        batch_size (int): Lignes archivées et supprimées par transaction
+        budget (IOBudget, optional): Budget d'E/S à respecter
+        dry_run (bool): Compter les lignes expirées sans rien modifier
+        on_progress (callable, optional): Appelée avec (table, lignes archivées, lignes expirées)
+
+    Returns:
+        dict: Statistiques par table, octets écrits et pages libérées
+    """
+    policies = RETENTION_POLICIES if policies is None else policies
+    stats = {'tables': {}, 'archive_bytes': 0, 'vacuumed_pages': 0}
+
+    for table, policy in policies.items():
+        if table not in RETENTION_TABLES or not policy:
+            continue
+        select_expired, month_of = RETENTION_TABLES[table]
+        ids = [row[0] for row in select_expired(db, policy)]
+        table_stats = stats['tables'][table] = {'expired': len(ids), 'archived': 0}
+        if dry_run or not ids:
+            continue
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            placeholders = ','.join('?' * len(batch))
+            rows = db.execute(f"SELECT * FROM {table} WHERE id IN ({placeholders}) ORDER BY id", batch).fetchall()
+
+            # Archive synchronisée sur disque avant la suppression
+            raw_bytes, written = append_archive(table, rows, month_of)
+            with db:
+                if table == 'knowledge':
+                    # Les statistiques de génération ne doivent pas pointer vers des entrées supprimées
+                    db.execute(f"UPDATE generation_stats SET knowledge_id = NULL WHERE knowledge_id IN ({placeholders})",
+                               batch)
+                db.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", batch)
+
+            table_stats['archived'] += len(rows)
+            stats['archive_bytes'] += written
+            RETENTION_ARCHIVED_ROWS.labels(table).inc(len(rows))
+            if budget:
+                budget.consume(raw_bytes + written)
+            if on_progress:
+                on_progress(table, table_stats['archived'], len(ids))
+
+        logger.info("Rétention: %s lignes de %s archivées", table_stats['archived'], table)
+
+    if not dry_run:
+        if any(item['archived'] for item in stats['tables'].values()):
+            invalidate_bootstrap_cache()
+        stats['vacuumed_pages'] = incremental_vacuum(db, budget)
+
+    return stats
+
+
+class RetentionScheduler:
+    """Lance périodiquement run_retention dans un thread de fond"""
+
+    def __init__(self, database=DATABASE, interval=RETENTION_INTERVAL, io_budget=RETENTION_IO_BUDGET):
+        self.database = database
+        self.interval = interval
+        self.io_budget = io_budget
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Démarre la tâche de fond (une fois par processus, sauf si l'intervalle est nul)"""
+        if not self.interval:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Erreur lors de la passe de rétention: %s", e)
+
+    def run_once(self):
+        """
+        Exécute une passe, sauf si un autre processus en exécute déjà une.
+
+        Returns:
+            dict: Statistiques de run_retention, ou None si la passe a été sautée
+        """
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with open(os.path.join(ARCHIVE_DIR, '.retention.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Passe de rétention déjà en cours dans un autre processus")
+                return None
+
+            conn = sqlite3.connect(self.database, timeout=30)
+            conn.row_factory = sqlite3.Row
+            try:
+                return run_retention(conn, budget=IOBudget(self.io_budget))
+            finally:
+                conn.close()
+
+
+_retention_scheduler_instance = None
+_retention_scheduler_lock = threading.Lock()
+
+
+def get_retention_scheduler():
+    """
+    Retourne l'instance unique de la tâche de rétention.
+
+    Returns:
+        RetentionScheduler: Instance de la tâche
+    """
+    global _retention_scheduler_instance
+
+    with _retention_scheduler_lock:
+        if _retention_scheduler_instance is None:
+            _retention_scheduler_instance = RetentionScheduler()
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=_retention_scheduler_instance._reset_process_state)
+
+    return _retention_scheduler_instance
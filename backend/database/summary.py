@@ -0,0 +1,326 @@
+# backend/database/summary.py
+"""
+Tables de synthèse maintenues par triggers.
+
+Les compteurs par catégorie, par agent et par projet (entrées de
+connaissance, interactions, feedbacks en attente, dernière activité)
+sont mis à jour par des triggers SQLite à chaque écriture sur les tables
+projects, knowledge, interactions et feedback. Les lectures de statistiques ne
+parcourent donc plus ces tables. rebuild_summaries recalcule tout à
+partir des tables sources (après un import en masse, par exemple).
+"""
+
+SUMMARY_TABLES = {
+    'knowledge_category_stats': '''
+        CREATE TABLE IF NOT EXISTS knowledge_category_stats (
+            category TEXT PRIMARY KEY,
+            entries INTEGER NOT NULL DEFAULT 0,
+            last_activity TIMESTAMP
+        )
+    ''',
+    'knowledge_agent_stats': '''
+        CREATE TABLE IF NOT EXISTS knowledge_agent_stats (
+            agent TEXT PRIMARY KEY,
+            entries INTEGER NOT NULL DEFAULT 0,
+            last_activity TIMESTAMP
+        )
+    ''',
+    'project_stats': '''
+        CREATE TABLE IF NOT EXISTS project_stats (
+            project_id INTEGER PRIMARY KEY,
+            knowledge_entries INTEGER NOT NULL DEFAULT 0,
+            interactions INTEGER NOT NULL DEFAULT 0,
+            completed_interactions INTEGER NOT NULL DEFAULT 0,
+            failed_interactions INTEGER NOT NULL DEFAULT 0,
+            feedback INTEGER NOT NULL DEFAULT 0,
+            pending_feedback INTEGER NOT NULL DEFAULT 0,
+            last_activity TIMESTAMP
+        )
+    '''
+}
+
+# Fragments réutilisés par les triggers
+_KNOWLEDGE_ADD = '''
+    INSERT INTO knowledge_category_stats (category, entries, last_activity)
+    VALUES (NEW.category, 1, COALESCE(NEW.created_at, CURRENT_TIMESTAMP))
+    ON CONFLICT(category) DO UPDATE SET
+        entries = entries + 1,
+        last_activity = MAX(COALESCE(last_activity, ''), excluded.last_activity);
+    INSERT INTO knowledge_agent_stats (agent, entries, last_activity)
+    VALUES (NEW.agent, 1, COALESCE(NEW.created_at, CURRENT_TIMESTAMP))
+    ON CONFLICT(agent) DO UPDATE SET
+        entries = entries + 1,
+        last_activity = MAX(COALESCE(last_activity, ''), excluded.last_activity);
+    INSERT INTO project_stats (project_id, knowledge_entries, last_activity)
+    SELECT NEW.project_id, 1, CURRENT_TIMESTAMP WHERE NEW.project_id IS NOT NULL
+    ON CONFLICT(project_id) DO UPDATE SET
+        knowledge_entries = knowledge_entries + 1,
+        last_activity = excluded.last_activity;
+'''
+
+_KNOWLEDGE_REMOVE = '''
+    UPDATE knowledge_category_stats SET entries = entries - 1 WHERE category = OLD.category;
+    DELETE FROM knowledge_category_stats WHERE category = OLD.category AND entries <= 0;
+    UPDATE knowledge_agent_stats SET entries = entries - 1 WHERE agent = OLD.agent;
+    DELETE FROM knowledge_agent_stats WHERE agent = OLD.agent AND entries <= 0;
+    UPDATE project_stats SET knowledge_entries = knowledge_entries - 1 WHERE project_id = OLD.project_id;
+'''
+
+_PROJECT_ROW = '''
+    INSERT INTO project_stats (project_id) VALUES (NEW.project_id)
+    ON CONFLICT(project_id) DO NOTHING;
+'''
+
+SUMMARY_TRIGGERS = {
+    'trg_projects_stats_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_projects_stats_insert
+        AFTER INSERT ON projects
+        BEGIN
+            {_PROJECT_ROW.replace('NEW.project_id', 'NEW.id')}
+        END
+    ''',
+    'trg_projects_stats_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_projects_stats_delete
+        AFTER DELETE ON projects
+        BEGIN
+            DELETE FROM project_stats WHERE project_id = OLD.id;
+        END
+    ''',
+    'trg_knowledge_stats_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_knowledge_stats_insert
+        AFTER INSERT ON knowledge
+        BEGIN
+            {_KNOWLEDGE_ADD}
+        END
+    ''',
+    'trg_knowledge_stats_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_knowledge_stats_delete
+        AFTER DELETE ON knowledge
+        BEGIN
+            {_KNOWLEDGE_REMOVE}
+        END
+    ''',
+    'trg_knowledge_stats_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_knowledge_stats_update
+        AFTER UPDATE OF agent, category, project_id ON knowledge
+        BEGIN
+            {_KNOWLEDGE_REMOVE}
+            {_KNOWLEDGE_ADD}
+        END
+    ''',
+    'trg_interactions_stats_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_interactions_stats_insert
+        AFTER INSERT ON interactions
+        BEGIN
+            {_PROJECT_ROW}
+            UPDATE project_stats SET
+                interactions = interactions + 1,
+                completed_interactions = completed_interactions + (NEW.status = 'completed'),
+                failed_interactions = failed_interactions + (NEW.status = 'failed'),
+                last_activity = CURRENT_TIMESTAMP
+            WHERE project_id = NEW.project_id;
+        END
+    ''',
+    'trg_interactions_stats_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_interactions_stats_update
+        AFTER UPDATE OF status ON interactions
+        BEGIN
+            {_PROJECT_ROW}
+            UPDATE project_stats SET
+                completed_interactions = completed_interactions
+                    + (NEW.status = 'completed') - (OLD.status = 'completed'),
+                failed_interactions = failed_interactions
+                    + (NEW.status = 'failed') - (OLD.status = 'failed'),
+                last_activity = CURRENT_TIMESTAMP
+            WHERE project_id = NEW.project_id;
+        END
+    ''',
+    'trg_interactions_stats_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_interactions_stats_delete
+        AFTER DELETE ON interactions
+        BEGIN
+            UPDATE project_stats SET
+                interactions = interactions - 1,
+                completed_interactions = completed_interactions - (OLD.status = 'completed'),
+                failed_interactions = failed_interactions - (OLD.status = 'failed')
+            WHERE project_id = OLD.project_id;
+        END
+    ''',
+    'trg_feedback_stats_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_stats_insert
+        AFTER INSERT ON feedback
+        BEGIN
+            {_PROJECT_ROW}
+            UPDATE project_stats SET
+                feedback = feedback + 1,
+                pending_feedback = pending_feedback + (NEW.status = 'pending'),
+                last_activity = CURRENT_TIMESTAMP
+            WHERE project_id = NEW.project_id;
+        END
+    ''',
+    'trg_feedback_stats_update': f'''
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_stats_update
+        AFTER UPDATE OF status ON feedback
+        BEGIN
+            {_PROJECT_ROW}
+            UPDATE project_stats SET
+                pending_feedback = pending_feedback
+                    + (NEW.status = 'pending') - (OLD.status = 'pending'),
+                last_activity = CURRENT_TIMESTAMP
+            WHERE project_id = NEW.project_id;
+        END
+    ''',
+    'trg_feedback_stats_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_stats_delete
+        AFTER DELETE ON feedback
+        BEGIN
+            UPDATE project_stats SET
+                feedback = feedback - 1,
+                pending_feedback = pending_feedback - (OLD.status = 'pending')
+            WHERE project_id = OLD.project_id;
+        END
+    '''
+}
+
+
+def ensure_summary_tables(db):
+    """
+    Crée les tables de synthèse et leurs triggers (sans commit).
+
+    Lors de la première création, les tables sont remplies à partir des
+    données existantes.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+    """
+    existing = {
+        row[0] for row in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({})".format(
+                ','.join('?' * len(SUMMARY_TABLES))
+            ),
+            tuple(SUMMARY_TABLES)
+        )
+    }
+
+    for sql in SUMMARY_TABLES.values():
+        db.execute(sql)
+    for sql in SUMMARY_TRIGGERS.values():
+        db.execute(sql)
+
+    if len(existing) < len(SUMMARY_TABLES):
+        rebuild_summaries(db)
+
+
+def rebuild_knowledge_summaries(db):
+    """
+    Recalcule les compteurs de connaissances à partir de la table knowledge (sans commit).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+    """
+    db.execute("DELETE FROM knowledge_category_stats")
+    db.execute(
+        """
+        INSERT INTO knowledge_category_stats (category, entries, last_activity)
+        SELECT category, COUNT(*), MAX(created_at) FROM knowledge GROUP BY category
+        """
+    )
+    db.execute("DELETE FROM knowledge_agent_stats")
+    db.execute(
+        """
+        INSERT INTO knowledge_agent_stats (agent, entries, last_activity)
+        SELECT agent, COUNT(*), MAX(created_at) FROM knowledge GROUP BY agent
+        """
+    )
+    db.execute(
+        """
+        UPDATE project_stats SET knowledge_entries = COALESCE(
+            (SELECT COUNT(*) FROM knowledge WHERE knowledge.project_id = project_stats.project_id), 0
+        )
+        """
+    )
+
+
+def rebuild_summaries(db):
+    """
+    Recalcule toutes les tables de synthèse à partir des tables sources (sans commit).
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+    """
+    db.execute("DELETE FROM project_stats")
+    db.execute(
+        """
+        INSERT INTO project_stats
+        (project_id, knowledge_entries, interactions, completed_interactions,
+         failed_interactions, feedback, pending_feedback, last_activity)
+        SELECT
+            p.id,
+            0,
+            COALESCE(i.total, 0), COALESCE(i.completed, 0), COALESCE(i.failed, 0),
+            COALESCE(f.total, 0), COALESCE(f.pending, 0),
+            NULLIF(MAX(COALESCE(i.last_activity, ''), COALESCE(f.last_activity, ''), COALESCE(p.created_at, '')), '')
+        FROM projects p
+        LEFT JOIN (
+            SELECT project_id, COUNT(*) AS total,
+                   SUM(status = 'completed') AS completed, SUM(status = 'failed') AS failed,
+                   MAX(COALESCE(completed_at, created_at)) AS last_activity
+            FROM interactions GROUP BY project_id
+        ) i ON i.project_id = p.id
+        LEFT JOIN (
+            SELECT project_id, COUNT(*) AS total, SUM(status = 'pending') AS pending,
+                   MAX(created_at) AS last_activity
+            FROM feedback GROUP BY project_id
+        ) f ON f.project_id = p.id
+        """
+    )
+    rebuild_knowledge_summaries(db)
+
+
+def get_knowledge_categories(db):
+    """
+    Retourne les catégories de connaissances non vides.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+
+    Returns:
+        list: Catégories avec leur nombre d'entrées et leur dernière activité
+    """
+    rows = db.execute(
+        "SELECT category, entries, last_activity FROM knowledge_category_stats WHERE entries > 0 ORDER BY category"
+    ).fetchall()
+    return [
+        {'category': row['category'], 'count': row['entries'], 'last_activity': row['last_activity']}
+        for row in rows
+    ]
+
+
+def get_summary_stats(db, project_id=None):
+    """
+    Retourne les statistiques de synthèse.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        project_id (int, optional): Restreindre les statistiques de projets à un projet
+
+    Returns:
+        dict: Compteurs par catégorie, par agent et par projet
+    """
+    agents = db.execute(
+        "SELECT agent, entries, last_activity FROM knowledge_agent_stats WHERE entries > 0 ORDER BY agent"
+    ).fetchall()
+
+    if project_id is None:
+        projects = db.execute("SELECT * FROM project_stats ORDER BY project_id").fetchall()
+    else:
+        projects = db.execute("SELECT * FROM project_stats WHERE project_id = ?", (project_id,)).fetchall()
+
+    return {
+        'categories': get_knowledge_categories(db),
+        'agents': [
+            {'agent': row['agent'], 'count': row['entries'], 'last_activity': row['last_activity']}
+            for row in agents
+        ],
+        'projects': [dict(row) for row in projects]
+    }
@@ -0,0 +1,31 @@
+# backend/gunicorn.conf.py
+"""
+Configuration gunicorn de l'application.
+
+L'application est préchargée dans le processus maître (preload_app): les
+modules, la configuration et les modelfiles lus sont partagés en
+copie-sur-écriture par les workers, et les agents ne sont vérifiés dans
+Ollama qu'une fois, par le maître. Chaque worker démarre ensuite ses
+propres tâches de fond (métriques, rétention).
+
+Usage (depuis backend/):
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    # Processus maître, avant le lancement des workers
+    if server.cfg.preload_app:
+        from agents.agent_manager import get_agent_manager
+        get_agent_manager().ensure_agents_ready()
+
+
+def post_worker_init(worker):
+    from app import init_worker
+    init_worker()
@@ -0,0 +1,344 @@
+# backend/utils/admission.py
+"""
+Contrôle d'admission pour les générations.
+
+Les générations envoyées à Ollama passent par un nombre limité de
+créneaux. Lorsqu'ils sont tous occupés, les appelants attendent et sont
+servis par ordre de priorité (chat interactif, puis révisions sur
+feedback, puis workflows, puis requêtes groupées), et par ordre
+d'arrivée au sein d'une même priorité.
+
+La file d'attente de chaque priorité est bornée: au-delà, la demande est
+refusée immédiatement avec une estimation du délai avant de réessayer.
+Un seau à jetons par client limite en amont le débit de chaque appelant.
+
+Les créneaux sont partagés entre les appelants bloquants (threads) et les
+appelants asynchrones (boucle asyncio du point d'entrée ASGI), servis dans
+la même file.
+"""
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    INFERENCE_PRIORITIES, INFERENCE_QUEUE_LIMITS,
+    CLIENT_RATE_PER_MINUTE, CLIENT_RATE_BURST
+)
+from utils.metrics import ADMISSION_REJECTIONS
+
+# Durée de service supposée tant qu'aucune génération n'a été mesurée (secondes)
+DEFAULT_SERVICE_TIME = 10.0
+
+
+class AdmissionError(Exception):
+    """Demande refusée avant d'atteindre Ollama"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionError):
+    """La file d'attente de la priorité demandée est pleine"""
+
+    def __init__(self, priority, position, retry_after):
+        super().__init__(
+            f"File d'attente {priority} pleine (position {position})",
+            retry_after
+        )
+        self.priority = priority
+        self.position = position
+
+
+class RateLimitedError(AdmissionError):
+    """Le client a dépassé son débit autorisé"""
+
+
+class DeadlineExceededError(AdmissionError, TimeoutError):
+    """Le délai du client a expiré avant l'appel à Ollama"""
+
+
+def priority_rank(priority):
+    """
+    Convertit une classe de priorité en rang numérique.
+
+    Args:
+        priority (str|int): Nom de la classe (ex: "feedback") ou rang
+
+    Returns:
+        int: Rang, plus petit = plus prioritaire
+
+    Raises:
+        ValueError: Si la classe de priorité est inconnue
+    """
+    if isinstance(priority, int):
+        return priority
+    try:
+        return INFERENCE_PRIORITIES[priority]
+    except KeyError:
+        raise ValueError(f"Priorité inconnue: {priority}")
+
+
+class PrioritySlots:
+    """Sémaphore borné dont les attentes sont servies par priorité"""
+
+    def __init__(self, capacity, queue_limits=None):
+        """
+        Args:
+            capacity (int): Nombre de créneaux simultanés
+            queue_limits (dict, optional): Nombre maximal d'appelants en attente
+                par classe de priorité (None = illimité)
+        """
+        self.capacity = capacity
+        self.queue_limits = INFERENCE_QUEUE_LIMITS if queue_limits is None else queue_limits
+        self.service_time = None
+        self._available = capacity
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        # Réveils des appelants asynchrones en attente, par entrée de la file
+        self._async_waiters = {}
+
+    def acquire(self, priority='interactive', timeout=None, cancel_token=None):
+        """
+        Réserve un créneau.
+
+        Args:
+            priority (str|int): Classe de priorité de l'appelant
+            timeout (float, optional): Attente maximale en secondes
+            cancel_token (CancellationToken, optional): Jeton dont l'annulation
+                retire l'appelant de la file d'attente
+
+        Returns:
+            bool: True si un créneau a été obtenu, False si le délai a expiré
+
+        Raises:
+            QueueFullError: Si la file d'attente de cette priorité est pleine
+            GenerationCancelled: Si le jeton est annulé pendant l'attente
+        """
+        rank = priority_rank(priority)
+        entry = (rank, next(self._sequence))
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+            cancel_token.add_callback(self._wake_waiters)
+
+        try:
+            with self._condition:
+                if self._available == 0 or self._waiters:
+                    self._check_queue_limit(priority, rank)
+                heapq.heappush(self._waiters, entry)
+                try:
+                    while not (self._available > 0 and self._waiters[0] == entry):
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled()
+                        remaining = deadline - time.monotonic() if deadline is not None else None
+                        if remaining is not None and remaining <= 0:
+                            return False
+                        self._condition.wait(remaining)
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    self._available -= 1
+                    return True
+                finally:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    # Le suivant dans la file peut éventuellement prendre un créneau
+                    self._notify_all()
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(self._wake_waiters)
+
+    async def acquire_async(self, priority='interactive', timeout=None, cancel_token=None):
+        """
+        Réserve un créneau sans bloquer la boucle asyncio.
+
+        L'appelant prend place dans la même file que les appelants bloquants.
+
+        Args:
+            priority (str|int): Classe de priorité de l'appelant
+            timeout (float, optional): Attente maximale en secondes
+            cancel_token (CancellationToken, optional): Jeton dont l'annulation
+                retire l'appelant de la file d'attente
+
+        Returns:
+            bool: True si un créneau a été obtenu, False si le délai a expiré
+
+        Raises:
+            QueueFullError: Si la file d'attente de cette priorité est pleine
+            GenerationCancelled: Si le jeton est annulé pendant l'attente
+        """
+        rank = priority_rank(priority)
+        entry = (rank, next(self._sequence))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        wakeup = asyncio.Event()
+
+        # Appelée sous le verrou, éventuellement depuis un autre thread
+        def wake():
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # Boucle fermée: plus personne à réveiller
+                pass
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+            cancel_token.add_callback(wake)
+
+        try:
+            with self._condition:
+                if self._available == 0 or self._waiters:
+                    self._check_queue_limit(priority, rank)
+                heapq.heappush(self._waiters, entry)
+                self._async_waiters[entry] = wake
+            try:
+                while True:
+                    with self._condition:
+                        # Effacé sous le verrou: une libération ultérieure le positionnera
+                        wakeup.clear()
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled()
+                        if self._available > 0 and self._waiters[0] == entry:
+                            self._available -= 1
+                            return True
+                    remaining = deadline - loop.time() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                with self._condition:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    del self._async_waiters[entry]
+                    self._notify_all()
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(wake)
+
+    def _notify_all(self):
+        # Appelée sous le verrou: réveille les threads et les appelants asynchrones en attente
+        self._condition.notify_all()
+        for wake in self._async_waiters.values():
+            wake()
+
+    def _wake_waiters(self):
+        # Réveille les appelants en attente pour qu'ils vérifient leur jeton
+        with self._condition:
+            self._notify_all()
+
+    def _check_queue_limit(self, priority, rank):
+        limit = self.queue_limits.get(priority) if isinstance(priority, str) else None
+        if limit is None:
+            return
+        same_class = sum(1 for waiter_rank, _ in self._waiters if waiter_rank == rank)
+        if same_class < limit:
+            return
+        ahead = sum(1 for waiter_rank, _ in self._waiters if waiter_rank <= rank)
+        raise QueueFullError(priority, ahead + 1, self.estimate_wait(ahead))
+
+    def estimate_wait(self, ahead):
+        """
+        Estime le délai avant qu'un appelant placé derrière `ahead` autres obtienne un créneau.
+
+        Args:
+            ahead (int): Nombre d'appelants servis avant lui
+
+        Returns:
+            int: Délai estimé en secondes (arrondi au supérieur)
+        """
+        service_time = self.service_time or DEFAULT_SERVICE_TIME
+        return max(1, math.ceil(service_time * math.ceil((ahead + 1) / self.capacity)))
+
+    def observe_service_time(self, seconds):
+        """
+        Met à jour la durée moyenne d'occupation d'un créneau (moyenne mobile).
+
+        Args:
+            seconds (float): Durée de la dernière génération
+        """
+        if self.service_time is None:
+            self.service_time = seconds
+        else:
+            self.service_time = 0.8 * self.service_time + 0.2 * seconds
+
+    def release(self):
+        """Libère un créneau"""
+        with self._condition:
+            if self._available >= self.capacity:
+                raise ValueError("Créneau libéré plus de fois qu'il n'a été réservé")
+            self._available += 1
+            self._notify_all()
+
+    def waiting(self):
+        """Retourne le nombre d'appelants en attente"""
+        with self._condition:
+            return len(self._waiters)
+
+
+class ClientRateLimiter:
+    """Seau à jetons par client"""
+
+    def __init__(self, rate_per_minute=CLIENT_RATE_PER_MINUTE, burst=CLIENT_RATE_BURST, max_clients=10000):
+        """
+        Args:
+            rate_per_minute (float): Jetons regagnés par minute
+            burst (int): Capacité du seau (rafale maximale)
+            max_clients (int): Nombre de seaux conservés avant purge des seaux pleins
+        """
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, client_id, cost=1, priority='interactive'):
+        """
+        Consomme des jetons pour un client.
+
+        Args:
+            client_id (str): Identifiant du client (en-tête X-Client-Id ou adresse IP)
+            cost (int): Nombre de jetons demandés (plafonné à la rafale)
+            priority (str): Classe de priorité de la demande (pour les métriques)
+
+        Raises:
+            RateLimitedError: Si le client n'a plus assez de jetons
+        """
+        if self.rate <= 0:
+            return
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated = self._buckets.get(client_id, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+            if tokens < cost:
+                self._buckets[client_id] = (tokens, now)
+                retry_after = max(1, math.ceil((cost - tokens) / self.rate))
+                ADMISSION_REJECTIONS.labels('rate_limit', priority).inc()
+                raise RateLimitedError(f"Limite de débit atteinte pour le client {client_id}", retry_after)
+
+            self._buckets[client_id] = (tokens - cost, now)
+            if len(self._buckets) > self.max_clients:
+                self._purge(now)
+
+    def _purge(self, now):
+        # Un seau redevenu plein équivaut à un client inconnu
+        self._buckets = {
+            client_id: (tokens, updated)
+            for client_id, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
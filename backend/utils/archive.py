@@ -0,0 +1,221 @@
+# backend/utils/archive.py
+"""
+Archives ZIP de projets produites en flux.
+
+L'archive est écrite directement dans la réponse HTTP, sans fichier
+temporaire. Chaque archive contient un manifeste (taille, date de
+modification et empreinte de chaque fichier) qui permet ensuite de
+produire une archive incrémentale ne contenant que les fichiers modifiés.
+"""
+
+import os
+import json
+import hashlib
+import zipfile
+from pathlib import Path
+from datetime import datetime
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import ARCHIVE_CHUNK_SIZE, ARCHIVE_STORE_THRESHOLD
+from utils.file_manager import PROJECTS_DIR
+from utils.metrics import FILE_IO_BYTES
+
+MANIFEST_NAME = '.manifest.json'
+
+# Formats déjà compressés: les recompresser ne fait que consommer du CPU
+COMPRESSED_EXTENSIONS = {
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif',
+    '.mp3', '.mp4', '.webm', '.ogg', '.pdf', '.woff', '.woff2',
+    '.docx', '.xlsx', '.pptx'
+}
+
+
+class _StreamBuffer:
+    """Flux en écriture seule, vidé au fur et à mesure de l'envoi"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compress_type(path, size):
+    if size >= ARCHIVE_STORE_THRESHOLD or path.suffix.lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def scan_project_files(project_name, include_temp=False):
+    """
+    Liste les fichiers d'un projet avec leur taille et leur date de modification.
+
+    Args:
+        project_name (str): Nom du projet
+        include_temp (bool): Inclure les fichiers temporaires
+
+    Returns:
+        dict: Chemin relatif (format POSIX) -> {'size', 'mtime_ns'},
+            ou None si le projet n'existe pas
+    """
+    project_dir = PROJECTS_DIR / project_name
+    if not project_dir.exists():
+        return None
+
+    files = {}
+    for root, _, names in os.walk(project_dir):
+        rel_dir = Path(root).relative_to(project_dir)
+
+        # Ignorer le dossier temp si spécifié
+        if not include_temp and 'temp' in rel_dir.parts:
+            continue
+
+        for name in names:
+            stat = os.stat(os.path.join(root, name))
+            files[(rel_dir / name).as_posix()] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    return files
+
+
+def changed_files(current, since_manifest):
+    """
+    Détermine les fichiers à inclure dans une archive.
+
+    Un fichier est considéré inchangé si sa taille et sa date de modification
+    sont identiques à celles du manifeste de référence.
+
+    Args:
+        current (dict): Résultat de scan_project_files
+        since_manifest (dict, optional): Manifeste de l'archive de référence
+
+    Returns:
+        tuple: (chemins à archiver, chemins supprimés depuis la référence)
+    """
+    if not since_manifest:
+        return sorted(current), []
+
+    previous = since_manifest.get('files', {})
+    changed = [
+        rel for rel, entry in sorted(current.items())
+        if rel not in previous
+        or previous[rel].get('size') != entry['size']
+        or previous[rel].get('mtime_ns') != entry['mtime_ns']
+    ]
+    deleted = sorted(set(previous) - set(current))
+    return changed, deleted
+
+
+def read_archive_manifest(fileobj):
+    """
+    Lit le manifeste contenu dans une archive produite précédemment.
+
+    Args:
+        fileobj: Fichier ZIP (chemin ou objet fichier positionnable)
+
+    Returns:
+        dict: Manifeste, ou None si l'archive n'en contient pas
+
+    Raises:
+        zipfile.BadZipFile: Si le fichier n'est pas une archive ZIP
+    """
+    with zipfile.ZipFile(fileobj) as zipf:
+        for name in zipf.namelist():
+            if name.endswith('/' + MANIFEST_NAME):
+                return json.loads(zipf.read(name).decode('utf-8'))
+    return None
+
+
+def stream_project_archive(project_name, since_manifest=None, include_temp=False,
+                           chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Produit l'archive ZIP d'un projet sous forme de blocs d'octets.
+
+    Les fichiers déjà compressés ou volumineux sont stockés sans
+    compression. Avec un manifeste de référence, seuls les fichiers
+    modifiés depuis cette archive sont inclus; le manifeste écrit en fin
+    d'archive décrit toujours l'état complet du projet, de sorte que les
+    archives incrémentales peuvent s'enchaîner.
+
+    Args:
+        project_name (str): Nom du projet
+        since_manifest (dict, optional): Manifeste de l'archive de référence
+        include_temp (bool): Inclure les fichiers temporaires
+        chunk_size (int): Taille des blocs lus sur le disque
+
+    Yields:
+        bytes: Contenu de l'archive
+    """
+    project_dir = PROJECTS_DIR / project_name
+    current = scan_project_files(project_name, include_temp) or {}
+    to_archive, deleted = changed_files(current, since_manifest)
+    previous = (since_manifest or {}).get('files', {})
+
+    manifest = {
+        'project': project_name,
+        'created_at': datetime.now().isoformat(),
+        'base': since_manifest.get('created_at') if since_manifest else None,
+        'files': {},
+        'deleted': deleted
+    }
+    included = set(to_archive)
+    for rel, entry in current.items():
+        if rel not in included:
+            manifest['files'][rel] = dict(entry, sha256=previous[rel].get('sha256'))
+
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        for rel in to_archive:
+            path = project_dir / rel
+            try:
+                source = open(path, 'rb')
+                info = zipfile.ZipInfo.from_file(path, f"{project_name}/{rel}")
+            except FileNotFoundError:
+                # Fichier supprimé pendant la production de l'archive
+                manifest['deleted'].append(rel)
+                continue
+
+            entry = current[rel]
+            info.compress_type = _compress_type(path, info.file_size)
+            digest = hashlib.sha256()
+
+            with source, zipf.open(info, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as target:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    target.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            FILE_IO_BYTES.labels('archive', 'read').inc(entry['size'])
+            manifest['files'][rel] = dict(entry, sha256=digest.hexdigest())
+            data = buffer.drain()
+            if data:
+                yield data
+
+        zipf.writestr(
+            f"{project_name}/{MANIFEST_NAME}",
+            json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True),
+            compress_type=zipfile.ZIP_DEFLATED
+        )
+
+    yield buffer.drain()
@@ -0,0 +1,97 @@
+# backend/utils/cache.py
+"""
+Cache en mémoire à durée de vie courte.
+
+Les valeurs sont recalculées au plus une fois à la fois par clé (les
+requêtes concurrentes attendent le premier calcul au lieu de le répéter)
+et sont invalidées explicitement par les écritures concernées. Le cache
+est propre à chaque processus: dans un déploiement multi-workers, la
+durée de vie borne le délai de propagation d'une écriture faite par un
+autre worker.
+"""
+
+import os
+import time
+import threading
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import BOOTSTRAP_CACHE_TTL
+
+
+class TTLCache:
+    """Cache clé/valeur avec expiration et invalidation"""
+
+    def __init__(self, ttl):
+        """
+        Args:
+            ttl (float): Durée de vie des entrées en secondes
+        """
+        self.ttl = ttl
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, key, loader):
+        """
+        Retourne la valeur en cache ou la calcule.
+
+        Args:
+            key (hashable): Clé de l'entrée
+            loader (callable): Fonction sans argument calculant la valeur
+
+        Returns:
+            Valeur en cache ou fraîchement calculée
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Un autre thread a pu calculer la valeur pendant l'attente
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+
+            generation = self._generation
+            value = loader()
+
+            with self._lock:
+                # Une écriture survenue pendant le calcul rend la valeur obsolète
+                if generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def invalidate(self, key=None):
+        """
+        Invalide une entrée, ou tout le cache.
+
+        Args:
+            key (hashable, optional): Clé à invalider (toutes si None)
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# Cache des données d'amorçage de l'interface (/api/bootstrap)
+BOOTSTRAP_CACHE = TTLCache(BOOTSTRAP_CACHE_TTL)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=BOOTSTRAP_CACHE._reset_process_state)
+
+
+def invalidate_bootstrap_cache():
+    """À appeler après toute écriture affectant projets, livrables ou connaissances"""
+    BOOTSTRAP_CACHE.invalidate()
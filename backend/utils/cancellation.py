@@ -0,0 +1,148 @@
+# backend/utils/cancellation.py
+"""
+Annulation coopérative des générations.
+
+Un jeton d'annulation est créé par l'appelant (requête de chat, workflow)
+et transmis jusqu'à l'appel à Ollama. La génération, reçue en flux, vérifie
+le jeton à chaque fragment: dès qu'il est déclenché, la connexion est
+fermée (Ollama arrête alors la génération) et le créneau d'inférence est
+libéré. Un appelant encore en file d'attente est retiré de la file.
+
+Les jetons des requêtes de chat en cours sont enregistrés sous l'ID de la
+requête, pour qu'un client puisse annuler explicitement une requête.
+"""
+
+import os
+import uuid
+import threading
+
+
+class GenerationCancelled(Exception):
+    """Génération interrompue par son jeton d'annulation"""
+
+    def __init__(self, reason='cancelled', partial=''):
+        super().__init__(f"Génération annulée ({reason})")
+        self.reason = reason
+        self.partial = partial
+
+
+class CancellationToken:
+    """Signal d'annulation partagé entre l'appelant et la génération"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason='cancelled'):
+        """
+        Déclenche l'annulation.
+
+        Args:
+            reason (str): Motif de l'annulation (ex: 'paused', 'client_disconnected')
+
+        Returns:
+            bool: True si le jeton n'était pas déjà annulé
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        return True
+
+    def add_callback(self, callback):
+        """
+        Enregistre une fonction appelée à l'annulation (immédiatement si déjà annulé).
+
+        Args:
+            callback (callable): Fonction sans argument
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self, partial=''):
+        """
+        Raises:
+            GenerationCancelled: Si le jeton a été annulé
+        """
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason, partial)
+
+    def wait(self, timeout=None):
+        """
+        Attend l'annulation.
+
+        Args:
+            timeout (float, optional): Attente maximale en secondes
+
+        Returns:
+            bool: True si le jeton a été annulé
+        """
+        return self._event.wait(timeout)
+
+
+class CancellationRegistry:
+    """Jetons des requêtes en cours, indexés par ID de requête"""
+
+    def __init__(self):
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def register(self, token, request_id=None):
+        """
+        Args:
+            token (CancellationToken): Jeton de la requête
+            request_id (str, optional): ID fourni par le client (généré sinon)
+
+        Returns:
+            str: ID de la requête
+        """
+        request_id = request_id or uuid.uuid4().hex
+        with self._lock:
+            self._tokens[request_id] = token
+        return request_id
+
+    def discard(self, request_id):
+        with self._lock:
+            self._tokens.pop(request_id, None)
+
+    def cancel(self, request_id, reason='cancelled'):
+        """
+        Annule une requête en cours.
+
+        Returns:
+            bool: True si la requête était en cours
+        """
+        with self._lock:
+            token = self._tokens.get(request_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+
+# Requêtes de chat en cours dans ce processus
+ACTIVE_REQUESTS = CancellationRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=ACTIVE_REQUESTS._reset_process_state)
@@ -0,0 +1,170 @@
+# backend/utils/checkpoint.py
+"""
+Points de reprise des générations d'étapes.
+
+La sortie d'une étape est écrite au fil du flux dans le dossier temp/ du
+projet: le texte reçu est ajouté à <step_id>.partial.md et ses
+métadonnées (nombre de tokens, empreinte du prompt) sont réécrites dans
+<step_id>.partial.json à chaque vidage sur disque. Si le processus meurt
+en cours d'étape, la génération suivante de la même étape (même agent,
+même palier, même prompt) repart du texte sauvegardé au lieu de tout
+régénérer. Les fichiers sont supprimés une fois le livrable enregistré.
+
+Le fichier de texte est verrouillé (flock) pendant la génération: un
+autre processus ne peut pas reprendre une étape encore en cours, et le
+verrou d'un processus mort est libéré par le système.
+"""
+
+import os
+import json
+import time
+import fcntl
+import hashlib
+from datetime import datetime
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import CHECKPOINT_FLUSH_TOKENS, CHECKPOINT_FLUSH_SECONDS
+from utils.file_manager import ensure_project_directories
+from utils.metrics import FILE_IO_BYTES
+
+
+class CheckpointBusyError(RuntimeError):
+    """L'étape est en cours de génération dans un autre processus"""
+
+
+class StepCheckpoint:
+    """Sortie partielle d'une étape, sauvegardée au fil de la génération"""
+
+    def __init__(self, project_name, step_id, agent, tier, prompt):
+        """
+        Args:
+            project_name (str): Nom du projet
+            step_id (str): ID de l'étape
+            agent (str): Agent de l'étape
+            tier (str): Palier de génération
+            prompt (str): Prompt de l'étape, hors consigne de reprise
+        """
+        temp_dir = ensure_project_directories(project_name) / 'temp'
+        self.step_id = step_id
+        self.agent = agent
+        self.tier = tier
+        self.text_path = temp_dir / f"{step_id}.partial.md"
+        self.meta_path = temp_dir / f"{step_id}.partial.json"
+        self.fingerprint = hashlib.sha256(f"{agent}\0{tier}\0{prompt}".encode('utf-8')).hexdigest()
+        # Texte et tokens repris d'une génération interrompue
+        self.resumed_text = ''
+        self.resumed_tokens = 0
+        self.tokens = 0
+        self._file = None
+        self._pending = 0
+        self._flushed_at = 0.0
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        """
+        Verrouille le point de reprise et charge la sortie sauvegardée, si elle
+        correspond à la même génération (sinon elle est effacée).
+
+        Returns:
+            StepCheckpoint: self
+
+        Raises:
+            CheckpointBusyError: Si l'étape est en cours dans un autre processus
+        """
+        self._file = open(self.text_path, 'a+', encoding='utf-8', errors='replace')
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            raise CheckpointBusyError(f"Étape {self.step_id} déjà en cours de génération")
+
+        meta = self._read_meta()
+        self._file.seek(0)
+        if meta and meta.get('fingerprint') == self.fingerprint:
+            self.resumed_text = self._file.read()
+            self.resumed_tokens = meta.get('tokens', 0) if self.resumed_text else 0
+            FILE_IO_BYTES.labels('checkpoint', 'read').inc(len(self.resumed_text.encode('utf-8')))
+        else:
+            # Sortie d'une autre génération (prompt modifié entre-temps): repartir de zéro
+            self._file.truncate()
+            self.resumed_text = ''
+            self.resumed_tokens = 0
+
+        self.tokens = self.resumed_tokens
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+        return self
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def append(self, text):
+        """
+        Ajoute un fragment reçu d'Ollama (un token); à utiliser comme on_token.
+
+        Args:
+            text (str): Fragment de texte
+        """
+        self._file.write(text)
+        FILE_IO_BYTES.labels('checkpoint', 'write').inc(len(text.encode('utf-8')))
+        self.tokens += 1
+        self._pending += 1
+        if self._pending >= CHECKPOINT_FLUSH_TOKENS or \
+                time.monotonic() - self._flushed_at >= CHECKPOINT_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Écrit sur disque le texte reçu puis les métadonnées correspondantes"""
+        if self._file is None or not self._pending:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        meta = {
+            'step_id': self.step_id,
+            'agent': self.agent,
+            'tier': self.tier,
+            'fingerprint': self.fingerprint,
+            'tokens': self.tokens,
+            'updated_at': datetime.now().isoformat()
+        }
+        tmp_path = self.meta_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+        self._pending = 0
+        self._flushed_at = time.monotonic()
+
+    def commit(self):
+        """Supprime le point de reprise, une fois le livrable de l'étape enregistré"""
+        for path in (self.meta_path, self.text_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._pending = 0
+
+    def close(self):
+        """Vide la sortie reçue sur disque et libère le verrou"""
+        if self._file is None:
+            return
+        try:
+            if self.text_path.exists():
+                self.flush()
+        finally:
+            self._file.close()
+            self._file = None
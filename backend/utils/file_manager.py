@@ -11,11 +11,19 @@ import json
 from pathlib import Path
 from datetime import datetime
 
+from utils.metrics import FILE_IO_BYTES
+from utils.cache import invalidate_bootstrap_cache
+
 # Chemin de base pour les données
 BASE_DATA_DIR = Path('data')
 PROJECTS_DIR = BASE_DATA_DIR / 'projects'
 
 
+def _record_io(operation, direction, content):
+    """Comptabilise les octets lus ou écrits par une opération"""
+    FILE_IO_BYTES.labels(operation, direction).inc(len(content.encode('utf-8')))
+
+
 def ensure_project_directories(project_name):
     """
     Assure que les répertoires nécessaires pour un projet existent.
@@ -48,6 +56,7 @@ def save_brief(project_name, content):
     
     with open(brief_path, 'w', encoding='utf-8') as file:
         file.write(content)
+    _record_io('brief', 'write', content)
     
     # Aussi sauvegarder une copie en JSON pour faciliter l'accès par API
     brief_meta = {
@@ -78,7 +87,9 @@ def get_brief(project_name):
         return None
     
     with open(brief_path, 'r', encoding='utf-8') as file:
-        return file.read()
+        content = file.read()
+    _record_io('brief', 'read', content)
+    return content
 
 
 def save_deliverable(project_name, deliverable_id, content, agent=None):
@@ -99,6 +110,7 @@ def save_deliverable(project_name, deliverable_id, content, agent=None):
     
     with open(deliverable_path, 'w', encoding='utf-8') as file:
         file.write(content)
+    _record_io('deliverable', 'write', content)
     
     # Sauvegarder les métadonnées
     deliverable_meta = {
@@ -113,6 +125,7 @@ def save_deliverable(project_name, deliverable_id, content, agent=None):
     with open(meta_path, 'w', encoding='utf-8') as file:
         json.dump(deliverable_meta, file, ensure_ascii=False, indent=2)
     
+    invalidate_bootstrap_cache()
     return str(deliverable_path)
 
 
@@ -137,7 +150,9 @@ def get_deliverable(project_name, deliverable_id):
         return None
     
     with open(deliverable_path, 'r', encoding='utf-8') as file:
-        return file.read()
+        content = file.read()
+    _record_io('deliverable', 'read', content)
+    return content
 
 
 def save_feedback(project_name, deliverable_id, feedback_content):
@@ -162,6 +177,7 @@ def save_feedback(project_name, deliverable_id, feedback_content):
     
     with open(feedback_path, 'w', encoding='utf-8') as file:
         file.write(feedback_content)
+    _record_io('feedback', 'write', feedback_content)
     
     # Sauvegarder les métadonnées
     feedback_meta = {
@@ -198,7 +214,9 @@ def get_feedback(project_name, deliverable_id):
         return None
     
     with open(feedback_path, 'r', encoding='utf-8') as file:
-        return file.read()
+        content = file.read()
+    _record_io('feedback', 'read', content)
+    return content
 
 
 def list_project_files(project_name):
@@ -0,0 +1,257 @@
+# backend/utils/logs.py
+"""
+Journalisation non bloquante.
+
+Les threads de requête et de workflow ne font que déposer leurs
+enregistrements dans une file bornée (QueueHandler); un unique thread
+d'arrière-plan (QueueListener) les formate et les écrit. Le thread
+appelant ne paie que le filtrage, l'ajout du contexte (trace, span,
+projet, étape) et l'interpolation du message.
+
+Les messages INFO et DEBUG fréquents sont échantillonnés par modèle de
+message (d'où le formatage paresseux "%s" plutôt que les f-strings dans
+les modules sollicités à chaque requête): au-delà de LOG_SAMPLE_BURST
+occurrences par fenêtre, ils sont écartés et leur nombre est reporté sur
+le prochain enregistrement conservé du même modèle.
+
+La configuration est faite une seule fois, par configure_logging().
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Import des configurations
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import (
+    LOG_LEVEL, LOG_FORMAT, LOG_FILE, LOG_QUEUE_SIZE, LOG_SAMPLE_BURST, LOG_SAMPLE_WINDOW,
+    LOG_SAMPLE_MAX_KEYS
+)
+from utils.metrics import LOG_RECORDS_DROPPED
+from utils.tracing import current_span
+
+# Champs de contexte ajoutés par log_context() (ex: project_id, step_id)
+_log_context = contextvars.ContextVar('log_context', default={})
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Ajoute des champs aux enregistrements émis dans le bloc.
+
+    Args:
+        **fields: Champs de contexte (ex: project_id=3, step_id="05_frontend")
+    """
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Ajoute la trace, le span et les champs de log_context() à chaque enregistrement"""
+
+    def filter(self, record):
+        current = current_span()
+        if current is not None:
+            record.trace_id = current.trace_id
+            record.span_id = current.span_id
+            if current.project_id is not None:
+                record.project_id = current.project_id
+        for key, value in _log_context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Limite le nombre de messages INFO/DEBUG d'un même modèle par fenêtre de temps"""
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW, max_keys=LOG_SAMPLE_MAX_KEYS):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._counters = {}
+        self._next_purge = time.monotonic() + window
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        # Appelée sous le verrou: oublie les fenêtres expirées sans message écarté
+        # à signaler, puis remet tout à zéro si trop de modèles restent suivis
+        self._counters = {
+            key: counter for key, counter in self._counters.items()
+            if counter[2] or now - counter[0] < self.window
+        }
+        if len(self._counters) >= self.max_keys:
+            self._counters.clear()
+        self._next_purge = now + self.window
+
+    def filter(self, record):
+        if not self.burst or record.levelno >= logging.WARNING:
+            return True
+
+        # Le modèle du message (avant interpolation) identifie les messages fréquents
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_purge or len(self._counters) >= self.max_keys:
+                self._purge(now)
+            window_start, emitted, suppressed = self._counters.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, emitted = now, 0
+            if emitted >= self.burst:
+                self._counters[key] = (window_start, emitted, suppressed + 1)
+                LOG_RECORDS_DROPPED.labels('sampled').inc()
+                return False
+            self._counters[key] = (window_start, emitted + 1, 0)
+        if suppressed:
+            record.sampled = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler qui n'attend jamais: une file pleine fait écarter l'enregistrement"""
+
+    def handle(self, record):
+        # La file est thread-safe: pas besoin du verrou d'E/S du handler
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def prepare(self, record):
+        # Seule l'interpolation du message est faite ici (les arguments pourraient
+        # changer avant l'écriture); le formatage complet (JSON, trace d'exception)
+        # est fait par le thread d'écriture. Ce handler est installé seul sur le
+        # logger racine: l'enregistrement est modifié en place plutôt que copié.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels('queue_full').inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objet JSON par ligne"""
+
+    # Champs de contexte recopiés s'ils sont présents
+    CONTEXT_FIELDS = ('trace_id', 'span_id', 'project_id', 'step_id', 'agent', 'sampled')
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName
+        }
+        for field in self.CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def create_pipeline(stream=None, json_format=True, queue_size=LOG_QUEUE_SIZE,
+                    sample_burst=LOG_SAMPLE_BURST, sample_window=LOG_SAMPLE_WINDOW):
+    """
+    Crée la file, le handler côté appelant et le thread d'écriture.
+
+    Args:
+        stream: Flux de sortie (stderr par défaut)
+        json_format (bool): Enregistrements JSON (sinon format texte)
+        queue_size (int): Nombre maximal d'enregistrements en attente
+        sample_burst (int): Messages conservés par modèle et par fenêtre (0 = tous)
+        sample_window (float): Durée de la fenêtre d'échantillonnage en secondes
+
+    Returns:
+        tuple: (NonBlockingQueueHandler, QueueListener non démarré)
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(SamplingFilter(sample_burst, sample_window))
+    handler.addFilter(ContextFilter())
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    return handler, listener
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def configure_logging(level=LOG_LEVEL, json_format=None, log_file=LOG_FILE):
+    """
+    Installe la journalisation non bloquante sur le logger racine (une seule fois).
+
+    Args:
+        level (str): Niveau minimal
+        json_format (bool, optional): Format JSON; par défaut selon LOG_FORMAT
+        log_file (str, optional): Fichier de sortie (ajout), sinon stderr
+
+    Returns:
+        QueueListener: Thread d'écriture
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline[1]
+
+        if json_format is None:
+            json_format = LOG_FORMAT == 'json'
+        stream = open(log_file, 'a', encoding='utf-8', buffering=1) if log_file else None
+        handler, listener = create_pipeline(stream, json_format)
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+
+        listener.start()
+        _pipeline = (handler, listener)
+        atexit.register(_stop_listener)
+        return listener
+
+
+def _stop_listener():
+    # Vide la file avant la sortie du processus
+    if _pipeline is not None and _pipeline[1]._thread is not None:
+        _pipeline[1].stop()
+
+
+def _reset_process_state():
+    global _pipeline_lock
+    _pipeline_lock = threading.Lock()
+    if _pipeline is None:
+        return
+    # Le thread d'écriture ne survit pas au fork: nouvelle file et nouveau thread
+    handler, listener = _pipeline
+    handler.queue = queue.Queue(handler.queue.maxsize)
+    listener.queue = handler.queue
+    listener._thread = None
+    listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_process_state)
@@ -0,0 +1,491 @@
+# backend/utils/metrics.py
+"""
+Métriques au format Prometheus pour l'application IA-WebAgency.
+
+Les mesures sont enregistrées sans verrou dans des fragments propres à
+chaque thread, puis agrégées à la lecture; les fragments des threads
+terminés sont repris dans un fragment de base puis abandonnés. Chaque
+processus (worker gunicorn) écrit périodiquement un instantané de ses
+valeurs dans METRICS_DIR (un fichier par PID, remplacé à chaque
+écriture); la route /metrics fusionne les instantanés des workers en
+vie afin que les totaux soient corrects quel que soit le worker qui
+répond.
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+logger = logging.getLogger('metrics')
+
+# Bornes par défaut des histogrammes de durée (en secondes)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Bornes des histogrammes de latence SQLite (en secondes)
+SQLITE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+# Bornes des histogrammes de débit de génération (tokens par seconde)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200)
+
+
+class _Timer:
+    """Gestionnaire de contexte mesurant une durée et l'enregistrant"""
+
+    __slots__ = ('child', 'started')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _CounterChild:
+    """Valeur d'un compteur ou d'une jauge pour un jeu de labels"""
+
+    __slots__ = ('registry', 'key')
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def inc(self, amount=1):
+        shard = self.registry._shard()
+        shard[self.key] = shard.get(self.key, 0) + amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    """Histogramme pour un jeu de labels"""
+
+    __slots__ = ('registry', 'key', 'buckets')
+
+    def __init__(self, registry, key, buckets):
+        self.registry = registry
+        self.key = key
+        self.buckets = buckets
+
+    def observe(self, value):
+        shard = self.registry._shard()
+        values = shard.get(self.key)
+        if values is None:
+            # Compteurs par intervalle (+Inf inclus), puis somme et nombre d'observations
+            values = shard[self.key] = [0] * (len(self.buckets) + 3)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class Metric:
+    """Définition d'une série de métriques"""
+
+    def __init__(self, registry, kind, name, documentation, labelnames=(), buckets=None):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets else None
+        self._children = {}
+        self._default = None if self.labelnames else self._make_child(())
+
+    def _make_child(self, values):
+        key = (self.name, values)
+        if self.kind == 'histogram':
+            return _HistogramChild(self.registry, key, self.buckets)
+        return _CounterChild(self.registry, key)
+
+    def labels(self, *values):
+        """
+        Retourne la série correspondant aux valeurs de labels.
+
+        Args:
+            *values: Valeurs des labels, dans l'ordre de labelnames
+
+        Returns:
+            Série sur laquelle appeler inc/dec/observe/time
+        """
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._make_child(values))
+        return child
+
+    # Raccourcis pour les métriques sans labels
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+
+def _merge(target, key, value):
+    current = target.get(key)
+    if current is None:
+        target[key] = list(value) if isinstance(value, list) else value
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            current[index] += item
+    else:
+        target[key] = current + value
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """Registre des métriques d'un processus"""
+
+    def __init__(self, metrics_dir=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        """
+        Initialise le registre.
+
+        Args:
+            metrics_dir (str): Dossier des instantanés partagés entre workers
+            flush_interval (float): Intervalle d'écriture des instantanés (secondes)
+        """
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._local = threading.local()
+        # Fragment de chaque thread vivant, et valeurs reprises des threads terminés
+        self._shards = {}
+        self._base = {}
+        self._worker_id = str(os.getpid())
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = {}
+            self._local.values = values
+            thread = threading.current_thread()
+            with self._lock:
+                self._prune_shards()
+                self._shards[thread] = values
+            return values
+
+    def _prune_shards(self):
+        # Appelée sous le verrou: un thread terminé n'écrit plus dans son fragment
+        for thread in [thread for thread in self._shards if not thread.is_alive()]:
+            for key, value in self._shards.pop(thread).items():
+                _merge(self._base, key, value)
+
+    def _register(self, kind, name, documentation, labelnames=(), buckets=None):
+        metric = Metric(self, kind, name, documentation, labelnames, buckets)
+        self.metrics[name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register('counter', name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register('gauge', name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._register('histogram', name, documentation, labelnames, buckets)
+
+    def snapshot(self):
+        """
+        Agrège les fragments de tous les threads du processus.
+
+        Returns:
+            dict: Valeurs par (nom, labels)
+        """
+        with self._lock:
+            self._prune_shards()
+            shards = list(self._shards.values())
+            merged = {}
+            for key, value in self._base.items():
+                _merge(merged, key, value)
+
+        for shard in shards:
+            for key, value in shard.copy().items():
+                _merge(merged, key, value)
+        return merged
+
+    def _snapshot_path(self):
+        return os.path.join(self.metrics_dir, f"{self._worker_id}.json")
+
+    def flush(self):
+        """Écrit l'instantané du processus dans le dossier partagé"""
+        entries = [[name, list(labels), value] for (name, labels), value in self.snapshot().items()]
+        payload = {'pid': os.getpid(), 'updated_at': time.time(), 'values': entries}
+
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            path = self._snapshot_path()
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("Erreur lors de l'écriture des métriques: %s", e)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start_flusher(self):
+        """Démarre l'écriture périodique des instantanés (une fois par processus)"""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+
+    def _after_fork(self):
+        """Repart d'un état vide dans un processus enfant (worker gunicorn)"""
+        restart = self._flusher is not None
+        self._lock = threading.Lock()
+        self._reset_process_state()
+        if restart:
+            self.start_flusher()
+
+    @staticmethod
+    def _is_alive(pid):
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def collect(self):
+        """
+        Fusionne les valeurs de tous les workers.
+
+        Les instantanés des workers arrêtés sont supprimés: leurs valeurs
+        ne sont plus comptées (remise à zéro des compteurs, au sens de Prometheus).
+
+        Returns:
+            dict: Valeurs agrégées par (nom, labels)
+        """
+        self.flush()
+        merged = {}
+
+        try:
+            filenames = os.listdir(self.metrics_dir)
+        except OSError:
+            filenames = []
+
+        for filename in filenames:
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.metrics_dir, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            pid = payload.get('pid', 0)
+            if filename != f"{pid}.json" or not self._is_alive(pid):
+                # Worker arrêté (ou instantané d'un ancien format)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+
+            for name, labels, value in payload.get('values', []):
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                _merge(merged, (name, tuple(labels)), value)
+
+        return merged
+
+    def render(self):
+        """
+        Produit l'exposition texte Prometheus des métriques agrégées.
+
+        Returns:
+            str: Métriques au format texte 0.0.4
+        """
+        values = self.collect()
+        by_metric = {}
+        for (name, labels), value in values.items():
+            by_metric.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+
+            for labels, value in sorted(by_metric.get(name, [])):
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(metric.labelnames, labels)} {_format_number(value)}")
+                    continue
+
+                cumulative = 0
+                bounds = list(metric.buckets) + [float('inf')]
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    le = f'le="{_format_number(float(bound))}"'
+                    lines.append(f"{name}_bucket{_format_labels(metric.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(metric.labelnames, labels)} {_format_number(float(value[-2]))}")
+                lines.append(f"{name}_count{_format_labels(metric.labelnames, labels)} {value[-1]}")
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=REGISTRY._after_fork)
+
+
+# Inférence Ollama
+OLLAMA_REQUEST_DURATION = REGISTRY.histogram(
+    'agency_ollama_request_duration_seconds',
+    "Durée des appels de génération à Ollama",
+    ['agent']
+)
+OLLAMA_REQUESTS = REGISTRY.counter(
+    'agency_ollama_requests_total',
+    "Nombre d'appels de génération à Ollama par résultat",
+    ['agent', 'status']
+)
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.histogram(
+    'agency_ollama_tokens_per_second',
+    "Débit de génération calculé à partir de eval_count/eval_duration",
+    ['agent'],
+    buckets=TOKENS_PER_SECOND_BUCKETS
+)
+OLLAMA_PROMPT_EVAL_DURATION = REGISTRY.histogram(
+    'agency_ollama_prompt_eval_seconds',
+    "Durée de lecture du prompt (prompt_eval_duration)",
+    ['agent']
+)
+OLLAMA_GENERATED_TOKENS = REGISTRY.counter(
+    'agency_ollama_generated_tokens_total',
+    "Nombre de tokens générés (eval_count)",
+    ['agent']
+)
+OLLAMA_PROMPT_TOKENS = REGISTRY.counter(
+    'agency_ollama_prompt_tokens_total',
+    "Nombre de tokens de prompt lus (prompt_eval_count)",
+    ['agent']
+)
+INFERENCE_QUEUE_WAIT = REGISTRY.histogram(
+    'agency_inference_queue_wait_seconds',
+    "Temps d'attente d'un créneau d'inférence",
+    ['agent']
+)
+INFERENCE_IN_FLIGHT = REGISTRY.gauge(
+    'agency_ollama_inflight_generations',
+    "Générations en cours vers Ollama"
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    'agency_admission_rejections_total',
+    "Demandes refusées avant l'appel à Ollama",
+    ['reason', 'priority']
+)
+
+# Workflow
+WORKFLOWS_ACTIVE = REGISTRY.gauge(
+    'agency_workflows_active',
+    "Workflows de projets en cours d'exécution"
+)
+WORKFLOW_STEP_DURATION = REGISTRY.histogram(
+    'agency_workflow_step_duration_seconds',
+    "Durée des étapes de workflow",
+    ['step_id']
+)
+
+# Stockage
+SQLITE_QUERY_DURATION = REGISTRY.histogram(
+    'agency_sqlite_query_duration_seconds',
+    "Durée des requêtes SQLite par helper",
+    ['helper'],
+    buckets=SQLITE_BUCKETS
+)
+FILE_IO_BYTES = REGISTRY.counter(
+    'agency_file_io_bytes_total',
+    "Octets lus et écrits par file_manager",
+    ['operation', 'direction']
+)
+RETENTION_ARCHIVED_ROWS = REGISTRY.counter(
+    'agency_retention_archived_rows_total',
+    "Lignes déplacées vers les archives froides par la tâche de rétention",
+    ['table']
+)
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    'agency_log_records_dropped_total',
+    "Enregistrements de journal écartés (file pleine ou échantillonnage)",
+    ['reason']
+)
+CHECKPOINT_RESUMED_TOKENS = REGISTRY.counter(
+    'agency_checkpoint_resumed_tokens_total',
+    "Tokens repris d'un point de reprise au lieu d'être régénérés",
+    ['agent']
+)
+
+
+def record_generation_stats(agent_name, response_data):
+    """
+    Enregistre les statistiques renvoyées par Ollama pour une génération.
+
+    Args:
+        agent_name (str): Nom de l'agent
+        response_data (dict): Réponse d'Ollama (eval_count, eval_duration, ...)
+    """
+    eval_count = response_data.get('eval_count') or 0
+    eval_duration = response_data.get('eval_duration') or 0
+    prompt_eval_count = response_data.get('prompt_eval_count') or 0
+    prompt_eval_duration = response_data.get('prompt_eval_duration') or 0
+
+    if eval_count:
+        OLLAMA_GENERATED_TOKENS.labels(agent_name).inc(eval_count)
+        if eval_duration:
+            OLLAMA_TOKENS_PER_SECOND.labels(agent_name).observe(eval_count / (eval_duration / 1e9))
+    if prompt_eval_count:
+        OLLAMA_PROMPT_TOKENS.labels(agent_name).inc(prompt_eval_count)
+    if prompt_eval_duration:
+        OLLAMA_PROMPT_EVAL_DURATION.labels(agent_name).observe(prompt_eval_duration / 1e9)
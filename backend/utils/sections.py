@@ -0,0 +1,272 @@
+# backend/utils/sections.py
+"""
+Découpage des livrables markdown en sections.
+
+Un livrable est découpé à chaque titre ATX (# à ######) hors des blocs de
+code; le texte qui précède le premier titre forme la section 'intro'.
+L'identifiant d'une section est dérivé du chemin de ses titres (ex:
+"architecture/base-de-donnees"): il reste stable tant que les titres ne
+changent pas, quel que soit le contenu régénéré. Le découpage est sans
+perte: la concaténation des sections redonne le texte d'origine.
+
+Les révisions ciblées s'en servent pour ne régénérer que les sections
+visées par un feedback, puis les remettre en place dans le livrable.
+"""
+
+import re
+import unicodedata
+
+HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+FENCE_RE = re.compile(r'^[ \t]*(```|~~~)')
+# Référence explicite à une section dans un feedback: "#architecture/base-de-donnees" ou "[section: securite]"
+REFERENCE_RE = re.compile(r'(?:^|[\s(])#([a-z0-9][a-z0-9/-]*)|\[section:\s*([^\]]+)\]', re.IGNORECASE)
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+INTRO_ID = 'intro'
+# Mots trop courants pour rattacher un feedback à un titre
+STOPWORDS = {
+    'les', 'des', 'une', 'pour', 'avec', 'dans', 'sur', 'par', 'est', 'sont', 'aux', 'the', 'and',
+    'section', 'partie', 'livrable', 'plus', 'tout', 'toute', 'toutes', 'tous', 'cette', 'faut'
+}
+
+
+class Section:
+    """Section d'un livrable: son titre et le texte qui le suit jusqu'au titre suivant"""
+
+    __slots__ = ('id', 'level', 'title', 'text')
+
+    def __init__(self, id, level, title, text):
+        self.id = id
+        self.level = level    # 0 pour l'introduction
+        self.title = title
+        self.text = text      # Ligne de titre comprise, fins de ligne conservées
+
+    @property
+    def heading(self):
+        """Ligne de titre de la section (chaîne vide pour l'introduction)"""
+        return self.text.split('\n', 1)[0] if self.level else ''
+
+    def to_dict(self):
+        return {'id': self.id, 'level': self.level, 'title': self.title, 'chars': len(self.text)}
+
+
+def normalize(text):
+    """Minuscules sans accents"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def slugify(title):
+    """Identifiant d'un titre: minuscules sans accents, mots séparés par des tirets"""
+    return '-'.join(WORD_RE.findall(normalize(title))) or 'section'
+
+
+def parse_sections(markdown):
+    """
+    Découpe un livrable markdown en sections.
+
+    Args:
+        markdown (str): Contenu du livrable
+
+    Returns:
+        list: Sections (Section) dans l'ordre du document
+    """
+    sections = []
+    path = []        # (niveau, slug) des titres englobants
+    used = {}
+    fence = None
+    current = None
+    lines = []
+
+    def close():
+        if current is not None or lines:
+            section = current or Section(INTRO_ID, 0, '', '')
+            section.text = ''.join(lines)
+            sections.append(section)
+
+    for line in markdown.splitlines(keepends=True):
+        stripped = line.rstrip('\r\n')
+        fence_match = FENCE_RE.match(stripped)
+        if fence_match:
+            marker = fence_match.group(1)
+            fence = None if fence == marker else (fence or marker)
+        heading = None if fence or fence_match else HEADING_RE.match(stripped)
+
+        if heading:
+            close()
+            level = len(heading.group(1))
+            title = heading.group(2).strip()
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, slugify(title)))
+
+            # Deux titres identiques sous le même parent: suffixe -2, -3...
+            base = '/'.join(slug for _, slug in path)
+            used[base] = used.get(base, 0) + 1
+            section_id = base if used[base] == 1 else f"{base}-{used[base]}"
+
+            current = Section(section_id, level, title, '')
+            lines = [line]
+        else:
+            lines.append(line)
+
+    close()
+    return sections
+
+
+def render_sections(sections):
+    """Recompose le texte d'une suite de sections"""
+    return ''.join(section.text for section in sections)
+
+
+def section_block(sections, index):
+    """
+    Étendue d'une section et de ses sous-sections.
+
+    Returns:
+        tuple: (début, fin) des indices, fin exclue
+    """
+    level = sections[index].level
+    end = index + 1
+    if level:
+        while end < len(sections) and sections[end].level > level:
+            end += 1
+    return index, end
+
+
+def match_sections(sections, feedback):
+    """
+    Détermine les sections visées par un feedback.
+
+    Par ordre de priorité: références explicites à un identifiant
+    ("#architecture", "[section: Sécurité]"), titres cités dans le feedback,
+    puis titres dont la majorité des mots significatifs apparaissent dans
+    le feedback.
+
+    Args:
+        sections (list): Sections du livrable
+        feedback (str): Texte du feedback (éventuellement fusionné)
+
+    Returns:
+        list: Identifiants des sections visées (vide si aucune ne l'est clairement)
+    """
+    by_id = {section.id: section for section in sections}
+    by_slug = {}
+    for section in sections:
+        by_slug.setdefault(section.id.rsplit('/', 1)[-1], section.id)
+        by_slug.setdefault(slugify(section.title), section.id)
+
+    explicit = []
+    for hashed, bracketed in REFERENCE_RE.findall(feedback):
+        reference = hashed.lower() if hashed else slugify(bracketed)
+        section_id = reference if reference in by_id else by_slug.get(reference)
+        if section_id is None:
+            # Identifiant partiel: fin du chemin des titres
+            section_id = next((candidate for candidate in by_id if candidate.endswith('/' + reference)), None)
+        if section_id and section_id not in explicit:
+            explicit.append(section_id)
+    if explicit:
+        return _in_document_order(sections, explicit)
+
+    flat = ' '.join(WORD_RE.findall(normalize(feedback)))
+    words = set(flat.split())
+    cited = []
+    overlapping = []
+    for section in sections:
+        if not section.level:
+            continue
+        title_words = WORD_RE.findall(normalize(section.title))
+        title = ' '.join(title_words)
+        if len(title) >= 4 and re.search(r'\b' + re.escape(title) + r'\b', flat):
+            cited.append(section.id)
+            continue
+        significant = {word for word in title_words if len(word) >= 4 and word not in STOPWORDS}
+        if significant and len(significant & words) * 2 > len(significant):
+            overlapping.append(section.id)
+
+    return _in_document_order(sections, cited or overlapping)
+
+
+def _in_document_order(sections, section_ids):
+    wanted = set(section_ids)
+    return [section.id for section in sections if section.id in wanted]
+
+
+def section_spans(sections, section_ids):
+    """
+    Regroupe les sections visées (avec leurs sous-sections) en plages contiguës.
+
+    Args:
+        sections (list): Sections du livrable
+        section_ids (list): Identifiants des sections visées
+
+    Returns:
+        list: Plages (début, fin) d'indices, fin exclue, sans chevauchement
+    """
+    wanted = set(section_ids)
+    spans = []
+    for index, section in enumerate(sections):
+        if section.id not in wanted:
+            continue
+        start, end = section_block(sections, index)
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def splice_sections(sections, replacements):
+    """
+    Remplace des plages de sections par un nouveau texte.
+
+    Args:
+        sections (list): Sections du livrable
+        replacements (dict): (début, fin) -> texte de remplacement
+
+    Returns:
+        str: Livrable recomposé
+    """
+    parts = []
+    index = 0
+    for (start, end), text in sorted(replacements.items()):
+        parts.append(render_sections(sections[index:start]))
+        parts.append(text)
+        index = end
+    parts.append(render_sections(sections[index:]))
+    return ''.join(parts)
+
+
+def fit_section(section, original, response):
+    """
+    Adapte la réponse d'un agent pour la remettre à la place d'une plage de sections.
+
+    Le bloc de code qui envelopperait la réponse est retiré, le titre
+    d'origine est rétabli (l'identifiant de la section ne change donc pas)
+    et les lignes vides qui séparaient la plage de la suite sont conservées.
+
+    Args:
+        section (Section): Première section de la plage
+        original (str): Texte d'origine de la plage
+        response (str): Réponse de l'agent
+
+    Returns:
+        str: Texte de remplacement (le texte d'origine si la réponse est vide)
+    """
+    text = response.strip()
+    lines = text.split('\n')
+    if len(lines) >= 2 and FENCE_RE.match(lines[0]) and FENCE_RE.match(lines[-1]):
+        text = '\n'.join(lines[1:-1]).strip()
+    if not text:
+        return original
+
+    if section.heading:
+        first, _, rest = text.partition('\n')
+        heading = HEADING_RE.match(first)
+        if heading and len(heading.group(1)) == section.level:
+            text = section.heading + '\n' + rest
+        else:
+            text = section.heading + '\n' + text
+
+    trailing = original[len(original.rstrip('\n')):]
+    return text.rstrip('\n') + trailing
@@ -0,0 +1,353 @@
+# backend/utils/tracing.py
+"""
+Traçage léger des workflows et des requêtes de chat.
+
+Chaque exécution de workflow et chaque requête de chat reçoit un
+identifiant de trace; chaque phase (préparation du prompt, génération,
+sauvegarde, ...) est enregistrée comme un span imbriqué avec sa durée
+et ses attributs. Les spans terminés sont mis en tampon et écrits dans
+SQLite par lots depuis un thread d'arrière-plan.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import contextvars
+from collections import deque
+
+# Import des configurations
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import DATABASE, TRACE_BATCH_SIZE, TRACE_FLUSH_INTERVAL
+
+logger = logging.getLogger('tracing')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def _new_id():
+    return os.urandom(8).hex()
+
+
+class Span:
+    """Phase chronométrée d'une trace"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'project_id',
+                 'started_at', 'duration_ms', 'attributes', '_start', '_token')
+
+    def __init__(self, name, trace_id, parent_id=None, project_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.project_id = project_id
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.attributes = attributes or {}
+        self._start = time.perf_counter()
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        if exc_type is not None:
+            self.attributes['error'] = str(exc) or exc_type.__name__
+        _current_span.reset(self._token)
+        EXPORTER.add(self)
+        return False
+
+
+class _NoopSpan:
+    """Span utilisé hors de toute trace: n'enregistre rien"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def start_trace(name, project_id=None, **attributes):
+    """
+    Démarre une nouvelle trace dont le span racine est retourné.
+
+    Args:
+        name (str): Nom du span racine (ex: "workflow.run", "chat")
+        project_id (int, optional): Projet associé à la trace
+        **attributes: Attributs du span racine
+
+    Returns:
+        Span: Span racine, à utiliser comme gestionnaire de contexte
+    """
+    return Span(name, _new_id(), project_id=project_id, attributes=attributes)
+
+
+def span(name, **attributes):
+    """
+    Crée un span enfant du span courant.
+
+    Hors d'une trace, retourne un span inactif afin de ne rien coûter.
+
+    Args:
+        name (str): Nom de la phase
+        **attributes: Attributs du span
+
+    Returns:
+        Span: Span enfant, à utiliser comme gestionnaire de contexte
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, parent.project_id, attributes)
+
+
+def record_span(name, started_at, duration_ms, **attributes):
+    """
+    Enregistre un span enfant déjà terminé, avec des temps explicites.
+
+    Utile pour les phases mesurées par un tiers (ex: prefill et décodage
+    rapportés par Ollama).
+
+    Args:
+        name (str): Nom de la phase
+        started_at (float): Début de la phase (timestamp Unix)
+        duration_ms (float): Durée en millisecondes
+        **attributes: Attributs du span
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return
+    child = Span(name, parent.trace_id, parent.span_id, parent.project_id, attributes)
+    child.started_at = started_at
+    child.duration_ms = duration_ms
+    EXPORTER.add(child)
+
+
+def current_span():
+    """Retourne le span courant ou None"""
+    return _current_span.get()
+
+
+def current_trace_id():
+    """Retourne l'identifiant de la trace courante ou None"""
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+class SpanExporter:
+    """Écrit les spans terminés dans SQLite par lots"""
+
+    def __init__(self, database=DATABASE, batch_size=TRACE_BATCH_SIZE, flush_interval=TRACE_FLUSH_INTERVAL):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        self._buffer = deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, finished_span):
+        # deque.append est atomique: aucun verrou sur le chemin critique
+        self._buffer.append(finished_span)
+        if self._thread is None:
+            self._start()
+        elif len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Écrit immédiatement les spans en attente"""
+        rows = []
+        while self._buffer:
+            try:
+                item = self._buffer.popleft()
+            except IndexError:
+                break
+            rows.append((
+                item.trace_id, item.span_id, item.parent_id, item.name, item.project_id,
+                item.started_at, item.duration_ms,
+                json.dumps(item.attributes, ensure_ascii=False, default=str) if item.attributes else None
+            ))
+
+        if not rows:
+            return 0
+
+        try:
+            conn = sqlite3.connect(self.database, timeout=30)
+            try:
+                with conn:
+                    conn.executemany(
+                        """
+                        INSERT INTO spans
+                        (trace_id, span_id, parent_id, name, project_id, started_at, duration_ms, attributes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        rows
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error("Erreur lors de l'écriture de %s spans: %s", len(rows), e)
+            return 0
+
+        return len(rows)
+
+
+EXPORTER = SpanExporter()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=EXPORTER._reset_process_state)
+
+
+def _row_to_dict(row):
+    return {
+        'trace_id': row['trace_id'],
+        'span_id': row['span_id'],
+        'parent_id': row['parent_id'],
+        'name': row['name'],
+        'started_at': row['started_at'],
+        'duration_ms': round(row['duration_ms'], 3) if row['duration_ms'] is not None else None,
+        'attributes': json.loads(row['attributes']) if row['attributes'] else {},
+        'children': []
+    }
+
+
+def build_span_trees(rows):
+    """
+    Reconstruit les arbres de spans à partir de lignes de la table spans.
+
+    Args:
+        rows (list): Lignes de la table spans
+
+    Returns:
+        list: Spans racines, avec leurs enfants imbriqués
+    """
+    nodes = {}
+    for row in rows:
+        node = _row_to_dict(row)
+        nodes[node['span_id']] = node
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['children'].append(node)
+
+    for node in nodes.values():
+        node['children'].sort(key=lambda child: child['started_at'])
+    roots.sort(key=lambda root: root['started_at'], reverse=True)
+    return roots
+
+
+def get_project_traces(db, project_id, limit=20):
+    """
+    Retourne les traces les plus récentes d'un projet sous forme d'arbres.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        project_id (int): ID du projet
+        limit (int): Nombre maximal de traces
+
+    Returns:
+        list: Spans racines des traces du projet
+    """
+    EXPORTER.flush()
+    rows = db.execute(
+        """
+        SELECT * FROM spans WHERE trace_id IN (
+            SELECT trace_id FROM spans
+            WHERE project_id = ? AND parent_id IS NULL
+            ORDER BY started_at DESC LIMIT ?
+        )
+        """,
+        (project_id, limit)
+    ).fetchall()
+    return build_span_trees(rows)
+
+
+def flame_summary(db, project_id=None, limit=500):
+    """
+    Agrège la durée des spans par chemin (racine;enfant;...), façon flame graph.
+
+    Args:
+        db (sqlite3.Connection): Connexion à la base de données
+        project_id (int, optional): Restreindre à un projet
+        limit (int): Nombre maximal de traces récentes prises en compte
+
+    Returns:
+        list: Chemins avec nombre d'occurrences, durée totale et durée propre
+    """
+    EXPORTER.flush()
+    where = "WHERE parent_id IS NULL" + (" AND project_id = ?" if project_id is not None else "")
+    args = ((project_id,) if project_id is not None else ()) + (limit,)
+    rows = db.execute(
+        f"""
+        SELECT * FROM spans WHERE trace_id IN (
+            SELECT trace_id FROM spans {where}
+            ORDER BY started_at DESC LIMIT ?
+        )
+        """,
+        args
+    ).fetchall()
+
+    summary = {}
+
+    def visit(node, prefix):
+        path = f"{prefix};{node['name']}" if prefix else node['name']
+        total = node['duration_ms'] or 0
+        children_total = sum(child['duration_ms'] or 0 for child in node['children'])
+        entry = summary.setdefault(path, {'path': path, 'count': 0, 'total_ms': 0.0, 'self_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += total
+        entry['self_ms'] += max(0.0, total - children_total)
+        for child in node['children']:
+            visit(child, path)
+
+    for root in build_span_trees(rows):
+        visit(root, '')
+
+    result = sorted(summary.values(), key=lambda entry: entry['total_ms'], reverse=True)
+    for entry in result:
+        entry['total_ms'] = round(entry['total_ms'], 3)
+        entry['self_ms'] = round(entry['self_ms'], 3)
+    return result
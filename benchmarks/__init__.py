@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+"""
+Outils de mesure de performance pour l'application IA-WebAgency.
+
+Ce package fournit un serveur Ollama simulé et des harnais de benchmark
+permettant de mesurer le débit et la latence du backend sans modèle réel.
+"""
@@ -0,0 +1,256 @@
+# benchmarks/connections.py
+"""
+Capacité en connexions de chat simultanées: gunicorn (workers synchrones)
+contre le point d'entrée ASGI (uvicorn, un seul processus).
+
+Pour chaque niveau de concurrence C, C clients ouvrent en même temps un
+chat en flux (POST /api/agents/<agent>/stream) vers un serveur Ollama
+simulé lent. Les créneaux d'inférence (OLLAMA_MAX_PARALLEL) sont portés à
+C, si bien que seul le serveur HTTP limite le nombre de générations en
+cours. Sont mesurés:
+
+- les chats terminés et en échec (délai client compris)
+- le délai jusqu'au premier fragment (TTFT) et la durée totale, p50/p95
+- le nombre maximal de générations simultanées reçues par Ollama
+- la mémoire de l'ensemble des processus du serveur (PSS, pic)
+
+Les mesures mémoire nécessitent Linux.
+
+Usage:
+    python -m benchmarks.connections --concurrency 10 50 200 --workers 4 --output connections.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+import httpx
+
+from benchmarks.load import git_revision, free_port, BACKEND_DIR
+from benchmarks.startup import read_memory
+from benchmarks.mock_ollama import MockOllamaServer, add_mock_arguments, settings_from_args
+
+AGENT = 'pixel'
+
+
+def server_command(server, port, workers):
+    """
+    Returns:
+        list: Commande de lancement du serveur
+    """
+    if server == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', '--app-dir', BACKEND_DIR, '--host', '127.0.0.1',
+                '--port', str(port), '--log-level', 'warning', 'asgi:app']
+    return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f"127.0.0.1:{port}",
+            '--pythonpath', BACKEND_DIR, '--log-level', 'warning',
+            '--config', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'), 'app:app']
+
+
+def process_tree(pid):
+    """PID d'un processus et de ses descendants (Linux)"""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", 'r') as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def tree_memory(pid):
+    """PSS cumulée du serveur (Mo), None si /proc n'est pas disponible"""
+    memories = [memory for memory in (read_memory(p) for p in process_tree(pid)) if memory]
+    return round(sum(m['pss_mb'] for m in memories), 1) if memories else None
+
+
+async def wait_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/api/health", timeout=2)).status_code == 200:
+                    return True
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    return False
+
+
+async def stream_chat(client, url, index, timeout):
+    """
+    Ouvre un chat en flux et le lit jusqu'à la ligne finale.
+
+    Returns:
+        dict: ok, ttft et durée (secondes)
+    """
+    started = time.perf_counter()
+    ttft = None
+    try:
+        async with client.stream('POST', f"{url}/api/agents/{AGENT}/stream",
+                                 json={'message': f"Proposition de maquette numéro {index}"},
+                                 headers={'X-Client-Id': f"bench-{index}"}, timeout=timeout) as response:
+            if response.status_code != 200:
+                return {'ok': False, 'error': f"HTTP {response.status_code}"}
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if 'token' in event and ttft is None:
+                    ttft = time.perf_counter() - started
+                if event.get('done'):
+                    ok = 'response' in event
+                    return {'ok': ok, 'error': None if ok else event.get('error') or event.get('reason'),
+                            'ttft': ttft, 'duration': time.perf_counter() - started}
+        return {'ok': False, 'error': "flux interrompu"}
+    except httpx.TimeoutException:
+        return {'ok': False, 'error': "délai dépassé"}
+    except httpx.HTTPError as e:
+        return {'ok': False, 'error': type(e).__name__}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+async def run_level(url, pid, mock, concurrency, timeout):
+    """
+    Lance `concurrency` chats simultanés et mesure le niveau.
+
+    Returns:
+        dict: Mesures du niveau de concurrence
+    """
+    peak = {'pss_mb': tree_memory(pid)}
+
+    async def sample():
+        while True:
+            await asyncio.sleep(0.5)
+            memory = tree_memory(pid)
+            if memory is not None and (peak['pss_mb'] is None or memory > peak['pss_mb']):
+                peak['pss_mb'] = memory
+
+    with mock.state.lock:
+        mock.state.counters['max_in_flight'] = mock.state.counters['in_flight']
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=0)
+    sampler = asyncio.ensure_future(sample())
+    started = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(limits=limits) as client:
+            results = await asyncio.gather(*(stream_chat(client, url, index, timeout)
+                                             for index in range(concurrency)))
+    finally:
+        sampler.cancel()
+    elapsed = time.perf_counter() - started
+
+    completed = [r for r in results if r['ok']]
+    errors = {}
+    for result in results:
+        if not result['ok']:
+            errors[result['error']] = errors.get(result['error'], 0) + 1
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    ttfts = [r['ttft'] for r in completed if r.get('ttft') is not None]
+    durations = [r['duration'] for r in completed]
+    return {
+        'concurrency': concurrency,
+        'completed': len(completed),
+        'failed': len(results) - len(completed),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 2),
+        'ttft_p50_ms': ms(statistics.median(ttfts)) if ttfts else None,
+        'ttft_p95_ms': ms(percentile(ttfts, 0.95)),
+        'latency_p50_ms': ms(statistics.median(durations)) if durations else None,
+        'latency_p95_ms': ms(percentile(durations, 0.95)),
+        'max_ollama_in_flight': mock.state.snapshot()['max_in_flight'],
+        'server_pss_mb': peak['pss_mb']
+    }
+
+
+def run_server(server, args, mock):
+    """
+    Démarre un serveur, mesure chaque niveau de concurrence puis l'arrête.
+
+    Returns:
+        list: Mesures par niveau de concurrence
+    """
+    workdir = tempfile.mkdtemp(prefix=f"agency-connections-{server}-")
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, OLLAMA_API_URL=mock.url, AGENCY_DATA_DIR=os.path.join(workdir, 'data'),
+               OLLAMA_MAX_PARALLEL=str(max(args.concurrency)), CLIENT_RATE_PER_MINUTE='1000000',
+               LOG_LEVEL='WARNING')
+    # Les fichiers de projets sont relatifs au répertoire courant
+    process = subprocess.Popen(server_command(server, port, args.workers), cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not asyncio.run(wait_ready(url, args.startup_timeout)):
+            raise RuntimeError(f"Le serveur {server} n'a pas démarré en {args.startup_timeout}s")
+        levels = []
+        for concurrency in args.concurrency:
+            levels.append(asyncio.run(run_level(url, process.pid, mock, concurrency, args.request_timeout)))
+            level = levels[-1]
+            print(f"{server:<9} {concurrency:>5} {level['completed']:>9} {level['failed']:>7} "
+                  f"{level['max_ollama_in_flight']:>10} {str(level['ttft_p50_ms']):>10} "
+                  f"{str(level['latency_p95_ms']):>10} {str(level['server_pss_mb']):>8}")
+        return levels
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capacité en chats simultanés: gunicorn contre ASGI")
+    parser.add_argument('--servers', nargs='+', choices=['gunicorn', 'asgi'], default=['gunicorn', 'asgi'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200],
+                        help="Chats simultanés par niveau")
+    parser.add_argument('--workers', type=int, default=4, help="Workers gunicorn")
+    parser.add_argument('--request-timeout', type=float, default=30.0, help="Délai d'un chat côté client (s)")
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    add_mock_arguments(parser)
+    parser.set_defaults(latency=100, tokens_per_sec=20.0, response_tokens=40)
+    args = parser.parse_args()
+
+    mock = MockOllamaServer(settings=settings_from_args(args)).start()
+    results = {}
+    print(f"{'serveur':<9} {'C':>5} {'terminés':>9} {'échecs':>7} {'ollama max':>10} "
+          f"{'ttft p50':>10} {'lat p95':>10} {'PSS Mo':>8}")
+    try:
+        for server in args.servers:
+            results[server] = run_server(server, args, mock)
+    finally:
+        mock.stop()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'connections',
+                'commit': git_revision(),
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'parameters': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
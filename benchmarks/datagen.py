@@ -0,0 +1,101 @@
+# benchmarks/datagen.py
+"""
+Générateurs de données synthétiques pour les benchmarks.
+
+Toutes les fonctions prennent un random.Random initialisé avec une graine
+fixe afin que les jeux de données soient identiques d'une exécution à l'autre.
+"""
+
+import random
+
+AGENTS = ['vision', 'pixel', 'arch', 'script', 'node', 'data', 'secure', 'test', 'deploy', 'pm']
+
+CATEGORIES = [
+    'Général', 'Méthodologie', 'Principes UI', 'Patterns', 'Frameworks',
+    'API REST', 'Optimisation', 'OWASP', 'Méthodes', 'CI/CD', 'Agile'
+]
+
+VOCABULARY = (
+    "architecture projet utilisateur interface données sécurité tests "
+    "déploiement performance api service composant livrable stratégie "
+    "design besoin client équipe planning qualité base modèle cache index "
+    "requête réponse serveur navigateur accessibilité maquette parcours "
+    "authentification autorisation chiffrement sauvegarde supervision "
+    "intégration livraison continue conteneur orchestration migration"
+).split()
+
+# Terme rare injecté dans une petite fraction des lignes pour les recherches
+RARE_TERM = "zéphyrine"
+
+
+def make_rng(seed=42):
+    """Retourne un générateur aléatoire initialisé avec une graine fixe"""
+    return random.Random(seed)
+
+
+def make_text(rng, words, rare_rate=0.0):
+    """
+    Génère un texte pseudo-aléatoire.
+
+    Args:
+        rng (random.Random): Générateur aléatoire
+        words (int): Nombre de mots
+        rare_rate (float): Probabilité d'insérer le terme rare
+
+    Returns:
+        str: Texte généré
+    """
+    tokens = [rng.choice(VOCABULARY) for _ in range(words)]
+    if rare_rate and rng.random() < rare_rate:
+        tokens[rng.randrange(words)] = RARE_TERM
+    return ' '.join(tokens)
+
+
+def knowledge_rows(rng, count, words=80, rare_rate=0.001):
+    """
+    Génère des lignes pour la table knowledge.
+
+    Args:
+        rng (random.Random): Générateur aléatoire
+        count (int): Nombre de lignes
+        words (int): Nombre de mots par contenu
+        rare_rate (float): Fraction des lignes contenant le terme rare
+
+    Yields:
+        tuple: (agent, category, query, content)
+    """
+    for _ in range(count):
+        yield (
+            rng.choice(AGENTS),
+            rng.choice(CATEGORIES),
+            make_text(rng, 12),
+            make_text(rng, words, rare_rate)
+        )
+
+
+def markdown_document(rng, sections=12, paragraphs=4, words=60):
+    """
+    Génère un livrable markdown structuré.
+
+    Args:
+        rng (random.Random): Générateur aléatoire
+        sections (int): Nombre de sections de niveau 2
+        paragraphs (int): Paragraphes par section
+        words (int): Mots par paragraphe
+
+    Returns:
+        str: Document markdown
+    """
+    lines = [f"# {make_text(rng, 4).capitalize()}", ""]
+    for index in range(1, sections + 1):
+        lines.append(f"## {index}. {make_text(rng, 3).capitalize()}")
+        lines.append("")
+        for _ in range(paragraphs):
+            lines.append(make_text(rng, words))
+            lines.append("")
+    return '\n'.join(lines)
+
+
+def project_names(count, prefix='bench-projet'):
+    """Retourne une liste de noms de projets déterministes"""
+    return [f"{prefix}-{index:04d}" for index in range(count)]
@@ -0,0 +1,351 @@
+# benchmarks/load.py
+"""
+Benchmark de charge de bout en bout pour l'application IA-WebAgency.
+
+Démarre un serveur Ollama simulé, lance l'application Flask sur un
+répertoire de données temporaire (ou cible une instance existante via
+--target) puis exécute plusieurs scénarios concurrents:
+
+- chat: questions simultanées aux agents (/api/agents/<agent>)
+- workflow: création de projets et exécution complète du workflow
+- knowledge: consultation et recherche dans la base de connaissances
+
+Les résultats (latences p50/p95/p99, débit, ressources) sont affichés
+et écrits en JSON afin de pouvoir être comparés d'un commit à l'autre.
+
+Usage:
+    python -m benchmarks.load --clients 8 --requests 20 --output results.json
+    python -m benchmarks.load --compare baseline.json --output current.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import tempfile
+import argparse
+import resource
+import platform
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.mock_ollama import MockOllamaServer, add_mock_arguments, settings_from_args
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+
+AGENTS = ['vision', 'pixel', 'arch', 'script', 'node', 'data', 'secure', 'test', 'deploy', 'pm']
+
+SEARCH_TERMS = ['architecture', 'React', 'sécurité', 'API', 'tests', 'Scrum', 'index']
+
+
+def percentile(values, pct):
+    """
+    Calcule un percentile par la méthode du rang le plus proche.
+
+    Args:
+        values (list): Valeurs mesurées
+        pct (float): Percentile souhaité (0-100)
+
+    Returns:
+        float: Valeur du percentile ou None si aucune valeur
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Résume les mesures d'un scénario.
+
+    Args:
+        latencies (list): Latences des requêtes réussies (secondes)
+        errors (int): Nombre de requêtes en échec
+        elapsed (float): Durée totale du scénario (secondes)
+
+    Returns:
+        dict: Statistiques du scénario (latences en millisecondes)
+    """
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    count = len(latencies)
+    return {
+        'requests': count + errors,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(count / elapsed, 3) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(max(latencies) if latencies else None),
+        'mean_ms': ms(sum(latencies) / count if count else None)
+    }
+
+
+def resource_usage():
+    """Retourne l'utilisation CPU et mémoire du processus courant"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+    max_rss = usage.ru_maxrss if sys.platform != 'darwin' else usage.ru_maxrss / 1024
+    return {
+        'cpu_user_s': round(usage.ru_utime, 3),
+        'cpu_system_s': round(usage.ru_stime, 3),
+        'max_rss_mb': round(max_rss / 1024, 1)
+    }
+
+
+def git_revision():
+    """Retourne le commit courant du dépôt, si disponible"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalApp:
+    """Application Flask lancée en arrière-plan sur des données temporaires"""
+
+    def __init__(self, ollama_url):
+        self.workdir = tempfile.mkdtemp(prefix='agency-bench-')
+        os.environ['OLLAMA_API_URL'] = ollama_url
+        os.environ['AGENCY_DATA_DIR'] = os.path.join(self.workdir, 'data')
+        # Les fichiers de projets sont relatifs au répertoire courant
+        os.chdir(self.workdir)
+        sys.path.insert(0, BACKEND_DIR)
+
+        from werkzeug.serving import make_server
+        import app as app_module
+
+        self.port = free_port()
+        self.server = make_server('127.0.0.1', self.port, app_module.app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def run_concurrently(clients, count, task):
+    """
+    Exécute une tâche avec plusieurs clients concurrents.
+
+    Args:
+        clients (int): Nombre de clients simultanés
+        count (int): Nombre total d'appels
+        task (callable): Fonction recevant l'index de l'appel et retournant
+            True en cas de succès
+
+    Returns:
+        dict: Statistiques du scénario
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def timed(index):
+        started = time.perf_counter()
+        try:
+            ok = task(index)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(timed, range(count)))
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def scenario_chat(base_url, clients, total, rng):
+    """Questions simultanées aux agents"""
+    session = requests.Session()
+
+    def task(index):
+        agent = AGENTS[index % len(AGENTS)]
+        response = session.post(
+            f"{base_url}/api/agents/{agent}",
+            json={'message': f"Question de charge {index} {rng.random():.6f}"},
+            timeout=300
+        )
+        return response.status_code == 200 and 'response' in response.json()
+
+    return run_concurrently(clients, total, task)
+
+
+def scenario_workflow(base_url, clients, total, timeout):
+    """Création de projets et exécution complète de leur workflow"""
+    run_id = int(time.time() * 1000)
+
+    def task(index):
+        response = requests.post(f"{base_url}/api/projects", json={
+            'name': f"bench-{run_id}-{index}",
+            'description': "Projet de benchmark",
+            'objectives': "Mesurer le débit du workflow"
+        }, timeout=30)
+        if response.status_code != 201:
+            return False
+        project_id = response.json()['id']
+
+        if requests.post(f"{base_url}/api/projects/{project_id}/start", timeout=30).status_code != 200:
+            return False
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = requests.get(f"{base_url}/api/projects/{project_id}", timeout=30).json().get('status')
+            if status == 'completed':
+                return True
+            if status == 'failed':
+                return False
+            time.sleep(0.2)
+        return False
+
+    return run_concurrently(clients, total, task)
+
+
+def scenario_knowledge(base_url, clients, total, rng):
+    """Consultation des catégories et recherche dans la base de connaissances"""
+    session = requests.Session()
+
+    def task(index):
+        if index % 2:
+            response = session.get(f"{base_url}/api/knowledge", timeout=30)
+        else:
+            term = SEARCH_TERMS[rng.randrange(len(SEARCH_TERMS))]
+            response = session.get(f"{base_url}/api/knowledge/search", params={'q': term}, timeout=30)
+        return response.status_code == 200
+
+    return run_concurrently(clients, total, task)
+
+
+def compare(current, baseline):
+    """
+    Compare deux résultats de benchmark.
+
+    Args:
+        current (dict): Résultats courants
+        baseline (dict): Résultats de référence
+
+    Returns:
+        list: Lignes de comparaison par scénario et indicateur
+    """
+    lines = []
+    for name, stats in current['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(name)
+        if not reference:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            before, after = reference.get(key), stats.get(key)
+            if before and after:
+                delta = (after - before) / before * 100
+                lines.append(f"{name:<10} {key:<15} {before:>10} -> {after:>10} ({delta:+.1f}%)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge de bout en bout")
+    parser.add_argument('--target', help="URL d'une application déjà lancée (sinon lancement local)")
+    parser.add_argument('--scenarios', default='chat,workflow,knowledge',
+                        help="Scénarios à exécuter, séparés par des virgules")
+    parser.add_argument('--clients', type=int, default=8, help="Clients simultanés")
+    parser.add_argument('--requests', type=int, default=40, help="Requêtes par scénario chat/knowledge")
+    parser.add_argument('--workflows', type=int, default=2, help="Nombre de workflows complets")
+    parser.add_argument('--workflow-timeout', type=float, default=600, help="Délai maximal par workflow (s)")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    parser.add_argument('--compare', help="Fichier JSON de référence à comparer")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    # Les chemins sont résolus avant le changement de répertoire de l'application locale
+    args.output = os.path.abspath(args.output) if args.output else None
+    args.compare = os.path.abspath(args.compare) if args.compare else None
+
+    rng = random.Random(args.seed)
+    mock = None
+    local_app = None
+
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        mock = MockOllamaServer(settings=settings_from_args(args)).start()
+        local_app = LocalApp(mock.url).start()
+        base_url = local_app.url
+
+    scenarios = {}
+    wanted = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+
+    try:
+        if 'chat' in wanted:
+            scenarios['chat'] = scenario_chat(base_url, args.clients, args.requests, rng)
+        if 'workflow' in wanted:
+            scenarios['workflow'] = scenario_workflow(
+                base_url, min(args.clients, args.workflows), args.workflows, args.workflow_timeout
+            )
+        if 'knowledge' in wanted:
+            scenarios['knowledge'] = scenario_knowledge(base_url, args.clients, args.requests, rng)
+    finally:
+        if local_app:
+            local_app.stop()
+        if mock:
+            mock.stop()
+
+    results = {
+        'benchmark': 'load',
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'parameters': vars(args),
+        'scenarios': scenarios,
+        'resources': resource_usage() if local_app else None,
+        'mock': mock.state.snapshot() if mock else None
+    }
+
+    for name, stats in scenarios.items():
+        print(f"{name:<10} req={stats['requests']:<5} err={stats['errors']:<4} "
+              f"rps={stats['throughput_rps']} p50={stats['p50_ms']}ms "
+              f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms")
+    if results['resources']:
+        print(f"ressources {results['resources']}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            for line in compare(results, json.load(f)):
+                print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
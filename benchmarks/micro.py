@@ -0,0 +1,432 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks des briques internes de l'application IA-WebAgency.
+
+Mesure, sur des données synthétiques générées avec une graine fixe:
+
+- les helpers de database.db (query_db, insert_db, update_db) pour
+  plusieurs tailles de la table knowledge
+- la recherche /api/knowledge/search et la liste des catégories
+- file_manager (save/get/list) avec des centaines de projets
+- AgentManager.prepare_step_prompt sur de gros livrables
+- ProjectWorkflow._save_state et ProjectWorkflow.load
+- le coût d'un appel de journalisation sur le chemin des requêtes:
+  handler synchrone avec f-string (ancienne configuration basicConfig)
+  contre file non bloquante (utils.logs), avec et sans échantillonnage
+
+Chaque cas est chronométré (médiane, moyenne, minimum) puis rejoué sous
+tracemalloc pour mesurer les allocations. Avec --baseline, le script
+compare les médianes à un résultat précédent et se termine avec un code
+non nul si un cas ralentit au-delà du seuil.
+
+Usage:
+    python -m benchmarks.micro --rows 10000,100000 --output micro.json
+    python -m benchmarks.micro --baseline micro.json --threshold 1.25
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import logging
+import argparse
+import platform
+import statistics
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import datagen
+from benchmarks.load import git_revision, BACKEND_DIR
+from benchmarks.mock_ollama import MockOllamaServer, MockSettings
+
+
+class Case:
+    """Cas de benchmark: une fonction sans argument à chronométrer"""
+
+    def __init__(self, name, fn, params=None):
+        self.name = name
+        self.fn = fn
+        self.params = params or {}
+
+
+def measure_time(fn, min_time, max_iterations, min_iterations=3):
+    """
+    Chronomètre une fonction de manière répétée.
+
+    Args:
+        fn (callable): Fonction à mesurer
+        min_time (float): Durée minimale de mesure en secondes
+        max_iterations (int): Nombre maximal d'itérations
+        min_iterations (int): Nombre minimal d'itérations
+
+    Returns:
+        dict: Statistiques de durée en microsecondes
+    """
+    fn()  # échauffement
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_iterations:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= min_iterations and time.perf_counter() - started >= min_time:
+            break
+
+    def us(value):
+        return round(value * 1e6, 2)
+
+    return {
+        'iterations': len(samples),
+        'median_us': us(statistics.median(samples)),
+        'mean_us': us(statistics.fmean(samples)),
+        'min_us': us(min(samples)),
+        'stdev_us': us(statistics.stdev(samples)) if len(samples) > 1 else 0.0
+    }
+
+
+def measure_allocations(fn, iterations=3):
+    """
+    Mesure les allocations mémoire d'une fonction avec tracemalloc.
+
+    Args:
+        fn (callable): Fonction à mesurer
+        iterations (int): Nombre d'appels mesurés
+
+    Returns:
+        dict: Pic d'allocation et mémoire conservée par appel, en kilo-octets
+    """
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(iterations):
+            fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'peak_kb': round((peak - before) / 1024, 2),
+        'retained_kb_per_call': round((after - before) / 1024 / iterations, 2)
+    }
+
+
+class BenchEnvironment:
+    """Application et données isolées dans un répertoire temporaire"""
+
+    def __init__(self, seed):
+        self.workdir = tempfile.mkdtemp(prefix='agency-micro-')
+        self.rng = datagen.make_rng(seed)
+        self.mock = MockOllamaServer(settings=MockSettings(latency_ms=0, tokens_per_sec=0)).start()
+
+        os.environ['OLLAMA_API_URL'] = self.mock.url
+        os.environ['AGENCY_DATA_DIR'] = os.path.join(self.workdir, 'data')
+        os.chdir(self.workdir)
+        sys.path.insert(0, BACKEND_DIR)
+
+        import app as app_module
+        import config
+
+        self.app = app_module.app
+        self.agent_manager = app_module.agent_manager
+        self.database = config.DATABASE
+        self.knowledge_rows = self.count_knowledge()
+
+    def count_knowledge(self):
+        with sqlite3.connect(self.database) as conn:
+            return conn.execute('SELECT COUNT(*) FROM knowledge').fetchone()[0]
+
+    def grow_knowledge(self, target):
+        """Complète la table knowledge jusqu'à atteindre le nombre de lignes voulu"""
+        missing = target - self.knowledge_rows
+        if missing <= 0:
+            return
+        conn = sqlite3.connect(self.database)
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT INTO knowledge (agent, category, query, content) VALUES (?, ?, ?, ?)',
+                    datagen.knowledge_rows(self.rng, missing)
+                )
+        finally:
+            conn.close()
+        self.knowledge_rows = target
+
+    def close(self):
+        self.mock.stop()
+
+
+def database_cases(env, rows):
+    """Cas des helpers query_db / insert_db / update_db"""
+    from database.db import query_db, insert_db, update_db
+
+    rng = env.rng
+    content = datagen.make_text(rng, 80)
+
+    def lookup_by_id():
+        query_db('SELECT * FROM knowledge WHERE id = ?', (rng.randint(1, rows),), one=True)
+
+    def filter_by_category():
+        query_db('SELECT id FROM knowledge WHERE category = ? LIMIT 100', (rng.choice(datagen.CATEGORIES),))
+
+    def count_by_agent():
+        query_db('SELECT agent, COUNT(*) FROM knowledge GROUP BY agent')
+
+    def insert_row():
+        insert_db(
+            'INSERT INTO knowledge (agent, category, query, content) VALUES (?, ?, ?, ?)',
+            ('arch', 'Général', 'benchmark', content)
+        )
+
+    def update_row():
+        update_db('UPDATE knowledge SET category = ? WHERE id = ?', ('Général', rng.randint(1, rows)))
+
+    params = {'rows': rows}
+    return [
+        Case(f"db.query_db.by_id[{rows}]", lookup_by_id, params),
+        Case(f"db.query_db.by_category[{rows}]", filter_by_category, params),
+        Case(f"db.query_db.count_by_agent[{rows}]", count_by_agent, params),
+        Case(f"db.insert_db[{rows}]", insert_row, params),
+        Case(f"db.update_db[{rows}]", update_row, params)
+    ]
+
+
+def search_cases(env, rows):
+    """Cas des routes de consultation de la base de connaissances"""
+    client = env.app.test_client()
+
+    def search_rare():
+        client.get('/api/knowledge/search', query_string={'q': datagen.RARE_TERM})
+
+    def list_categories():
+        client.get('/api/knowledge')
+
+    params = {'rows': rows}
+    return [
+        Case(f"api.knowledge_search[{rows}]", search_rare, params),
+        Case(f"api.knowledge_categories[{rows}]", list_categories, params)
+    ]
+
+
+def file_manager_cases(env, projects):
+    """Cas de file_manager avec de nombreux projets"""
+    from utils import file_manager
+
+    rng = env.rng
+    names = datagen.project_names(projects)
+    document = datagen.markdown_document(rng)
+
+    for name in names:
+        file_manager.save_brief(name, datagen.make_text(rng, 200))
+        for step in ('01_brief_strategique', '02_design_ux', '03_architecture'):
+            file_manager.save_deliverable(name, step, document, agent='arch')
+
+    def save():
+        file_manager.save_deliverable(rng.choice(names), '03_architecture', document, agent='arch')
+
+    def get():
+        file_manager.get_deliverable(rng.choice(names), '02_design_ux')
+
+    def list_files():
+        file_manager.list_project_files(rng.choice(names))
+
+    def list_all_projects():
+        for name in names:
+            file_manager.list_project_files(name)
+
+    params = {'projects': projects}
+    return [
+        Case(f"files.save_deliverable[{projects}]", save, params),
+        Case(f"files.get_deliverable[{projects}]", get, params),
+        Case(f"files.list_project_files[{projects}]", list_files, params),
+        Case(f"files.list_all_projects[{projects}]", list_all_projects, params)
+    ]
+
+
+def prompt_cases(env, sections):
+    """Cas d'assemblage du prompt d'une étape avec de gros livrables"""
+    from config import WORKFLOW_STEPS
+    from utils import file_manager
+
+    name = 'bench-prompt'
+    file_manager.save_brief(name, datagen.make_text(env.rng, 400))
+    for step in WORKFLOW_STEPS[:-1]:
+        file_manager.save_deliverable(
+            name, step['id'], datagen.markdown_document(env.rng, sections=sections), agent=step['agent']
+        )
+    file_manager.save_feedback(name, WORKFLOW_STEPS[-1]['id'], datagen.make_text(env.rng, 150))
+
+    last = WORKFLOW_STEPS[-1]
+
+    def prepare():
+        env.agent_manager.prepare_step_prompt(name, last['id'], last['agent'])
+
+    return [Case(f"agents.prepare_step_prompt[{sections}_sections]", prepare, {'sections': sections})]
+
+
+def workflow_cases(env):
+    """Cas de persistance de l'état du workflow"""
+    from agents.workflow import ProjectWorkflow
+
+    name = 'bench-workflow'
+    workflow = ProjectWorkflow(env.agent_manager, name)
+    for step in workflow.steps:
+        step.result = {'success': True, 'deliverable_path': f"data/projects/{name}/{step.id}.md"}
+
+    def save_state():
+        workflow._save_state()
+
+    def load():
+        ProjectWorkflow.load(env.agent_manager, name)
+
+    return [
+        Case("workflow._save_state", save_state),
+        Case("workflow.load", load)
+    ]
+
+
+def logging_cases(env):
+    """Cas de journalisation: coût supporté par le thread appelant"""
+    from utils.logs import create_pipeline, TEXT_FORMAT
+
+    def make_logger(name, handler):
+        bench_logger = logging.getLogger(f"bench.{name}")
+        bench_logger.handlers = [handler]
+        bench_logger.setLevel(logging.INFO)
+        bench_logger.propagate = False
+        return bench_logger
+
+    def log_file(name):
+        return open(os.path.join(env.workdir, f"{name}.log"), 'a', encoding='utf-8')
+
+    # Avant: écriture synchrone dans le thread appelant, message formaté en f-string
+    sync_handler = logging.StreamHandler(log_file('sync'))
+    sync_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    sync_logger = make_logger('sync', sync_handler)
+
+    # Après: file bornée vidée par un thread d'écriture, formatage paresseux
+    loggers = {}
+    for name, burst in (('queue', 0), ('queue_sampled', 20)):
+        handler, listener = create_pipeline(log_file(name), json_format=True, sample_burst=burst)
+        listener.start()
+        loggers[name] = make_logger(name, handler)
+
+    counter = iter(range(10 ** 9))
+
+    def sync():
+        knowledge_id = next(counter)
+        sync_logger.info(f"Réponse de l'agent pm stockée avec l'ID {knowledge_id}")
+
+    def queued(name):
+        def log():
+            loggers[name].info("Réponse de l'agent %s stockée avec l'ID %s", 'pm', next(counter))
+        return log
+
+    return [
+        Case("logging.sync_fstring", sync),
+        Case("logging.queue_json", queued('queue')),
+        Case("logging.queue_json_sampled", queued('queue_sampled'))
+    ]
+
+
+def run_cases(cases, args, results):
+    for case in cases:
+        if args.cases and not any(pattern in case.name for pattern in args.cases):
+            continue
+        stats = measure_time(case.fn, args.min_time, args.max_iterations)
+        stats.update(measure_allocations(case.fn, args.alloc_iterations))
+        stats['params'] = case.params
+        results[case.name] = stats
+        print(f"{case.name:<45} median={stats['median_us']:>12}us "
+              f"n={stats['iterations']:<6} peak={stats['peak_kb']}KB")
+
+
+def check_regressions(results, baseline, threshold):
+    """
+    Compare les médianes à une référence.
+
+    Args:
+        results (dict): Résultats courants par cas
+        baseline (dict): Résultats de référence par cas
+        threshold (float): Ratio maximal toléré (ex: 1.25 = +25%)
+
+    Returns:
+        list: Cas en régression (nom, référence, courant, ratio)
+    """
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get('median_us'):
+            continue
+        ratio = stats['median_us'] / reference['median_us']
+        if ratio > threshold:
+            regressions.append((name, reference['median_us'], stats['median_us'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks des chemins critiques")
+    parser.add_argument('--rows', default='10000,100000',
+                        help="Tailles de la table knowledge, séparées par des virgules (ex: 10000,100000,1000000)")
+    parser.add_argument('--projects', type=int, default=200, help="Nombre de projets pour file_manager")
+    parser.add_argument('--sections', type=int, default=40, help="Sections par livrable pour prepare_step_prompt")
+    parser.add_argument('--min-time', type=float, default=0.5, help="Durée minimale de mesure par cas (s)")
+    parser.add_argument('--max-iterations', type=int, default=1000, help="Itérations maximales par cas")
+    parser.add_argument('--alloc-iterations', type=int, default=3, help="Appels mesurés sous tracemalloc")
+    parser.add_argument('--cases', action='append', help="Ne lancer que les cas contenant ce motif")
+    parser.add_argument('--seed', type=int, default=42, help="Graine des données synthétiques")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    parser.add_argument('--baseline', help="Fichier JSON de référence pour la détection de régressions")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Ratio de ralentissement toléré par rapport à la référence")
+    args = parser.parse_args()
+
+    args.output = os.path.abspath(args.output) if args.output else None
+    args.baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    env = BenchEnvironment(args.seed)
+    results = {}
+
+    try:
+        with env.app.app_context():
+            for rows in sorted(int(value) for value in args.rows.split(',') if value):
+                env.grow_knowledge(rows)
+                run_cases(database_cases(env, rows), args, results)
+                run_cases(search_cases(env, rows), args, results)
+
+            run_cases(file_manager_cases(env, args.projects), args, results)
+            run_cases(prompt_cases(env, args.sections), args, results)
+            run_cases(workflow_cases(env), args, results)
+            run_cases(logging_cases(env), args, results)
+    finally:
+        env.close()
+
+    output = {
+        'benchmark': 'micro',
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'parameters': vars(args),
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+        regressions = check_regressions(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"RÉGRESSION {name}: {before}us -> {after}us (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"Aucune régression au-delà de x{args.threshold}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+# benchmarks/mock_ollama.py
+"""
+Serveur Ollama simulé pour les benchmarks.
+
+Implémente les routes /api/tags, /api/create, /api/generate, /api/chat,
+/api/embeddings et /api/ps avec une latence, un débit de génération
+et un taux d'échec configurables. Avec --cores, les options d'exécution
+(num_thread, num_batch, num_ctx) influent sur les débits et la mémoire
+du modèle chargé, pour exercer l'auto-réglage (manage.py autotune).
+
+Usage:
+    python -m benchmarks.mock_ollama --port 11434 --latency 50 --tokens-per-sec 40
+"""
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Modèles de base présents d'emblée (comme après un "ollama pull")
+BASE_MODELS = ('llama3:8b', 'llama3.2:3b')
+
+# Vocabulaire utilisé pour fabriquer les réponses simulées
+WORDS = (
+    "architecture projet utilisateur interface données sécurité tests "
+    "déploiement performance api service composant livrable stratégie "
+    "design besoin client équipe planning qualité base modèle"
+).split()
+
+
+class MockSettings:
+    """Paramètres de simulation du serveur Ollama"""
+
+    def __init__(self, latency_ms=50, tokens_per_sec=40.0, prompt_tokens_per_sec=400.0,
+                 response_tokens=200, failure_rate=0.0, load_ms=0, embedding_dim=384,
+                 cores=0, seed=42):
+        """
+        Initialise les paramètres de simulation.
+
+        Args:
+            latency_ms (float): Latence fixe ajoutée à chaque requête
+            tokens_per_sec (float): Débit de génération simulé (décodage)
+            prompt_tokens_per_sec (float): Débit de lecture du prompt simulé (prefill)
+            response_tokens (int): Nombre de tokens générés par défaut
+            failure_rate (float): Probabilité (0-1) qu'une requête échoue en 500
+            load_ms (float): Temps de chargement simulé lors d'un changement de modèle
+            embedding_dim (int): Dimension des embeddings retournés
+            cores (int): Cœurs physiques simulés; 0 = débits indépendants des options
+            seed (int): Graine du générateur aléatoire
+        """
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+        self.response_tokens = response_tokens
+        self.failure_rate = failure_rate
+        self.load_ms = load_ms
+        self.embedding_dim = embedding_dim
+        self.cores = cores
+        self.random = random.Random(seed)
+
+
+class MockState:
+    """État partagé du serveur simulé (modèles créés, compteurs)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models = {}
+        self.loaded_model = None
+        self.loaded_options = None
+        self.loaded_size = 0
+        self.counters = {
+            'requests': 0,
+            'failures': 0,
+            'model_loads': 0,
+            'generated_tokens': 0,
+            'in_flight': 0,
+            'max_in_flight': 0
+        }
+
+    def incr(self, key, value=1):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def enter(self):
+        """Compte une génération en cours (et le maximum atteint)"""
+        with self.lock:
+            self.counters['in_flight'] += 1
+            self.counters['max_in_flight'] = max(self.counters['max_in_flight'], self.counters['in_flight'])
+
+    def leave(self):
+        with self.lock:
+            self.counters['in_flight'] -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def _count_tokens(text):
+    """Approximation du nombre de tokens d'un texte (mots)"""
+    return max(1, len(text.split()))
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Gestionnaire HTTP imitant l'API Ollama"""
+
+    protocol_version = 'HTTP/1.1'
+    settings = None
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _send_chunk(self, payload):
+        data = (json.dumps(payload) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        self.state.incr('requests')
+
+        if self.path == '/api/tags':
+            with self.state.lock:
+                models = [{'name': f"{name}:latest", 'model': f"{name}:latest"} for name in self.state.models]
+                models += [{'name': name, 'model': name} for name in BASE_MODELS]
+            self._send_json({'models': models})
+        elif self.path == '/api/ps':
+            with self.state.lock:
+                loaded = self.state.loaded_model
+                size = self.state.loaded_size
+            self._send_json({'models': [{'name': loaded, 'size': size, 'size_vram': 0}] if loaded else []})
+        elif self.path == '/mock/stats':
+            self._send_json(self.state.snapshot())
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        self.state.incr('requests')
+        payload = self._read_json()
+
+        if self.path == '/api/create':
+            name = payload.get('name') or payload.get('model')
+            with self.state.lock:
+                self.state.models[name] = payload.get('modelfile', '')
+            if payload.get('stream', True):
+                self._start_stream()
+                for status in ('reading model metadata', 'creating system layer', 'success'):
+                    self._send_chunk({'status': status})
+                self._end_stream()
+            else:
+                self._send_json({'status': 'success'})
+            return
+
+        if self.path in ('/api/generate', '/api/chat', '/api/embeddings', '/api/embed'):
+            if self.settings.random.random() < self.settings.failure_rate:
+                self.state.incr('failures')
+                self._send_json({'error': 'simulated failure'}, status=500)
+                return
+
+        if self.path == '/api/generate':
+            self._generate(payload, payload.get('prompt', ''), chat=False)
+        elif self.path == '/api/chat':
+            prompt = '\n'.join(m.get('content', '') for m in payload.get('messages', []))
+            self._generate(payload, prompt, chat=True)
+        elif self.path in ('/api/embeddings', '/api/embed'):
+            self._embeddings(payload)
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    # Taille simulée d'un modèle 8B quantifié en 4 bits et de son cache KV par token de contexte
+    MODEL_BYTES = 4_700_000_000
+    KV_BYTES_PER_TOKEN = 131_072
+    RUNNER_OPTIONS = ('num_ctx', 'num_thread', 'num_batch')
+
+    def _runtime_rates(self, options):
+        """
+        Débits de prefill et de décodage pour les options d'exécution demandées.
+
+        Returns:
+            tuple: (tokens/s de prefill, tokens/s de décodage)
+        """
+        settings = self.settings
+        prefill, decode = settings.prompt_tokens_per_sec, settings.tokens_per_sec
+        if not settings.cores:
+            return prefill, decode
+        threads = options.get('num_thread') or settings.cores
+        # Au-delà des cœurs physiques, les threads se disputent les cœurs
+        scale = min(threads, settings.cores) / settings.cores
+        if threads > settings.cores:
+            scale *= settings.cores / threads
+        # Le prefill traite le prompt par lots de num_batch tokens
+        batch = min(options.get('num_batch') or 512, 512)
+        return prefill * scale * (batch / 512) ** 0.5, decode * scale
+
+    def _load_model(self, model, options=None):
+        """Simule le chargement d'un modèle lorsqu'il change (ou ses options d'exécution)"""
+        options = options or {}
+        runner = tuple(options.get(key) for key in self.RUNNER_OPTIONS)
+        with self.state.lock:
+            switched = self.state.loaded_model != model or self.state.loaded_options != runner
+            self.state.loaded_model = model
+            self.state.loaded_options = runner
+            self.state.loaded_size = self.MODEL_BYTES + self.KV_BYTES_PER_TOKEN * (options.get('num_ctx') or 2048)
+        if switched:
+            self.state.incr('model_loads')
+            if self.settings.load_ms:
+                time.sleep(self.settings.load_ms / 1000.0)
+            return int(self.settings.load_ms * 1e6)
+        return 0
+
+    def _generate(self, payload, prompt, chat):
+        settings = self.settings
+        started = time.perf_counter()
+        model = payload.get('model', 'unknown')
+
+        options = payload.get('options') or {}
+        load_duration = self._load_model(model, options)
+        if not chat and not prompt:
+            # Requête sans prompt: chargement du modèle uniquement
+            self._send_json({'model': model, 'response': '', 'done': True, 'done_reason': 'load',
+                             'load_duration': load_duration})
+            return
+        prompt_tokens = _count_tokens(prompt) + _count_tokens(payload.get('system') or '')
+        prompt_tokens_per_sec, tokens_per_sec = self._runtime_rates(options)
+        num_predict = options.get('num_predict') or settings.response_tokens
+        if num_predict < 0:
+            num_predict = settings.response_tokens
+        response_tokens = min(num_predict, settings.response_tokens)
+
+        self.state.enter()
+        try:
+            self._generate_response(payload, prompt, chat, model, started, load_duration, prompt_tokens,
+                                    prompt_tokens_per_sec, tokens_per_sec, response_tokens)
+        finally:
+            self.state.leave()
+
+    def _generate_response(self, payload, prompt, chat, model, started, load_duration, prompt_tokens,
+                           prompt_tokens_per_sec, tokens_per_sec, response_tokens):
+        settings = self.settings
+        # Latence fixe + lecture du prompt (prefill)
+        prefill = prompt_tokens / prompt_tokens_per_sec if prompt_tokens_per_sec else 0
+        time.sleep(settings.latency_ms / 1000.0 + prefill)
+
+        seed = int(hashlib.md5(prompt.encode('utf-8')).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        words = [rng.choice(WORDS) for _ in range(response_tokens)]
+        token_delay = 1.0 / tokens_per_sec if tokens_per_sec else 0
+
+        def stats():
+            total = int((time.perf_counter() - started) * 1e9)
+            return {
+                'done': True,
+                'done_reason': 'stop',
+                'total_duration': total,
+                'load_duration': load_duration,
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(prefill * 1e9),
+                'eval_count': response_tokens,
+                'eval_duration': int(response_tokens * token_delay * 1e9)
+            }
+
+        def fragment(text):
+            if chat:
+                return {'model': model, 'message': {'role': 'assistant', 'content': text}, 'done': False}
+            return {'model': model, 'response': text, 'done': False}
+
+        self.state.incr('prompt_tokens', prompt_tokens)
+        self.state.incr('generated_tokens', response_tokens)
+
+        if payload.get('stream', True):
+            self._start_stream()
+            try:
+                for word in words:
+                    if token_delay:
+                        time.sleep(token_delay)
+                    self._send_chunk(fragment(word + ' '))
+                final = fragment('')
+                final.update(stats())
+                self._send_chunk(final)
+                self._end_stream()
+            except (BrokenPipeError, ConnectionResetError):
+                # Le client a interrompu la génération
+                self.close_connection = True
+            return
+
+        time.sleep(response_tokens * token_delay)
+        result = fragment(' '.join(words))
+        result.update(stats())
+        self._send_json(result)
+
+    def _embeddings(self, payload):
+        text = payload.get('prompt') or payload.get('input') or ''
+        if isinstance(text, list):
+            text = ' '.join(text)
+        time.sleep(self.settings.latency_ms / 1000.0)
+        rng = random.Random(hashlib.md5(text.encode('utf-8')).hexdigest())
+        vector = [rng.uniform(-1, 1) for _ in range(self.settings.embedding_dim)]
+        if self.path == '/api/embed':
+            self._send_json({'model': payload.get('model'), 'embeddings': [vector]})
+        else:
+            self._send_json({'embedding': vector})
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    # File d'écoute assez longue pour des centaines de générations simultanées
+    request_queue_size = 1024
+
+
+class MockOllamaServer:
+    """Serveur Ollama simulé exécuté dans un thread en arrière-plan"""
+
+    def __init__(self, host='127.0.0.1', port=0, settings=None):
+        """
+        Initialise le serveur simulé.
+
+        Args:
+            host (str): Adresse d'écoute
+            port (int): Port d'écoute (0 pour un port libre)
+            settings (MockSettings, optional): Paramètres de simulation
+        """
+        self.settings = settings or MockSettings()
+        self.state = MockState()
+        handler = type('BoundMockOllamaHandler', (MockOllamaHandler,), {
+            'settings': self.settings,
+            'state': self.state
+        })
+        self.httpd = MockHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """URL de base de l'API simulée (équivalent de OLLAMA_API_URL)"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_mock_arguments(parser):
+    """Ajoute les options de simulation à un parseur argparse"""
+    parser.add_argument('--latency', type=float, default=50, help="Latence fixe par requête (ms)")
+    parser.add_argument('--tokens-per-sec', type=float, default=40.0, help="Débit de génération simulé")
+    parser.add_argument('--prompt-tokens-per-sec', type=float, default=400.0, help="Débit de prefill simulé")
+    parser.add_argument('--response-tokens', type=int, default=200, help="Tokens générés par réponse")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Taux d'échec simulé (0-1)")
+    parser.add_argument('--load-ms', type=float, default=0, help="Temps de chargement lors d'un changement de modèle (ms)")
+    parser.add_argument('--cores', type=int, default=0,
+                        help="Cœurs simulés: les débits dépendent de num_thread/num_batch (0 = désactivé)")
+    parser.add_argument('--seed', type=int, default=42, help="Graine aléatoire")
+
+
+def settings_from_args(args):
+    """Construit les paramètres de simulation à partir des arguments CLI"""
+    return MockSettings(
+        latency_ms=args.latency,
+        tokens_per_sec=args.tokens_per_sec,
+        prompt_tokens_per_sec=args.prompt_tokens_per_sec,
+        response_tokens=args.response_tokens,
+        failure_rate=args.failure_rate,
+        load_ms=args.load_ms,
+        cores=args.cores,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur Ollama simulé")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockOllamaServer(args.host, args.port, settings_from_args(args))
+    print(f"Mock Ollama en écoute sur {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
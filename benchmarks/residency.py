@@ -0,0 +1,108 @@
+# benchmarks/residency.py
+"""
+Compare les modes de modèles Ollama (AGENT_MODEL_MODE).
+
+- agents: un modèle Ollama par agent; chaque changement d'agent fait
+  recharger un modèle sur une machine qui n'en garde qu'un en mémoire
+- shared: un seul modèle de base résident, le prompt système et les
+  paramètres de l'agent étant envoyés avec chaque requête
+
+Chaque mode est mesuré par benchmarks.load (scénario chat par défaut,
+les agents étant sollicités à tour de rôle) dans un processus séparé, la
+configuration étant lue au démarrage. Le serveur Ollama simulé facture
+--load-ms à chaque chargement de modèle; le nombre de chargements est
+relevé par le serveur simulé.
+
+Usage:
+    python -m benchmarks.residency --load-ms 1500 --requests 40 --output residency.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+from benchmarks.load import git_revision, REPO_DIR
+from benchmarks.mock_ollama import add_mock_arguments
+
+MODES = ('agents', 'shared')
+
+
+def run_mode(mode, args):
+    """
+    Lance benchmarks.load dans un processus dont la configuration utilise le mode donné.
+
+    Returns:
+        dict: Résultats de benchmarks.load
+    """
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        output = f.name
+    command = [
+        sys.executable, '-m', 'benchmarks.load',
+        '--scenarios', args.scenarios,
+        '--clients', str(args.clients),
+        '--requests', str(args.requests),
+        '--workflows', str(args.workflows),
+        '--latency', str(args.latency),
+        '--tokens-per-sec', str(args.tokens_per_sec),
+        '--prompt-tokens-per-sec', str(args.prompt_tokens_per_sec),
+        '--response-tokens', str(args.response_tokens),
+        '--load-ms', str(args.load_ms),
+        '--seed', str(args.seed),
+        '--output', output
+    ]
+    # Un seul client de benchmark: pas de limitation de débit par client
+    env = dict(os.environ, AGENT_MODEL_MODE=mode, LOG_LEVEL='WARNING', CLIENT_RATE_PER_MINUTE='1000000')
+    try:
+        subprocess.run(command, cwd=REPO_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare les modes de modèles Ollama")
+    parser.add_argument('--scenarios', default='chat', help="Scénarios de benchmarks.load")
+    parser.add_argument('--clients', type=int, default=2, help="Clients simultanés")
+    parser.add_argument('--requests', type=int, default=40, help="Requêtes du scénario chat")
+    parser.add_argument('--workflows', type=int, default=1, help="Workflows du scénario workflow")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    add_mock_arguments(parser)
+    parser.set_defaults(load_ms=1500, latency=20, response_tokens=50, tokens_per_sec=200.0)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in MODES:
+        report = run_mode(mode, args)
+        results[mode] = {
+            'scenarios': report['scenarios'],
+            'model_loads': report['mock']['model_loads'],
+            'requests': report['mock']['requests']
+        }
+
+    print(f"{'mode':<8} {'scénario':<10} {'chargements':>11} {'erreurs':>7} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>7}")
+    for mode, result in results.items():
+        for name, stats in result['scenarios'].items():
+            print(f"{mode:<8} {name:<10} {result['model_loads']:>11} {stats['errors']:>7} {stats['p50_ms']:>9} "
+                  f"{stats['p95_ms']:>9} {stats['throughput_rps']:>7}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'residency',
+                'commit': git_revision(),
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'parameters': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
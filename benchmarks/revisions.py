@@ -0,0 +1,158 @@
+# benchmarks/revisions.py
+"""
+Compare les révisions complètes et les révisions ciblées par section.
+
+Un livrable synthétique de N sections reçoit plusieurs feedbacks visant
+chacun une section. Chaque feedback est appliqué sur le livrable d'origine:
+
+- full: régénération du livrable entier (process_project_step)
+- sections: régénération de la seule section visée, avec ses voisines en
+  contexte (revise_sections)
+
+Le serveur Ollama simulé produit num_predict tokens, plafonnés à
+--response-tokens (par défaut la taille du livrable, comme un agent qui
+réécrit tout le document); le nombre de tokens lus et générés est relevé
+par le serveur simulé.
+
+Usage:
+    python -m benchmarks.revisions --sections 8 --section-words 150 --revisions 3 --output revisions.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+
+from benchmarks.load import git_revision, BACKEND_DIR
+from benchmarks.mock_ollama import MockOllamaServer, WORDS, add_mock_arguments, settings_from_args
+
+PROJECT = 'bench-revisions'
+STEP_ID = '02_design_ux'
+AGENT = 'pixel'
+
+
+def make_deliverable(sections, words, rng):
+    """
+    Construit un livrable markdown de plusieurs sections.
+
+    Returns:
+        tuple: (contenu, titres des sections)
+    """
+    titles = [f"Volet {chr(ord('A') + index)} {rng.choice(WORDS).capitalize()}" for index in range(sections)]
+    parts = ["# Design UX/UI\n\nSynthèse du livrable.\n"]
+    for title in titles:
+        body = ' '.join(rng.choice(WORDS) for _ in range(words))
+        parts.append(f"\n## {title}\n\n{body}\n")
+    return ''.join(parts), titles
+
+
+def run_mode(mode, agent_manager, mock, deliverable, titles, revisions):
+    """
+    Applique un feedback par section visée et mesure chaque révision.
+
+    Returns:
+        dict: Latences, tokens lus et générés, portée déterminée pour les feedbacks
+    """
+    from utils.file_manager import save_deliverable
+    from utils.sections import parse_sections
+    from agents.revisions import revision_scope
+
+    sections = parse_sections(deliverable)
+    latencies = []
+    scopes = []
+    before = mock.state.snapshot()
+
+    for index in range(revisions):
+        title = titles[index % len(titles)]
+        feedback = f"La section {title} doit être plus précise sur les contraintes mobiles."
+        save_deliverable(PROJECT, STEP_ID, deliverable, agent=AGENT)
+        scope, section_ids = revision_scope(agent_manager, PROJECT, STEP_ID, feedback)
+        scopes.append(scope)
+
+        started = time.perf_counter()
+        if mode == 'sections':
+            result = agent_manager.revise_sections(PROJECT, STEP_ID, AGENT, feedback, section_ids)
+        else:
+            result = agent_manager.process_project_step(PROJECT, STEP_ID, AGENT, context={'feedback': feedback},
+                                                        priority='feedback', tier='full')
+        latencies.append(time.perf_counter() - started)
+        if not result.get('success'):
+            raise RuntimeError(f"Révision {mode} en échec: {result.get('message')}")
+
+    after = mock.state.snapshot()
+    return {
+        'revisions': revisions,
+        'deliverable_sections': len(sections),
+        'scopes': sorted(set(scopes)),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1),
+        'prompt_tokens': (after.get('prompt_tokens', 0) - before.get('prompt_tokens', 0)) // revisions,
+        'generated_tokens': (after.get('generated_tokens', 0) - before.get('generated_tokens', 0)) // revisions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare révisions complètes et révisions par section")
+    parser.add_argument('--sections', type=int, default=8, help="Sections du livrable")
+    parser.add_argument('--section-words', type=int, default=150, help="Mots par section")
+    parser.add_argument('--revisions', type=int, default=3, help="Révisions mesurées par mode")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    add_mock_arguments(parser)
+    parser.set_defaults(latency=20, tokens_per_sec=200.0, prompt_tokens_per_sec=2000.0, response_tokens=0)
+    args = parser.parse_args()
+
+    if not args.response_tokens:
+        # Une révision complète réécrit tout le livrable
+        args.response_tokens = args.sections * args.section_words
+
+    output = os.path.abspath(args.output) if args.output else None
+    mock = MockOllamaServer(settings=settings_from_args(args)).start()
+    workdir = tempfile.mkdtemp(prefix='agency-revisions-')
+    os.environ['OLLAMA_API_URL'] = mock.url
+    os.environ['AGENCY_DATA_DIR'] = os.path.join(workdir, 'data')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # Les fichiers de projets sont relatifs au répertoire courant
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app as app_module
+
+    deliverable, titles = make_deliverable(args.sections, args.section_words, random.Random(args.seed))
+    results = {}
+    try:
+        client = app_module.app.test_client()
+        client.post('/api/projects', json={'name': PROJECT, 'description': "Benchmark des révisions"})
+        with app_module.app.app_context():
+            agent_manager = app_module.agent_manager
+            agent_manager.ensure_agents_ready()
+            for mode in ('full', 'sections'):
+                results[mode] = run_mode(mode, agent_manager, mock, deliverable, titles, args.revisions)
+    finally:
+        mock.stop()
+
+    print(f"{'mode':<9} {'portée':<10} {'p50 ms':>9} {'tokens lus':>11} {'générés':>8}")
+    for mode, stats in results.items():
+        print(f"{mode:<9} {','.join(stats['scopes']):<10} {stats['p50_ms']:>9} {stats['prompt_tokens']:>11} "
+              f"{stats['generated_tokens']:>8}")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'benchmark': 'revisions',
+                'commit': git_revision(),
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'parameters': vars(args),
+                'results': results
+            }, f, indent=2)
+        print(f"Résultats écrits dans {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# benchmarks/startup.py
+"""
+Benchmark du démarrage de l'application sous gunicorn.
+
+Lance gunicorn avec N workers sur un répertoire de données temporaire et
+un serveur Ollama simulé, avec et sans --preload, puis mesure:
+
+- le temps écoulé jusqu'à ce que tous les workers répondent (chaque
+  worker est identifié par le PID renvoyé par /api/health)
+- la mémoire de chaque processus d'après /proc/<pid>/smaps_rollup:
+  RSS, PSS (pages partagées réparties entre les processus) et USS
+  (pages privées, ce que libérerait l'arrêt du worker)
+- le nombre de requêtes reçues par Ollama pendant le démarrage
+
+Les mesures mémoire nécessitent Linux.
+
+Usage:
+    python -m benchmarks.startup --workers 4 --output startup.json
+    python -m benchmarks.startup --modes preload --runs 5
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+import requests
+
+from benchmarks.load import git_revision, free_port, BACKEND_DIR
+from benchmarks.mock_ollama import MockOllamaServer, add_mock_arguments, settings_from_args
+
+# Options de ligne de commande et variables d'environnement (gunicorn.conf.py) de chaque mode
+MODES = {
+    'default': ([], {'GUNICORN_PRELOAD': '0'}),
+    'preload': (['--preload'], {'GUNICORN_PRELOAD': '1'})
+}
+
+
+def read_memory(pid):
+    """
+    Lit la mémoire d'un processus.
+
+    Args:
+        pid (int): PID du processus
+
+    Returns:
+        dict: rss_mb, pss_mb et uss_mb (None si /proc n'est pas disponible)
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+
+    def mb(kb):
+        return round(kb / 1024, 1)
+
+    return {
+        'rss_mb': mb(fields.get('Rss', 0)),
+        'pss_mb': mb(fields.get('Pss', 0)),
+        'uss_mb': mb(fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0))
+    }
+
+
+def wait_for_workers(url, workers, timeout):
+    """
+    Interroge /api/health jusqu'à avoir obtenu une réponse de chaque worker.
+
+    Returns:
+        tuple: (PIDs des workers, secondes jusqu'à la première réponse) ou (None, None)
+    """
+    deadline = time.monotonic() + timeout
+    start = time.monotonic()
+    first = None
+    pids = set()
+    while time.monotonic() < deadline:
+        try:
+            # Une connexion par requête: le noyau répartit les connexions entre les workers
+            response = requests.get(f"{url}/api/health", timeout=5, headers={'Connection': 'close'})
+            if response.status_code == 200:
+                if first is None:
+                    first = time.monotonic() - start
+                pids.add(response.json()['pid'])
+                if len(pids) >= workers:
+                    return pids, first
+                continue
+        except requests.RequestException:
+            pass
+        time.sleep(0.01)
+    return None, first
+
+
+def run_once(mode, workers, ollama, workdir, timeout):
+    """
+    Démarre gunicorn, attend que tous les workers répondent, mesure puis arrête.
+
+    Returns:
+        dict: Mesures du démarrage
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    options, mode_env = MODES[mode]
+    env = dict(os.environ, OLLAMA_API_URL=ollama.url, AGENCY_DATA_DIR=os.path.join(workdir, 'data'),
+               **mode_env)
+    command = [
+        sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+        '--bind', f"127.0.0.1:{port}", '--pythonpath', BACKEND_DIR, '--log-level', 'warning'
+    ] + options
+    config_file = os.path.join(BACKEND_DIR, 'gunicorn.conf.py')
+    if os.path.exists(config_file):
+        command += ['--config', config_file]
+    command.append('app:app')
+
+    requests_before = ollama.state.snapshot().get('requests', 0)
+    start = time.monotonic()
+    # Les fichiers de projets sont relatifs au répertoire courant
+    process = subprocess.Popen(command, cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pids, first = wait_for_workers(url, workers, timeout)
+        ready = time.monotonic() - start
+        if pids is None:
+            raise RuntimeError(f"gunicorn ({mode}) n'a pas démarré {workers} workers en {timeout}s")
+
+        # Laisser les threads d'arrière-plan des workers démarrer avant de mesurer
+        time.sleep(0.5)
+        master = read_memory(process.pid)
+        per_worker = [memory for memory in (read_memory(pid) for pid in sorted(pids)) if memory]
+
+        def mean(key):
+            return round(statistics.mean(m[key] for m in per_worker), 1) if per_worker else None
+
+        return {
+            'first_response_s': round(first, 3),
+            'all_workers_s': round(ready, 3),
+            'ollama_requests': ollama.state.snapshot().get('requests', 0) - requests_before,
+            'master': master,
+            'worker_rss_mb': mean('rss_mb'),
+            'worker_pss_mb': mean('pss_mb'),
+            'worker_uss_mb': mean('uss_mb'),
+            'total_pss_mb': round(sum(m['pss_mb'] for m in per_worker) + (master or {}).get('pss_mb', 0), 1)
+        }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def summarize(runs):
+    """Médiane de chaque mesure numérique sur plusieurs démarrages"""
+    keys = [key for key, value in runs[0].items() if isinstance(value, (int, float))]
+    return {key: round(statistics.median(run[key] for run in runs if run[key] is not None), 3) for key in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage sous gunicorn")
+    parser.add_argument('--workers', type=int, default=4, help="Nombre de workers gunicorn")
+    parser.add_argument('--modes', default='default,preload',
+                        help=f"Modes à mesurer, séparés par des virgules ({', '.join(MODES)})")
+    parser.add_argument('--runs', type=int, default=3, help="Démarrages par mode")
+    parser.add_argument('--timeout', type=float, default=60, help="Délai maximal de démarrage (s)")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"Mode inconnu: {mode}")
+
+    ollama = MockOllamaServer(settings=settings_from_args(args)).start()
+    results = {}
+    try:
+        for mode in modes:
+            runs = []
+            for _ in range(args.runs):
+                # Base neuve à chaque démarrage: les agents sont recréés dans Ollama simulé
+                workdir = tempfile.mkdtemp(prefix='agency-startup-')
+                ollama.state.models.clear()
+                try:
+                    runs.append(run_once(mode, args.workers, ollama, workdir, args.timeout))
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            results[mode] = {'median': summarize(runs), 'runs': runs}
+    finally:
+        ollama.stop()
+
+    print(f"{'mode':<10} {'1re rép. s':>10} {'workers s':>10} {'ollama':>7} "
+          f"{'RSS/w':>7} {'PSS/w':>7} {'USS/w':>7} {'PSS tot':>8}")
+    for mode, result in results.items():
+        m = result['median']
+        print(f"{mode:<10} {m['first_response_s']:>10} {m['all_workers_s']:>10} {m['ollama_requests']:>7} "
+              f"{m['worker_rss_mb']:>7} {m['worker_pss_mb']:>7} {m['worker_uss_mb']:>7} {m['total_pss_mb']:>8}")
+
+    report = {
+        'benchmark': 'startup',
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'parameters': vars(args),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -65,9 +65,9 @@ function ProjectCard({ project }) {
           <i className="far fa-calendar-alt"></i> Créé le {formatDate(project.created_at)}
         </span>
         
-        {project.deliverables && (
+        {(project.deliverables || project.deliverable_count !== undefined) && (
           <span className="project-deliverables">
-            <i className="far fa-file-alt"></i> {project.deliverables?.length || 0} livrables
+            <i className="far fa-file-alt"></i> {project.deliverables?.length ?? project.deliverable_count ?? 0} livrables
           </span>
         )}
       </div>
@@ -1,5 +1,6 @@
 import React, { createContext, useState, useEffect, useContext, useCallback } from 'react';
-import { fetchProjects, fetchProjectById } from '../services/projectService';
+import { fetchProjectById } from '../services/projectService';
+import { fetchBootstrap } from '../services/bootstrapService';
 
 // Création du contexte
 const ProjectContext = createContext();
@@ -22,7 +23,8 @@ export function ProjectProvider({ children }) {
     setError(null);
     
     try {
-      const data = await fetchProjects();
+      // Projets lus depuis /api/bootstrap, avec le nombre de livrables de chacun
+      const { projects: data } = await fetchBootstrap();
       // S'assurer que data est toujours un tableau, même si undefined
       setProjects(Array.isArray(data) ? data : []);
     } catch (err) {
@@ -1,7 +1,7 @@
 import React, { useEffect, useCallback } from 'react';
 import { Link } from 'react-router-dom';
 import { useProjects } from '../context/ProjectContext';
-import { fetchAgents } from '../services/agentService';
+import { fetchBootstrap } from '../services/bootstrapService';
 import ProjectCard from '../components/ProjectCard';
 import AgentAvatar from '../components/AgentAvatar';
 import './Dashboard.css';
@@ -24,7 +24,8 @@ function Dashboard() {
       setAgentsLoading(true);
       setAgentsError(null);
       
-      const agentsData = await fetchAgents();
+      // Même requête que la liste des projets (partagée par fetchBootstrap)
+      const { agents: agentsData } = await fetchBootstrap();
       setAgents(agentsData || []);
     } catch (error) {
       console.error("Erreur lors du chargement des agents:", error);
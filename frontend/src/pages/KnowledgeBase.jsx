@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import { fetchKnowledgeCategories, fetchKnowledgeByCategory, searchKnowledge } from '../services/knowledgeService';
-import { fetchAgents } from '../services/agentService';
+import { fetchKnowledgeByCategory, searchKnowledge } from '../services/knowledgeService';
+import { fetchBootstrap } from '../services/bootstrapService';
 import AgentAvatar from '../components/AgentAvatar';
 import './KnowledgeBase.css';
 
@@ -22,17 +22,16 @@ function KnowledgeBase() {
       setError(null);
       
       try {
-        // Charger les catégories
-        const categoriesData = await fetchKnowledgeCategories();
-        setCategories(categoriesData || []);
+        // Catégories et agents en une seule requête
+        const { knowledge, agents: agentsData } = await fetchBootstrap();
+        const categoriesData = (knowledge || []).map(item => item.category);
+        setCategories(categoriesData);
         
         // Si des catégories sont disponibles, sélectionner la première par défaut
         if (categoriesData && categoriesData.length > 0) {
           setSelectedCategory(categoriesData[0]);
         }
         
-        // Charger les agents
-        const agentsData = await fetchAgents();
         setAgents(agentsData || []);
         
       } catch (err) {
@@ -1,4 +1,5 @@
 import { get } from './api';
+import { fetchBootstrap } from './bootstrapService';
 
 // Liste des agents prédéfinis avec des informations par défaut
 const DEFAULT_AGENTS = [
@@ -102,6 +103,27 @@ export const fetchAgentKnowledge = async (agentName) => {
   }
 };
 
+// Liste des agents partagée entre les appels à fetchAgentDetails (un échec n'est pas conservé)
+let agentsPromise = null;
+
+const loadAgentList = () => {
+  if (!agentsPromise) {
+    const promise = fetchBootstrap().then(({ agents }) => {
+      if (!Array.isArray(agents) || agents.length === 0) {
+        throw new Error('Liste des agents vide');
+      }
+      return agents;
+    });
+    agentsPromise = promise;
+    promise.catch(() => {
+      if (agentsPromise === promise) {
+        agentsPromise = null;
+      }
+    });
+  }
+  return agentsPromise;
+};
+
 /**
  * Récupère les détails d'un agent par son nom
  * @param {string} agentName Nom de l'agent
@@ -109,8 +131,15 @@ export const fetchAgentKnowledge = async (agentName) => {
  */
 export const fetchAgentDetails = async (agentName) => {
   try {
-    // Récupérer tous les agents
-    const agents = await fetchAgents();
+    // Récupérer tous les agents (une seule requête pour tous les agents affichés)
+    let agents;
+    try {
+      agents = await loadAgentList();
+    } catch (error) {
+      console.error("Erreur lors de la récupération des agents:", error);
+      // Liste par défaut pour cet appel uniquement : le suivant interroge à nouveau l'API
+      agents = DEFAULT_AGENTS;
+    }
     
     // Trouver l'agent correspondant
     const agent = agents.find(a => a.name === agentName);
@@ -0,0 +1,25 @@
+import { get } from './api';
+
+// Requête en cours, partagée par les composants qui se montent en même temps
+let pendingBootstrap = null;
+
+/**
+ * Récupère en une seule requête les données affichées au chargement :
+ * projets (avec statut et nombre de livrables), agents et catégories
+ * de connaissances (avec nombre d'entrées)
+ * @returns {Promise<Object>} { projects, agents, knowledge }
+ */
+export const fetchBootstrap = async () => {
+  if (!pendingBootstrap) {
+    pendingBootstrap = get('/bootstrap').finally(() => {
+      pendingBootstrap = null;
+    });
+  }
+  return pendingBootstrap;
+};
+
+const bootstrapService = {
+  fetchBootstrap
+};
+
+export default bootstrapService;
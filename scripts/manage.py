@@ -0,0 +1,369 @@
+# scripts/manage.py
+"""
+Commandes d'administration de l'agence web IA.
+
+Exemples:
+    python scripts/manage.py knowledge-export -o knowledge.ndjson.gz
+    python scripts/manage.py knowledge-import knowledge.ndjson.gz
+    python scripts/manage.py knowledge-dedupe --dry-run
+    python scripts/manage.py rebuild-stats
+    python scripts/manage.py retention --dry-run
+    python scripts/manage.py vacuum
+    python scripts/manage.py autotune --agents arch,pm --apply
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+# Les modules du backend sont importés comme depuis backend/
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.insert(0, BACKEND_DIR)
+
+from config import (
+    DATABASE, KNOWLEDGE_DUPLICATE_DISTANCE, RETENTION_BATCH_SIZE, RETENTION_IO_BUDGET, AGENTS,
+    TUNING_REPEATS, TUNING_DECODE_TOKENS, TUNING_BATCH_SIZES, TUNING_PROMPTS
+)
+
+
+def open_database():
+    """Initialise le schéma si nécessaire et retourne une connexion à la base"""
+    from flask import Flask
+    from database.db import init_db, close_db
+
+    app = Flask('manage')
+    with app.app_context():
+        init_db()
+        close_db()
+
+    db = sqlite3.connect(DATABASE, timeout=30)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def knowledge_export(args):
+    from database.knowledge_io import iter_knowledge_ndjson, gzip_stream
+
+    compress = args.gzip or (args.output or '').endswith('.gz')
+    db = open_database()
+    count = 0
+    started = time.monotonic()
+
+    def counted(lines):
+        nonlocal count
+        for line in lines:
+            count += 1
+            yield line
+
+    try:
+        output = sys.stdout.buffer if args.output in (None, '-') else open(args.output, 'wb')
+        try:
+            lines = counted(iter_knowledge_ndjson(db, agent=args.agent, category=args.category))
+            if compress:
+                for chunk in gzip_stream(lines):
+                    output.write(chunk)
+            else:
+                for line in lines:
+                    output.write(line.encode('utf-8'))
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+    finally:
+        db.close()
+
+    print(f"✅ {count} entrées exportées en {time.monotonic() - started:.1f}s", file=sys.stderr)
+
+
+def knowledge_import(args):
+    from database.knowledge_io import import_knowledge, iter_ndjson_lines
+
+    def report(stats):
+        print(
+            f"\r🔄 {stats['stage']}: {stats['read']} lues, {stats['invalid']} invalides",
+            end='', file=sys.stderr, flush=True
+        )
+
+    db = open_database()
+    started = time.monotonic()
+    try:
+        source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+        try:
+            stats = import_knowledge(
+                db,
+                iter_ndjson_lines(source),
+                batch_size=args.batch_size,
+                on_progress=None if args.quiet else report
+            )
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+    finally:
+        db.close()
+
+    print(file=sys.stderr)
+    print(
+        f"✅ {stats['inserted']} entrées importées, {stats['duplicates']} doublons ignorés, "
+        f"{stats['invalid']} lignes invalides en {time.monotonic() - started:.1f}s",
+        file=sys.stderr
+    )
+
+
+def knowledge_dedupe(args):
+    from database.dedup import dedupe_knowledge
+
+    def report(stats):
+        print(
+            f"\r🔄 {stats['stage']}: {stats['fingerprinted']} empreintes, "
+            f"{stats['scanned']} parcourues, {stats['duplicates']} doublons",
+            end='', file=sys.stderr, flush=True
+        )
+
+    db = open_database()
+    started = time.monotonic()
+    try:
+        stats = dedupe_knowledge(
+            db,
+            max_distance=args.max_distance,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+            reindex=args.reindex,
+            on_progress=None if args.quiet else report
+        )
+    finally:
+        db.close()
+
+    print(file=sys.stderr)
+    action = "détectés" if args.dry_run else "fusionnés"
+    print(
+        f"✅ {stats['duplicates']} quasi-doublons {action} sur {stats['scanned']} entrées "
+        f"en {time.monotonic() - started:.1f}s",
+        file=sys.stderr
+    )
+
+
+def rebuild_stats(args):
+    from database.summary import rebuild_summaries
+
+    db = open_database()
+    started = time.monotonic()
+    try:
+        with db:
+            rebuild_summaries(db)
+        categories = db.execute("SELECT COUNT(*) FROM knowledge_category_stats").fetchone()[0]
+        projects = db.execute("SELECT COUNT(*) FROM project_stats").fetchone()[0]
+    finally:
+        db.close()
+
+    print(
+        f"✅ Statistiques recalculées: {categories} catégories, {projects} projets "
+        f"en {time.monotonic() - started:.1f}s",
+        file=sys.stderr
+    )
+
+
+def retention(args):
+    from database.retention import run_retention, IOBudget
+
+    def report(table, archived, expired):
+        print(f"\r🔄 {table}: {archived}/{expired} lignes archivées", end='', file=sys.stderr, flush=True)
+
+    db = open_database()
+    started = time.monotonic()
+    try:
+        stats = run_retention(
+            db,
+            batch_size=args.batch_size,
+            budget=None if args.no_budget else IOBudget(RETENTION_IO_BUDGET),
+            dry_run=args.dry_run,
+            on_progress=None if args.quiet else report
+        )
+    finally:
+        db.close()
+
+    print(file=sys.stderr)
+    for table, table_stats in stats['tables'].items():
+        if args.dry_run:
+            print(f"📋 {table}: {table_stats['expired']} lignes expirées", file=sys.stderr)
+        else:
+            print(f"📦 {table}: {table_stats['archived']} lignes archivées", file=sys.stderr)
+    print(
+        f"✅ Rétention terminée en {time.monotonic() - started:.1f}s "
+        f"({stats['archive_bytes']} octets archivés, {stats['vacuumed_pages']} pages libérées)",
+        file=sys.stderr
+    )
+
+
+def vacuum(args):
+    db = open_database()
+    try:
+        size_before = os.path.getsize(DATABASE)
+        # Le changement de mode auto_vacuum ne prend effet qu'après un VACUUM complet
+        db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        db.execute("VACUUM")
+        mode = db.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        db.close()
+
+    print(
+        f"✅ Base compactée: {size_before} -> {os.path.getsize(DATABASE)} octets "
+        f"(auto_vacuum={'INCREMENTAL' if mode == 2 else mode})",
+        file=sys.stderr
+    )
+
+
+def autotune(args):
+    import requests
+    from agents.registry import get_agent_registry
+    from agents.tuning import detect_cpu, representative_workload, tune_agent, write_tuned_modelfile
+
+    agents = [agent.strip() for agent in args.agents.split(',')] if args.agents else AGENTS
+    unknown = [agent for agent in agents if agent not in AGENTS]
+    if unknown:
+        print(f"❌ Agents inconnus: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    registry = get_agent_registry()
+    cpu = detect_cpu()
+    # Ollama peut tourner sur une autre machine que cette commande
+    if args.cores:
+        cpu = {'physical': args.cores, 'logical': args.threads or args.cores}
+    elif args.threads:
+        cpu['logical'] = args.threads
+    print(f"🖥️  {cpu['physical']} cœurs physiques, {cpu['logical']} threads", file=sys.stderr)
+
+    def report(trial):
+        options = ', '.join(f"{key}={value}" for key, value in trial['options'].items())
+        memory = f", {trial['memory_mb']} Mo" if trial['memory_mb'] else ''
+        print(
+            f"  🔄 {trial['model']} [{options}]: prefill {trial['prefill_tps']} tok/s, "
+            f"décodage {trial['decode_tps']} tok/s{memory} -> {trial['estimated_s']}s"
+            f"{'' if trial['fits'] else ' (mémoire dépassée)'}",
+            file=sys.stderr
+        )
+
+    db = open_database()
+    results = []
+    try:
+        for agent in agents:
+            profile = registry.get(agent)
+            if profile is None:
+                print(f"❌ Modelfile introuvable pour {agent}", file=sys.stderr)
+                continue
+            workload = representative_workload(db, agent, args.prompts, profile.num_predict)
+            print(
+                f"🔧 {agent}: {len(workload['prompts'])} prompts ({workload['history']} en historique), "
+                f"{workload['eval_tokens']} tokens générés en médiane",
+                file=sys.stderr
+            )
+            try:
+                result = tune_agent(
+                    profile, workload, cpu,
+                    models=args.models.split(',') if args.models else None,
+                    batch_sizes=[int(size) for size in args.batch_sizes.split(',')],
+                    repeats=args.repeats,
+                    decode_tokens=args.decode_tokens,
+                    max_memory_mb=args.max_memory_mb,
+                    on_trial=None if args.quiet else report
+                )
+            except (RuntimeError, requests.RequestException) as e:
+                print(f"❌ {agent}: mesure impossible ({e})", file=sys.stderr)
+                continue
+            results.append(result)
+
+            parameters = ' '.join(f"{key}={value}" for key, value in result['parameters'].items())
+            print(
+                f"✅ {agent}: {result['model']} {parameters} "
+                f"({result['baseline_estimated_s']}s -> {result['estimated_s']}s par génération)",
+                file=sys.stderr
+            )
+            if not args.dry_run:
+                write_tuned_modelfile(profile, result)
+    finally:
+        db.close()
+
+    if args.apply and not args.dry_run:
+        # Recrée immédiatement les agents réglés (sinon au prochain démarrage de l'application)
+        from agents.agent_manager import AgentManager
+        manager = AgentManager()
+        registry.refresh_if_changed(force=True)
+        for result in results:
+            status = "✅" if manager.create_agent(result['agent']) else "❌"
+            print(f"{status} Agent {result['agent']} recréé dans Ollama", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Administration de l'agence web IA")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('knowledge-export', help="Exporte la base de connaissances en NDJSON")
+    export_parser.add_argument('-o', '--output', help="Fichier de sortie (défaut: sortie standard, .gz = gzip)")
+    export_parser.add_argument('--gzip', action='store_true', help="Compresser la sortie en gzip")
+    export_parser.add_argument('--agent', help="Restreindre à un agent")
+    export_parser.add_argument('--category', help="Restreindre à une catégorie")
+    export_parser.set_defaults(handler=knowledge_export)
+
+    import_parser = commands.add_parser('knowledge-import', help="Importe des connaissances depuis un fichier NDJSON")
+    import_parser.add_argument('input', help="Fichier NDJSON, éventuellement gzip ('-' = entrée standard)")
+    import_parser.add_argument('--batch-size', type=int, default=10000, help="Lignes par lot")
+    import_parser.add_argument('--quiet', action='store_true', help="Ne pas afficher la progression")
+    import_parser.set_defaults(handler=knowledge_import)
+
+    dedupe_parser = commands.add_parser('knowledge-dedupe', help="Fusionne les quasi-doublons de la base de connaissances")
+    dedupe_parser.add_argument(
+        '--max-distance', type=int, default=KNOWLEDGE_DUPLICATE_DISTANCE,
+        help="Distance de Hamming maximale entre empreintes SimHash"
+    )
+    dedupe_parser.add_argument('--batch-size', type=int, default=1000, help="Entrées par lot")
+    dedupe_parser.add_argument('--dry-run', action='store_true', help="Compter les doublons sans les fusionner")
+    dedupe_parser.add_argument('--reindex', action='store_true', help="Recréer l'index des bandes SimHash")
+    dedupe_parser.add_argument('--quiet', action='store_true', help="Ne pas afficher la progression")
+    dedupe_parser.set_defaults(handler=knowledge_dedupe)
+
+    stats_parser = commands.add_parser('rebuild-stats', help="Recalcule les tables de statistiques de synthèse")
+    stats_parser.set_defaults(handler=rebuild_stats)
+
+    retention_parser = commands.add_parser('retention', help="Archive et supprime les données expirées")
+    retention_parser.add_argument('--dry-run', action='store_true', help="Compter les lignes expirées sans rien modifier")
+    retention_parser.add_argument('--batch-size', type=int, default=RETENTION_BATCH_SIZE, help="Lignes par transaction")
+    retention_parser.add_argument('--no-budget', action='store_true', help="Ne pas limiter le débit d'E/S")
+    retention_parser.add_argument('--quiet', action='store_true', help="Ne pas afficher la progression")
+    retention_parser.set_defaults(handler=retention)
+
+    vacuum_parser = commands.add_parser(
+        'vacuum', help="Compacte la base et active l'auto_vacuum incrémental (bloque la base pendant l'opération)"
+    )
+    vacuum_parser.set_defaults(handler=vacuum)
+
+    tune_parser = commands.add_parser(
+        'autotune', help="Mesure et écrit les paramètres d'exécution Ollama adaptés à cette machine"
+    )
+    tune_parser.add_argument('--agents', help="Agents à régler, séparés par des virgules (défaut: tous)")
+    tune_parser.add_argument(
+        '--models', help="Modèles de base à comparer, ex: quantifications déjà téléchargées (défaut: FROM de l'agent)"
+    )
+    tune_parser.add_argument('--prompts', type=int, default=TUNING_PROMPTS, help="Prompts représentatifs par agent")
+    tune_parser.add_argument('--repeats', type=int, default=TUNING_REPEATS, help="Mesures par prompt et jeu de paramètres")
+    tune_parser.add_argument('--decode-tokens', type=int, default=TUNING_DECODE_TOKENS, help="Tokens générés par mesure")
+    tune_parser.add_argument(
+        '--batch-sizes', default=','.join(str(size) for size in TUNING_BATCH_SIZES), help="Valeurs de num_batch à essayer"
+    )
+    tune_parser.add_argument('--cores', type=int, help="Cœurs physiques de l'hôte Ollama (défaut: détectés localement)")
+    tune_parser.add_argument('--threads', type=int, help="Threads matériels de l'hôte Ollama")
+    tune_parser.add_argument('--max-memory-mb', type=float, help="Mémoire maximale du modèle chargé")
+    tune_parser.add_argument('--dry-run', action='store_true', help="Mesurer sans écrire les modelfiles")
+    tune_parser.add_argument('--apply', action='store_true', help="Recréer aussitôt les agents réglés dans Ollama")
+    tune_parser.add_argument('--quiet', action='store_true', help="Ne pas afficher chaque mesure")
+    tune_parser.set_defaults(handler=autotune)
+
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
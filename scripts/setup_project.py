@@ -3,6 +3,7 @@ import os
 import subprocess
 import sys
 import sqlite3
+import hashlib
 
 def check_ollama():
     try:
@@ -41,6 +42,9 @@ def init_database():
                 content TEXT NOT NULL,
                 project_id INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                content_hash TEXT,
+                simhash INTEGER,
+                duplicate_count INTEGER DEFAULT 0,
                 FOREIGN KEY (project_id) REFERENCES projects (id)
             )
             ''')
@@ -108,11 +112,17 @@ def seed_knowledge():
         conn = sqlite3.connect('data/db/agency.db')
         cursor = conn.cursor()
         
-        for item in basic_knowledge:
-            cursor.execute(
-                "INSERT INTO knowledge (agent, category, content) VALUES (?, ?, ?)",
-                (item["agent"], item["category"], item["content"])
-            )
+        # Même empreinte que database/knowledge_io.content_hash
+        cursor.executemany(
+            "INSERT INTO knowledge (agent, category, content, content_hash) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    item["agent"], item["category"], item["content"],
+                    hashlib.sha256(' '.join(item["content"].split()).encode('utf-8')).hexdigest()
+                )
+                for item in basic_knowledge
+            ]
+        )
         
         conn.commit()
         conn.close()